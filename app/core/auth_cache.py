@@ -0,0 +1,133 @@
+"""
+In-process cache for authenticated principals.
+
+``get_current_user`` used to decode the JWT and run a ``users`` lookup on
+every authenticated request. Two caches remove that work after the first hit:
+
+* verified access-token payloads, memoized until the token's ``exp``;
+* user principals (``{"user_id", "username"}``), kept for ``AUTH_PRINCIPAL_TTL``
+  seconds so a deleted account stops authenticating within that window, or
+  immediately when ``invalidate_user`` is called.
+
+Loads that race with ``invalidate_user`` are discarded: callers take a
+``load_epoch()`` before querying the database and pass it to
+``put_principal``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config import settings
+
+
+class AuthCache:
+    """Bounded LRU caches for token payloads and user principals."""
+
+    def __init__(
+        self,
+        principal_ttl: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.principal_ttl = principal_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._principals: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._epoch = 0
+        self._stats = {
+            "token_hits": 0,
+            "token_misses": 0,
+            "principal_hits": 0,
+            "principal_misses": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _store(self, table: "OrderedDict", key: str, value) -> None:
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+
+    def _lookup(self, table: "OrderedDict", key: str, hit: str, miss: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = table.get(key)
+            if entry is not None and entry[0] > self._clock():
+                table.move_to_end(key)
+                self._stats[hit] += 1
+                return entry[1]
+            if entry is not None:
+                del table[key]
+            self._stats[miss] += 1
+            return None
+
+    # -- tokens ----------------------------------------------------------
+    def get_payload(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verified payload for ``token`` if it was seen before and has not expired."""
+        if not self.enabled:
+            return None
+        return self._lookup(self._tokens, token, "token_hits", "token_misses")
+
+    def put_payload(self, token: str, payload: Dict[str, Any]) -> None:
+        expires_at = payload.get("exp")
+        if not self.enabled or not isinstance(expires_at, (int, float)):
+            return
+        with self._lock:
+            self._store(self._tokens, token, (float(expires_at), payload))
+
+    # -- principals ------------------------------------------------------
+    def get_principal(self, user_id: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled or self.principal_ttl <= 0:
+            return None
+        principal = self._lookup(self._principals, user_id, "principal_hits", "principal_misses")
+        return dict(principal) if principal is not None else None
+
+    def load_epoch(self) -> int:
+        return self._epoch
+
+    def put_principal(self, user_id: str, principal: Dict[str, Any], epoch: Optional[int] = None) -> None:
+        if not self.enabled or self.principal_ttl <= 0:
+            return
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return  # invalidated while the caller was loading it
+            self._store(self._principals, user_id, (self._clock() + self.principal_ttl, dict(principal)))
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop a user's principal and memoized tokens (account deleted or disabled)."""
+        with self._lock:
+            self._epoch += 1
+            self._stats["invalidations"] += 1
+            self._principals.pop(user_id, None)
+            stale = [token for token, (_, payload) in self._tokens.items() if payload.get("sub") == user_id]
+            for token in stale:
+                del self._tokens[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._tokens.clear()
+            self._principals.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["tokens"] = len(self._tokens)
+            stats["principals"] = len(self._principals)
+        stats["principal_ttl"] = self.principal_ttl
+        return stats
+
+
+auth_cache = AuthCache(
+    principal_ttl=settings.auth_principal_ttl,
+    max_entries=settings.auth_cache_size,
+)
@@ -17,6 +17,28 @@ class Settings(BaseSettings):
     environment: str = Field(default="development", alias="ENVIRONMENT")
     sqlite_path: str = Field(default="idleduelist.db", alias="SQLITE_PATH")
     database_url: str | None = Field(default=None, alias="DATABASE_URL")
+    database_replica_url: str | None = Field(default=None, alias="DATABASE_REPLICA_URL")
+    db_replica_max_lag_seconds: float = Field(default=5.0, alias="DB_REPLICA_MAX_LAG_SECONDS")
+    db_read_your_writes_seconds: float = Field(default=5.0, alias="DB_READ_YOUR_WRITES_SECONDS")
+    db_pool_min_size: int = Field(default=1, alias="DB_POOL_MIN_SIZE")
+    db_pool_max_size: int = Field(default=10, alias="DB_POOL_MAX_SIZE")
+    db_pool_timeout: float = Field(default=10.0, alias="DB_POOL_TIMEOUT")
+    db_pool_health_check_interval: float = Field(default=30.0, alias="DB_POOL_HEALTH_CHECK_INTERVAL")
+    db_prepare_statements: bool = Field(default=True, alias="DB_PREPARE_STATEMENTS")
+    sqlite_profile: str = Field(default="tuned", alias="SQLITE_PROFILE")
+    sqlite_journal_mode: str | None = Field(default=None, alias="SQLITE_JOURNAL_MODE")
+    sqlite_synchronous: str | None = Field(default=None, alias="SQLITE_SYNCHRONOUS")
+    sqlite_mmap_size: int | None = Field(default=None, alias="SQLITE_MMAP_SIZE")
+    sqlite_cache_size: int | None = Field(default=None, alias="SQLITE_CACHE_SIZE")
+    sqlite_busy_timeout_ms: int | None = Field(default=None, alias="SQLITE_BUSY_TIMEOUT_MS")
+    sqlite_temp_store: str | None = Field(default=None, alias="SQLITE_TEMP_STORE")
+    sqlite_checkpoint_interval: float = Field(default=300.0, alias="SQLITE_CHECKPOINT_INTERVAL")
+    sqlite_wal_truncate_pages: int = Field(default=4096, alias="SQLITE_WAL_TRUNCATE_PAGES")
+    db_executor_workers: int = Field(default=10, alias="DB_EXECUTOR_WORKERS")
+    db_instrumentation: bool = Field(default=True, alias="DB_INSTRUMENTATION")
+    db_slow_query_ms: float = Field(default=100.0, alias="DB_SLOW_QUERY_MS")
+    db_n_plus_one_threshold: int = Field(default=5, alias="DB_N_PLUS_ONE_THRESHOLD")
+    db_max_tracked_statements: int = Field(default=500, alias="DB_MAX_TRACKED_STATEMENTS")
     redis_url: str | None = Field(default=None, alias="REDIS_URL")
     redis_namespace: str = Field(default="idleduelist", alias="REDIS_NAMESPACE")
     cors_origins: str | None = Field(default=None, alias="CORS_ORIGINS")
@@ -36,7 +58,30 @@ class Settings(BaseSettings):
     combat_state_ttl: int = Field(default=3600, alias="COMBAT_STATE_TTL")
     auto_fight_ttl: int = Field(default=7200, alias="AUTO_FIGHT_TTL")
     pvp_queue_ttl: int = Field(default=300, alias="PVP_QUEUE_TTL")
-    active_session_ttl: int = Field(default=900, alias="ACTIVE_SESSION_TTL")
+    matchmaking_bracket_width: int = Field(default=100, alias="MATCHMAKING_BRACKET_WIDTH")
+    matchmaking_base_window: int = Field(default=100, alias="MATCHMAKING_BASE_WINDOW")
+    matchmaking_widen_per_second: float = Field(default=10.0, alias="MATCHMAKING_WIDEN_PER_SECOND")
+    matchmaking_max_window: int = Field(default=1000, alias="MATCHMAKING_MAX_WINDOW")
+    matchmaking_tick_seconds: float = Field(default=0.5, alias="MATCHMAKING_TICK_SECONDS")
+    matchmaking_result_ttl: int = Field(default=60, alias="MATCHMAKING_RESULT_TTL")
+    queue_telemetry_half_life: float = Field(default=600.0, alias="QUEUE_TELEMETRY_HALF_LIFE")
+    opponent_index_refresh_seconds: float = Field(default=60.0, alias="OPPONENT_INDEX_REFRESH_SECONDS")
+    pvp_random_band_levels: int = Field(default=10, alias="PVP_RANDOM_BAND_LEVELS")
+    ghost_battle_tick_seconds: float = Field(default=0.1, alias="GHOST_BATTLE_TICK_SECONDS")
+    ghost_battle_max_seconds: float = Field(default=300.0, alias="GHOST_BATTLE_MAX_SECONDS")
+    leaderboard_reconcile_seconds: float = Field(default=300.0, alias="LEADERBOARD_RECONCILE_SECONDS")
+    presence_window_seconds: int = Field(default=300, alias="PRESENCE_WINDOW_SECONDS")
+    presence_bucket_seconds: int = Field(default=60, alias="PRESENCE_BUCKET_SECONDS")
+
+    character_cache_size: int = Field(default=1024, alias="CHARACTER_CACHE_SIZE")
+    character_cache_ttl: int = Field(default=300, alias="CHARACTER_CACHE_TTL")
+    auth_principal_ttl: float = Field(default=60.0, alias="AUTH_PRINCIPAL_TTL")
+    auth_cache_size: int = Field(default=10000, alias="AUTH_CACHE_SIZE")
+    ownership_cache_size: int = Field(default=10000, alias="OWNERSHIP_CACHE_SIZE")
+    ownership_cache_ttl: int = Field(default=300, alias="OWNERSHIP_CACHE_TTL")
+    password_bcrypt_rounds: int = Field(default=12, alias="PASSWORD_BCRYPT_ROUNDS")
+    password_hash_workers: int = Field(default=2, alias="PASSWORD_HASH_WORKERS")
+    password_hash_concurrency: int = Field(default=4, alias="PASSWORD_HASH_CONCURRENCY")
 
     log_file: str = Field(default="idleduelist.log", alias="LOG_FILE")
     telemetry_sample_rate: float = Field(default=1.0, alias="TELEMETRY_SAMPLE_RATE")
@@ -0,0 +1,201 @@
+"""
+bcrypt hashing and verification off the event loop.
+
+bcrypt is deliberately slow (tens of milliseconds at cost 12), so running it
+inside an ``async def`` handler stalls every other request on the loop.
+``password_hasher`` runs it in a small process pool behind a concurrency cap
+and records how long calls queue::
+
+    password_hash = await password_hasher.hash(password)
+    if await password_hasher.verify(password, stored_hash):
+        if password_hasher.needs_rehash(stored_hash):
+            ...  # store await password_hasher.hash(password)
+
+``PASSWORD_BCRYPT_ROUNDS`` sets the cost for new hashes; hashes made with a
+lower cost are upgraded transparently on the next successful login.
+``PASSWORD_HASH_WORKERS=0`` runs bcrypt in threads instead (it releases the
+GIL), for platforms where spawning worker processes is not possible.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+def hash_password_sync(password: str, rounds: int) -> str:
+    """Hash ``password`` with bcrypt at ``rounds`` (runs in the worker)."""
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def verify_password_sync(password: str, hashed: str) -> bool:
+    """Check ``password`` against a bcrypt hash (runs in the worker)."""
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor encoded in a ``$2b$12$...`` hash, or None if unrecognised."""
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded worker pool with queueing metrics."""
+
+    def __init__(self, rounds: int, workers: int, max_concurrency: int) -> None:
+        if not MIN_ROUNDS <= rounds <= MAX_ROUNDS:
+            raise ValueError(f"bcrypt rounds must be between {MIN_ROUNDS} and {MAX_ROUNDS}, got {rounds}")
+        self.rounds = rounds
+        self.workers = max(0, workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "hashes": 0,
+            "verifies": 0,
+            "failed": 0,
+            "waiting": 0,
+            "in_flight": 0,
+            "rehashes": 0,
+            "queue_wait_ms_total": 0.0,
+            "queue_wait_ms_max": 0.0,
+            "run_ms_total": 0.0,
+        }
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers == 0:
+            return None
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn: never fork a process that holds DB connections and threads
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    def _bump(self, key: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    async def _run(self, kind: str, fn: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        acquired = False
+        self._bump("waiting")
+        try:
+            async with self._semaphore():
+                acquired = True
+                started = time.perf_counter()
+                waited_ms = (started - queued_at) * 1000
+                with self._stats_lock:
+                    self._stats["waiting"] -= 1
+                    self._stats["in_flight"] += 1
+                    self._stats["queue_wait_ms_total"] += waited_ms
+                    self._stats["queue_wait_ms_max"] = max(self._stats["queue_wait_ms_max"], waited_ms)
+                ok = False
+                try:
+                    try:
+                        result = await loop.run_in_executor(self._get_executor(), fn, *args)
+                    except BrokenProcessPool:
+                        self._fall_back_to_threads()
+                        result = await loop.run_in_executor(None, fn, *args)
+                    ok = True
+                    return result
+                finally:
+                    with self._stats_lock:
+                        self._stats["in_flight"] -= 1
+                        self._stats[kind if ok else "failed"] += 1
+                        self._stats["run_ms_total"] += (time.perf_counter() - started) * 1000
+        finally:
+            if not acquired:  # cancelled while queued
+                self._bump("waiting", -1)
+
+    def _fall_back_to_threads(self) -> None:
+        """A worker died (or could not start): keep serving from threads."""
+        logger.error("Password hashing process pool is broken; falling back to threads")
+        self.workers = 0
+        self.shutdown(wait=False)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hashes", hash_password_sync, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verifies", verify_password_sync, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True when ``hashed`` was made with fewer rounds than the current policy."""
+        rounds = hash_rounds(hashed)
+        return rounds is not None and rounds < self.rounds
+
+    def record_rehash(self) -> None:
+        self._bump("rehashes")
+
+    def warm_up(self) -> None:
+        """Start the worker processes now rather than on the first login."""
+        try:
+            executor = self._get_executor()
+            if executor is not None:
+                for future in [executor.submit(hash_rounds, "") for _ in range(self.workers)]:
+                    future.result()
+        except Exception as exc:
+            logger.warning("Could not start password hashing workers: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        calls = stats["hashes"] + stats["verifies"] + stats["failed"]
+        stats["avg_queue_wait_ms"] = round(stats["queue_wait_ms_total"] / calls, 3) if calls else 0.0
+        stats["avg_run_ms"] = round(stats["run_ms_total"] / calls, 3) if calls else 0.0
+        for key in ("queue_wait_ms_total", "queue_wait_ms_max", "run_ms_total"):
+            stats[key] = round(stats[key], 3)
+        stats.update(
+            rounds=self.rounds,
+            workers=self.workers,
+            max_concurrency=self.max_concurrency,
+            backend="process" if self.workers else "thread",
+        )
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.password_bcrypt_rounds,
+    workers=settings.password_hash_workers,
+    max_concurrency=settings.password_hash_concurrency,
+)
@@ -1,15 +1,22 @@
 """Database helpers exposed at package level."""
 
+from .async_db import AsyncDatabase, async_db
+from .instrumentation import query_instrumentation
 from .manager import (
     db_manager,
     execute_query,
     get_db_connection,
     get_db_cursor,
+    get_db_read_connection,
 )
 
 __all__ = [
+    "AsyncDatabase",
+    "async_db",
     "db_manager",
     "execute_query",
     "get_db_connection",
     "get_db_cursor",
+    "get_db_read_connection",
+    "query_instrumentation",
 ]
@@ -0,0 +1,154 @@
+"""
+Run blocking database work off the event loop.
+
+sqlite3 and psycopg2 are synchronous, so calling them from an ``async def``
+handler stalls every other request on the loop. ``async_db.run`` hands the
+call to a bounded thread pool (sized to match the connection pool) and
+awaits the result; ``async_db.offload`` does the same for a whole route
+handler while keeping its signature visible to FastAPI::
+
+    @app.get("/api/character/{character_id}")
+    @async_db.offload
+    def get_character(character_id: str, current_user: dict = Depends(get_current_user)):
+        ...
+
+Handlers that mutate shared in-memory state for one entity (a combat, an
+auto-fight session) can pass ``serialize_on`` so requests for the same key
+still run one at a time, as they did when everything ran on the loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
+
+from app.core.config import settings
+
+T = TypeVar("T")
+KeyFunc = Callable[[Dict[str, Any]], Any]
+
+
+class AsyncDatabase:
+    """Bounded executor for blocking DB calls, with queueing metrics."""
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._key_locks: "weakref.WeakValueDictionary[Any, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "in_flight": 0,
+            "queue_wait_ms_total": 0.0,
+            "queue_wait_ms_max": 0.0,
+            "run_ms_total": 0.0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="db"
+                    )
+        return self._executor
+
+    def _call(self, submitted_at: float, context: contextvars.Context, fn: Callable[..., T], args, kwargs) -> T:
+        started = time.perf_counter()
+        waited_ms = (started - submitted_at) * 1000
+        with self._stats_lock:
+            self._stats["queue_wait_ms_total"] += waited_ms
+            self._stats["queue_wait_ms_max"] = max(self._stats["queue_wait_ms_max"], waited_ms)
+        ok = False
+        try:
+            result = context.run(fn, *args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._stats_lock:
+                self._stats["in_flight"] -= 1
+                self._stats["completed" if ok else "failed"] += 1
+                self._stats["run_ms_total"] += (time.perf_counter() - started) * 1000
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run ``fn(*args, **kwargs)`` on the DB executor and await its result.
+
+        Context variables of the caller are visible inside ``fn``.
+        """
+        with self._stats_lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            self._call, time.perf_counter(), contextvars.copy_context(), fn, args, kwargs
+        )
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    async def run_serialized(self, key: Any, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Like ``run`` but never runs two calls for the same ``key`` concurrently."""
+        if key is None:
+            return await self.run(fn, *args, **kwargs)
+        lock = self._key_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._key_locks[key] = lock
+        async with lock:
+            return await self.run(fn, *args, **kwargs)
+
+    def offload(
+        self,
+        fn: Optional[Callable[..., T]] = None,
+        *,
+        serialize_on: Union[str, KeyFunc, None] = None,
+    ):
+        """Wrap a blocking handler in a coroutine that runs it on the executor.
+
+        ``serialize_on`` names a keyword argument (or takes a callable that
+        receives the keyword arguments) whose value is used as the
+        ``run_serialized`` key.
+        """
+
+        def decorator(func: Callable[..., T]) -> Callable[..., Any]:
+            if isinstance(serialize_on, str):
+                key_func: Optional[KeyFunc] = lambda kwargs: kwargs.get(serialize_on)
+            else:
+                key_func = serialize_on
+
+            @functools.wraps(func)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                if key_func is None:
+                    return await self.run(func, *args, **kwargs)
+                return await self.run_serialized(key_func(kwargs), func, *args, **kwargs)
+
+            return wrapper
+
+        return decorator(fn) if fn is not None else decorator
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        finished = stats["completed"] + stats["failed"]
+        stats["avg_queue_wait_ms"] = round(stats["queue_wait_ms_total"] / finished, 3) if finished else 0.0
+        stats["avg_run_ms"] = round(stats["run_ms_total"] / finished, 3) if finished else 0.0
+        for key in ("queue_wait_ms_total", "queue_wait_ms_max", "run_ms_total"):
+            stats[key] = round(stats[key], 3)
+        stats["max_workers"] = self.max_workers
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+async_db = AsyncDatabase(settings.db_executor_workers)
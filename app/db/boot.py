@@ -0,0 +1,207 @@
+"""
+Fast database boot: migrations and seed data are skipped when unchanged.
+
+Startup used to replay every migration check and rewrite all abilities, PvE
+enemies and store items row by row. ``boot_database`` instead compares two
+fingerprints stored in ``boot_meta``:
+
+* ``schema_fingerprint`` - hash of the registered migration history
+* ``seed_fingerprint``   - hash of the seed rows built from ``game_logic``
+
+When both match, boot is a single SELECT. Otherwise pending migrations run
+and the seed tables are upserted with ``executemany`` in one transaction,
+together with the new fingerprints, so a crash mid-seed is retried on the
+next boot.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.db.migrations import migration_engine
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_KEY = "schema_fingerprint"
+SEED_KEY = "seed_fingerprint"
+
+_ARMOR_NAMES = {
+    "helmet": "Helmet",
+    "chest": "Chestplate",
+    "legs": "Leggings",
+    "boots": "Boots",
+    "gloves": "Gloves",
+}
+
+
+class SeedTable(NamedTuple):
+    """Rows for one code-owned table, keyed by ``id``.
+
+    ``prune`` deletes rows whose id is no longer in the seed (safe only for
+    tables nothing else references by foreign key).
+    """
+
+    table: str
+    columns: Tuple[str, ...]
+    rows: List[Tuple[Any, ...]]
+    prune: bool = False
+
+    @property
+    def upsert_sql(self) -> str:
+        columns = ", ".join(self.columns)
+        placeholders = ", ".join("?" for _ in self.columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in self.columns if column != "id")
+        return (
+            f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}"
+        )
+
+
+class BootReport(NamedTuple):
+    migrations_applied: List[int]
+    schema_changed: bool
+    seed_changed: bool
+    timings_ms: Dict[str, float]
+
+    @property
+    def skipped(self) -> bool:
+        return not (self.schema_changed or self.seed_changed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "migrations_applied": self.migrations_applied,
+            "schema_changed": self.schema_changed,
+            "seed_changed": self.seed_changed,
+            "skipped": self.skipped,
+            "timings_ms": self.timings_ms,
+        }
+
+
+def build_seed_tables() -> List[SeedTable]:
+    """Abilities, PvE enemies (in story order) and the common store items."""
+    from game_logic import ABILITIES, PVE_ENEMIES, WEAPON_TYPES
+
+    abilities = [
+        (
+            ability["id"], ability["name"], ability["description"], ability["cooldown_seconds"],
+            ability["damage_multiplier"], ability["damage_type"], ability["mana_cost"],
+            weapon_type, bool(ability["is_ultimate"]),
+        )
+        for weapon_type, weapon_abilities in ABILITIES.items()
+        for ability in weapon_abilities
+    ]
+    enemies = [
+        (
+            enemy["id"], enemy["name"], enemy["level"], json.dumps(enemy["stats"]),
+            enemy["description"], order, enemy["level"], enemy["gold_min"], enemy["gold_max"],
+            enemy["drop_chance"], enemy.get("exp_reward", 50),
+        )
+        for order, enemy in enumerate(PVE_ENEMIES, start=1)
+    ]
+    store_items = [
+        (f"store_{weapon_type}", f"Common {weapon_type.title()}", "main_hand", weapon_type, 100, 1)
+        for weapon_type in WEAPON_TYPES
+    ] + [
+        (f"store_{slot}", f"Common {name}", slot, None, 50, 1)
+        for slot, name in _ARMOR_NAMES.items()
+    ]
+    return [
+        SeedTable(
+            "abilities",
+            ("id", "name", "description", "cooldown_seconds", "damage_multiplier",
+             "damage_type", "mana_cost", "weapon_type", "is_ultimate"),
+            abilities,
+        ),
+        SeedTable(
+            "pve_enemies",
+            ("id", "name", "level", "stats_json", "description", "story_order",
+             "unlocked_at_level", "gold_min", "gold_max", "drop_chance", "exp_reward"),
+            enemies,
+            prune=True,
+        ),
+        SeedTable(
+            "store_items",
+            ("id", "name", "slot", "weapon_type", "base_price", "level_requirement"),
+            store_items,
+        ),
+    ]
+
+
+def seed_fingerprint(tables: Sequence[SeedTable]) -> str:
+    payload = [[table.table, list(table.columns), table.rows, table.prune] for table in tables]
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def apply_seed(cursor, tables: Sequence[SeedTable]) -> None:
+    """Upsert every seed table; the caller owns the transaction."""
+    for table in tables:
+        cursor.executemany(table.upsert_sql, table.rows)
+        if table.prune and table.rows:
+            ids = [row[0] for row in table.rows]
+            placeholders = ", ".join("?" for _ in ids)
+            cursor.execute(f"DELETE FROM {table.table} WHERE id NOT IN ({placeholders})", ids)
+
+
+def _read_meta(conn) -> Dict[str, str]:
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT key, value FROM boot_meta")
+        return {row["key"]: row["value"] for row in cursor.fetchall()}
+    except Exception:
+        # Fresh database (or one that predates boot_meta)
+        conn.rollback()
+        return {}
+
+
+def _write_meta(cursor, values: Dict[str, str]) -> None:
+    cursor.executemany(
+        "INSERT INTO boot_meta (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+        list(values.items()),
+    )
+
+
+def boot_database(
+    conn,
+    use_postgres: Optional[bool] = None,
+    seed_tables: Optional[Sequence[SeedTable]] = None,
+) -> BootReport:
+    """Bring schema and seed data up to date, skipping work whose fingerprint matches."""
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    meta = _read_meta(conn)
+    schema_fp = migration_engine.fingerprint()
+    schema_changed = meta.get(SCHEMA_KEY) != schema_fp
+    timings["fingerprint_check_ms"] = (time.perf_counter() - started) * 1000
+
+    applied: List[int] = []
+    if schema_changed:
+        phase = time.perf_counter()
+        applied = migration_engine.migrate(conn, use_postgres=use_postgres)
+        timings["migrate_ms"] = (time.perf_counter() - phase) * 1000
+
+    phase = time.perf_counter()
+    tables = list(seed_tables) if seed_tables is not None else build_seed_tables()
+    seed_fp = seed_fingerprint(tables)
+    seed_changed = meta.get(SEED_KEY) != seed_fp
+    if schema_changed or seed_changed:
+        cursor = conn.cursor()
+        try:
+            if seed_changed:
+                apply_seed(cursor, tables)
+            _write_meta(cursor, {SCHEMA_KEY: schema_fp, SEED_KEY: seed_fp})
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        timings["seed_ms"] = (time.perf_counter() - phase) * 1000
+
+    timings["total_ms"] = (time.perf_counter() - started) * 1000
+    timings = {key: round(value, 2) for key, value in timings.items()}
+    return BootReport(applied, schema_changed, seed_changed, timings)
@@ -7,6 +7,12 @@ from __future__ import annotations
 
 def ensure_player_tracking_tables(conn, cursor, use_postgres: bool) -> None:
     """Create player tracking related tables if they do not exist."""
+    create_player_tracking_tables(cursor, use_postgres)
+    conn.commit()
+
+
+def create_player_tracking_tables(cursor, use_postgres: bool) -> None:
+    """Issue the player tracking DDL without committing (for use inside a migration)."""
     if use_postgres:
         cursor.execute(
             """
@@ -156,5 +162,3 @@ def ensure_player_tracking_tables(conn, cursor, use_postgres: bool) -> None:
     cursor.execute(
         "CREATE INDEX IF NOT EXISTS idx_pvp_matches_loser ON pvp_matches (loser_user_id, created_at DESC)"
     )
-
-    conn.commit()
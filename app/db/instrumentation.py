@@ -0,0 +1,355 @@
+"""
+Per-query and per-request database instrumentation.
+
+Every statement run through a managed connection (SQLite or PostgreSQL) is
+timed and attributed to the request that issued it. The HTTP middleware opens
+a ``RequestQueries`` scope in a contextvar; the scope travels with the request
+into ``async_db`` worker threads because those run handlers in a copy of the
+caller's context::
+
+    token = query_instrumentation.begin_request(request.method, request.scope)
+    try:
+        response = await call_next(request)
+    finally:
+        query_instrumentation.end_request(token)
+
+Aggregates are kept per normalised SQL text (calls, errors, latency, rows)
+and per route (requests, queries per request). Statements slower than
+``DB_SLOW_QUERY_MS`` are logged with their route, and a statement repeated
+``DB_N_PLUS_ONE_THRESHOLD`` times within one request is logged once as a
+likely N+1 pattern. At most ``max_statements`` distinct statements are
+tracked; the least recently run one is dropped to make room, so SQL built
+at runtime cannot grow the table without bound.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_MAX_SQL_LENGTH = 240
+
+
+@lru_cache(maxsize=4096)
+def _normalize(sql: str) -> str:
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    if len(sql) > _MAX_SQL_LENGTH:
+        sql = sql[: _MAX_SQL_LENGTH - 3] + "..."
+    return sql
+
+
+def normalize_sql(sql: Any) -> str:
+    """Collapse whitespace so the same statement always maps to one key."""
+    return _normalize(sql if isinstance(sql, str) else str(sql))
+
+
+class RequestQueries:
+    """Queries issued while serving a single request."""
+
+    __slots__ = ("method", "scope", "path", "count", "total_ms", "by_sql", "flagged", "_lock")
+
+    def __init__(self, method: str = "", scope: Optional[Mapping[str, Any]] = None, path: str = "") -> None:
+        self.method = method
+        self.scope = scope
+        self.path = path or (scope.get("path", "") if scope else "")
+        self.count = 0
+        self.total_ms = 0.0
+        self.by_sql: Dict[str, int] = {}
+        self.flagged: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        """Route template once routing has run (``/api/combat/{combat_id}``), else the raw path."""
+        route = self.scope.get("route") if self.scope else None
+        path = getattr(route, "path", None) or self.path
+        return f"{self.method} {path}".strip()
+
+    def add(self, sql: str, elapsed_ms: float) -> int:
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            repeats = self.by_sql.get(sql, 0) + 1
+            self.by_sql[sql] = repeats
+            return repeats
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("db_request_queries", default=None)
+_paused: ContextVar[bool] = ContextVar("db_instrumentation_paused", default=False)
+
+
+class QueryInstrumentation:
+    """Collects statement timings and per-request query counts."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        slow_query_ms: float = 100.0,
+        n_plus_one_threshold: int = 5,
+        recent_limit: int = 50,
+        max_statements: int = 500,
+    ) -> None:
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = max(2, n_plus_one_threshold)
+        self._lock = threading.Lock()
+        self.max_statements = max(1, max_statements)
+        self._statements: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._n_plus_one: Dict[tuple, Dict[str, Any]] = {}
+        self._slow: "deque[Dict[str, Any]]" = deque(maxlen=recent_limit)
+        self._totals = {"queries": 0, "errors": 0, "slow": 0, "outside_request": 0, "evicted_statements": 0}
+
+    # -- request scope ---------------------------------------------------
+    def begin_request(self, method: str = "", scope: Optional[Mapping[str, Any]] = None, path: str = "") -> Token:
+        return _current_request.set(RequestQueries(method, scope, path))
+
+    def end_request(self, token: Token) -> Optional[RequestQueries]:
+        """Close the scope opened by ``begin_request`` and fold it into route stats."""
+        current = _current_request.get()
+        _current_request.reset(token)
+        if current is None or not self.enabled:
+            return current
+        route = current.route
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0}
+            stats["requests"] += 1
+            stats["queries"] += current.count
+            stats["db_ms"] += current.total_ms
+            if current.count > stats["max_queries"]:
+                stats["max_queries"] = current.count
+        return current
+
+    @staticmethod
+    def current_request() -> Optional[RequestQueries]:
+        return _current_request.get()
+
+    @staticmethod
+    @contextmanager
+    def paused():
+        """Skip recording inside the block (connection setup, pool health checks)."""
+        token = _paused.set(True)
+        try:
+            yield
+        finally:
+            _paused.reset(token)
+
+    # -- recording -------------------------------------------------------
+    def record(self, sql: Any, elapsed_ms: float, rows: int = -1, ok: bool = True) -> None:
+        """Record one executed statement; ``rows`` is -1 when unknown."""
+        if not self.enabled:
+            return
+        key = normalize_sql(sql)
+        request = _current_request.get()
+        with self._lock:
+            self._totals["queries"] += 1
+            if request is None:
+                self._totals["outside_request"] += 1
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    self._statements.popitem(last=False)
+                    self._totals["evicted_statements"] += 1
+                stats = self._statements[key] = {
+                    "calls": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                }
+            else:
+                self._statements.move_to_end(key)
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            if elapsed_ms > stats["max_ms"]:
+                stats["max_ms"] = elapsed_ms
+            if rows > 0:
+                stats["rows"] += rows
+            if not ok:
+                self._totals["errors"] += 1
+                stats["errors"] += 1
+
+        route = request.route if request is not None else None
+        if elapsed_ms >= self.slow_query_ms:
+            with self._lock:
+                self._totals["slow"] += 1
+                self._slow.append({
+                    "sql": key,
+                    "ms": round(elapsed_ms, 3),
+                    "route": route,
+                    "at": time.time(),
+                })
+            logger.warning("Slow query (%.1f ms) on %s: %s", elapsed_ms, route or "<no request>", key)
+
+        if request is not None:
+            repeats = request.add(key, elapsed_ms)
+            if repeats == self.n_plus_one_threshold:
+                self._flag_n_plus_one(request, route, key)
+
+    def add_rows(self, sql: Any, rows: int) -> None:
+        """Attribute rows fetched after ``execute`` returned to their statement."""
+        if not self.enabled or rows <= 0:
+            return
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is not None:
+                stats["rows"] += rows
+
+    def _flag_n_plus_one(self, request: RequestQueries, route: str, key: str) -> None:
+        request.flagged.append(key)
+        with self._lock:
+            entry = self._n_plus_one.get((route, key))
+            if entry is None:
+                entry = self._n_plus_one[(route, key)] = {"route": route, "sql": key, "requests": 0}
+            entry["requests"] += 1
+        logger.warning(
+            "Possible N+1 on %s: statement repeated %d times in one request: %s",
+            route, self.n_plus_one_threshold, key,
+        )
+
+    # -- reporting -------------------------------------------------------
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            statements = [
+                {
+                    "sql": sql,
+                    "calls": int(s["calls"]),
+                    "errors": int(s["errors"]),
+                    "rows": int(s["rows"]),
+                    "total_ms": round(s["total_ms"], 3),
+                    "avg_ms": round(s["total_ms"] / s["calls"], 3) if s["calls"] else 0.0,
+                    "max_ms": round(s["max_ms"], 3),
+                }
+                for sql, s in self._statements.items()
+            ]
+            routes = [
+                {
+                    "route": route,
+                    "requests": int(r["requests"]),
+                    "avg_queries": round(r["queries"] / r["requests"], 2) if r["requests"] else 0.0,
+                    "max_queries": int(r["max_queries"]),
+                    "avg_db_ms": round(r["db_ms"] / r["requests"], 3) if r["requests"] else 0.0,
+                }
+                for route, r in self._routes.items()
+            ]
+            n_plus_one = sorted(self._n_plus_one.values(), key=lambda e: e["requests"], reverse=True)
+            totals = dict(self._totals)
+            slow = list(self._slow)
+        statements.sort(key=lambda row: row["total_ms"], reverse=True)
+        routes.sort(key=lambda row: row["avg_queries"], reverse=True)
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "totals": totals,
+            "statements": statements[:top],
+            "routes": routes[:top],
+            "n_plus_one": [dict(entry) for entry in n_plus_one[:top]],
+            "recent_slow": slow[-top:],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._routes.clear()
+            self._n_plus_one.clear()
+            self._slow.clear()
+            for key in self._totals:
+                self._totals[key] = 0
+
+
+def _fetched_rows(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class InstrumentedCursorMixin:
+    """Times ``execute``/``executemany`` and counts fetched rows.
+
+    Mixed into the SQLite cursor below and into the PostgreSQL
+    ``AutoConvertCursor`` in ``app.db.manager``.
+    """
+
+    _last_sql: Any = None
+
+    def _timed(self, method, query, args):
+        instrumentation = query_instrumentation
+        if not instrumentation.enabled or _paused.get():
+            self._last_sql = None
+            return method(query, *args)
+        self._last_sql = query
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = method(query, *args)
+            ok = True
+            return result
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # Result sets are counted as they are fetched; rowcount covers writes
+            rows = -1
+            if ok and self.description is None:
+                rows = self.rowcount if self.rowcount is not None else -1
+            instrumentation.record(query, elapsed_ms, rows=rows, ok=ok)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self._last_sql is not None:
+            query_instrumentation.add_rows(self._last_sql, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        if self._last_sql is not None:
+            query_instrumentation.add_rows(self._last_sql, _fetched_rows(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self._last_sql is not None:
+            query_instrumentation.add_rows(self._last_sql, _fetched_rows(rows))
+        return rows
+
+
+class InstrumentedSqliteCursor(InstrumentedCursorMixin, sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, (parameters,))
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, (seq_of_parameters,))
+
+
+class InstrumentedSqliteConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including ``conn.execute``) are instrumented."""
+
+    def cursor(self, factory=InstrumentedSqliteCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+query_instrumentation = QueryInstrumentation(
+    enabled=settings.db_instrumentation,
+    slow_query_ms=settings.db_slow_query_ms,
+    n_plus_one_threshold=settings.db_n_plus_one_threshold,
+    max_statements=settings.db_max_tracked_statements,
+)
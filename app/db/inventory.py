@@ -0,0 +1,254 @@
+"""
+Inventory repository backed by the normalized ``inventory_items`` table.
+
+Each item is one row keyed by ``(character_id, item_id)``; the full item dict
+is kept in ``item_json`` while ``slot``/``rarity``/``level`` are copied into
+indexed columns for filtering. ``position`` preserves acquisition order.
+All methods take a cursor so callers control the transaction.
+
+The inventory limit is enforced by the INSERT itself (it only inserts while
+the character holds fewer than ``limit`` rows). On PostgreSQL ``add_items``
+also locks the character row first, so concurrent drops for the same
+character cannot both see the last free slot.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from app.db.manager import db_manager
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_LIMIT = 100
+
+
+def _new_item_id() -> str:
+    return f"eq_{uuid.uuid4().hex[:12]}"
+
+
+class InventoryRepository:
+    """Row-level access to a character's inventory."""
+
+    def __init__(self, limit: int = INVENTORY_LIMIT, use_postgres: Optional[bool] = None) -> None:
+        self.limit = limit
+        self._use_postgres = use_postgres
+
+    @property
+    def use_postgres(self) -> bool:
+        return db_manager.use_postgres if self._use_postgres is None else self._use_postgres
+
+    # ------------------------------------------------------------------
+    # Reads
+    def count(self, cursor, character_id: str) -> int:
+        cursor.execute(
+            "SELECT COUNT(*) AS total FROM inventory_items WHERE character_id = ?",
+            (character_id,),
+        )
+        row = cursor.fetchone()
+        return int(row["total"]) if row else 0
+
+    def list_items(
+        self,
+        cursor,
+        character_id: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        slot: Optional[str] = None,
+        rarity: Optional[str] = None,
+    ) -> List[Dict]:
+        """Return items in acquisition order, optionally filtered and paged."""
+        query = "SELECT item_json FROM inventory_items WHERE character_id = ?"
+        params: List = [character_id]
+        if slot:
+            query += " AND slot = ?"
+            params.append(slot)
+        if rarity:
+            query += " AND rarity = ?"
+            params.append(rarity)
+        query += " ORDER BY position"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([int(limit), int(offset)])
+        cursor.execute(query, tuple(params))
+        return [json.loads(row["item_json"]) for row in cursor.fetchall()]
+
+    def get_item(self, cursor, character_id: str, item_id: str) -> Optional[Dict]:
+        cursor.execute(
+            "SELECT item_json FROM inventory_items WHERE character_id = ? AND item_id = ?",
+            (character_id, item_id),
+        )
+        row = cursor.fetchone()
+        return json.loads(row["item_json"]) if row else None
+
+    def get_items(self, cursor, character_id: str, item_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Fetch several items in one query, keyed by item id."""
+        ids = list(dict.fromkeys(item_ids))
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ids)
+        cursor.execute(
+            f"SELECT item_id, item_json FROM inventory_items "
+            f"WHERE character_id = ? AND item_id IN ({placeholders})",
+            (character_id, *ids),
+        )
+        return {row["item_id"]: json.loads(row["item_json"]) for row in cursor.fetchall()}
+
+    # ------------------------------------------------------------------
+    # Writes
+    def add_item(self, cursor, character_id: str, item: Dict, limit: Optional[int] = None) -> Optional[Dict]:
+        """Insert ``item``, re-keying it if its id collides with an existing row.
+
+        With ``limit``, nothing is inserted (and None is returned) when the
+        character already holds ``limit`` items.
+        """
+        if not item.get("id"):
+            item["id"] = _new_item_id()
+        having = " HAVING COUNT(*) < ?" if limit is not None else ""
+        for _ in range(5):
+            params = [
+                character_id,
+                item["id"],
+                item.get("slot"),
+                item.get("rarity"),
+                item.get("level"),
+                json.dumps(item),
+                character_id,
+            ]
+            if limit is not None:
+                params.append(int(limit))
+            cursor.execute(
+                f"""
+                INSERT INTO inventory_items
+                    (character_id, item_id, slot, rarity, level, position, item_json)
+                SELECT ?, ?, ?, ?, ?, COALESCE(MAX(position), 0) + 1, ?
+                FROM inventory_items WHERE character_id = ?{having}
+                ON CONFLICT (character_id, item_id) DO NOTHING
+                """,
+                tuple(params),
+            )
+            if cursor.rowcount != 0:
+                return item
+            if limit is not None and self.count(cursor, character_id) >= limit:
+                return None
+            item["id"] = _new_item_id()
+        raise RuntimeError(f"Could not allocate inventory id for character {character_id}")
+
+    def add_items(
+        self, cursor, character_id: str, items: Iterable[Dict], respect_limit: bool = True
+    ) -> List[Dict]:
+        """Insert items until the inventory limit is reached; returns those stored."""
+        items = list(items)
+        if not items:
+            return []
+        if respect_limit and self.use_postgres:
+            cursor.execute("SELECT id FROM characters WHERE id = ? FOR UPDATE", (character_id,))
+        added = []
+        for item in items:
+            stored = self.add_item(cursor, character_id, item, limit=self.limit if respect_limit else None)
+            if stored is None:
+                break
+            added.append(stored)
+        return added
+
+    def update_item(self, cursor, character_id: str, item: Dict) -> bool:
+        cursor.execute(
+            """
+            UPDATE inventory_items
+            SET slot = ?, rarity = ?, level = ?, item_json = ?
+            WHERE character_id = ? AND item_id = ?
+            """,
+            (
+                item.get("slot"),
+                item.get("rarity"),
+                item.get("level"),
+                json.dumps(item),
+                character_id,
+                item["id"],
+            ),
+        )
+        return cursor.rowcount > 0
+
+    def remove_item(self, cursor, character_id: str, item_id: str) -> bool:
+        cursor.execute(
+            "DELETE FROM inventory_items WHERE character_id = ? AND item_id = ?",
+            (character_id, item_id),
+        )
+        return cursor.rowcount > 0
+
+    def remove_items(self, cursor, character_id: str, item_ids: Iterable[str]) -> int:
+        ids = list(dict.fromkeys(item_ids))
+        if not ids:
+            return 0
+        placeholders = ", ".join("?" for _ in ids)
+        cursor.execute(
+            f"DELETE FROM inventory_items WHERE character_id = ? AND item_id IN ({placeholders})",
+            (character_id, *ids),
+        )
+        return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # Migration
+    def migrate_legacy_inventory(self, cursor) -> int:
+        """Move items out of ``characters.inventory_json`` into rows.
+
+        The blob is emptied once its items are copied, so the migration is
+        idempotent. Duplicate or missing ids inside a legacy blob are re-keyed.
+        """
+        cursor.execute(
+            "SELECT id, inventory_json FROM characters "
+            "WHERE inventory_json IS NOT NULL AND inventory_json != '[]' AND inventory_json != ''"
+        )
+        rows = cursor.fetchall()
+        migrated = 0
+        for row in rows:
+            try:
+                items = json.loads(row["inventory_json"]) or []
+            except (TypeError, ValueError):
+                logger.warning("Unreadable inventory_json for character %s; resetting", row["id"])
+                items = []
+
+            records = []
+            seen = set()
+            for position, item in enumerate(items, start=1):
+                if not isinstance(item, dict):
+                    continue
+                if not item.get("id") or item["id"] in seen:
+                    item["id"] = _new_item_id()
+                seen.add(item["id"])
+                records.append(
+                    (
+                        row["id"],
+                        item["id"],
+                        item.get("slot"),
+                        item.get("rarity"),
+                        item.get("level"),
+                        position,
+                        json.dumps(item),
+                    )
+                )
+
+            if records:
+                cursor.executemany(
+                    """
+                    INSERT INTO inventory_items
+                        (character_id, item_id, slot, rarity, level, position, item_json)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (character_id, item_id) DO NOTHING
+                    """,
+                    records,
+                )
+            cursor.execute(
+                "UPDATE characters SET inventory_json = '[]' WHERE id = ?", (row["id"],)
+            )
+            migrated += 1
+
+        if migrated:
+            logger.info("Migrated inventory blobs for %d characters", migrated)
+        return migrated
+
+
+inventory_repository = InventoryRepository()
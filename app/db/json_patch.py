@@ -0,0 +1,135 @@
+"""
+Dialect-specific partial updates for JSON document columns.
+
+Builds SQL expressions that change individual keys of a JSON column in place
+(SQLite ``json_set``/``json_insert``/``json_remove``, PostgreSQL ``jsonb_set``
+and friends), so callers can update a document with a single statement
+instead of reading, mutating and rewriting the whole blob.
+
+Example::
+
+    expr, params = JsonPatch("equipment_json").set(["helmet"], item).build()
+    cursor.execute(
+        f"UPDATE characters SET equipment_json = {expr} WHERE id = ?",
+        (*params, character_id),
+    )
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+from app.db.manager import db_manager
+
+Path = Union[str, Sequence[str]]
+
+
+def _as_path(path: Path) -> List[str]:
+    return [path] if isinstance(path, str) else list(path)
+
+
+def _sqlite_path(path: Path) -> str:
+    return "$" + "".join(f'."{key}"' for key in _as_path(path))
+
+
+def load_json_column(value: Any, default: Any = None) -> Any:
+    """Decode a JSON column that may arrive as text (SQLite) or already parsed (jsonb)."""
+    if value is None:
+        return default
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    return json.loads(value)
+
+
+class JsonPatch:
+    """Accumulates key-level operations on one JSON column."""
+
+    def __init__(self, column: str, use_postgres: Optional[bool] = None) -> None:
+        self.column = column
+        self.use_postgres = db_manager.use_postgres if use_postgres is None else use_postgres
+        self._expr = column
+        self._params: List[Any] = []
+        self._touched: List[List[str]] = []
+
+    def _wrap(self, expr: str, params: Sequence[Any], path: Optional[Path] = None) -> "JsonPatch":
+        self._expr = expr
+        self._params = [*self._params, *params]
+        if path is not None:
+            self._touched.append(_as_path(path))
+        return self
+
+    def _source(self, path: Path) -> Tuple[str, List[Any]]:
+        """Expression to read ``path`` from: the patched document once an earlier
+        operation touched it (or a parent/child of it), else the stored column."""
+        keys = _as_path(path)
+        for touched in self._touched:
+            shared = min(len(keys), len(touched))
+            if keys[:shared] == touched[:shared]:
+                return self._expr, list(self._params)
+        return self.column, []
+
+    def set(self, path: Path, value: Any) -> "JsonPatch":
+        """Set ``path`` to ``value``, creating the key if missing."""
+        encoded = json.dumps(value)
+        if self.use_postgres:
+            return self._wrap(
+                f"jsonb_set({self._expr}, ?::text[], ?::jsonb, true)",
+                [_as_path(path), encoded],
+                path,
+            )
+        return self._wrap(f"json_set({self._expr}, ?, json(?))", [_sqlite_path(path), encoded], path)
+
+    def insert(self, key: str, value: Any) -> "JsonPatch":
+        """Add top-level ``key`` only when it is not already present."""
+        encoded = json.dumps(value)
+        if self.use_postgres:
+            return self._wrap(
+                f"(jsonb_build_object(?::text, ?::jsonb) || {self._expr})", [key, encoded], key
+            )
+        return self._wrap(f"json_insert({self._expr}, ?, json(?))", [_sqlite_path(key), encoded], key)
+
+    def increment(self, path: Path, delta: Union[int, float], default: Union[int, float] = 0) -> "JsonPatch":
+        """Add ``delta`` to the numeric value at ``path`` (``default`` when missing)."""
+        source, source_params = self._source(path)
+        if self.use_postgres:
+            return self._wrap(
+                f"jsonb_set({self._expr}, ?::text[], "
+                f"to_jsonb(COALESCE(({source} #>> ?::text[])::numeric, ?) + ?), true)",
+                [_as_path(path), *source_params, _as_path(path), default, delta],
+                path,
+            )
+        return self._wrap(
+            f"json_set({self._expr}, ?, COALESCE(json_extract({source}, ?), ?) + ?)",
+            [_sqlite_path(path), *source_params, _sqlite_path(path), default, delta],
+            path,
+        )
+
+    def remove(self, path: Path) -> "JsonPatch":
+        if self.use_postgres:
+            return self._wrap(f"({self._expr} #- ?::text[])", [_as_path(path)], path)
+        return self._wrap(f"json_remove({self._expr}, ?)", [_sqlite_path(path)], path)
+
+    def build(self) -> Tuple[str, List[Any]]:
+        return self._expr, list(self._params)
+
+
+def json_extract_path(column: str, path: Path, use_postgres: Optional[bool] = None) -> Tuple[str, List[Any]]:
+    """Select the JSON value at ``path``; decode the result with ``load_json_column``."""
+    use_postgres = db_manager.use_postgres if use_postgres is None else use_postgres
+    if use_postgres:
+        return f"({column} #> ?::text[])", [_as_path(path)]
+    return f"json_extract({column}, ?)", [_sqlite_path(path)]
+
+
+def json_path_equals(column: str, path: Path, value: Any, use_postgres: Optional[bool] = None) -> Tuple[str, List[Any]]:
+    """Condition matching when the scalar at ``path`` equals ``value`` (NULL-safe).
+
+    Used as a compare-and-set guard on partial updates.
+    """
+    use_postgres = db_manager.use_postgres if use_postgres is None else use_postgres
+    if use_postgres:
+        return f"({column} #>> ?::text[]) IS NOT DISTINCT FROM ?", [_as_path(path), value]
+    return f"json_extract({column}, ?) IS ?", [_sqlite_path(path), value]
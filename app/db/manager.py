@@ -1,17 +1,384 @@
 """
 Database manager that abstracts SQLite/PostgreSQL differences.
+
+Connections are pooled: PostgreSQL uses a shared bounded pool, SQLite keeps
+idle connections per thread (sqlite3 connections are bound to the thread that
+created them). Callers still use ``get_connection()``/``conn.close()``;
+``close()`` on a pooled connection returns it to the pool instead of closing
+it. ``db_manager.connection()`` is a context manager that always returns the
+connection, even when the block raises.
+
+Read-only work goes through ``get_read_connection()``, which uses the read
+replica (``DATABASE_REPLICA_URL``) when the ``ReplicaRouter`` allows it.
 """
 
 from __future__ import annotations
 
 import logging
 import sqlite3
-from typing import Any, Optional, Sequence
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Sequence
 
 from app.core.config import settings
+from app.db.instrumentation import (
+    InstrumentedSqliteConnection,
+    InstrumentedCursorMixin,
+    query_instrumentation,
+)
+from app.db.replica import REPLICA, ReplicaRouter
+from app.db.sqlite_profile import WalCheckpointer, sqlite_profile_from_settings
+from app.db.statements import to_postgres_placeholders
 
 logger = logging.getLogger(__name__)
 
+try:
+    import psycopg2  # type: ignore
+    from psycopg2.extensions import connection as PgConnection  # type: ignore
+    from psycopg2.extras import RealDictCursor  # type: ignore
+except ImportError:  # pragma: no cover - depends on env setup
+    psycopg2 = None
+    PgConnection = None
+    RealDictCursor = None
+
+
+if RealDictCursor is not None:
+
+    class AutoConvertCursor(InstrumentedCursorMixin, RealDictCursor):
+        """Instrumented RealDictCursor that accepts SQLite-style ``?`` placeholders."""
+
+        def execute(self, query, vars=None):
+            if isinstance(query, str):
+                query = to_postgres_placeholders(query)
+            return self._timed(super().execute, query, (vars,))
+
+        def executemany(self, query, vars_list):
+            if isinstance(query, str):
+                query = to_postgres_placeholders(query)
+            return self._timed(super().executemany, query, (vars_list,))
+
+    class PreparingConnection(PgConnection):
+        """psycopg2 connection that remembers which statements it has PREPAREd."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.prepared_statements = set()
+
+else:  # pragma: no cover - depends on env setup
+    AutoConvertCursor = None
+    PreparingConnection = None
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became available within the configured timeout."""
+
+
+class _PoolEntry:
+    __slots__ = ("raw", "last_used", "owner")
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+        self.last_used = time.monotonic()
+        self.owner = threading.get_ident()
+
+
+class PooledConnection:
+    """Proxy around a raw DB-API connection that returns it to its pool on close."""
+
+    def __init__(self, pool: "_BasePool", entry: _PoolEntry) -> None:
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name: str) -> Any:
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise AttributeError(f"Connection already returned to pool ({name})")
+        return getattr(entry.raw, name)
+
+    @property
+    def raw(self):
+        return self._entry.raw if self._entry else None
+
+    def cursor(self, *args, **kwargs):
+        return self._entry.raw.cursor(*args, **kwargs)
+
+    def commit(self) -> None:
+        self._entry.raw.commit()
+        if self._pool.on_commit is not None:
+            self._pool.on_commit()
+
+    def rollback(self) -> None:
+        self._entry.raw.rollback()
+
+    def execute(self, *args, **kwargs):
+        return self._entry.raw.execute(*args, **kwargs)
+
+    def close(self) -> None:
+        """Return the connection to the pool (idempotent)."""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool.release(entry)
+
+    def __del__(self) -> None:  # pragma: no cover - safety net for leaked handles
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _BasePool:
+    """Shared bookkeeping: health checks, reset on return, metrics."""
+
+    backend = "base"
+    # Called after every commit through a checked-out connection
+    on_commit: Optional[Callable[[], None]] = None
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        min_size: int,
+        max_size: int,
+        timeout: float,
+        health_check_interval: float,
+    ) -> None:
+        self._factory = factory
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "in_use": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    # -- helpers ---------------------------------------------------------
+    def _bump(self, key: str, amount: float = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _create(self) -> _PoolEntry:
+        entry = _PoolEntry(self._factory())
+        self._bump("created")
+        return entry
+
+    def _discard(self, entry: _PoolEntry) -> None:
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+        self._bump("closed")
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        if getattr(entry.raw, "closed", 0):
+            return False
+        if time.monotonic() - entry.last_used < self.health_check_interval:
+            return True
+        try:
+            with query_instrumentation.paused():
+                cursor = entry.raw.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+                cursor.close()
+            entry.raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, entry: _PoolEntry) -> bool:
+        """Roll back anything the borrower left open; False means discard."""
+        try:
+            entry.raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _record_checkout(self, waited: float) -> None:
+        waited_ms = waited * 1000
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+
+    def _checked_out(self, entry: _PoolEntry, started: float) -> PooledConnection:
+        self._record_checkout(time.monotonic() - started)
+        return PooledConnection(self, entry)
+
+    # -- interface -------------------------------------------------------
+    def acquire(self) -> PooledConnection:  # pragma: no cover - abstract
+        raise NotImplementedError
+
+    def release(self, entry: _PoolEntry) -> None:  # pragma: no cover - abstract
+        raise NotImplementedError
+
+    def idle_count(self) -> int:  # pragma: no cover - abstract
+        raise NotImplementedError
+
+    def close_all(self) -> None:  # pragma: no cover - abstract
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        checkouts = stats["checkouts"]
+        stats["avg_wait_ms"] = round(stats["wait_ms_total"] / checkouts, 3) if checkouts else 0.0
+        stats["wait_ms_total"] = round(stats["wait_ms_total"], 3)
+        stats["wait_ms_max"] = round(stats["wait_ms_max"], 3)
+        stats.update(
+            backend=self.backend,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            idle=self.idle_count(),
+        )
+        return stats
+
+
+class QueuePool(_BasePool):
+    """Bounded pool shared by all threads; callers wait when it is exhausted."""
+
+    backend = "shared"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._idle: "deque[_PoolEntry]" = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def prefill(self) -> None:
+        for _ in range(self.min_size):
+            entry = self._create()
+            with self._cond:
+                self._open += 1
+                self._idle.append(entry)
+
+    def acquire(self) -> PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            entry = None
+            with self._cond:
+                while not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._bump("timeouts")
+                        raise PoolTimeout(
+                            f"Timed out after {self.timeout}s waiting for a database connection"
+                        )
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if entry is None:
+                try:
+                    entry = self._create()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                return self._checked_out(entry, started)
+
+            if self._is_healthy(entry):
+                return self._checked_out(entry, started)
+
+            self._bump("health_check_failures")
+            self._discard(entry)
+            with self._cond:
+                self._open -= 1
+
+    def release(self, entry: _PoolEntry) -> None:
+        self._bump("in_use", -1)
+        healthy = self._reset(entry)
+        with self._cond:
+            if healthy:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not healthy:
+            self._discard(entry)
+
+    def idle_count(self) -> int:
+        return len(self._idle)
+
+    def close_all(self) -> None:
+        with self._cond:
+            entries = list(self._idle)
+            self._idle.clear()
+            self._open -= len(entries)
+        for entry in entries:
+            self._discard(entry)
+
+
+class ThreadLocalPool(_BasePool):
+    """Keeps up to ``max_size`` idle connections per thread (for SQLite).
+
+    Checkout never blocks: SQLite serialises writers itself, so the pool only
+    exists to avoid reopening the database file on every request.
+    """
+
+    backend = "per_thread"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._local = threading.local()
+        self._registry_lock = threading.Lock()
+        self._all_idle: list = []
+
+    def _idle_list(self) -> list:
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = []
+            with self._registry_lock:
+                self._all_idle.append(idle)
+        return idle
+
+    def acquire(self) -> PooledConnection:
+        started = time.monotonic()
+        idle = self._idle_list()
+        while idle:
+            entry = idle.pop()
+            if self._is_healthy(entry):
+                return self._checked_out(entry, started)
+            self._bump("health_check_failures")
+            self._discard(entry)
+        return self._checked_out(self._create(), started)
+
+    def release(self, entry: _PoolEntry) -> None:
+        self._bump("in_use", -1)
+        if entry.owner != threading.get_ident():
+            # Leaked handle collected on another thread; sqlite3 refuses cross-thread use
+            self._bump("closed")
+            return
+        idle = self._idle_list()
+        if self._reset(entry) and len(idle) < self.max_size:
+            entry.last_used = time.monotonic()
+            idle.append(entry)
+        else:
+            self._discard(entry)
+
+    def idle_count(self) -> int:
+        with self._registry_lock:
+            return sum(len(idle) for idle in self._all_idle)
+
+    def close_all(self) -> None:
+        # Only the calling thread's connections can be closed safely
+        idle = self._idle_list()
+        while idle:
+            self._discard(idle.pop())
+
 
 class DatabaseManager:
     """Shared database connection helper."""
@@ -22,35 +389,228 @@ class DatabaseManager:
         self.use_postgres = bool(
             self.database_url and self.database_url.startswith("postgres")
         )
+        self.sqlite_profile = sqlite_profile_from_settings(settings)
+        self._pool_lock = threading.Lock()
+        self._postgres_pool: Optional[QueuePool] = None
+        self._sqlite_pool: Optional[ThreadLocalPool] = None
+        self._sqlite_read_pool: Optional[ThreadLocalPool] = None
+        self._replica_pool: Optional[_BasePool] = None
+        self.replica_url = settings.database_replica_url
+        self.replica_router = ReplicaRouter(
+            max_lag_seconds=settings.db_replica_max_lag_seconds,
+            sticky_seconds=settings.db_read_your_writes_seconds,
+        )
+        self.wal_checkpointer = WalCheckpointer(
+            self._get_sqlite_connection,
+            interval_seconds=settings.sqlite_checkpoint_interval,
+            truncate_pages=settings.sqlite_wal_truncate_pages,
+        )
+
+    def _pool_options(self) -> Dict[str, Any]:
+        return {
+            "min_size": settings.db_pool_min_size,
+            "max_size": settings.db_pool_max_size,
+            "timeout": settings.db_pool_timeout,
+            "health_check_interval": settings.db_pool_health_check_interval,
+        }
+
+    def _connect_postgres(self, url: Optional[str] = None, read_only: bool = False):
+        conn = psycopg2.connect(url or self.database_url, connection_factory=PreparingConnection)
+        conn.cursor_factory = AutoConvertCursor
+        if read_only:
+            conn.set_session(readonly=True)
+        return conn
+
+    def _connect_sqlite(self, read_only: bool = False, path: Optional[str] = None):
+        profile = self.sqlite_profile
+        if path is not None:
+            # Separate replica file: opened read-only at the OS level as well
+            database, uri = f"file:{path}?mode=ro", True
+        else:
+            database, uri = self.sqlite_path, False
+        conn = sqlite3.connect(
+            database,
+            timeout=profile.busy_timeout_ms / 1000,
+            factory=InstrumentedSqliteConnection,
+            uri=uri,
+        )
+        conn.row_factory = sqlite3.Row
+        with query_instrumentation.paused():
+            profile.apply(conn, read_only=read_only)
+        return conn
+
+    def _get_postgres_pool(self) -> QueuePool:
+        if self._postgres_pool is None:
+            with self._pool_lock:
+                if self._postgres_pool is None:
+                    pool = QueuePool(self._connect_postgres, **self._pool_options())
+                    pool.on_commit = self.replica_router.note_write
+                    pool.prefill()
+                    self._postgres_pool = pool
+        return self._postgres_pool
+
+    def _get_sqlite_pool(self) -> ThreadLocalPool:
+        if self._sqlite_pool is None:
+            with self._pool_lock:
+                if self._sqlite_pool is None:
+                    pool = ThreadLocalPool(self._connect_sqlite, **self._pool_options())
+                    pool.on_commit = self.replica_router.note_write
+                    self._sqlite_pool = pool
+        return self._sqlite_pool
+
+    def _get_sqlite_read_pool(self) -> ThreadLocalPool:
+        if self._sqlite_read_pool is None:
+            with self._pool_lock:
+                if self._sqlite_read_pool is None:
+                    self._sqlite_read_pool = ThreadLocalPool(
+                        lambda: self._connect_sqlite(read_only=True), **self._pool_options()
+                    )
+        return self._sqlite_read_pool
+
+    @property
+    def has_replica(self) -> bool:
+        """PostgreSQL needs an explicit replica URL; SQLite falls back to its read pool."""
+        if self.use_postgres:
+            return bool(self.replica_url) and psycopg2 is not None
+        return True
+
+    def _sqlite_replica_path(self) -> Optional[str]:
+        url = self.replica_url
+        if not url or url.startswith("postgres"):
+            return None
+        return url[len("sqlite:///"):] if url.startswith("sqlite:///") else url
+
+    def _get_replica_pool(self) -> _BasePool:
+        if not self.use_postgres:
+            path = self._sqlite_replica_path()
+            if path is None:
+                return self._get_sqlite_read_pool()
+        if self._replica_pool is None:
+            with self._pool_lock:
+                if self._replica_pool is None:
+                    if self.use_postgres:
+                        self._replica_pool = QueuePool(
+                            lambda: self._connect_postgres(self.replica_url, read_only=True),
+                            **self._pool_options(),
+                        )
+                    else:
+                        self._replica_pool = ThreadLocalPool(
+                            lambda: self._connect_sqlite(read_only=True, path=path),
+                            **self._pool_options(),
+                        )
+        return self._replica_pool
+
+    def _probe_replica_lag(self) -> float:
+        """Seconds the replica is behind the primary (0 when not a streaming standby)."""
+        if not self.use_postgres:
+            return 0.0
+        conn = self._get_replica_pool().acquire()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                END AS lag_seconds
+                """
+            )
+            return float(cursor.fetchone()["lag_seconds"])
+        finally:
+            conn.close()
+
+    def _get_sqlite_connection(self):
+        return self._get_sqlite_pool().acquire()
 
     def get_connection(self):
-        """Return a database connection, preferring PostgreSQL when configured."""
+        """Check out a pooled connection, preferring PostgreSQL when configured."""
         if self.use_postgres:
-            try:
-                import psycopg2  # type: ignore
-                from psycopg2.extras import RealDictCursor  # type: ignore
-
-                class AutoConvertCursor(RealDictCursor):
-                    def execute(self, query, vars=None):
-                        if isinstance(query, str):
-                            query = query.replace("?", "%s")
-                        return super().execute(query, vars)
-
-                conn = psycopg2.connect(self.database_url)
-                conn.cursor_factory = AutoConvertCursor
-                return conn
-            except ImportError:
+            if psycopg2 is None:
                 logger.error("psycopg2 not installed, falling back to SQLite")
-                # fallthrough to SQLite
+            else:
+                try:
+                    return self._get_postgres_pool().acquire()
+                except PoolTimeout:
+                    raise
+                except Exception as exc:
+                    logger.error(
+                        "Failed to connect to PostgreSQL: %s. Falling back to SQLite.", exc
+                    )
+                    # fallthrough to SQLite
+
+        return self._get_sqlite_pool().acquire()
+
+    def get_read_connection(self):
+        """Check out a connection for read-only endpoints.
+
+        Reads go to the replica unless the session wrote recently or the
+        replica is past its staleness budget (see ``ReplicaRouter``). On
+        SQLite without ``DATABASE_REPLICA_URL`` the replica is a separate
+        pool of ``query_only`` connections to the same file, so in WAL mode
+        readers never contend with writers for a pooled handle and an
+        accidental write fails loudly. PostgreSQL without a replica URL reads
+        from the primary pool.
+        """
+        if not self.has_replica:
+            return self.get_connection()
+        if self.replica_router.choose(self._probe_replica_lag) == REPLICA:
+            try:
+                return self._get_replica_pool().acquire()
+            except PoolTimeout:
+                raise
             except Exception as exc:
-                logger.error(
-                    "Failed to connect to PostgreSQL: %s. Falling back to SQLite.", exc
-                )
-                # fallthrough to SQLite
+                self.replica_router.record_replica_error()
+                logger.warning("Read replica unavailable, reading from primary: %s", exc)
+        return self.get_connection()
 
-        conn = sqlite3.connect(self.sqlite_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+    @property
+    def uses_sqlite_wal(self) -> bool:
+        return not self.use_postgres and self.sqlite_profile.uses_wal
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection that is always returned.
+
+        Uncommitted work is rolled back when the connection goes back to the pool.
+        """
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        pool = self._postgres_pool if self.use_postgres else self._sqlite_pool
+        if pool is None:
+            pool = self._sqlite_pool
+        return pool.stats() if pool is not None else {}
+
+    def query_stats(self, top: int = 20) -> Dict[str, Any]:
+        """Statement latency, per-route query counts, slow queries and N+1 suspects."""
+        return query_instrumentation.stats(top=top)
+
+    def sqlite_stats(self) -> Dict[str, Any]:
+        """Active SQLite profile, read pool and checkpoint stats (empty on PostgreSQL)."""
+        if self.use_postgres:
+            return {}
+        return {
+            "profile": self.sqlite_profile.to_dict(),
+            "read_pool": self._sqlite_read_pool.stats() if self._sqlite_read_pool else {},
+            "checkpoints": self.wal_checkpointer.stats(),
+        }
+
+    def replica_stats(self) -> Dict[str, Any]:
+        """Read routing decisions plus the replica pool, when one is configured."""
+        stats = {"configured": bool(self.replica_url), **self.replica_router.stats()}
+        if self._replica_pool is not None:
+            stats["pool"] = self._replica_pool.stats()
+        return stats
+
+    def close_pools(self) -> None:
+        for pool in (self._postgres_pool, self._sqlite_pool, self._sqlite_read_pool, self._replica_pool):
+            if pool is not None:
+                pool.close_all()
 
     def get_cursor(self, conn):
         """Return a cursor with placeholder-conversion for PostgreSQL."""
@@ -60,7 +620,7 @@ class DatabaseManager:
 
             def wrapped_execute(query, params=None):
                 if isinstance(query, str):
-                    query = query.replace("?", "%s")
+                    query = to_postgres_placeholders(query)
                 return original_execute(query, params)
 
             cursor.execute = wrapped_execute  # type: ignore
@@ -70,7 +630,7 @@ class DatabaseManager:
         """Execute a query with placeholder conversion when needed."""
         params = params or ()
         if self.use_postgres and isinstance(query, str):
-            query = query.replace("?", "%s")
+            query = to_postgres_placeholders(query)
         return cursor.execute(query, params)
 
 
@@ -81,6 +641,10 @@ def get_db_connection():
     return db_manager.get_connection()
 
 
+def get_db_read_connection():
+    return db_manager.get_read_connection()
+
+
 def get_db_cursor(conn):
     return db_manager.get_cursor(conn)
 
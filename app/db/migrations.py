@@ -0,0 +1,493 @@
+"""
+Versioned schema migrations.
+
+Each migration is a function registered with a unique, increasing version.
+``migration_engine.migrate(conn)`` applies the ones not yet recorded in the
+``schema_migrations`` table, in order, committing each one together with its
+version row. Migrations must be idempotent against databases that predate
+version tracking (use the ``table_exists``/``column_exists`` helpers and
+``IF NOT EXISTS``), because the first run of the engine replays the whole
+history on them.
+
+DDL is written once using dialect tokens (``{str}``, ``{serial}``, ``{json}``,
+``{false}``...) rendered for SQLite or PostgreSQL by ``MigrationContext``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app.db.bootstrap import create_player_tracking_tables
+from app.db.inventory import inventory_repository
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key shared by every process running migrations
+MIGRATION_LOCK_ID = 7_351_902
+
+_DIALECT_TOKENS = {
+    False: {
+        "str": "TEXT",
+        "str50": "TEXT",
+        "str10": "TEXT",
+        "serial": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "json": "TEXT",
+        "bigint": "INTEGER",
+        "false": "0",
+        "true": "1",
+    },
+    True: {
+        "str": "VARCHAR(255)",
+        "str50": "VARCHAR(50)",
+        "str10": "VARCHAR(10)",
+        "serial": "SERIAL PRIMARY KEY",
+        "json": "JSONB",
+        "bigint": "BIGINT",
+        "false": "FALSE",
+        "true": "TRUE",
+    },
+}
+
+
+class MigrationContext:
+    """Cursor plus dialect-aware DDL helpers handed to each migration."""
+
+    def __init__(self, conn, cursor, use_postgres: bool) -> None:
+        self.conn = conn
+        self.cursor = cursor
+        self.use_postgres = use_postgres
+
+    def render(self, sql: str) -> str:
+        return sql.format(**_DIALECT_TOKENS[self.use_postgres])
+
+    def execute(self, sql: str, params=()) -> None:
+        self.cursor.execute(self.render(sql), params)
+
+    def table_exists(self, table: str) -> bool:
+        if self.use_postgres:
+            self.cursor.execute("SELECT to_regclass(?) AS name", (f"public.{table}",))
+        else:
+            self.cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            )
+        row = self.cursor.fetchone()
+        return row is not None and row["name"] is not None
+
+    def column_exists(self, table: str, column: str) -> bool:
+        if self.use_postgres:
+            self.cursor.execute(
+                "SELECT 1 AS found FROM information_schema.columns WHERE table_name = ? AND column_name = ?",
+                (table, column),
+            )
+            return self.cursor.fetchone() is not None
+        self.cursor.execute(f"PRAGMA table_info({table})")
+        return any(row["name"] == column for row in self.cursor.fetchall())
+
+    def add_column(self, table: str, column: str, definition: str) -> bool:
+        """``ALTER TABLE ... ADD COLUMN`` unless the column is already there."""
+        if self.column_exists(table, column):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    def create_index(self, name: str, table: str, columns: str, unique: bool = False) -> None:
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        self.execute(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[MigrationContext], None]
+
+
+class MigrationEngine:
+    """Registry of migrations plus the runner that records applied versions."""
+
+    def __init__(self) -> None:
+        self._migrations: Dict[int, Migration] = {}
+
+    def register(self, version: int, name: str):
+        def decorator(func: Callable[[MigrationContext], None]):
+            if version in self._migrations:
+                raise ValueError(f"Migration version {version} is already registered")
+            self._migrations[version] = Migration(version, name, func)
+            return func
+
+        return decorator
+
+    @property
+    def migrations(self) -> List[Migration]:
+        return [self._migrations[version] for version in sorted(self._migrations)]
+
+    @property
+    def latest_version(self) -> int:
+        return max(self._migrations, default=0)
+
+    def fingerprint(self) -> str:
+        """Hash of the registered migration history; changes whenever one is added."""
+        history = "\n".join(f"{m.version}:{m.name}" for m in self.migrations)
+        return hashlib.sha256(history.encode("utf-8")).hexdigest()
+
+    def _ensure_version_table(self, ctx: MigrationContext) -> None:
+        ctx.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name {str} NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        ctx.conn.commit()
+
+    def applied_versions(self, cursor) -> List[int]:
+        cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+        return [row["version"] for row in cursor.fetchall()]
+
+    def pending(self, cursor) -> List[Migration]:
+        applied = set(self.applied_versions(cursor))
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def _lock(self, ctx: MigrationContext) -> None:
+        if ctx.use_postgres:
+            # Session-level: held across the per-migration commits below
+            ctx.cursor.execute(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
+            ctx.conn.commit()
+
+    def _unlock(self, ctx: MigrationContext) -> None:
+        if ctx.use_postgres:
+            ctx.cursor.execute(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+            ctx.conn.commit()
+
+    def _begin(self, ctx: MigrationContext) -> None:
+        if not ctx.use_postgres:
+            # Take SQLite's write lock before re-reading the version table
+            if ctx.conn.in_transaction:
+                ctx.conn.commit()
+            ctx.cursor.execute("BEGIN IMMEDIATE")
+
+    def migrate(self, conn, use_postgres: Optional[bool] = None, target: Optional[int] = None) -> List[int]:
+        """Apply pending migrations up to ``target`` (default: all); return applied versions.
+
+        Concurrent callers (several workers booting at once) are serialized:
+        PostgreSQL takes an advisory lock for the whole run, SQLite takes the
+        write lock per migration, and each migration is skipped if another
+        process recorded it in the meantime.
+        """
+        if use_postgres is None:
+            from app.db.manager import db_manager
+
+            use_postgres = db_manager.use_postgres
+        cursor = conn.cursor()
+        ctx = MigrationContext(conn, cursor, use_postgres)
+        self._ensure_version_table(ctx)
+
+        applied = []
+        self._lock(ctx)
+        try:
+            for migration in self.pending(cursor):
+                if target is not None and migration.version > target:
+                    break
+                started = time.perf_counter()
+                try:
+                    self._begin(ctx)
+                    if migration.version in self.applied_versions(cursor):
+                        conn.rollback()
+                        continue
+                    migration.apply(ctx)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                        (migration.version, migration.name),
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    logger.exception("Migration %04d_%s failed", migration.version, migration.name)
+                    raise
+                applied.append(migration.version)
+                logger.info(
+                    "Applied migration %04d_%s in %.1f ms",
+                    migration.version, migration.name, (time.perf_counter() - started) * 1000,
+                )
+        finally:
+            self._unlock(ctx)
+        return applied
+
+
+migration_engine = MigrationEngine()
+migration = migration_engine.register
+
+
+# ----------------------------------------------------------------------
+# Schema history. Never edit a migration that has shipped; add a new one.
+
+
+@migration(1, "baseline_schema")
+def _baseline_schema(ctx: MigrationContext) -> None:
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id {str} PRIMARY KEY,
+            username {str} UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            email {str},
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS characters (
+            id {str} PRIMARY KEY,
+            user_id {str} NOT NULL,
+            name {str} UNIQUE NOT NULL,
+            level INTEGER DEFAULT 1,
+            exp INTEGER DEFAULT 0,
+            skill_points INTEGER DEFAULT 3,
+            stats_json {json} NOT NULL,
+            equipment_json {json} NOT NULL,
+            inventory_json TEXT NOT NULL,
+            auto_combat BOOLEAN DEFAULT {false},
+            gold INTEGER DEFAULT 0,
+            pvp_enabled BOOLEAN DEFAULT {false},
+            combat_stance {str50} DEFAULT 'balanced',
+            revision INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS inventory_items (
+            character_id {str} NOT NULL,
+            item_id {str} NOT NULL,
+            slot {str50},
+            rarity {str50},
+            level INTEGER,
+            position INTEGER NOT NULL DEFAULT 0,
+            item_json TEXT NOT NULL,
+            PRIMARY KEY (character_id, item_id),
+            FOREIGN KEY (character_id) REFERENCES characters (id)
+        )
+        """
+    )
+    ctx.create_index("idx_inventory_items_position", "inventory_items", "character_id, position")
+    ctx.create_index("idx_inventory_items_slot", "inventory_items", "character_id, slot")
+    ctx.create_index("idx_inventory_items_rarity", "inventory_items", "character_id, rarity")
+
+    if ctx.use_postgres and not ctx.table_exists("combat_logs"):
+        # A failed earlier create can leave the SERIAL sequence behind
+        ctx.execute("DROP SEQUENCE IF EXISTS combat_logs_id_seq CASCADE")
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS combat_logs (
+            id {serial},
+            character1_id {str} NOT NULL,
+            character2_id {str} NOT NULL,
+            winner_id {str},
+            log_json TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (character1_id) REFERENCES characters (id),
+            FOREIGN KEY (character2_id) REFERENCES characters (id)
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id {serial},
+            character_id {str} NOT NULL,
+            character_name {str} NOT NULL,
+            message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (character_id) REFERENCES characters (id)
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS abilities (
+            id {str} PRIMARY KEY,
+            name {str} NOT NULL,
+            description TEXT,
+            cooldown_seconds INTEGER NOT NULL,
+            damage_multiplier REAL NOT NULL,
+            damage_type {str50} NOT NULL,
+            mana_cost INTEGER NOT NULL,
+            weapon_type {str50} NOT NULL,
+            is_ultimate BOOLEAN DEFAULT {false}
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS character_abilities (
+            id {serial},
+            character_id {str} NOT NULL,
+            ability_id {str} NOT NULL,
+            slot_position INTEGER NOT NULL,
+            FOREIGN KEY (character_id) REFERENCES characters (id),
+            FOREIGN KEY (ability_id) REFERENCES abilities (id),
+            UNIQUE(character_id, slot_position)
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pve_enemies (
+            id {str} PRIMARY KEY,
+            name {str} NOT NULL,
+            level INTEGER NOT NULL,
+            stats_json TEXT NOT NULL,
+            description TEXT,
+            story_order INTEGER NOT NULL,
+            unlocked_at_level INTEGER DEFAULT 1,
+            gold_min INTEGER DEFAULT 1,
+            gold_max INTEGER DEFAULT 1,
+            drop_chance REAL DEFAULT 0.0,
+            exp_reward INTEGER DEFAULT 50
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS character_pve_progress (
+            id {serial},
+            character_id {str} NOT NULL,
+            highest_enemy_defeated {str},
+            enemies_unlocked_json TEXT NOT NULL,
+            highest_unlocked_order INTEGER DEFAULT 1,
+            FOREIGN KEY (character_id) REFERENCES characters (id),
+            UNIQUE(character_id)
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS store_items (
+            id {str} PRIMARY KEY,
+            name {str} NOT NULL,
+            slot {str50} NOT NULL,
+            weapon_type {str50},
+            base_price INTEGER NOT NULL,
+            level_requirement INTEGER DEFAULT 1
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id {str} PRIMARY KEY,
+            user_id {str} NOT NULL,
+            character_name {str},
+            content TEXT NOT NULL,
+            upvotes INTEGER DEFAULT 0,
+            downvotes INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """
+    )
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feedback_votes (
+            id {str} PRIMARY KEY,
+            feedback_id {str} NOT NULL,
+            user_id {str} NOT NULL,
+            vote_type {str10} NOT NULL CHECK (vote_type IN ('upvote', 'downvote')),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (feedback_id) REFERENCES feedback (id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            UNIQUE(feedback_id, user_id)
+        )
+        """
+    )
+    create_player_tracking_tables(ctx.cursor, ctx.use_postgres)
+
+
+@migration(2, "backfill_added_columns")
+def _backfill_added_columns(ctx: MigrationContext) -> None:
+    """Columns added after the first release, for databases created before them."""
+    ctx.add_column("characters", "gold", "INTEGER DEFAULT 0")
+    ctx.add_column("characters", "pvp_enabled", "BOOLEAN DEFAULT {false}")
+    ctx.add_column("characters", "combat_stance", "{str50} DEFAULT 'balanced'")
+    ctx.add_column("characters", "pvp_wins", "INTEGER DEFAULT 0")
+    ctx.add_column("characters", "pvp_losses", "INTEGER DEFAULT 0")
+    ctx.add_column("characters", "pvp_mmr", "INTEGER DEFAULT 1000")
+    ctx.add_column("characters", "pvp_last_week_rank", "INTEGER")
+    ctx.add_column("characters", "pvp_weekly_rewards_claimed", "BOOLEAN DEFAULT {false}")
+    ctx.add_column("characters", "revision", "INTEGER DEFAULT 0")
+
+    ctx.add_column("pve_enemies", "description", "TEXT")
+    ctx.add_column("pve_enemies", "gold_min", "INTEGER DEFAULT 1")
+    ctx.add_column("pve_enemies", "gold_max", "INTEGER DEFAULT 1")
+    ctx.add_column("pve_enemies", "drop_chance", "REAL DEFAULT 0.0")
+    ctx.add_column("pve_enemies", "exp_reward", "INTEGER DEFAULT 50")
+
+    ctx.add_column("character_pve_progress", "highest_unlocked_order", "INTEGER")
+
+
+@migration(3, "jsonb_character_documents")
+def _jsonb_character_documents(ctx: MigrationContext) -> None:
+    """Stats/equipment are patched in place with jsonb_set, so store them as JSONB."""
+    if not ctx.use_postgres:
+        return
+    for column in ("stats_json", "equipment_json"):
+        ctx.cursor.execute(
+            "SELECT data_type FROM information_schema.columns WHERE table_name = 'characters' AND column_name = ?",
+            (column,),
+        )
+        info = ctx.cursor.fetchone()
+        if info and info["data_type"] != "jsonb":
+            ctx.execute(f"ALTER TABLE characters ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb")
+
+
+@migration(4, "inventory_rows_from_json")
+def _inventory_rows_from_json(ctx: MigrationContext) -> None:
+    inventory_repository.migrate_legacy_inventory(ctx.cursor)
+
+
+@migration(5, "pve_progress_highest_order")
+def _pve_progress_highest_order(ctx: MigrationContext) -> None:
+    from app.services.pve_progress import pve_progress_service
+
+    pve_progress_service.migrate_legacy_progress(ctx.cursor)
+
+
+@migration(6, "hot_query_indexes")
+def _hot_query_indexes(ctx: MigrationContext) -> None:
+    """Indexes for ownership checks, PvP lookups, the leaderboard, chat and votes.
+
+    feedback_votes(feedback_id, user_id) and character_abilities(character_id)
+    are already covered by their UNIQUE constraints' indexes.
+    """
+    # Leaderboard orders by these columns directly, so they must not be NULL
+    ctx.execute("UPDATE characters SET pvp_mmr = 1000 WHERE pvp_mmr IS NULL")
+    ctx.execute("UPDATE characters SET pvp_wins = 0 WHERE pvp_wins IS NULL")
+    ctx.execute("UPDATE characters SET pvp_losses = 0 WHERE pvp_losses IS NULL")
+
+    ctx.create_index("idx_characters_user_id", "characters", "user_id")
+    ctx.create_index("idx_characters_pvp_level", "characters", "pvp_enabled, level")
+    ctx.create_index("idx_characters_pvp_mmr", "characters", "pvp_mmr DESC, pvp_wins DESC, level DESC")
+    ctx.create_index("idx_chat_messages_created_at", "chat_messages", "created_at")
+    ctx.create_index("idx_feedback_votes_user", "feedback_votes", "user_id")
+
+
+@migration(7, "boot_meta")
+def _boot_meta(ctx: MigrationContext) -> None:
+    """Key/value store for startup fingerprints (see ``app.db.boot``)."""
+    ctx.execute(
+        """
+        CREATE TABLE IF NOT EXISTS boot_meta (
+            key {str} PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
@@ -0,0 +1,82 @@
+"""
+Named statements used by the API handlers.
+
+Each query is written once in SQLite form and rendered for PostgreSQL by the
+statement registry at import time (see ``app.db.statements``).
+"""
+
+from app.db.statements import statements
+
+# Users
+USER_ID_BY_USERNAME = statements.register(
+    "users.id_by_username",
+    "SELECT id FROM users WHERE username = ?",
+)
+USER_CREDENTIALS_BY_USERNAME = statements.register(
+    "users.credentials_by_username",
+    "SELECT id, username, password_hash FROM users WHERE username = ?",
+)
+USER_BY_ID = statements.register(
+    "users.by_id",
+    "SELECT id, username FROM users WHERE id = ?",
+)
+USER_INSERT = statements.register(
+    "users.insert",
+    "INSERT INTO users (id, username, password_hash, email) VALUES (?, ?, ?, ?)",
+)
+USER_SET_PASSWORD_HASH = statements.register(
+    "users.set_password_hash",
+    "UPDATE users SET password_hash = ? WHERE id = ?",
+)
+
+# Characters
+# SELECT * is not prepared: a server-side plan would pin the column list
+CHARACTER_FIRST_FOR_USER = statements.register(
+    "characters.first_for_user",
+    "SELECT * FROM characters WHERE user_id = ? LIMIT 1",
+    prepare=False,
+)
+CHARACTER_IDS_FOR_USER = statements.register(
+    "characters.ids_for_user",
+    "SELECT id FROM characters WHERE user_id = ?",
+)
+CHARACTER_REVISION_FOR_OWNER = statements.register(
+    "characters.revision_for_owner",
+    "SELECT revision FROM characters WHERE id = ? AND user_id = ?",
+)
+CHARACTER_SET_GOLD = statements.register(
+    "characters.set_gold",
+    "UPDATE characters SET gold = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
+)
+
+# PvP
+PVP_SET_ENABLED = statements.register(
+    "pvp.set_enabled",
+    "UPDATE characters SET pvp_enabled = ?, revision = revision + 1 WHERE id = ?",
+)
+PVP_MATCH_PROFILE = statements.register(
+    "pvp.match_profile",
+    "SELECT id, name, level, pvp_mmr FROM characters WHERE id = ?",
+)
+PVP_OPPONENT_OWNER = statements.register(
+    "pvp.opponent_owner",
+    "SELECT user_id, pvp_enabled FROM characters WHERE id = ?",
+)
+PVP_OPPONENT_INDEX_ROWS = statements.register(
+    "pvp.opponent_index_rows",
+    "SELECT id, name, level, pvp_mmr FROM characters WHERE pvp_enabled = {true}",
+)
+# One pass over characters; the leaderboard service keeps them ranked
+PVP_LEADERBOARD_ROWS = statements.register(
+    "pvp.leaderboard_rows",
+    """
+    SELECT c.id, c.name, c.level,
+           COALESCE(c.pvp_mmr, ?) AS mmr,
+           COALESCE(c.pvp_wins, 0) AS wins,
+           COALESCE(c.pvp_losses, 0) AS losses,
+           COALESCE(pp.username, '') AS username,
+           COALESCE(pp.best_mmr, ?) AS best_mmr
+    FROM characters c
+    LEFT JOIN player_profiles pp ON pp.user_id = c.user_id
+    """,
+)
@@ -0,0 +1,177 @@
+"""
+Routing for read-only work between a read replica and the primary.
+
+``db_manager.get_read_connection()`` asks the router where a read should go.
+A read goes to the replica unless:
+
+* the session that issued the request committed on the primary within the
+  last ``DB_READ_YOUR_WRITES_SECONDS`` (read-your-writes stickiness), or
+* the replica is further behind than ``DB_REPLICA_MAX_LAG_SECONDS`` (the
+  staleness budget) or its lag could not be measured.
+
+Stickiness is tracked per session key (the request's ``Authorization``
+header) by the HTTP middleware::
+
+    token = db_manager.replica_router.begin_request(request.headers.get("authorization"))
+    try:
+        response = await call_next(request)
+    finally:
+        db_manager.replica_router.end_request(token)
+
+Commits on the primary pool call ``note_write()``, which makes the rest of
+the request and the session's next requests read from the primary.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+PRIMARY_STICKY = "sticky"
+PRIMARY_LAG = "lag"
+
+
+class RoutingScope:
+    """Read-routing state for a single request."""
+
+    __slots__ = ("session_key", "sticky", "wrote")
+
+    def __init__(self, session_key: Optional[str], sticky: bool) -> None:
+        self.session_key = session_key
+        self.sticky = sticky
+        self.wrote = False
+
+
+_current_scope: ContextVar[Optional[RoutingScope]] = ContextVar("db_read_routing", default=None)
+
+
+class ReplicaRouter:
+    """Decides per read whether the replica is fresh enough and allowed."""
+
+    def __init__(
+        self,
+        max_lag_seconds: float = 5.0,
+        sticky_seconds: float = 5.0,
+        lag_check_interval: float = 1.0,
+        max_sessions: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_lag_seconds = max_lag_seconds
+        self.sticky_seconds = sticky_seconds
+        self.lag_check_interval = lag_check_interval
+        self.max_sessions = max(1, max_sessions)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._recent_writes: "OrderedDict[str, float]" = OrderedDict()
+        self._lag: Optional[float] = None
+        self._lag_checked_at: Optional[float] = None
+        self._stats = {
+            "replica_reads": 0,
+            "primary_reads_sticky": 0,
+            "primary_reads_lag": 0,
+            "replica_errors": 0,
+            "lag_probe_failures": 0,
+        }
+
+    # -- request scope ---------------------------------------------------
+    def begin_request(self, session_key: Optional[str]) -> Token:
+        sticky = session_key is not None and self.wrote_recently(session_key)
+        return _current_scope.set(RoutingScope(session_key, sticky))
+
+    def end_request(self, token: Token) -> None:
+        scope = _current_scope.get()
+        _current_scope.reset(token)
+        if scope is not None and scope.wrote and scope.session_key is not None:
+            self.mark_write(scope.session_key)
+
+    def note_write(self) -> None:
+        """Called after a commit on the primary; pins the current request's session."""
+        scope = _current_scope.get()
+        if scope is not None:
+            scope.wrote = True
+            scope.sticky = True
+
+    def mark_write(self, session_key: str) -> None:
+        now = self._clock()
+        with self._lock:
+            self._recent_writes[session_key] = now
+            self._recent_writes.move_to_end(session_key)
+            while len(self._recent_writes) > self.max_sessions:
+                self._recent_writes.popitem(last=False)
+
+    def wrote_recently(self, session_key: str) -> bool:
+        with self._lock:
+            written_at = self._recent_writes.get(session_key)
+            if written_at is None:
+                return False
+            if self._clock() - written_at < self.sticky_seconds:
+                return True
+            del self._recent_writes[session_key]
+            return False
+
+    # -- staleness -------------------------------------------------------
+    def replica_lag(self, probe: Callable[[], float]) -> Optional[float]:
+        """Replica lag in seconds, re-measured at most once per ``lag_check_interval``.
+
+        ``None`` means the last probe failed; concurrent callers reuse the
+        cached value instead of all probing at once.
+        """
+        now = self._clock()
+        checked_at = self._lag_checked_at
+        if checked_at is not None and now - checked_at < self.lag_check_interval:
+            return self._lag
+        if not self._probe_lock.acquire(blocking=False):
+            return self._lag
+        try:
+            try:
+                lag: Optional[float] = max(0.0, float(probe()))
+            except Exception as exc:
+                lag = None
+                self._bump("lag_probe_failures")
+                logger.warning("Could not measure replica lag: %s", exc)
+            self._lag = lag
+            self._lag_checked_at = self._clock()
+            return lag
+        finally:
+            self._probe_lock.release()
+
+    # -- routing ---------------------------------------------------------
+    def choose(self, probe: Callable[[], float]) -> str:
+        """Return ``REPLICA`` or the reason the read must go to the primary."""
+        scope = _current_scope.get()
+        if scope is not None and scope.sticky:
+            self._bump("primary_reads_sticky")
+            return PRIMARY_STICKY
+        if self.max_lag_seconds >= 0:
+            lag = self.replica_lag(probe)
+            if lag is None or lag > self.max_lag_seconds:
+                self._bump("primary_reads_lag")
+                return PRIMARY_LAG
+        self._bump("replica_reads")
+        return REPLICA
+
+    def record_replica_error(self) -> None:
+        self._bump("replica_errors")
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["sticky_sessions"] = len(self._recent_writes)
+        stats.update(
+            max_lag_seconds=self.max_lag_seconds,
+            sticky_seconds=self.sticky_seconds,
+            last_lag_seconds=round(self._lag, 3) if self._lag is not None else None,
+        )
+        return stats
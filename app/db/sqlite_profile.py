@@ -0,0 +1,193 @@
+"""
+SQLite connection tuning and WAL checkpoint management.
+
+Every SQLite connection opened by ``DatabaseManager`` gets the PRAGMAs of the
+active profile (``SQLITE_PROFILE``, default ``tuned``); individual settings
+can be overridden through ``SQLITE_*`` environment variables. ``legacy``
+reproduces what connections got before tuning (rollback journal, FULL sync,
+Python's default 5 s busy timeout) for comparisons.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}
+SYNCHRONOUS_LEVELS = {"off", "normal", "full", "extra"}
+TEMP_STORES = {"default", "file", "memory"}
+CHECKPOINT_MODES = {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    """PRAGMA values applied to each new SQLite connection."""
+
+    name: str
+    journal_mode: str
+    synchronous: str
+    mmap_size: int
+    cache_size: int  # negative values are KiB, positive are pages
+    busy_timeout_ms: int
+    temp_store: str
+
+    def __post_init__(self) -> None:
+        if self.journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown SQLite journal_mode: {self.journal_mode}")
+        if self.synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown SQLite synchronous level: {self.synchronous}")
+        if self.temp_store not in TEMP_STORES:
+            raise ValueError(f"Unknown SQLite temp_store: {self.temp_store}")
+
+    @property
+    def uses_wal(self) -> bool:
+        return self.journal_mode == "wal"
+
+    def apply(self, conn: sqlite3.Connection, read_only: bool = False) -> None:
+        """Apply the profile to ``conn``; ``read_only`` also sets ``query_only``."""
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if not read_only:
+            # journal_mode is persistent in the database file, so writers own it
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = {int(self.cache_size)}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+SQLITE_PROFILES: Dict[str, SqliteProfile] = {
+    "legacy": SqliteProfile(
+        name="legacy",
+        journal_mode="delete",
+        synchronous="full",
+        mmap_size=0,
+        cache_size=-2000,
+        busy_timeout_ms=5000,
+        temp_store="default",
+    ),
+    "tuned": SqliteProfile(
+        name="tuned",
+        journal_mode="wal",
+        synchronous="normal",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64000,
+        busy_timeout_ms=5000,
+        temp_store="memory",
+    ),
+    "durable": SqliteProfile(
+        name="durable",
+        journal_mode="wal",
+        synchronous="full",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64000,
+        busy_timeout_ms=5000,
+        temp_store="memory",
+    ),
+}
+
+
+def build_sqlite_profile(name: str = "tuned", **overrides: Optional[Any]) -> SqliteProfile:
+    """Return profile ``name`` with any non-None ``overrides`` applied."""
+    try:
+        base = SQLITE_PROFILES[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown SQLite profile '{name}'. Choose from: {', '.join(sorted(SQLITE_PROFILES))}"
+        ) from None
+    changes = {
+        key: value.lower() if isinstance(value, str) else value
+        for key, value in overrides.items()
+        if value is not None
+    }
+    return replace(base, **changes) if changes else base
+
+
+def sqlite_profile_from_settings(settings) -> SqliteProfile:
+    return build_sqlite_profile(
+        settings.sqlite_profile,
+        journal_mode=settings.sqlite_journal_mode,
+        synchronous=settings.sqlite_synchronous,
+        mmap_size=settings.sqlite_mmap_size,
+        cache_size=settings.sqlite_cache_size,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        temp_store=settings.sqlite_temp_store,
+    )
+
+
+class WalCheckpointer:
+    """Periodically folds the WAL back into the database file.
+
+    SQLite's auto-checkpoint runs on the committing connection and gives up
+    while readers are active, so under steady read traffic the WAL can grow
+    without bound. A PASSIVE checkpoint runs every interval; once the WAL
+    exceeds ``truncate_pages`` a TRUNCATE checkpoint resets it to zero bytes.
+    """
+
+    def __init__(self, connect, interval_seconds: float, truncate_pages: int) -> None:
+        self._connect = connect
+        self.interval_seconds = interval_seconds
+        self.truncate_pages = truncate_pages
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "truncations": 0,
+            "busy": 0,
+            "errors": 0,
+            "last_log_pages": 0,
+            "last_checkpointed_pages": 0,
+            "last_duration_ms": 0.0,
+            "last_run_at": None,
+        }
+
+    def checkpoint(self, mode: str = "PASSIVE") -> Dict[str, int]:
+        """Run one checkpoint and return SQLite's (busy, log, checkpointed) counters."""
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        started = time.perf_counter()
+        conn = self._connect()
+        try:
+            busy, log_pages, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            if mode != "TRUNCATE" and log_pages >= self.truncate_pages and not busy:
+                busy, log_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                mode = "TRUNCATE"
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["busy"] += int(bool(busy))
+            self._stats["truncations"] += int(mode == "TRUNCATE")
+            self._stats["last_log_pages"] = log_pages
+            self._stats["last_checkpointed_pages"] = checkpointed
+            self._stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            self._stats["last_run_at"] = time.time()
+        return {"busy": busy, "log_pages": log_pages, "checkpointed_pages": checkpointed}
+
+    async def run_forever(self, run_blocking) -> None:
+        """Checkpoint every interval; ``run_blocking`` moves the call off the loop."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await run_blocking(self.checkpoint)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                with self._lock:
+                    self._stats["errors"] += 1
+                logger.warning("WAL checkpoint failed: %s", exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
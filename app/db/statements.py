@@ -0,0 +1,210 @@
+"""
+Named SQL statements, translated per dialect once and timed per execution.
+
+Statements are written once in SQLite form (``?`` placeholders) and may use
+``{true}``/``{false}`` for boolean literals. Registering a statement renders
+both dialects up front, so executing it does no string work::
+
+    USER_BY_USERNAME = statements.register(
+        "users.by_username", "SELECT id FROM users WHERE username = ?"
+    )
+    statements.execute(cursor, USER_BY_USERNAME, (username,))
+
+On PostgreSQL each statement is ``PREPARE``d once per connection and run
+with ``EXECUTE``, so the server parses and plans it only once. Ad-hoc SQL
+still works everywhere; ``to_postgres_placeholders`` memoizes its
+``?`` -> ``%s`` translation.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_BOOLEAN_LITERALS = {
+    False: {"{true}": "1", "{false}": "0"},
+    True: {"{true}": "TRUE", "{false}": "FALSE"},
+}
+
+
+def _render_booleans(sql: str, postgres: bool) -> str:
+    for token, literal in _BOOLEAN_LITERALS[postgres].items():
+        sql = sql.replace(token, literal)
+    return sql
+
+
+def _replace_placeholders(query: str, make_placeholder) -> tuple:
+    """Replace ``?`` outside quoted strings/identifiers; return (sql, count)."""
+    out: List[str] = []
+    count = 0
+    quote: Optional[str] = None
+    for char in query:
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "?":
+            count += 1
+            out.append(make_placeholder(count))
+            continue
+        out.append(char)
+    return "".join(out), count
+
+
+@lru_cache(maxsize=2048)
+def to_postgres_placeholders(query: str) -> str:
+    """Translate SQLite ``?`` placeholders to psycopg2 ``%s`` (memoized)."""
+    if "?" not in query:
+        return query
+    return _replace_placeholders(query, lambda _: "%s")[0]
+
+
+class Statement:
+    """One named statement with its SQL rendered for both dialects."""
+
+    __slots__ = (
+        "name", "sql", "prepare", "sqlite_sql", "postgres_sql", "param_count",
+        "prepared_name", "prepare_sql", "execute_sql",
+    )
+
+    def __init__(self, name: str, sql: str, prepare: bool = True) -> None:
+        self.name = name
+        self.sql = sql
+        self.prepare = prepare
+        self.sqlite_sql = _render_booleans(sql, postgres=False)
+        postgres = _render_booleans(sql, postgres=True)
+        self.postgres_sql, self.param_count = _replace_placeholders(postgres, lambda _: "%s")
+        self.prepared_name = "st_" + re.sub(r"\W", "_", name)
+        body, _ = _replace_placeholders(postgres, lambda index: f"${index}")
+        self.prepare_sql = f"PREPARE {self.prepared_name} AS {body}"
+        if self.param_count:
+            placeholders = ", ".join(["%s"] * self.param_count)
+            self.execute_sql = f"EXECUTE {self.prepared_name} ({placeholders})"
+        else:
+            self.execute_sql = f"EXECUTE {self.prepared_name}"
+
+    def __repr__(self) -> str:
+        return f"Statement({self.name!r})"
+
+
+class StatementRegistry:
+    """Holds named statements and per-statement execution timings."""
+
+    def __init__(self, prepare_on_postgres: bool = True) -> None:
+        self.prepare_on_postgres = prepare_on_postgres
+        self._statements: Dict[str, Statement] = {}
+        self._lock = threading.Lock()
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, sql: str, prepare: bool = True) -> Statement:
+        if name in self._statements:
+            raise ValueError(f"Statement '{name}' is already registered")
+        statement = Statement(name, sql, prepare=prepare)
+        self._statements[name] = statement
+        self._timings[name] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+        return statement
+
+    def get(self, name: str) -> Statement:
+        try:
+            return self._statements[name]
+        except KeyError:
+            raise KeyError(f"Unknown statement '{name}'") from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._statements
+
+    def _resolve(self, statement: Union[str, Statement]) -> Statement:
+        return self.get(statement) if isinstance(statement, str) else statement
+
+    def _postgres_sql(self, cursor, statement: Statement) -> str:
+        if not (self.prepare_on_postgres and statement.prepare):
+            return statement.postgres_sql
+        prepared = getattr(cursor.connection, "prepared_statements", None)
+        if prepared is None:
+            return statement.postgres_sql
+        if statement.prepared_name not in prepared:
+            # A savepoint keeps a PREPARE failure (e.g. an uninferrable
+            # parameter type) from aborting the caller's transaction
+            cursor.execute("SAVEPOINT statement_prepare")
+            try:
+                cursor.execute(statement.prepare_sql)
+            except Exception as exc:
+                cursor.execute("ROLLBACK TO SAVEPOINT statement_prepare")
+                statement.prepare = False
+                logger.warning("Could not prepare statement %s, running it unprepared: %s", statement.name, exc)
+                return statement.postgres_sql
+            finally:
+                cursor.execute("RELEASE SAVEPOINT statement_prepare")
+            prepared.add(statement.prepared_name)
+        return statement.execute_sql
+
+    def _record(self, name: str, started: float, ok: bool) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            timing = self._timings[name]
+            timing["calls"] += 1
+            timing["total_ms"] += elapsed_ms
+            if elapsed_ms > timing["max_ms"]:
+                timing["max_ms"] = elapsed_ms
+            if not ok:
+                timing["errors"] += 1
+
+    def execute(self, cursor, statement: Union[str, Statement], params: Sequence[Any] = ()):
+        """Execute ``statement`` (name or Statement) on ``cursor`` and time it."""
+        statement = self._resolve(statement)
+        if isinstance(cursor, sqlite3.Cursor):
+            sql = statement.sqlite_sql
+        else:
+            sql = self._postgres_sql(cursor, statement)
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = cursor.execute(sql, tuple(params))
+            ok = True
+            return result
+        finally:
+            self._record(statement.name, started, ok)
+
+    def fetchone(self, cursor, statement: Union[str, Statement], params: Sequence[Any] = ()):
+        self.execute(cursor, statement, params)
+        return cursor.fetchone()
+
+    def fetchall(self, cursor, statement: Union[str, Statement], params: Sequence[Any] = ()):
+        self.execute(cursor, statement, params)
+        return cursor.fetchall()
+
+    def stats(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-statement timings, slowest total first."""
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "calls": int(timing["calls"]),
+                    "errors": int(timing["errors"]),
+                    "total_ms": round(timing["total_ms"], 3),
+                    "avg_ms": round(timing["total_ms"] / timing["calls"], 3) if timing["calls"] else 0.0,
+                    "max_ms": round(timing["max_ms"], 3),
+                }
+                for name, timing in self._timings.items()
+                if timing["calls"]
+            ]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows[:top] if top else rows
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for timing in self._timings.values():
+                timing.update(calls=0, errors=0, total_ms=0.0, max_ms=0.0)
+
+
+statements = StatementRegistry(prepare_on_postgres=settings.db_prepare_statements)
@@ -0,0 +1,124 @@
+"""
+Read-through cache for rendered character payloads.
+
+Entries are tagged with the ``characters.revision`` they were built from.
+Every mutation bumps the revision, so a reader that finds a different
+revision in the database treats the entry as stale. Two tiers are used:
+a per-process LRU and, when configured, Redis shared across workers.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.core.cache import redis_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CharacterSnapshotCache:
+    """Two-tier (process LRU + Redis) cache keyed by character id and revision."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._namespace = settings.redis_namespace
+        self._local: "OrderedDict[str, Tuple[int, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "stale": 0}
+
+    def _client(self):
+        return redis_cache.get_client()
+
+    def _key(self, character_id: str) -> str:
+        return f"{self._namespace}:character_snapshot:{character_id}"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _store_local(self, character_id: str, revision: int, payload: Dict) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._local[character_id] = (revision, payload)
+            self._local.move_to_end(character_id)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, character_id: str, revision: int) -> Optional[Dict]:
+        """Return the payload cached for ``revision`` or None."""
+        with self._lock:
+            entry = self._local.get(character_id)
+            if entry is not None:
+                if entry[0] == revision:
+                    self._local.move_to_end(character_id)
+                    self._stats["local_hits"] += 1
+                    return entry[1]
+                del self._local[character_id]
+                self._stats["stale"] += 1
+
+        client = self._client()
+        if client:
+            try:
+                data = client.get(self._key(character_id))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                logger.warning("Character cache read failed: %s", exc)
+                data = None
+            if data:
+                cached = json.loads(data)
+                if cached.get("revision") == revision:
+                    self._store_local(character_id, revision, cached["payload"])
+                    self._count("redis_hits")
+                    return cached["payload"]
+                self._count("stale")
+
+        self._count("misses")
+        return None
+
+    def set(self, character_id: str, revision: int, payload: Dict) -> None:
+        self._store_local(character_id, revision, payload)
+        client = self._client()
+        if client:
+            try:
+                client.setex(
+                    self._key(character_id),
+                    self.ttl_seconds,
+                    json.dumps({"revision": revision, "payload": payload}),
+                )
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                logger.warning("Character cache write failed: %s", exc)
+
+    def invalidate(self, character_id: str) -> None:
+        with self._lock:
+            self._local.pop(character_id, None)
+        client = self._client()
+        if client:
+            try:
+                client.delete(self._key(character_id))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                logger.warning("Character cache invalidation failed: %s", exc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._local)
+        hits = stats["local_hits"] + stats["redis_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups * 100, 2) if lookups else 0.0
+        return stats
+
+
+character_cache = CharacterSnapshotCache(
+    max_entries=settings.character_cache_size,
+    ttl_seconds=settings.character_cache_ttl,
+)
@@ -0,0 +1,268 @@
+"""
+Bulk inventory actions applied against a single character snapshot.
+
+The character row and inventory are loaded once, the ordered actions are
+validated and applied in memory, and the net result is written back in one
+transaction guarded by ``characters.revision``.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Callable, Dict, List, Optional
+
+from app.db import get_db_connection
+from app.db.inventory import inventory_repository
+from app.db.json_patch import JsonPatch, load_json_column
+from game_logic import (
+    COMBINE_REQUIREMENTS,
+    EQUIPMENT_SLOTS,
+    calculate_sell_price,
+    calculate_upgrade_cost,
+    generate_equipment,
+    rescale_equipment_stats,
+)
+
+MAX_BULK_ACTIONS = 100
+
+
+class InventoryActionError(Exception):
+    """A single bulk action was rejected; the rest of the batch continues."""
+
+
+class BulkConflictError(Exception):
+    """The character changed between loading the snapshot and writing it."""
+
+
+class InventorySnapshot:
+    """In-memory copy of the state a batch may touch, plus change tracking."""
+
+    def __init__(self, row, items: List[Dict], inventory_limit: int) -> None:
+        self.level = row["level"]
+        self.gold = row["gold"] or 0
+        self.revision = row["revision"] or 0
+        self.equipment: Dict[str, Optional[Dict]] = load_json_column(row["equipment_json"], {})
+        self.inventory: Dict[str, Dict] = {item["id"]: item for item in items}
+        self.inventory_limit = inventory_limit
+        self.original_ids = set(self.inventory)
+        self.dirty_items: set = set()
+        self.dirty_slots: set = set()
+        self.gold_delta = 0
+
+    @property
+    def available_gold(self) -> int:
+        return self.gold + self.gold_delta
+
+    @property
+    def changed(self) -> bool:
+        return bool(
+            self.dirty_items
+            or self.dirty_slots
+            or self.gold_delta
+            or self.original_ids != set(self.inventory)
+        )
+
+    def take_inventory_item(self, item_id: str) -> Dict:
+        item = self.inventory.get(item_id)
+        if item is None:
+            raise InventoryActionError(f"Item {item_id} not found in inventory")
+        return item
+
+    def check_room_for(self, item: Dict, freeing: Optional[str] = None) -> None:
+        """Reject moving ``item`` into the inventory (after ``freeing`` leaves it)
+        when its id is already taken or the inventory is full."""
+        remaining = set(self.inventory) - {freeing}
+        if item["id"] in remaining:
+            raise InventoryActionError(f"Item {item['id']} is already in inventory")
+        if len(remaining) >= self.inventory_limit:
+            raise InventoryActionError("Inventory is full")
+
+
+class InventoryBulkService:
+    """Validates and applies ordered sell/equip/unequip/combine/upgrade actions."""
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, Callable[[InventorySnapshot, Dict], Dict]] = {
+            "sell": self._sell,
+            "equip": self._equip,
+            "unequip": self._unequip,
+            "combine": self._combine,
+            "upgrade": self._upgrade,
+        }
+
+    # ------------------------------------------------------------------
+    # Action handlers: validate first, then mutate the snapshot
+    def _sell(self, snap: InventorySnapshot, action: Dict) -> Dict:
+        item = snap.take_inventory_item(action.get("item_id"))
+        price = calculate_sell_price(item)
+        del snap.inventory[item["id"]]
+        snap.gold_delta += price
+        return {"item_id": item["id"], "gold_gained": price}
+
+    def _equip(self, snap: InventorySnapshot, action: Dict) -> Dict:
+        slot = action.get("slot")
+        item = snap.take_inventory_item(action.get("item_id"))
+        if item.get("slot") != slot:
+            raise InventoryActionError("Item slot mismatch")
+        current = snap.equipment.get(slot)
+        if current:
+            snap.check_room_for(current, freeing=item["id"])
+        del snap.inventory[item["id"]]
+        snap.equipment[slot] = item
+        snap.dirty_slots.add(slot)
+        if current:
+            snap.inventory[current["id"]] = current
+        return {"item_id": item["id"], "slot": slot}
+
+    def _unequip(self, snap: InventorySnapshot, action: Dict) -> Dict:
+        slot = action.get("slot")
+        current = snap.equipment.get(slot)
+        if not current:
+            raise InventoryActionError("No item equipped in that slot")
+        snap.check_room_for(current)
+        snap.equipment[slot] = None
+        snap.dirty_slots.add(slot)
+        snap.inventory[current["id"]] = current
+        return {"item_id": current["id"], "slot": slot}
+
+    def _combine(self, snap: InventorySnapshot, action: Dict) -> Dict:
+        item_ids = action.get("item_ids") or []
+        if not isinstance(item_ids, list):
+            raise InventoryActionError("item_ids must be a list")
+        item_ids = list(dict.fromkeys(item_ids))
+        if len(item_ids) < 2:
+            raise InventoryActionError("Need at least 2 items to combine")
+        items = [snap.take_inventory_item(item_id) for item_id in item_ids]
+        rarities = {item.get("rarity", "common") for item in items}
+        if len(rarities) > 1:
+            raise InventoryActionError("All items must be the same rarity")
+        target_rarity = rarities.pop()
+        if target_rarity not in COMBINE_REQUIREMENTS:
+            raise InventoryActionError("Cannot combine items of this rarity")
+        required_count, result_rarity = COMBINE_REQUIREMENTS[target_rarity]
+        if len(items) < required_count:
+            raise InventoryActionError(
+                f"Need {required_count} {target_rarity} items to create {result_rarity}"
+            )
+        if len(snap.inventory) - len(items) + 1 >= snap.inventory_limit:
+            raise InventoryActionError("Inventory would be full after combining")
+
+        for item_id in item_ids:
+            del snap.inventory[item_id]
+        equipment = generate_equipment(random.choice(EQUIPMENT_SLOTS), result_rarity, snap.level)
+        snap.inventory[equipment["id"]] = equipment
+        return {"equipment": equipment, "rarity_created": result_rarity}
+
+    def _upgrade(self, snap: InventorySnapshot, action: Dict) -> Dict:
+        item_id = action.get("item_id")
+        slot = next(
+            (s for s, eq in snap.equipment.items() if eq and eq.get("id") == item_id), None
+        )
+        item = snap.equipment[slot] if slot else snap.take_inventory_item(item_id)
+
+        item_level = item.get("level", 1)
+        if item_level >= snap.level:
+            raise InventoryActionError(f"Item is already at maximum level ({snap.level})")
+        cost = calculate_upgrade_cost(item_level)
+        if snap.available_gold < cost:
+            raise InventoryActionError(
+                f"Not enough gold. Required: {cost}, Have: {snap.available_gold}"
+            )
+
+        new_level = item_level + 1
+        item["stats"] = rescale_equipment_stats(item, new_level)
+        item["level"] = new_level
+        snap.gold_delta -= cost
+        if slot:
+            snap.dirty_slots.add(slot)
+        else:
+            snap.dirty_items.add(item_id)
+        return {"item": item, "gold_spent": cost}
+
+    # ------------------------------------------------------------------
+    def _persist(self, cursor, character_id: str, snap: InventorySnapshot) -> None:
+        patch = JsonPatch("equipment_json")
+        for slot in sorted(snap.dirty_slots):
+            patch.set(slot, snap.equipment.get(slot))
+        equipment_expr, equipment_params = patch.build()
+        cursor.execute(
+            f"UPDATE characters SET equipment_json = {equipment_expr}, gold = COALESCE(gold, 0) + ?, "
+            "updated_at = CURRENT_TIMESTAMP, revision = revision + 1 "
+            "WHERE id = ? AND COALESCE(revision, 0) = ?",
+            (*equipment_params, snap.gold_delta, character_id, snap.revision),
+        )
+        if cursor.rowcount == 0:
+            raise BulkConflictError("Character changed, please retry")
+
+        inventory_repository.remove_items(
+            cursor, character_id, snap.original_ids - set(snap.inventory)
+        )
+        for item_id, item in list(snap.inventory.items()):
+            if item_id not in snap.original_ids:
+                inventory_repository.add_item(cursor, character_id, item)
+            elif item_id in snap.dirty_items:
+                inventory_repository.update_item(cursor, character_id, item)
+
+    def apply(self, character_id: str, user_id: str, actions: List[Dict], atomic: bool = False) -> Dict:
+        """Apply ``actions`` in order and return per-action results.
+
+        Rejected actions are reported and skipped; with ``atomic`` any
+        rejection aborts the whole batch. Raises LookupError when the
+        character does not belong to ``user_id`` and BulkConflictError when a
+        concurrent write invalidated the snapshot.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT level, gold, revision, equipment_json FROM characters WHERE id = ? AND user_id = ?",
+                (character_id, user_id),
+            )
+            row = cursor.fetchone()
+            if not row:
+                raise LookupError("Character not found")
+
+            snap = InventorySnapshot(
+                row,
+                inventory_repository.list_items(cursor, character_id),
+                inventory_repository.limit,
+            )
+
+            results = []
+            for index, action in enumerate(actions):
+                action_type = action.get("type") if isinstance(action, dict) else None
+                result = {"index": index, "type": action_type}
+                try:
+                    handler = self._handlers.get(action_type)
+                    if handler is None:
+                        raise InventoryActionError(f"Unknown action type: {action_type}")
+                    result.update(handler(snap, action))
+                    result["success"] = True
+                except InventoryActionError as exc:
+                    result.update(success=False, error=str(exc))
+                results.append(result)
+
+            failed = sum(1 for r in results if not r["success"])
+            committed = False
+            if snap.changed and not (atomic and failed):
+                try:
+                    self._persist(cursor, character_id, snap)
+                    conn.commit()
+                    committed = True
+                except Exception:
+                    conn.rollback()
+                    raise
+
+            return {
+                "success": not (atomic and failed),
+                "committed": committed,
+                "applied": len(results) - failed if committed else 0,
+                "failed": failed,
+                "results": results,
+                "gold_remaining": snap.available_gold if committed else snap.gold,
+            }
+        finally:
+            conn.close()
+
+
+inventory_bulk_service = InventoryBulkService()
@@ -0,0 +1,500 @@
+"""
+Materialized PvP leaderboard with O(log n) rank lookups.
+
+``/api/pvp/leaderboard`` used to sort every character joined with its
+player profile by MMR, wins and level on each request, then skip ``offset``
+rows. ``leaderboard`` keeps the characters ordered instead and is updated
+as results are written::
+
+    leaderboard.update(character_id, mmr=1016, wins=12)
+    leaderboard.page(offset=100, limit=50)
+    leaderboard.around(character_id, neighbors=5)   # my rank and neighbours
+
+Each character gets one numeric score that sorts by MMR, then wins, then
+level; equal scores are ordered by character id, descending. With Redis,
+the order is a sorted set (``{ns}:leaderboard``) plus a hash of display
+rows, shared by all workers; without Redis it is an indexable skiplist in
+memory. Either way a page or a rank costs O(log n + k).
+
+The board is built from the database by a background task started with
+the app (``run_forever``) and rebuilt every ``LEADERBOARD_RECONCILE_SECONDS``
+to pick up anything the updates missed (other workers without Redis, name
+changes, crashes between commit and update); requests never rebuild it.
+With Redis one worker per interval rebuilds into temporary keys and renames
+them into place, and each update is a single script. Updates this worker
+makes while a rebuild runs are replayed onto the new board.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.cache import redis_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MMR = 1000
+MAX_WINS = 10 ** 7 - 1
+MAX_LEVEL = 999
+
+RETRY_SECONDS = 5.0
+
+Loader = Callable[[], Iterable[Dict]]
+Key = Tuple[int, str]
+
+# KEYS: order zset, rows hash
+# ARGV: character id, mmr, wins, losses, level ('' = unchanged), default MMR, max wins, max level
+UPDATE_SCRIPT = """
+local data = redis.call('HGET', KEYS[2], ARGV[1])
+if not data then
+    return 0
+end
+local row = cjson.decode(data)
+for i, field in ipairs({'mmr', 'wins', 'losses', 'level'}) do
+    if ARGV[i + 1] ~= '' then
+        row[field] = tonumber(ARGV[i + 1])
+    end
+end
+row['best_mmr'] = math.max(tonumber(row['best_mmr'] or ARGV[6]), row['mmr'])
+local score = math.max(0, row['mmr']) * 1e10
+    + math.min(math.max(0, row['wins']), tonumber(ARGV[7])) * 1e3
+    + math.min(math.max(0, row['level']), tonumber(ARGV[8]))
+redis.call('ZADD', KEYS[1], string.format('%.0f', score), ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], cjson.encode(row))
+return 1
+"""
+
+
+def score(mmr: int, wins: int, level: int) -> int:
+    """One sortable number for (MMR, wins, level); exact in a double for MMR < 90000."""
+    return (
+        max(0, int(mmr)) * 10 ** 10
+        + min(max(0, int(wins)), MAX_WINS) * 10 ** 3
+        + min(max(0, int(level)), MAX_LEVEL)
+    )
+
+
+class _Node:
+    __slots__ = ("key", "next", "span", "prev")
+
+    def __init__(self, key: Optional[Key], levels: int) -> None:
+        self.key = key
+        self.next: List[Optional[_Node]] = [None] * levels
+        self.span: List[int] = [0] * levels
+        self.prev: Optional[_Node] = None
+
+
+class _RankedSkipList:
+    """Ascending keys with O(log n) insert, remove, rank and select (spans per link)."""
+
+    MAX_LEVELS = 32
+
+    def __init__(self, rng: random.Random) -> None:
+        self._rng = rng
+        self._head = _Node(None, self.MAX_LEVELS)
+        self._levels = 1
+        self._size = 0
+        self._tail: Optional[_Node] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_levels(self) -> int:
+        levels = 1
+        while levels < self.MAX_LEVELS and self._rng.random() < 0.25:
+            levels += 1
+        return levels
+
+    def insert(self, key: Key) -> None:
+        update: List[_Node] = [self._head] * self.MAX_LEVELS
+        rank = [0] * self.MAX_LEVELS
+        node = self._head
+        for i in reversed(range(self._levels)):
+            rank[i] = 0 if i == self._levels - 1 else rank[i + 1]
+            while node.next[i] is not None and node.next[i].key < key:
+                rank[i] += node.span[i]
+                node = node.next[i]
+            update[i] = node
+        levels = self._random_levels()
+        if levels > self._levels:
+            for i in range(self._levels, levels):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._size
+            self._levels = levels
+        new = _Node(key, levels)
+        for i in range(levels):
+            new.next[i] = update[i].next[i]
+            update[i].next[i] = new
+            new.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = rank[0] - rank[i] + 1
+        for i in range(levels, self._levels):
+            update[i].span[i] += 1
+        new.prev = update[0] if update[0] is not self._head else None
+        if new.next[0] is not None:
+            new.next[0].prev = new
+        else:
+            self._tail = new
+        self._size += 1
+
+    def remove(self, key: Key) -> bool:
+        update: List[_Node] = [self._head] * self.MAX_LEVELS
+        node = self._head
+        for i in reversed(range(self._levels)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+        target = node.next[0]
+        if target is None or target.key != key:
+            return False
+        for i in range(self._levels):
+            if update[i].next[i] is target:
+                update[i].span[i] += target.span[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].span[i] -= 1
+        if target.next[0] is not None:
+            target.next[0].prev = target.prev
+        else:
+            self._tail = target.prev
+        while self._levels > 1 and self._head.next[self._levels - 1] is None:
+            self._levels -= 1
+        self._size -= 1
+        return True
+
+    def rank(self, key: Key) -> Optional[int]:
+        """1-based position of ``key`` in ascending order, or None."""
+        position, node = 0, self._head
+        for i in reversed(range(self._levels)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.span[i]
+                node = node.next[i]
+            if node.key == key:
+                return position
+        return None
+
+    def select(self, position: int) -> Optional[_Node]:
+        """Node at 1-based ascending ``position``."""
+        if position < 1 or position > self._size:
+            return None
+        traversed, node = 0, self._head
+        for i in reversed(range(self._levels)):
+            while node.next[i] is not None and traversed + node.span[i] <= position:
+                traversed += node.span[i]
+                node = node.next[i]
+            if traversed == position:
+                return node
+        return None
+
+    def descending(self, start: int, count: int) -> List[Key]:
+        """Up to ``count`` keys from 0-based ``start`` in descending order."""
+        node = self.select(self._size - start)
+        keys: List[Key] = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.prev
+        return keys
+
+
+class _MemoryBoard:
+    """Display rows plus their skiplist order for one process."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rows: Dict[str, Dict] = {}
+        self.keys: Dict[str, Key] = {}
+        self.order = _RankedSkipList(rng)
+
+    def put(self, row: Dict) -> None:
+        self.drop(row["id"])
+        key = (score(row["mmr"], row["wins"], row["level"]), row["id"])
+        self.rows[row["id"]] = row
+        self.keys[row["id"]] = key
+        self.order.insert(key)
+
+    def drop(self, character_id: str) -> None:
+        key = self.keys.pop(character_id, None)
+        if key is not None:
+            self.order.remove(key)
+            del self.rows[character_id]
+
+
+class Leaderboard:
+    """PvP ranking by MMR, wins and level, kept in step with match results."""
+
+    def __init__(
+        self,
+        reconcile_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.reconcile_seconds = reconcile_seconds
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._namespace = settings.redis_namespace
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._board = _MemoryBoard(self._rng)
+        self._loaded_at: Optional[float] = None
+        self._journal: Optional[List[Tuple[str, tuple]]] = None  # set while a rebuild runs
+        self._stats = {"reconciles": 0, "updates": 0, "lookups": 0, "redis_errors": 0, "reconcile_errors": 0}
+        self._update_script = None
+        self._script_client = None
+
+    def _client(self):
+        return redis_cache.get_client()
+
+    def _key(self, suffix: str = "") -> str:
+        return f"{self._namespace}:leaderboard{suffix}"
+
+    @staticmethod
+    def _from_row(row: Dict) -> Dict:
+        mmr = row.get("mmr")
+        mmr = int(mmr if mmr is not None else DEFAULT_MMR)
+        best_mmr = row.get("best_mmr")
+        return {
+            "id": row["id"],
+            "name": row.get("name") or "",
+            "username": row.get("username") or "",
+            "level": int(row.get("level") or 1),
+            "mmr": mmr,
+            "wins": int(row.get("wins") or 0),
+            "losses": int(row.get("losses") or 0),
+            "best_mmr": max(mmr, int(best_mmr if best_mmr is not None else DEFAULT_MMR)),
+        }
+
+    # -- reconciliation --------------------------------------------------
+    @property
+    def loaded(self) -> bool:
+        """Whether the board has been built (or another worker owns the shared one)."""
+        return self._loaded_at is not None
+
+    def reconcile(self, loader: Loader) -> None:
+        """Rebuild the board from ``loader`` rows."""
+        with self._load_lock:
+            client = self._client()
+            if client and not self._claim_rebuild(client):
+                self._loaded_at = self._clock()  # another worker is rebuilding the shared board
+                return
+            with self._lock:
+                self._journal = []
+            try:
+                rows = [self._from_row(row) for row in loader()]
+                if client:
+                    self._rebuild_redis(client, rows)
+                else:
+                    board = _MemoryBoard(self._rng)
+                    for row in rows:
+                        board.put(row)
+                    with self._lock:
+                        self._board = board
+            finally:
+                with self._lock:
+                    journal, self._journal = self._journal or [], None
+            for op, args in journal:
+                getattr(self, op)(*args)
+            self._loaded_at = self._clock()
+            with self._lock:
+                self._stats["reconciles"] += 1
+
+    async def run_forever(self, loader: Loader, run_blocking) -> None:
+        """Build now, then rebuild every interval; ``run_blocking`` moves the work off the loop."""
+        while True:
+            try:
+                await run_blocking(self.reconcile, loader)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                with self._lock:
+                    self._stats["reconcile_errors"] += 1
+                logger.warning("Leaderboard rebuild failed: %s", exc)
+            if not self.loaded:
+                await asyncio.sleep(RETRY_SECONDS)
+            elif self.reconcile_seconds > 0:
+                await asyncio.sleep(self.reconcile_seconds)
+            else:
+                return
+
+    def _claim_rebuild(self, client) -> bool:
+        ttl = max(1, int(self.reconcile_seconds))
+        try:
+            if not client.exists(self._key()):
+                client.delete(self._key(":reconcile"))
+            return bool(client.set(self._key(":reconcile"), "1", nx=True, ex=ttl))
+        except Exception as exc:  # pragma: no cover - depends on env setup
+            self._stats["redis_errors"] += 1
+            logger.warning("Leaderboard rebuild lock failed: %s", exc)
+            return False
+
+    def _rebuild_redis(self, client, rows: List[Dict]) -> None:
+        token = uuid.uuid4().hex
+        order_tmp, rows_tmp = self._key(f":tmp:{token}"), self._key(f":rows:tmp:{token}")
+        for start in range(0, len(rows), 1000):
+            chunk = rows[start:start + 1000]
+            pipe = client.pipeline(transaction=False)
+            pipe.zadd(order_tmp, {row["id"]: score(row["mmr"], row["wins"], row["level"]) for row in chunk})
+            pipe.hset(rows_tmp, mapping={row["id"]: json.dumps(row) for row in chunk})
+            pipe.execute()
+        pipe = client.pipeline(transaction=True)
+        if rows:
+            pipe.rename(order_tmp, self._key())
+            pipe.rename(rows_tmp, self._key(":rows"))
+        else:
+            pipe.delete(self._key(), self._key(":rows"))
+        pipe.execute()
+
+    # -- updates (journaled while a rebuild runs) ------------------------
+    def _journaled(self, op: str, args: tuple) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((op, args))
+            self._stats["updates"] += 1
+
+    def upsert(self, row: Dict) -> None:
+        """Rank a character (``id``, ``name``, ``level``, ``mmr``, ``wins``, ``losses``, ...)."""
+        row = self._from_row(row)
+        self._journaled("upsert", (row,))
+        client = self._client()
+        if client:
+            pipe = client.pipeline(transaction=True)
+            pipe.zadd(self._key(), {row["id"]: score(row["mmr"], row["wins"], row["level"])})
+            pipe.hset(self._key(":rows"), row["id"], json.dumps(row))
+            pipe.execute()
+            return
+        with self._lock:
+            self._board.put(row)
+
+    def update(
+        self,
+        character_id: str,
+        mmr: Optional[int] = None,
+        wins: Optional[int] = None,
+        losses: Optional[int] = None,
+        level: Optional[int] = None,
+    ) -> None:
+        """Set new absolute values for a ranked character (no-op if not ranked)."""
+        self._journaled("update", (character_id, mmr, wins, losses, level))
+        changes = {"mmr": mmr, "wins": wins, "losses": losses, "level": level}
+        client = self._client()
+        if client:
+            # read-modify-write in one script, so concurrent updates cannot interleave
+            self._script(client)(
+                keys=[self._key(), self._key(":rows")],
+                args=[
+                    character_id,
+                    *("" if value is None else int(value) for value in changes.values()),
+                    DEFAULT_MMR,
+                    MAX_WINS,
+                    MAX_LEVEL,
+                ],
+            )
+            return
+        with self._lock:
+            current = self._board.rows.get(character_id)
+            if current is not None:
+                self._board.put(self._changed(current, changes))
+
+    def _script(self, client):
+        if self._script_client is not client:
+            self._update_script, self._script_client = client.register_script(UPDATE_SCRIPT), client
+        return self._update_script
+
+    @staticmethod
+    def _changed(row: Dict, changes: Dict) -> Dict:
+        row = dict(row, **{field: int(value) for field, value in changes.items() if value is not None})
+        row["best_mmr"] = max(row.get("best_mmr", DEFAULT_MMR), row["mmr"])
+        return row
+
+    def remove(self, character_id: str) -> None:
+        self._journaled("remove", (character_id,))
+        client = self._client()
+        if client:
+            pipe = client.pipeline(transaction=True)
+            pipe.zrem(self._key(), character_id)
+            pipe.hdel(self._key(":rows"), character_id)
+            pipe.execute()
+            return
+        with self._lock:
+            self._board.drop(character_id)
+
+    # -- queries ---------------------------------------------------------
+    def _ranked(self, ids: List[str], rows: List[Optional[str]], first_rank: int) -> List[Dict]:
+        entries = []
+        for offset, (character_id, data) in enumerate(zip(ids, rows)):
+            if data:
+                entries.append(dict(json.loads(data), rank=first_rank + offset))
+        return entries
+
+    def page(self, offset: int, limit: int) -> List[Dict]:
+        """Rows ranked ``offset + 1`` to ``offset + limit``, each with its ``rank``."""
+        offset, limit = max(0, offset), max(0, limit)
+        with self._lock:
+            self._stats["lookups"] += 1
+        if limit == 0:
+            return []
+        client = self._client()
+        if client:
+            ids = client.zrevrange(self._key(), offset, offset + limit - 1)
+            rows = client.hmget(self._key(":rows"), ids) if ids else []
+            return self._ranked(ids, rows, offset + 1)
+        with self._lock:
+            board = self._board
+            keys = board.order.descending(offset, limit)
+            return [dict(board.rows[cid], rank=offset + 1 + index) for index, (_, cid) in enumerate(keys)]
+
+    def rank(self, character_id: str) -> Optional[int]:
+        """1-based rank of ``character_id`` or None if not ranked."""
+        with self._lock:
+            self._stats["lookups"] += 1
+        client = self._client()
+        if client:
+            position = client.zrevrank(self._key(), character_id)
+            return None if position is None else int(position) + 1
+        with self._lock:
+            key = self._board.keys.get(character_id)
+            if key is None:
+                return None
+            return len(self._board.order) - self._board.order.rank(key) + 1
+
+    def around(self, character_id: str, neighbors: int) -> Optional[Dict]:
+        """``character_id``'s rank with up to ``neighbors`` rows above and below it."""
+        rank = self.rank(character_id)
+        if rank is None:
+            return None
+        start = max(0, rank - 1 - max(0, neighbors))
+        return {"rank": rank, "entries": self.page(start, rank - start + max(0, neighbors))}
+
+    def __len__(self) -> int:
+        client = self._client()
+        if client:
+            return int(client.zcard(self._key()))
+        with self._lock:
+            return len(self._board.rows)
+
+    def clear(self) -> None:
+        client = self._client()
+        if client:
+            client.delete(self._key(), self._key(":rows"), self._key(":reconcile"))
+        with self._lock:
+            self._board = _MemoryBoard(self._rng)
+            self._loaded_at = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            backend="redis" if self._client() else "memory",
+            ranked=len(self),
+            reconcile_seconds=self.reconcile_seconds,
+        )
+        return stats
+
+
+leaderboard = Leaderboard(reconcile_seconds=settings.leaderboard_reconcile_seconds)
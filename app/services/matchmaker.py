@@ -0,0 +1,122 @@
+"""
+Periodic batch matchmaking for the PvP queue.
+
+On-demand pairing favours whoever polls first. ``batch_matchmaker`` instead
+pairs the whole queue every ``MATCHMAKING_TICK_SECONDS``. Each tick it takes
+a snapshot, plans pairs that match as many players as possible with the
+smallest total MMR gap (``MatchQueue.plan_pairs``), dequeues them in a
+single atomic claim and publishes one result per player. Each match's wait
+also feeds ``queue_telemetry`` for the wait estimates. Clients see their
+match on ``/api/pvp/queue-status``; ``/api/pvp/match`` consumes it.
+
+With Redis, every worker runs the loop, but only the one that takes the
+short-lived tick lock does the work. A pair that someone else dequeued
+between the snapshot and the claim is skipped and counted as a conflict.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from typing import Callable, Dict
+
+from app.core.cache import redis_cache
+from app.core.config import settings
+from app.services.queue_telemetry import queue_telemetry
+from app.services.state_service import state_service
+
+logger = logging.getLogger(__name__)
+
+
+class BatchMatchmaker:
+    """Pairs the queued players on a fixed tick and publishes the results."""
+
+    def __init__(self, interval_seconds: float, clock: Callable[[], float] = time.time) -> None:
+        self.interval_seconds = interval_seconds
+        self._clock = clock
+        self._lock_key = f"{settings.redis_namespace}:matchmaker_tick"
+        self._lock_token = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._stats = {
+            "ticks": 0,
+            "skipped_ticks": 0,
+            "pairs": 0,
+            "conflicts": 0,
+            "errors": 0,
+            "last_queue_size": 0,
+            "last_tick_ms": 0.0,
+            "max_tick_ms": 0.0,
+        }
+
+    def _lead(self) -> bool:
+        """Take this tick's lock (always granted without Redis)."""
+        client = redis_cache.get_client()
+        if not client:
+            return True
+        lock_ms = max(1, int(self.interval_seconds * 900))
+        return bool(client.set(self._lock_key, self._lock_token, nx=True, px=lock_ms))
+
+    def tick(self) -> int:
+        """Pair the current queue once; returns the number of matches made."""
+        if not self._lead():
+            with self._lock:
+                self._stats["skipped_ticks"] += 1
+            return 0
+        started = time.perf_counter()
+        now = self._clock()
+        queue = state_service.pvp_queue()
+        snapshot = queue.entries()
+        plan = queue.plan_pairs(snapshot.values(), now)
+        claimed = queue.claim_pairs([(first.character_id, second.character_id) for first, second in plan])
+
+        results: Dict[str, Dict] = {}
+        for (first, second), ok in zip(plan, claimed):
+            if not ok:
+                continue
+            for player, opponent in ((first, second), (second, first)):
+                queue_telemetry.record_match(player.mmr, now - player.joined_at)
+                results[player.character_id] = {
+                    "opponent_id": opponent.character_id,
+                    "opponent_mmr": opponent.mmr,
+                    "mmr_gap": abs(opponent.mmr - player.mmr),
+                    "waited_seconds": round(max(0.0, now - player.joined_at), 3),
+                    "matched_at": now,
+                }
+        state_service.set_pvp_match_results(results)
+        queue_telemetry.observe_queue_size(len(snapshot) - len(results))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        made = len(results) // 2
+        with self._lock:
+            self._stats["ticks"] += 1
+            self._stats["pairs"] += made
+            self._stats["conflicts"] += len(plan) - made
+            self._stats["last_queue_size"] = len(snapshot)
+            self._stats["last_tick_ms"] = round(elapsed_ms, 3)
+            self._stats["max_tick_ms"] = round(max(self._stats["max_tick_ms"], elapsed_ms), 3)
+        return made
+
+    async def run_forever(self, run_blocking) -> None:
+        """Tick every interval; ``run_blocking`` moves the tick off the loop."""
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await run_blocking(self.tick)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                with self._lock:
+                    self._stats["errors"] += 1
+                logger.warning("Matchmaking tick failed: %s", exc)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["interval_seconds"] = self.interval_seconds
+        return stats
+
+
+batch_matchmaker = BatchMatchmaker(interval_seconds=settings.matchmaking_tick_seconds)
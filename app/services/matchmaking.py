@@ -0,0 +1,521 @@
+"""
+MMR-bucketed PvP matchmaking.
+
+Queued characters are indexed by MMR, so finding an opponent is a short walk
+outward from the caller's rating rather than a scan of the whole queue::
+
+    queue.join(character_id, mmr)
+    opponent = queue.pair(character_id)   # QueueEntry or None
+
+Two players may be paired when their MMR gap is within the wider of their
+two search windows. A window starts at ``MATCHMAKING_BASE_WINDOW`` and
+widens by ``MATCHMAKING_WIDEN_PER_SECOND`` while the player waits, up to
+``MATCHMAKING_MAX_WINDOW``, so long waits trade match quality for a match.
+``pair`` removes both players atomically, so an opponent is never handed to
+two callers. Entries older than ``PVP_QUEUE_TTL`` are dropped.
+
+Two backends share that API. ``MatchmakingEngine`` keeps the queue in
+process, in fixed-width brackets of sorted lists. ``RedisMatchQueue`` keeps
+two sorted sets shared by all workers (join time and MMR per character) and
+pairs inside a Lua script; expiry is a score-range delete on the join-time
+set. ``state_service`` picks the Redis backend whenever Redis is configured.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.cache import redis_cache
+from app.core.config import settings
+
+DEFAULT_MMR = 1000
+
+BracketItem = Tuple[int, float, str]
+
+
+@dataclass(frozen=True)
+class QueueEntry:
+    character_id: str
+    mmr: int
+    joined_at: float
+
+
+class MatchQueue:
+    """Pairing policy and counters shared by the queue backends."""
+
+    def __init__(
+        self,
+        bracket_width: int,
+        base_window: int,
+        widen_per_second: float,
+        max_window: int,
+        entry_ttl: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if bracket_width <= 0:
+            raise ValueError("bracket_width must be positive")
+        self.bracket_width = bracket_width
+        self.base_window = base_window
+        self.widen_per_second = widen_per_second
+        self.max_window = max(max_window, base_window)
+        self.entry_ttl = entry_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {"joins": 0, "leaves": 0, "pairs": 0, "expired": 0, "no_match": 0}
+
+    def window_for(self, entry: QueueEntry, now: Optional[float] = None) -> float:
+        """MMR gap ``entry`` accepts after waiting until ``now``."""
+        waited = max(0.0, (self._clock() if now is None else now) - entry.joined_at)
+        return min(self.max_window, self.base_window + self.widen_per_second * waited)
+
+    def _bracket(self, mmr: int) -> int:
+        return mmr // self.bracket_width
+
+    def _label(self, bracket: int) -> str:
+        return f"{bracket * self.bracket_width}-{(bracket + 1) * self.bracket_width - 1}"
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    def entries(self) -> Dict[str, QueueEntry]:
+        raise NotImplementedError
+
+    def claim_pairs(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """Dequeue each pair only if both players are still queued."""
+        raise NotImplementedError
+
+    def plan_pairs(self, entries: Iterable[QueueEntry], now: Optional[float] = None) -> List[Tuple[QueueEntry, QueueEntry]]:
+        """Pair a queue snapshot: as many matches as possible, then the smallest total MMR gap.
+
+        Entries are sorted by MMR and only neighbours are paired (for a fixed
+        set of players that minimises the total gap); a dynamic programme over
+        the sorted list picks which neighbour pairs to take so that windows
+        leave as few players unmatched as possible.
+        """
+        now = self._clock() if now is None else now
+        ordered = sorted(entries, key=lambda entry: (entry.mmr, entry.joined_at, entry.character_id))
+        # best[i]: (pairs, -total gap) using the first i entries
+        best: List[Tuple[int, int]] = [(0, 0)] * (len(ordered) + 1)
+        paired_last = [False] * (len(ordered) + 1)
+        for i in range(2, len(ordered) + 1):
+            best[i] = best[i - 1]
+            low, high = ordered[i - 2], ordered[i - 1]
+            gap = high.mmr - low.mmr
+            if gap <= max(self.window_for(low, now), self.window_for(high, now)):
+                candidate = (best[i - 2][0] + 1, best[i - 2][1] - gap)
+                if candidate > best[i]:
+                    best[i], paired_last[i] = candidate, True
+        pairs: List[Tuple[QueueEntry, QueueEntry]] = []
+        i = len(ordered)
+        while i >= 2:
+            if paired_last[i]:
+                pairs.append((ordered[i - 2], ordered[i - 1]))
+                i -= 2
+            else:
+                i -= 1
+        pairs.reverse()
+        return pairs
+
+    def depth_by_bracket(self) -> Dict[str, int]:
+        """Queued players per MMR bracket, labelled ``"1000-1099"``."""
+        depth: Dict[int, int] = {}
+        for entry in self.entries().values():
+            bracket = self._bracket(entry.mmr)
+            depth[bracket] = depth.get(bracket, 0) + 1
+        return {self._label(bracket): count for bracket, count in sorted(depth.items())}
+
+    def stats(self) -> Dict:
+        depth = self.depth_by_bracket()
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            queued=sum(depth.values()),
+            brackets=depth,
+            base_window=self.base_window,
+            max_window=self.max_window,
+            widen_per_second=self.widen_per_second,
+        )
+        return stats
+
+
+class MatchmakingEngine(MatchQueue):
+    """In-memory PvP queue indexed by MMR bracket."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._entries: "OrderedDict[str, QueueEntry]" = OrderedDict()  # join order
+        self._brackets: Dict[int, List[BracketItem]] = {}
+
+    # -- index maintenance ----------------------------------------------
+    @staticmethod
+    def _item(entry: QueueEntry) -> BracketItem:
+        return (entry.mmr, entry.joined_at, entry.character_id)
+
+    def _insert(self, entry: QueueEntry) -> None:
+        self._entries[entry.character_id] = entry
+        bisect.insort(self._brackets.setdefault(self._bracket(entry.mmr), []), self._item(entry))
+
+    def _remove(self, character_id: str) -> Optional[QueueEntry]:
+        entry = self._entries.pop(character_id, None)
+        if entry is None:
+            return None
+        bracket = self._bracket(entry.mmr)
+        items = self._brackets[bracket]
+        item = self._item(entry)
+        index = bisect.bisect_left(items, item)
+        if index < len(items) and items[index] == item:
+            del items[index]
+        if not items:
+            del self._brackets[bracket]
+        return entry
+
+    def _expire(self, now: float) -> None:
+        if self.entry_ttl <= 0:
+            return
+        threshold = now - self.entry_ttl
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.joined_at > threshold:
+                break
+            self._remove(oldest.character_id)
+            self._stats["expired"] += 1
+
+    # -- search ----------------------------------------------------------
+    def _walk_down(self, mmr: int) -> Iterator[BracketItem]:
+        bracket = self._bracket(mmr)
+        lowest = self._bracket(mmr - self.max_window)
+        items = self._brackets.get(bracket, [])
+        for index in range(bisect.bisect_right(items, (mmr, float("inf"), "")) - 1, -1, -1):
+            yield items[index]
+        for bracket in range(bracket - 1, lowest - 1, -1):
+            yield from reversed(self._brackets.get(bracket, []))
+
+    def _walk_up(self, mmr: int) -> Iterator[BracketItem]:
+        bracket = self._bracket(mmr)
+        highest = self._bracket(mmr + self.max_window)
+        items = self._brackets.get(bracket, [])
+        yield from items[bisect.bisect_right(items, (mmr, float("inf"), "")):]
+        for bracket in range(bracket + 1, highest + 1):
+            yield from self._brackets.get(bracket, [])
+
+    def _nearest(self, seeker: QueueEntry, now: float) -> Optional[QueueEntry]:
+        """Closest-MMR queued entry compatible with ``seeker`` (walks outward)."""
+        seeker_window = self.window_for(seeker, now)
+        down, up = self._walk_down(seeker.mmr), self._walk_up(seeker.mmr)
+        below, above = next(down, None), next(up, None)
+        while below is not None or above is not None:
+            if above is None or (below is not None and seeker.mmr - below[0] <= above[0] - seeker.mmr):
+                item, below = below, next(down, None)
+            else:
+                item, above = above, next(up, None)
+            gap = abs(item[0] - seeker.mmr)
+            if gap > self.max_window:
+                break
+            if item[2] == seeker.character_id:
+                continue
+            candidate = self._entries[item[2]]
+            if gap <= max(seeker_window, self.window_for(candidate, now)):
+                return candidate
+        return None
+
+    # -- public API ------------------------------------------------------
+    def join(self, character_id: str, mmr: Optional[int] = None) -> QueueEntry:
+        """Queue ``character_id`` (re-joining resets its wait)."""
+        entry = QueueEntry(character_id, int(mmr if mmr is not None else DEFAULT_MMR), self._clock())
+        with self._lock:
+            self._remove(character_id)
+            self._insert(entry)
+            self._stats["joins"] += 1
+        return entry
+
+    def leave(self, character_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(character_id) is not None
+            if removed:
+                self._stats["leaves"] += 1
+        return removed
+
+    def get(self, character_id: str) -> Optional[QueueEntry]:
+        with self._lock:
+            self._expire(self._clock())
+            return self._entries.get(character_id)
+
+    def pair(self, character_id: str, mmr: Optional[int] = None) -> Optional[QueueEntry]:
+        """Pop the best queued opponent for ``character_id``.
+
+        A queued caller is matched with its own wait time and leaves the queue
+        with the opponent; a caller that is not queued searches with ``mmr``
+        and the base window.
+        """
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            seeker = self._entries.get(character_id)
+            if seeker is None:
+                seeker = QueueEntry(character_id, int(mmr if mmr is not None else DEFAULT_MMR), now)
+            opponent = self._nearest(seeker, now)
+            if opponent is None:
+                self._stats["no_match"] += 1
+                return None
+            self._remove(opponent.character_id)
+            self._remove(character_id)
+            self._stats["pairs"] += 1
+            return opponent
+
+    def claim_pairs(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        claimed = []
+        with self._lock:
+            for first, second in pairs:
+                ok = first != second and first in self._entries and second in self._entries
+                if ok:
+                    self._remove(first)
+                    self._remove(second)
+                    self._stats["pairs"] += 1
+                claimed.append(ok)
+        return claimed
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(self._clock())
+            return len(self._entries)
+
+    def entries(self) -> Dict[str, QueueEntry]:
+        with self._lock:
+            self._expire(self._clock())
+            return dict(self._entries)
+
+    def depth_by_bracket(self) -> Dict[str, int]:
+        with self._lock:
+            self._expire(self._clock())
+            return {self._label(bracket): len(items) for bracket, items in sorted(self._brackets.items())}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._brackets.clear()
+
+
+# KEYS: join-time zset, MMR zset
+# ARGV: seeker id, seeker MMR if not queued, now, ttl, base window, widen per second, max window
+#
+# Walks outward from the seeker's rank in the MMR set, STEP entries at a time
+# per side, always inspecting the nearer side next: the first acceptable
+# candidate is the closest one, and the walk stops there or at max_window.
+PAIR_SCRIPT = """
+local joined, ratings = KEYS[1], KEYS[2]
+local seeker = ARGV[1]
+local now, ttl = tonumber(ARGV[3]), tonumber(ARGV[4])
+local base, widen, max_window = tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7])
+local STEP = 16
+
+local expired = {}
+if ttl > 0 then
+    expired = redis.call('ZRANGEBYSCORE', joined, '-inf', now - ttl, 'LIMIT', 0, 1000)
+    if #expired > 0 then
+        redis.call('ZREM', joined, unpack(expired))
+        redis.call('ZREM', ratings, unpack(expired))
+    end
+end
+
+local function window(joined_at)
+    return math.min(max_window, base + widen * math.max(0, now - joined_at))
+end
+
+local mmr = tonumber(redis.call('ZSCORE', ratings, seeker) or ARGV[2])
+local seeker_window = window(tonumber(redis.call('ZSCORE', joined, seeker) or now))
+
+-- next rank to read above and below the seeker
+local up, down
+local rank = redis.call('ZRANK', ratings, seeker)
+if rank then
+    up, down = rank + 1, rank - 1
+else
+    up = redis.call('ZCOUNT', ratings, '-inf', '(' .. mmr)
+    down = up - 1
+end
+
+-- buffered ids/scores per side, flat as returned by ZRANGE WITHSCORES
+local above, above_at = {}, 1
+local below, below_at = {}, -1
+local function peek_above()
+    if above_at > #above then
+        if up < 0 then return nil end
+        above, above_at = redis.call('ZRANGE', ratings, up, up + STEP - 1, 'WITHSCORES'), 1
+        up = (#above > 0) and up + STEP or -1
+        if #above == 0 then return nil end
+    end
+    return above[above_at], tonumber(above[above_at + 1])
+end
+local function peek_below()
+    if below_at < 1 then
+        if down < 0 then return nil end
+        local start = math.max(0, down - STEP + 1)
+        below = redis.call('ZRANGE', ratings, start, down, 'WITHSCORES')
+        below_at, down = #below - 1, start - 1
+        if #below == 0 then return nil end
+    end
+    return below[below_at], tonumber(below[below_at + 1])
+end
+
+while true do
+    local up_id, up_mmr = peek_above()
+    local down_id, down_mmr = peek_below()
+    if up_id and up_mmr - mmr > max_window then up_id = nil end
+    if down_id and mmr - down_mmr > max_window then down_id = nil end
+    if not up_id and not down_id then break end
+
+    local id, score, gap
+    if down_id and (not up_id or mmr - down_mmr <= up_mmr - mmr) then
+        id, score, gap, below_at = down_id, below[below_at + 1], mmr - down_mmr, below_at - 2
+    else
+        id, score, gap, above_at = up_id, above[above_at + 1], up_mmr - mmr, above_at + 2
+    end
+    local joined_at = tonumber(redis.call('ZSCORE', joined, id))
+    if joined_at and gap <= math.max(seeker_window, window(joined_at)) then
+        redis.call('ZREM', joined, id, seeker)
+        redis.call('ZREM', ratings, id, seeker)
+        return {#expired, id, score, tostring(joined_at)}
+    end
+end
+return {#expired}
+"""
+
+# KEYS: join-time zset, MMR zset
+# ARGV: character ids, two per pair; returns 1/0 per pair
+CLAIM_SCRIPT = """
+local joined, ratings = KEYS[1], KEYS[2]
+local claimed = {}
+for i = 1, #ARGV, 2 do
+    local first, second = ARGV[i], ARGV[i + 1]
+    if first ~= second and redis.call('ZSCORE', joined, first) and redis.call('ZSCORE', joined, second) then
+        redis.call('ZREM', joined, first, second)
+        redis.call('ZREM', ratings, first, second)
+        claimed[#claimed + 1] = 1
+    else
+        claimed[#claimed + 1] = 0
+    end
+end
+return claimed
+"""
+
+
+class RedisMatchQueue(MatchQueue):
+    """PvP queue in two Redis sorted sets, shared by every worker."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._namespace = settings.redis_namespace
+        self._joined_key = f"{self._namespace}:pvp_queue"
+        self._ratings_key = f"{self._namespace}:pvp_queue:mmr"
+        self._scripts: Dict[str, object] = {}
+        self._script_client = None
+
+    def _client(self):
+        return redis_cache.get_client()
+
+    def _script(self, client, source: str):
+        if self._script_client is not client:
+            self._scripts, self._script_client = {}, client
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = client.register_script(source)
+        return script
+
+    def _live_after(self, now: float) -> str:
+        # exclusive lower bound: an entry expires once joined_at <= now - ttl
+        return f"({now - self.entry_ttl}" if self.entry_ttl > 0 else "-inf"
+
+    def join(self, character_id: str, mmr: Optional[int] = None) -> QueueEntry:
+        entry = QueueEntry(character_id, int(mmr if mmr is not None else DEFAULT_MMR), self._clock())
+        pipe = self._client().pipeline()
+        pipe.zadd(self._joined_key, {character_id: entry.joined_at})
+        pipe.zadd(self._ratings_key, {character_id: entry.mmr})
+        pipe.execute()
+        self._count("joins")
+        return entry
+
+    def leave(self, character_id: str) -> bool:
+        pipe = self._client().pipeline()
+        pipe.zrem(self._joined_key, character_id)
+        pipe.zrem(self._ratings_key, character_id)
+        removed = bool(pipe.execute()[0])
+        if removed:
+            self._count("leaves")
+        return removed
+
+    def get(self, character_id: str) -> Optional[QueueEntry]:
+        pipe = self._client().pipeline(transaction=False)
+        pipe.zscore(self._joined_key, character_id)
+        pipe.zscore(self._ratings_key, character_id)
+        joined_at, mmr = pipe.execute()
+        if joined_at is None or (self.entry_ttl > 0 and joined_at <= self._clock() - self.entry_ttl):
+            return None
+        return QueueEntry(character_id, int(mmr if mmr is not None else DEFAULT_MMR), float(joined_at))
+
+    def pair(self, character_id: str, mmr: Optional[int] = None) -> Optional[QueueEntry]:
+        client = self._client()
+        result = self._script(client, PAIR_SCRIPT)(
+            keys=[self._joined_key, self._ratings_key],
+            args=[
+                character_id,
+                int(mmr if mmr is not None else DEFAULT_MMR),
+                self._clock(),
+                self.entry_ttl,
+                self.base_window,
+                self.widen_per_second,
+                self.max_window,
+            ],
+        )
+        if result[0]:
+            self._count("expired", int(result[0]))
+        if len(result) < 4:
+            self._count("no_match")
+            return None
+        self._count("pairs")
+        return QueueEntry(result[1], int(float(result[2])), float(result[3]))
+
+    def claim_pairs(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        if not pairs:
+            return []
+        client = self._client()
+        flags = self._script(client, CLAIM_SCRIPT)(
+            keys=[self._joined_key, self._ratings_key],
+            args=[character_id for pair in pairs for character_id in pair],
+        )
+        claimed = [bool(flag) for flag in flags]
+        self._count("pairs", sum(claimed))
+        return claimed
+
+    def __len__(self) -> int:
+        return int(self._client().zcount(self._joined_key, self._live_after(self._clock()), "+inf"))
+
+    def entries(self) -> Dict[str, QueueEntry]:
+        pipe = self._client().pipeline(transaction=False)
+        pipe.zrangebyscore(self._joined_key, self._live_after(self._clock()), "+inf", withscores=True)
+        pipe.zrange(self._ratings_key, 0, -1, withscores=True)
+        joined, ratings = pipe.execute()
+        mmr_by_id = dict(ratings)
+        return {
+            character_id: QueueEntry(character_id, int(mmr_by_id.get(character_id, DEFAULT_MMR)), float(joined_at))
+            for character_id, joined_at in joined
+        }
+
+    def clear(self) -> None:
+        self._client().delete(self._joined_key, self._ratings_key)
+
+
+_policy = dict(
+    bracket_width=settings.matchmaking_bracket_width,
+    base_window=settings.matchmaking_base_window,
+    widen_per_second=settings.matchmaking_widen_per_second,
+    max_window=settings.matchmaking_max_window,
+    entry_ttl=settings.pvp_queue_ttl,
+)
+matchmaking_engine = MatchmakingEngine(**_policy)
+redis_match_queue = RedisMatchQueue(**_policy)
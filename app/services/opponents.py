@@ -0,0 +1,313 @@
+"""
+In-memory index of PvP-enabled characters by level.
+
+``/api/pvp/opponents`` used to run ``ORDER BY ABS(level - ?)`` over every
+PvP-enabled character in range on each browse, which no index can serve.
+``opponent_index`` keeps those characters (id, name, level, MMR) grouped by
+level, each level sorted by name, so a browse walks outward from the
+caller's level and stops after ``limit`` rows::
+
+    opponent_index.nearest(level=12, limit=20, max_level_diff=5, exclude=character_id)
+
+The same index samples random opponents for offline PvP: every indexed
+character also sits in an array with a position map (one per level band
+plus one overall), so adding, removing and drawing a uniform random id are
+all O(1); removal swaps the last id into the freed slot::
+
+    opponent_index.sample(exclude=character_id, level=12)
+
+Handlers keep it in step: ``upsert`` when PvP is enabled, ``remove`` when it
+is disabled, ``update`` on level-ups and MMR changes. The index is loaded
+from the database on first use and rebuilt every
+``OPPONENT_INDEX_REFRESH_SECONDS`` to pick up changes made by other
+workers; updates that land while a rebuild is running are replayed onto the
+new index before it is swapped in.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+DEFAULT_MMR = 1000
+
+Loader = Callable[[], Iterable[Dict]]
+
+
+@dataclass(frozen=True)
+class Opponent:
+    id: str
+    name: str
+    level: int
+    mmr: int
+
+
+class _SwapSet:
+    """Ids in an array plus a position map: O(1) add, remove and uniform sampling."""
+
+    __slots__ = ("items", "positions")
+
+    def __init__(self) -> None:
+        self.items: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, character_id: str) -> None:
+        if character_id not in self.positions:
+            self.positions[character_id] = len(self.items)
+            self.items.append(character_id)
+
+    def discard(self, character_id: str) -> None:
+        index = self.positions.pop(character_id, None)
+        if index is None:
+            return
+        last = self.items.pop()
+        if index < len(self.items):
+            self.items[index] = last
+            self.positions[last] = index
+
+    def sample(self, rng: random.Random, exclude: Optional[str] = None) -> Optional[str]:
+        """Uniform random id other than ``exclude``."""
+        skip = self.positions.get(exclude) if exclude is not None else None
+        size = len(self.items) - (1 if skip is not None else 0)
+        if size <= 0:
+            return None
+        index = rng.randrange(size)
+        if skip is not None and index >= skip:
+            index += 1
+        return self.items[index]
+
+
+class _LevelTable:
+    """Characters per level (sorted by name) and per level band (for sampling)."""
+
+    def __init__(self, band_levels: int) -> None:
+        self.band_levels = band_levels
+        self.by_id: Dict[str, Opponent] = {}
+        self.levels: Dict[int, List[Tuple[str, str]]] = {}
+        self.everyone = _SwapSet()
+        self.bands: Dict[int, _SwapSet] = {}
+
+    def band(self, level: int) -> int:
+        return level // self.band_levels
+
+    def add(self, opponent: Opponent) -> None:
+        self.discard(opponent.id)
+        self.by_id[opponent.id] = opponent
+        bisect.insort(self.levels.setdefault(opponent.level, []), (opponent.name, opponent.id))
+        self.everyone.add(opponent.id)
+        self.bands.setdefault(self.band(opponent.level), _SwapSet()).add(opponent.id)
+
+    def discard(self, character_id: str) -> Optional[Opponent]:
+        opponent = self.by_id.pop(character_id, None)
+        if opponent is None:
+            return None
+        rows = self.levels[opponent.level]
+        key = (opponent.name, opponent.id)
+        index = bisect.bisect_left(rows, key)
+        if index < len(rows) and rows[index] == key:
+            del rows[index]
+        if not rows:
+            del self.levels[opponent.level]
+        self.everyone.discard(character_id)
+        band = self.band(opponent.level)
+        self.bands[band].discard(character_id)
+        if not self.bands[band]:
+            del self.bands[band]
+        return opponent
+
+
+class OpponentIndex:
+    """Nearest-level browsing and random sampling without touching the database."""
+
+    def __init__(
+        self,
+        refresh_seconds: float,
+        band_levels: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if band_levels <= 0:
+            raise ValueError("band_levels must be positive")
+        self.refresh_seconds = refresh_seconds
+        self.band_levels = band_levels
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._table = _LevelTable(band_levels)
+        self._loaded_at: Optional[float] = None
+        self._journal: Optional[List[Tuple[str, tuple]]] = None  # set while a rebuild runs
+        self._stats = {"loads": 0, "lookups": 0, "updates": 0, "samples": 0, "band_fallbacks": 0}
+
+    # -- loading ---------------------------------------------------------
+    def _stale(self) -> bool:
+        return self._loaded_at is None or (
+            self.refresh_seconds > 0 and self._clock() - self._loaded_at >= self.refresh_seconds
+        )
+
+    def ensure_loaded(self, loader: Loader) -> None:
+        """(Re)build from ``loader`` rows when never loaded or past the refresh interval."""
+        if not self._stale():
+            return
+        with self._load_lock:
+            if not self._stale():
+                return
+            with self._lock:
+                self._journal = []
+            try:
+                table = _LevelTable(self.band_levels)
+                for row in loader():
+                    table.add(self._from_row(row))
+            except Exception:
+                with self._lock:
+                    self._journal = None
+                raise
+            with self._lock:
+                for op, args in self._journal:
+                    getattr(self, op)(table, *args)
+                self._journal = None
+                self._table = table
+                self._loaded_at = self._clock()
+                self._stats["loads"] += 1
+
+    @staticmethod
+    def _from_row(row: Dict) -> Opponent:
+        mmr = row.get("pvp_mmr")
+        return Opponent(
+            id=row["id"],
+            name=row.get("name") or "",
+            level=int(row.get("level") or 1),
+            mmr=int(mmr if mmr is not None else DEFAULT_MMR),
+        )
+
+    # -- mutations (applied to the live table and journaled during a rebuild) --
+    def _apply(self, op: str, *args) -> None:
+        with self._lock:
+            getattr(self, op)(self._table, *args)
+            if self._journal is not None:
+                self._journal.append((op, args))
+            self._stats["updates"] += 1
+
+    @staticmethod
+    def _upsert(table: _LevelTable, opponent: Opponent) -> None:
+        table.add(opponent)
+
+    @staticmethod
+    def _remove(table: _LevelTable, character_id: str) -> None:
+        table.discard(character_id)
+
+    @staticmethod
+    def _update(table: _LevelTable, character_id: str, level: Optional[int], mmr: Optional[int]) -> None:
+        current = table.by_id.get(character_id)
+        if current is None:
+            return
+        table.add(replace(
+            current,
+            level=int(level) if level is not None else current.level,
+            mmr=int(mmr) if mmr is not None else current.mmr,
+        ))
+
+    def upsert(self, row: Dict) -> None:
+        """Index a PvP-enabled character (``id``, ``name``, ``level``, ``pvp_mmr``)."""
+        self._apply("_upsert", self._from_row(row))
+
+    def remove(self, character_id: str) -> None:
+        self._apply("_remove", character_id)
+
+    def update(self, character_id: str, level: Optional[int] = None, mmr: Optional[int] = None) -> None:
+        """Refresh level and/or MMR of an indexed character (no-op if not indexed)."""
+        self._apply("_update", character_id, level, mmr)
+
+    # -- queries ---------------------------------------------------------
+    def get(self, character_id: str) -> Optional[Opponent]:
+        with self._lock:
+            return self._table.by_id.get(character_id)
+
+    def nearest(
+        self,
+        level: int,
+        limit: int,
+        max_level_diff: int,
+        exclude: Optional[str] = None,
+        min_level: int = 1,
+        max_level: int = 100,
+    ) -> List[Opponent]:
+        """Up to ``limit`` characters ordered by level distance, then name."""
+        results: List[Opponent] = []
+        with self._lock:
+            self._stats["lookups"] += 1
+            table = self._table
+            for diff in range(0, max_level_diff + 1):
+                candidates = [level] if diff == 0 else [level - diff, level + diff]
+                rows = [
+                    table.levels.get(candidate, [])
+                    for candidate in candidates
+                    if min_level <= candidate <= max_level
+                ]
+                for _, character_id in heapq.merge(*rows):
+                    if character_id == exclude:
+                        continue
+                    results.append(table.by_id[character_id])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def highest(self, limit: int) -> List[Opponent]:
+        """Up to ``limit`` characters from the highest level down, by name within a level."""
+        results: List[Opponent] = []
+        with self._lock:
+            self._stats["lookups"] += 1
+            table = self._table
+            for level in sorted(table.levels, reverse=True):
+                for _, character_id in table.levels[level]:
+                    results.append(table.by_id[character_id])
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def sample(self, exclude: Optional[str] = None, level: Optional[int] = None) -> Optional[str]:
+        """Random indexed character id other than ``exclude``.
+
+        With ``level``, draws from that level's band first and falls back to
+        everyone when the band has nobody else.
+        """
+        with self._lock:
+            self._stats["samples"] += 1
+            table = self._table
+            if level is not None:
+                band = table.bands.get(table.band(level))
+                if band is not None:
+                    picked = band.sample(self._rng, exclude)
+                    if picked is not None:
+                        return picked
+                self._stats["band_fallbacks"] += 1
+            return table.everyone.sample(self._rng, exclude)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._table.by_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["indexed"] = len(self._table.by_id)
+            stats["levels"] = len(self._table.levels)
+            stats["bands"] = len(self._table.bands)
+        stats["refresh_seconds"] = self.refresh_seconds
+        return stats
+
+
+opponent_index = OpponentIndex(
+    refresh_seconds=settings.opponent_index_refresh_seconds,
+    band_levels=settings.pvp_random_band_levels,
+)
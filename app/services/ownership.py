@@ -0,0 +1,172 @@
+"""
+Cache of which characters each user owns.
+
+Most character endpoints start by proving the caller owns ``character_id``.
+That check used to open its own connection and run
+``SELECT id FROM characters WHERE id = ? AND user_id = ?`` before the handler
+opened a second connection for the real work. ``ownership_cache`` keeps the
+set of character ids per user instead, in a per-process LRU and, when
+configured, in Redis so every worker shares it::
+
+    if not ownership_cache.owns(user_id, character_id, load_ids):
+        raise HTTPException(status_code=403, ...)
+
+Sets are primed at login, replaced when a character is created and dropped
+with ``invalidate`` when one is deleted. A cached "not owned" answer is
+always re-checked against the database once, so a character created through
+another worker is never refused while this worker's copy is still fresh.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from app.core.cache import redis_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[str], Iterable[str]]
+
+
+class OwnershipCache:
+    """Two-tier (process LRU + Redis) cache of user id -> owned character ids."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: int,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._namespace = settings.redis_namespace
+        self._local: "OrderedDict[str, Tuple[float, FrozenSet[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "rechecks": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _client(self):
+        return redis_cache.get_client()
+
+    def _key(self, user_id: str) -> str:
+        return f"{self._namespace}:owned_characters:{user_id}"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def _store_local(self, user_id: str, ids: FrozenSet[str], epoch: Optional[int] = None) -> None:
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return  # invalidated while the caller was loading it
+            self._local[user_id] = (self._clock() + self.ttl_seconds, ids)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(self, user_id: str) -> Optional[FrozenSet[str]]:
+        """Cached character ids for ``user_id``, or None if not cached."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._local.get(user_id)
+            if entry is not None and entry[0] > self._clock():
+                self._local.move_to_end(user_id)
+                self._stats["local_hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._local[user_id]
+            epoch = self._epoch
+
+        client = self._client()
+        if client:
+            try:
+                data = client.get(self._key(user_id))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                logger.warning("Ownership cache read failed: %s", exc)
+                data = None
+            if data:
+                ids = frozenset(json.loads(data))
+                self._store_local(user_id, ids, epoch)
+                self._count("redis_hits")
+                return ids
+
+        self._count("misses")
+        return None
+
+    def prime(self, user_id: str, character_ids: Iterable[str], epoch: Optional[int] = None) -> None:
+        """Record the complete set of characters ``user_id`` owns."""
+        if not self.enabled:
+            return
+        ids = frozenset(character_ids)
+        self._store_local(user_id, ids, epoch)
+        if epoch is not None and epoch != self._epoch:
+            return
+        client = self._client()
+        if client:
+            try:
+                client.setex(self._key(user_id), self.ttl_seconds, json.dumps(sorted(ids)))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                logger.warning("Ownership cache write failed: %s", exc)
+
+    def load_epoch(self) -> int:
+        return self._epoch
+
+    def owns(self, user_id: str, character_id: Optional[str], loader: Loader) -> bool:
+        """True if ``user_id`` owns ``character_id``; ``loader`` lists owned ids on a miss."""
+        if not character_id:
+            return False
+        ids = self.get(user_id)
+        if ids is not None:
+            if character_id in ids:
+                return True
+            self._count("rechecks")
+        epoch = self.load_epoch()
+        ids = frozenset(loader(user_id))
+        self.prime(user_id, ids, epoch)
+        return character_id in ids
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's set (character created, deleted or transferred)."""
+        with self._lock:
+            self._epoch += 1
+            self._stats["invalidations"] += 1
+            self._local.pop(user_id, None)
+        client = self._client()
+        if client:
+            try:
+                client.delete(self._key(user_id))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                logger.warning("Ownership cache invalidation failed: %s", exc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._local.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._local)
+        hits = stats["local_hits"] + stats["redis_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups * 100, 2) if lookups else 0.0
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+ownership_cache = OwnershipCache(
+    max_entries=settings.ownership_cache_size,
+    ttl_seconds=settings.ownership_cache_ttl,
+)
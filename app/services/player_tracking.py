@@ -10,8 +10,10 @@ import uuid
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from app.db import execute_query, get_db_connection
+from app.db import execute_query, get_db_connection, get_db_read_connection
 from app.db.manager import db_manager
+from app.db.queries import PVP_LEADERBOARD_ROWS
+from app.db.statements import statements
 
 logger = logging.getLogger(__name__)
 
@@ -299,7 +301,7 @@ class PlayerTrackingService:
     # ------------------------------------------------------------------
     # Queries
     def get_profile(self, user_id: str) -> Dict:
-        conn = get_db_connection()
+        conn = get_db_read_connection()
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -324,7 +326,7 @@ class PlayerTrackingService:
             conn.close()
 
     def get_recent_progress(self, character_id: str, limit: int = 20) -> List[Dict]:
-        conn = get_db_connection()
+        conn = get_db_read_connection()
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -352,7 +354,7 @@ class PlayerTrackingService:
             conn.close()
 
     def get_recent_matches(self, user_id: str, limit: int = 20) -> List[Dict]:
-        conn = get_db_connection()
+        conn = get_db_read_connection()
         cursor = conn.cursor()
         try:
             cursor.execute(
@@ -378,26 +380,13 @@ class PlayerTrackingService:
         finally:
             conn.close()
 
-    def get_leaderboard(self, limit: int = 50, offset: int = 0) -> List[Dict]:
-        conn = get_db_connection()
+    def get_leaderboard_rows(self) -> List[Dict]:
+        """Every character's leaderboard row, unordered (the leaderboard sorts them)."""
+        conn = get_db_read_connection()
         cursor = conn.cursor()
         try:
-            cursor.execute(
-                """
-                SELECT c.id, c.name, c.level, 
-                       COALESCE(c.pvp_mmr, ?) AS mmr,
-                       COALESCE(c.pvp_wins, 0) AS wins,
-                       COALESCE(c.pvp_losses, 0) AS losses,
-                       COALESCE(pp.username, '') AS username,
-                       COALESCE(pp.best_mmr, ?) AS best_mmr
-                FROM characters c
-                LEFT JOIN player_profiles pp ON pp.user_id = c.user_id
-                ORDER BY mmr DESC, wins DESC, c.level DESC
-                LIMIT ? OFFSET ?
-                """,
-                (1000, 1000, limit, offset),
-            )
-            return [dict(row) for row in cursor.fetchall()]
+            rows = statements.fetchall(cursor, PVP_LEADERBOARD_ROWS, (1000, 1000))
+            return [dict(row) for row in rows]
         finally:
             conn.close()
 
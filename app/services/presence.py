@@ -0,0 +1,171 @@
+"""
+Online-presence tracking with time-bucketed counters.
+
+Every authenticated request is a heartbeat. Heartbeats land in fixed-width
+time buckets (``PRESENCE_BUCKET_SECONDS``, one minute by default) and a user
+is online while any bucket inside the last ``PRESENCE_WINDOW_SECONDS``
+contains them::
+
+    presence_tracker.heartbeat(user_id)
+    presence_tracker.online_count()
+    presence_tracker.is_online(user_id)
+
+Each worker records a user at most once per bucket; repeat heartbeats in the
+same bucket are a set lookup with no lock and no write. With Redis, buckets
+are HyperLogLogs shared by all workers and the count is one ``PFCOUNT`` over
+the window's keys. Without Redis, each user sits in exactly one in-memory
+bucket (their latest), so the count is the size of a dict and expired
+buckets are dropped as the window moves. Whether one user is online is a
+lookup of their latest bucket (in memory) or of a per-user key that expires
+with the window (Redis; HyperLogLogs cannot answer membership).
+
+The window is measured in whole buckets, so a user stays online for up to
+one bucket longer than the window.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Set
+
+from app.core.cache import redis_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """Counts distinct users seen in a sliding window of time buckets."""
+
+    def __init__(
+        self,
+        window_seconds: int,
+        bucket_seconds: int,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if bucket_seconds <= 0 or window_seconds < bucket_seconds:
+            raise ValueError("presence window must hold at least one bucket")
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        # the current, partly elapsed bucket plus enough whole ones to cover the window
+        self.window_buckets = -(-window_seconds // bucket_seconds) + 1
+        self._clock = clock
+        self._namespace = settings.redis_namespace
+        self._lock = threading.Lock()
+        # users already recorded by this worker in the current bucket
+        self._written_bucket = -1
+        self._written: Set[str] = set()
+        # in-memory store: bucket -> users whose latest heartbeat is in it
+        self._buckets: Dict[int, Set[str]] = {}
+        self._user_bucket: Dict[str, int] = {}
+        self._stats = {"writes": 0, "redis_errors": 0}
+
+    def _client(self):
+        return redis_cache.get_client()
+
+    def _key(self, bucket: int) -> str:
+        return f"{self._namespace}:presence:{bucket}"
+
+    def _user_key(self, user_id: str) -> str:
+        return f"{self._namespace}:presence:user:{user_id}"
+
+    def _bucket(self) -> int:
+        return int(self._clock() // self.bucket_seconds)
+
+    def heartbeat(self, user_id: str) -> None:
+        """Mark ``user_id`` as online now."""
+        bucket = self._bucket()
+        if bucket == self._written_bucket and user_id in self._written:
+            return  # already recorded in this bucket
+
+        with self._lock:
+            if bucket != self._written_bucket:
+                self._written, self._written_bucket = set(), bucket
+            elif user_id in self._written:
+                return
+            self._written.add(user_id)
+            self._stats["writes"] += 1
+
+        client = self._client()
+        if client:
+            try:
+                key = self._key(bucket)
+                pipe = client.pipeline(transaction=False)
+                pipe.pfadd(key, user_id)
+                pipe.expire(key, (self.window_buckets + 1) * self.bucket_seconds)
+                pipe.set(self._user_key(user_id), bucket, ex=self.window_buckets * self.bucket_seconds)
+                pipe.execute()
+                return
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                self._stats["redis_errors"] += 1
+                logger.warning("Presence heartbeat to Redis failed: %s", exc)
+
+        with self._lock:
+            previous = self._user_bucket.get(user_id)
+            if previous is not None and previous != bucket:
+                self._buckets[previous].discard(user_id)
+            self._buckets.setdefault(bucket, set()).add(user_id)
+            self._user_bucket[user_id] = bucket
+            self._expire(bucket)
+
+    def _expire(self, bucket: int) -> None:
+        cutoff = bucket - self.window_buckets
+        for old in [b for b in self._buckets if b <= cutoff]:
+            for user_id in self._buckets.pop(old):
+                if self._user_bucket.get(user_id) == old:
+                    del self._user_bucket[user_id]
+
+    def online_count(self) -> int:
+        """Distinct users with a heartbeat inside the window."""
+        bucket = self._bucket()
+        client = self._client()
+        if client:
+            try:
+                keys = [self._key(bucket - offset) for offset in range(self.window_buckets)]
+                return int(client.pfcount(*keys))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                self._stats["redis_errors"] += 1
+                logger.warning("Presence count from Redis failed: %s", exc)
+        with self._lock:
+            self._expire(bucket)
+            return len(self._user_bucket)
+
+    def is_online(self, user_id: str) -> bool:
+        """Whether ``user_id`` has a heartbeat inside the window."""
+        bucket = self._bucket()
+        client = self._client()
+        if client:
+            try:
+                return bool(client.exists(self._user_key(user_id)))
+            except Exception as exc:  # pragma: no cover - depends on env setup
+                self._stats["redis_errors"] += 1
+                logger.warning("Presence lookup from Redis failed: %s", exc)
+        with self._lock:
+            seen = self._user_bucket.get(user_id)
+            return seen is not None and seen > bucket - self.window_buckets
+
+    def reset(self) -> None:
+        with self._lock:
+            self._written, self._written_bucket = set(), -1
+            self._buckets.clear()
+            self._user_bucket.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tracked_users"] = len(self._user_bucket)
+            stats["buckets"] = len(self._buckets)
+        stats.update(
+            backend="redis" if self._client() else "memory",
+            window_seconds=self.window_seconds,
+            bucket_seconds=self.bucket_seconds,
+        )
+        return stats
+
+
+presence_tracker = PresenceTracker(
+    window_seconds=settings.presence_window_seconds,
+    bucket_seconds=settings.presence_bucket_seconds,
+)
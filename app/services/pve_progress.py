@@ -0,0 +1,142 @@
+"""
+PvE enemy catalog and linear story progression helpers.
+
+Unlocks are strictly linear by ``story_order``, so progression is stored as a
+single ``highest_unlocked_order`` integer per character instead of a JSON list
+of enemy ids.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Dict, List, Optional
+
+from app.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+class PveCatalog:
+    """Immutable in-memory view of the PvE enemy roster ordered by story."""
+
+    def __init__(self, enemies: List[Dict]) -> None:
+        self._enemies: List[Dict] = []
+        for index, enemy in enumerate(enemies):
+            entry = dict(enemy)
+            entry["story_order"] = index + 1
+            self._enemies.append(entry)
+        self._by_id: Dict[str, Dict] = {e["id"]: e for e in self._enemies}
+
+    def __len__(self) -> int:
+        return len(self._enemies)
+
+    @property
+    def enemies(self) -> List[Dict]:
+        return self._enemies
+
+    def get(self, enemy_id: str) -> Optional[Dict]:
+        return self._by_id.get(enemy_id)
+
+    def story_order(self, enemy_id: str) -> Optional[int]:
+        enemy = self._by_id.get(enemy_id)
+        return enemy["story_order"] if enemy else None
+
+    def clamp_order(self, order: Optional[int]) -> int:
+        """Clamp a stored progress index into the valid story range (min 1)."""
+        if not self._enemies:
+            return 0
+        if order is None or order < 1:
+            return 1
+        return min(order, len(self._enemies))
+
+    def highest_order_from_ids(self, enemy_ids: List[str]) -> int:
+        """Translate a legacy ``enemies_unlocked_json`` list into a story index."""
+        orders = [self._by_id[eid]["story_order"] for eid in enemy_ids if eid in self._by_id]
+        return self.clamp_order(max(orders) if orders else 1)
+
+
+def _load_catalog() -> PveCatalog:
+    from game_logic import PVE_ENEMIES
+
+    return PveCatalog(PVE_ENEMIES)
+
+
+pve_catalog = _load_catalog()
+
+
+class PveProgressService:
+    """Reads and advances per-character story progression."""
+
+    def __init__(self, catalog: PveCatalog) -> None:
+        self.catalog = catalog
+
+    def get_highest_unlocked(self, cursor, character_id: str) -> int:
+        cursor.execute(
+            "SELECT highest_unlocked_order FROM character_pve_progress WHERE character_id = ?",
+            (character_id,),
+        )
+        row = cursor.fetchone()
+        order = row["highest_unlocked_order"] if row else None
+        return self.catalog.clamp_order(order)
+
+    def is_unlocked(self, highest_unlocked: int, enemy_id: str) -> bool:
+        order = self.catalog.story_order(enemy_id)
+        return order is not None and order <= highest_unlocked
+
+    def unlock_next(self, character_id: str, enemy_id: str) -> bool:
+        """Unlock the enemy after ``enemy_id`` with a single conditional upsert.
+
+        Returns True when progression advanced.
+        """
+        current_order = self.catalog.story_order(enemy_id)
+        if current_order is None:
+            return False
+        next_order = self.catalog.clamp_order(current_order + 1)
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                INSERT INTO character_pve_progress (character_id, enemies_unlocked_json, highest_unlocked_order)
+                VALUES (?, '[]', ?)
+                ON CONFLICT (character_id) DO UPDATE
+                SET highest_unlocked_order = EXCLUDED.highest_unlocked_order
+                WHERE character_pve_progress.highest_unlocked_order IS NULL
+                   OR character_pve_progress.highest_unlocked_order < EXCLUDED.highest_unlocked_order
+                """,
+                (character_id, next_order),
+            )
+            advanced = cursor.rowcount > 0
+            conn.commit()
+            return advanced
+        finally:
+            conn.close()
+
+    def migrate_legacy_progress(self, cursor) -> int:
+        """Backfill ``highest_unlocked_order`` from ``enemies_unlocked_json``."""
+        cursor.execute(
+            "SELECT character_id, enemies_unlocked_json FROM character_pve_progress "
+            "WHERE highest_unlocked_order IS NULL"
+        )
+        rows = cursor.fetchall()
+        updates = []
+        for row in rows:
+            try:
+                unlocked = json.loads(row["enemies_unlocked_json"] or "[]")
+            except (TypeError, ValueError):
+                unlocked = []
+            order = self.catalog.highest_order_from_ids(unlocked)
+            updates.append((order, row["character_id"]))
+
+        if updates:
+            cursor.executemany(
+                "UPDATE character_pve_progress SET highest_unlocked_order = ? WHERE character_id = ?",
+                updates,
+            )
+            logger.info("Migrated PvE progress for %d characters", len(updates))
+        return len(updates)
+
+
+pve_progress_service = PveProgressService(pve_catalog)
@@ -0,0 +1,214 @@
+"""
+Rolling PvP queue statistics for wait-time estimates.
+
+``/api/pvp/queue-status`` used to estimate the wait as ``queue_size * 30``
+seconds and list the whole queue to get that size, on every poll from every
+waiting client. ``queue_telemetry`` learns from what the matchmakers
+actually do instead, in constant memory per MMR bracket:
+
+* an exponentially weighted mean of the time matched players waited;
+* a decaying histogram of those waits (fixed bounds), for percentiles and
+  for the remaining wait of a player who has already waited a while;
+* a decaying match rate (players matched per minute).
+
+All three forget the past with a half-life of ``QUEUE_TELEMETRY_HALF_LIFE``
+seconds. The queue size is cached and refreshed by each matchmaking tick,
+so a status poll costs a few dict lookups::
+
+    queue_telemetry.record_match(mmr, waited_seconds)
+    queue_telemetry.estimate_wait(mmr, waited_seconds)   # seconds, or None
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+WAIT_BUCKETS = (5, 10, 20, 30, 60, 120, 300, 600)
+
+
+class _BracketStats:
+    """Decaying wait mean, wait histogram and match counter for one bracket."""
+
+    __slots__ = ("mean_wait", "weight", "histogram", "matches", "updated_at")
+
+    def __init__(self, buckets: int, now: float) -> None:
+        self.mean_wait = 0.0
+        self.weight = 0.0
+        self.histogram: List[float] = [0.0] * (buckets + 1)  # last bucket: overflow
+        self.matches = 0.0
+        self.updated_at = now
+
+    def decay(self, now: float, half_life: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed <= 0:
+            return
+        factor = math.pow(0.5, elapsed / half_life)
+        self.weight *= factor
+        self.matches *= factor
+        self.histogram = [count * factor for count in self.histogram]
+        self.updated_at = now
+
+
+class QueueTelemetry:
+    """Constant-memory wait-time and match-rate tracking per MMR bracket."""
+
+    def __init__(
+        self,
+        bracket_width: int,
+        half_life_seconds: float,
+        size_max_age: float = 1.0,
+        buckets: Sequence[float] = WAIT_BUCKETS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if bracket_width <= 0 or half_life_seconds <= 0:
+            raise ValueError("bracket_width and half_life_seconds must be positive")
+        self.bracket_width = bracket_width
+        self.half_life_seconds = half_life_seconds
+        self.size_max_age = size_max_age
+        self.buckets = tuple(buckets)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._brackets: Dict[int, _BracketStats] = {}
+        self._overall = _BracketStats(len(self.buckets), clock())
+        self._queue_size = 0
+        self._queue_size_at: Optional[float] = None
+
+    def _bracket(self, mmr: int) -> int:
+        return int(mmr) // self.bracket_width
+
+    def _label(self, bracket: int) -> str:
+        return f"{bracket * self.bracket_width}-{(bracket + 1) * self.bracket_width - 1}"
+
+    def _bucket_index(self, waited: float) -> int:
+        for index, bound in enumerate(self.buckets):
+            if waited <= bound:
+                return index
+        return len(self.buckets)
+
+    # -- recording -------------------------------------------------------
+    def record_match(self, mmr: int, waited_seconds: float) -> None:
+        """A queued player with ``mmr`` was matched after ``waited_seconds``."""
+        now = self._clock()
+        waited = max(0.0, float(waited_seconds))
+        index = self._bucket_index(waited)
+        with self._lock:
+            bracket = self._brackets.get(self._bracket(mmr))
+            if bracket is None:
+                bracket = self._brackets[self._bracket(mmr)] = _BracketStats(len(self.buckets), now)
+            for stats in (bracket, self._overall):
+                stats.decay(now, self.half_life_seconds)
+                stats.weight += 1.0
+                stats.mean_wait += (waited - stats.mean_wait) / stats.weight
+                stats.histogram[index] += 1.0
+                stats.matches += 1.0
+
+    def observe_queue_size(self, size: int) -> None:
+        with self._lock:
+            self._queue_size = int(size)
+            self._queue_size_at = self._clock()
+
+    # -- reading ---------------------------------------------------------
+    def queue_size(self, loader: Callable[[], int]) -> int:
+        """Cached queue size; ``loader`` is called when the cache is older than ``size_max_age``."""
+        with self._lock:
+            fresh = self._queue_size_at is not None and self._clock() - self._queue_size_at < self.size_max_age
+            if fresh:
+                return self._queue_size
+        size = loader()
+        self.observe_queue_size(size)
+        return size
+
+    def _percentile(self, stats: _BracketStats, pct: float) -> Optional[float]:
+        total = sum(stats.histogram)
+        if total <= 0:
+            return None
+        target, running = total * pct / 100.0, 0.0
+        for index, count in enumerate(stats.histogram):
+            running += count
+            if running >= target:
+                return float(self.buckets[index]) if index < len(self.buckets) else float(self.buckets[-1] * 2)
+        return float(self.buckets[-1] * 2)
+
+    def _rate_per_minute(self, stats: _BracketStats, now: float) -> float:
+        # a decaying count with half-life h integrates to rate * h / ln 2
+        factor = math.pow(0.5, max(0.0, now - stats.updated_at) / self.half_life_seconds)
+        return stats.matches * factor * math.log(2) / self.half_life_seconds * 60
+
+    def _bucket_ranges(self) -> List[Tuple[float, float]]:
+        bounds = [0.0, *map(float, self.buckets), float(self.buckets[-1] * 2)]
+        return list(zip(bounds, bounds[1:]))
+
+    def _remaining_wait(self, stats: _BracketStats, waited: float) -> Optional[float]:
+        """Mean of the recorded waits longer than ``waited``, minus ``waited``.
+
+        Waits are taken as uniform within each histogram bucket, so the bucket
+        containing ``waited`` contributes only its part above it.
+        """
+        mass = total = 0.0
+        for (low, high), count in zip(self._bucket_ranges(), stats.histogram):
+            if count <= 0 or high <= waited:
+                continue
+            start = max(low, waited)
+            share = count * (high - start) / (high - low)
+            mass += share
+            total += share * (start + high) / 2
+        if mass <= 0:
+            return None
+        return total / mass - waited
+
+    def estimate_wait(self, mmr: int, waited_seconds: float = 0.0) -> Optional[int]:
+        """Expected remaining wait for a player in ``mmr``'s bracket, or None without data.
+
+        Conditions the bracket's recent wait histogram (falling back to all
+        brackets) on the player having already waited ``waited_seconds``;
+        past every recorded wait, the recent mean wait is used again.
+        """
+        waited = max(0.0, float(waited_seconds))
+        with self._lock:
+            bracket = self._brackets.get(self._bracket(mmr))
+            source = bracket if bracket is not None and bracket.weight > 0 else self._overall
+            if source.weight <= 0:
+                return None
+            remaining = self._remaining_wait(source, waited)
+            if remaining is None:
+                remaining = source.mean_wait
+            return max(1, int(round(remaining)))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._brackets.clear()
+            self._overall = _BracketStats(len(self.buckets), self._clock())
+            self._queue_size, self._queue_size_at = 0, None
+
+    def stats(self) -> Dict:
+        now = self._clock()
+
+        def summary(stats: _BracketStats) -> Dict:
+            return {
+                "mean_wait_seconds": round(stats.mean_wait, 2) if stats.weight > 0 else None,
+                "p50_wait_seconds": self._percentile(stats, 50),
+                "p90_wait_seconds": self._percentile(stats, 90),
+                "matches_per_minute": round(self._rate_per_minute(stats, now), 3),
+            }
+
+        with self._lock:
+            return {
+                "queue_size": self._queue_size,
+                "half_life_seconds": self.half_life_seconds,
+                "overall": summary(self._overall),
+                "brackets": {
+                    self._label(bracket): summary(stats)
+                    for bracket, stats in sorted(self._brackets.items())
+                },
+            }
+
+
+queue_telemetry = QueueTelemetry(
+    bracket_width=settings.matchmaking_bracket_width,
+    half_life_seconds=settings.queue_telemetry_half_life,
+)
@@ -5,11 +5,14 @@ State storage helpers that transparently switch between Redis and in-memory.
 from __future__ import annotations
 
 import json
+import time
 from typing import Dict, Optional
 
 from app.core.cache import redis_cache
 from app.core.config import settings
 from app.core.state import game_state
+from app.services.matchmaking import MatchQueue, QueueEntry, matchmaking_engine, redis_match_queue
+from app.services.queue_telemetry import queue_telemetry
 
 
 class StateService:
@@ -51,42 +54,79 @@ class StateService:
             game_state.combat_states.pop(combat_id, None)
 
     # PvP queue --------------------------------------------------------------------
+    def pvp_queue(self) -> MatchQueue:
+        """Redis sorted sets when Redis is configured, else the in-process index."""
+        return redis_match_queue if self._client() else matchmaking_engine
+
     def get_pvp_queue_entry(self, character_id: str) -> Optional[str]:
-        client = self._client()
-        if client:
-            return client.get(self._key("pvp_queue", character_id))
-        return game_state.pvp_queue.get(character_id)
+        entry = self.pvp_queue().get(character_id)
+        return str(entry.joined_at) if entry else None
 
-    def set_pvp_queue_entry(self, character_id: str, timestamp: str) -> None:
-        client = self._client()
-        if client:
-            client.setex(
-                self._key("pvp_queue", character_id),
-                settings.pvp_queue_ttl,
-                timestamp,
-            )
-        else:
-            game_state.pvp_queue[character_id] = timestamp
+    def get_pvp_queue_member(self, character_id: str) -> Optional[QueueEntry]:
+        return self.pvp_queue().get(character_id)
+
+    def set_pvp_queue_entry(self, character_id: str, mmr: Optional[int] = None) -> None:
+        self.pvp_queue().join(character_id, mmr)
 
     def delete_pvp_queue_entry(self, character_id: str) -> None:
+        self.pvp_queue().leave(character_id)
+
+    def get_all_pvp_queue(self) -> Dict[str, str]:
+        return {
+            character_id: str(entry.joined_at)
+            for character_id, entry in self.pvp_queue().entries().items()
+        }
+
+    def get_pvp_queue_size(self) -> int:
+        return len(self.pvp_queue())
+
+    def pop_pvp_pair(self, character_id: str, mmr: Optional[int] = None) -> Optional[str]:
+        """Atomically take the best queued opponent for ``character_id`` (and dequeue it)."""
+        opponent = self.pvp_queue().pair(character_id, mmr)
+        if opponent is None:
+            return None
+        queue_telemetry.record_match(opponent.mmr, time.time() - opponent.joined_at)
+        return opponent.character_id
+
+    def get_pvp_queue_stats(self) -> Dict:
+        return self.pvp_queue().stats()
+
+    # PvP match results (published by the batch matchmaker) ------------------------
+    def set_pvp_match_results(self, results: Dict[str, Dict]) -> None:
+        if not results:
+            return
         client = self._client()
         if client:
-            client.delete(self._key("pvp_queue", character_id))
+            pipe = client.pipeline(transaction=False)
+            for character_id, result in results.items():
+                pipe.setex(self._key("pvp_match", character_id), settings.matchmaking_result_ttl, json.dumps(result))
+            pipe.execute()
         else:
-            game_state.pvp_queue.pop(character_id, None)
+            threshold = time.time() - settings.matchmaking_result_ttl
+            with game_state.lock:
+                expired = [cid for cid, r in game_state.pvp_matches.items() if r["matched_at"] < threshold]
+                for character_id in expired:
+                    del game_state.pvp_matches[character_id]
+                game_state.pvp_matches.update(results)
+
+    def get_pvp_match_result(self, character_id: str) -> Optional[Dict]:
+        client = self._client()
+        if client:
+            data = client.get(self._key("pvp_match", character_id))
+            return json.loads(data) if data else None
+        with game_state.lock:
+            result = game_state.pvp_matches.get(character_id)
+        if result and result["matched_at"] >= time.time() - settings.matchmaking_result_ttl:
+            return result
+        return None
 
-    def get_all_pvp_queue(self) -> Dict[str, str]:
+    def delete_pvp_match_result(self, character_id: str) -> None:
         client = self._client()
         if client:
-            entries: Dict[str, str] = {}
-            pattern = self._key("pvp_queue", "*")
-            for key in client.keys(pattern):
-                character_id = key.split(":")[-1]
-                timestamp = client.get(key)
-                if timestamp:
-                    entries[character_id] = timestamp
-            return entries
-        return game_state.pvp_queue.copy()
+            client.delete(self._key("pvp_match", character_id))
+        else:
+            with game_state.lock:
+                game_state.pvp_matches.pop(character_id, None)
 
     # Auto fight sessions ----------------------------------------------------------
     def get_auto_fight_session(self, session_id: str) -> Optional[Dict]:
@@ -136,8 +176,14 @@ set_combat_state = state_service.set_combat_state
 delete_combat_state = state_service.delete_combat_state
 
 get_pvp_queue_entry = state_service.get_pvp_queue_entry
+get_pvp_queue_member = state_service.get_pvp_queue_member
 set_pvp_queue_entry = state_service.set_pvp_queue_entry
 delete_pvp_queue_entry = state_service.delete_pvp_queue_entry
+get_pvp_queue_size = state_service.get_pvp_queue_size
+pop_pvp_pair = state_service.pop_pvp_pair
+get_pvp_queue_stats = state_service.get_pvp_queue_stats
+get_pvp_match_result = state_service.get_pvp_match_result
+delete_pvp_match_result = state_service.delete_pvp_match_result
 
 get_auto_fight_session = state_service.get_auto_fight_session
 set_auto_fight_session = state_service.set_auto_fight_session
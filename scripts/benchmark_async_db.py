@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop responsiveness under concurrent database load.
+
+Runs the app in-process against a throwaway SQLite database, hammers the hot
+character/store/PvP endpoints with concurrent clients and reports latency
+percentiles for those requests and for a cheap probe (/health/live) issued
+alongside them. With blocking DB calls on the loop the probe queues behind
+every query; with the executor it should stay flat.
+
+Usage:
+    python scripts/benchmark_async_db.py --clients 32 --requests 2000
+    python scripts/benchmark_async_db.py --inline      # old behaviour, for comparison
+    python scripts/benchmark_async_db.py --db-latency-ms 5   # simulate a remote DB
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label, samples):
+    print(
+        f"{label:<10} n={len(samples):<6} "
+        f"p50={percentile(samples, 50):7.2f}ms  p95={percentile(samples, 95):7.2f}ms  "
+        f"p99={percentile(samples, 99):7.2f}ms  max={max(samples or [0]):7.2f}ms  "
+        f"mean={statistics.fmean(samples) if samples else 0:7.2f}ms"
+    )
+
+
+async def main(args):
+    import httpx
+    import server
+    from app.db import async_db, db_manager
+
+    if args.inline:
+        async def run_inline(fn, *a, **kw):
+            return fn(*a, **kw)
+        async_db.run = run_inline
+
+    if args.db_latency_ms:
+        original_get_connection = db_manager.get_connection
+
+        def slow_get_connection():
+            time.sleep(args.db_latency_ms / 1000)
+            return original_get_connection()
+        db_manager.get_connection = slow_get_connection
+
+    server.init_database()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = {"username": "bench_user", "password": "bench_password"}
+        await client.post("/api/register", json=credentials)
+        token = (await client.post("/api/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        character_id = (await client.post(
+            "/api/character/create", json={"name": "Bencher"}, headers=headers
+        )).json()["character_id"]
+
+        paths = [
+            f"/api/character/{character_id}",
+            "/api/character/list",
+            f"/api/store/list?character_id={character_id}",
+            f"/api/pvp/opponents?character_id={character_id}",
+        ]
+        load_latencies, probe_latencies = [], []
+        remaining = args.requests
+        done = asyncio.Event()
+
+        async def worker(offset):
+            nonlocal remaining
+            i = offset
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                await client.get(paths[i % len(paths)], headers=headers)
+                load_latencies.append((time.perf_counter() - started) * 1000)
+                i += 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health/live")
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        started = time.perf_counter()
+        probe_task = asyncio.create_task(probe())
+        await asyncio.gather(*(worker(i) for i in range(args.clients)))
+        done.set()
+        await probe_task
+        elapsed = time.perf_counter() - started
+
+    mode = "inline" if args.inline else f"executor ({async_db.max_workers} workers)"
+    print(f"mode={mode} clients={args.clients} requests={args.requests} "
+          f"elapsed={elapsed:.2f}s throughput={args.requests / elapsed:.0f} req/s")
+    summarize("load", load_latencies)
+    summarize("probe", probe_latencies)
+    if not args.inline:
+        print("executor:", async_db.stats())
+        print("pool:", db_manager.pool_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--inline", action="store_true", help="run DB calls on the event loop (pre-executor behaviour)")
+    args = parser.parse_args()
+
+    if "SQLITE_PATH" not in os.environ and "DATABASE_URL" not in os.environ:
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    asyncio.run(main(args))
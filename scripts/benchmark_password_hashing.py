@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark event-loop stalls during a burst of password verifications.
+
+Simulates a login burst after a deploy: ``--logins`` concurrent bcrypt
+verifications while a heartbeat coroutine ticks every 5 ms, standing in for
+in-progress combat polls. Reports how late the heartbeat ran (loop stall)
+and how long the burst took, for bcrypt on the event loop (``--inline``,
+the old behaviour) and for the password worker pool.
+
+Usage:
+    python scripts/benchmark_password_hashing.py --logins 50
+    python scripts/benchmark_password_hashing.py --inline
+    python scripts/benchmark_password_hashing.py --workers 4 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+TICK_SECONDS = 0.005
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main(args):
+    from app.core.passwords import PasswordHasher, hash_password_sync, verify_password_sync
+
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers, max_concurrency=args.concurrency)
+    stored_hash = hash_password_sync("bench_password", args.rounds)
+    hasher.warm_up()
+
+    async def verify(password):
+        if args.inline:
+            return verify_password_sync(password, stored_hash)
+        return await hasher.verify(password, stored_hash)
+
+    lateness = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            expected = time.perf_counter() + TICK_SECONDS
+            await asyncio.sleep(TICK_SECONDS)
+            lateness.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(verify("bench_password") for _ in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await heartbeat_task
+    assert all(results)
+
+    mode = "inline" if args.inline else f"pool ({hasher.stats()['backend']}, {args.workers} workers, cap {args.concurrency})"
+    print(f"mode={mode} rounds={args.rounds} logins={args.logins} "
+          f"elapsed={elapsed:.2f}s ({args.logins / elapsed:.1f} verifies/s)")
+    print(f"loop stall: p50={percentile(lateness, 50):.2f}ms p99={percentile(lateness, 99):.2f}ms "
+          f"max={max(lateness or [0]):.2f}ms mean={statistics.fmean(lateness) if lateness else 0:.2f}ms")
+    if not args.inline:
+        print("hasher:", hasher.stats())
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--inline", action="store_true", help="run bcrypt on the event loop (old behaviour)")
+    asyncio.run(main(parser.parse_args()))
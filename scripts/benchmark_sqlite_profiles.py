@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Compare SQLite profiles on a combat-reward style workload.
+
+Each writer thread repeatedly applies a reward the way end-of-combat does
+(bump gold/experience/revision on the character and append a combat log)
+in its own transaction, while reader threads poll character rows through the
+read-only pool. Reports throughput, write latency percentiles and how many
+transactions failed with "database is locked".
+
+Usage:
+    python scripts/benchmark_sqlite_profiles.py
+    python scripts/benchmark_sqlite_profiles.py --profiles legacy tuned --writers 16 --writes 300
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.manager import DatabaseManager
+from app.db.sqlite_profile import SQLITE_PROFILES, build_sqlite_profile
+
+SCHEMA = [
+    """CREATE TABLE characters (
+        id TEXT PRIMARY KEY, level INTEGER DEFAULT 1, experience INTEGER DEFAULT 0,
+        gold INTEGER DEFAULT 0, revision INTEGER DEFAULT 0, updated_at TIMESTAMP
+    )""",
+    """CREATE TABLE combat_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, character1_id TEXT, character2_id TEXT,
+        winner_id TEXT, log_json TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_profile(name, args):
+    manager = DatabaseManager()
+    manager.use_postgres = False
+    manager.sqlite_path = os.path.join(tempfile.mkdtemp(), f"{name}.db")
+    manager.sqlite_profile = build_sqlite_profile(name)
+
+    conn = manager.get_connection()
+    for statement in SCHEMA:
+        conn.execute(statement)
+    character_ids = [f"char_{i}" for i in range(args.characters)]
+    conn.executemany("INSERT INTO characters (id) VALUES (?)", [(cid,) for cid in character_ids])
+    conn.commit()
+    conn.close()
+
+    log_blob = json.dumps([{"turn": t, "damage": random.randint(1, 50)} for t in range(40)])
+    latencies, locked, reads = [], [], []
+    lock = threading.Lock()
+    stop_readers = threading.Event()
+
+    def writer():
+        rng = random.Random()
+        local_latencies, local_locked = [], 0
+        for _ in range(args.writes):
+            cid = rng.choice(character_ids)
+            started = time.perf_counter()
+            conn = manager.get_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE characters SET gold = gold + ?, experience = experience + ?, "
+                    "updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
+                    (rng.randint(5, 20), rng.randint(10, 40), cid),
+                )
+                cursor.execute(
+                    "INSERT INTO combat_logs (character1_id, character2_id, winner_id, log_json) VALUES (?, ?, ?, ?)",
+                    (cid, "pve_enemy", cid, log_blob),
+                )
+                conn.commit()
+                local_latencies.append((time.perf_counter() - started) * 1000)
+            except sqlite3.OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                local_locked += 1
+            finally:
+                conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            locked.append(local_locked)
+
+    def reader():
+        count = 0
+        while not stop_readers.is_set():
+            conn = manager.get_read_connection()
+            try:
+                conn.execute(
+                    "SELECT id, level, gold, experience FROM characters WHERE id = ?",
+                    (random.choice(character_ids),),
+                ).fetchone()
+                count += 1
+            except sqlite3.OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+            finally:
+                conn.close()
+        with lock:
+            reads.append(count)
+
+    readers = [threading.Thread(target=reader) for _ in range(args.readers)]
+    writers = [threading.Thread(target=writer) for _ in range(args.writers)]
+    started = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop_readers.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    committed = len(latencies)
+    print(
+        f"{name:<8} commits={committed:<6} locked={sum(locked):<5} "
+        f"writes/s={committed / elapsed:8.0f} reads/s={sum(reads) / elapsed:8.0f} "
+        f"p50={percentile(latencies, 50):7.2f}ms p99={percentile(latencies, 99):7.2f}ms "
+        f"max={max(latencies or [0]):7.2f}ms"
+    )
+    manager.close_pools()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=sorted(SQLITE_PROFILES), choices=sorted(SQLITE_PROFILES))
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200, help="reward transactions per writer")
+    parser.add_argument("--characters", type=int, default=50)
+    args = parser.parse_args()
+
+    for profile_name in args.profiles:
+        run_profile(profile_name, args)
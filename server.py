@@ -6,12 +6,12 @@ Main backend server with API endpoints
 
 import os
 import json
+import asyncio
 import sqlite3
 import random
-import bcrypt
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import time
 from fastapi import FastAPI, HTTPException, Depends, Body, Header, Request
 from fastapi.responses import HTMLResponse, JSONResponse
@@ -26,22 +26,67 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi.exceptions import RequestValidationError
 
+from app.core.auth_cache import auth_cache
 from app.core.cache import redis_cache
 from app.core.config import settings
 from app.core.logging import configure_logging
-from app.core.state import game_state
-from app.db import db_manager, execute_query, get_db_connection, get_db_cursor
-from app.db.bootstrap import ensure_player_tracking_tables
+from app.core.passwords import password_hasher
+from app.db import (
+    async_db,
+    db_manager,
+    execute_query,
+    get_db_connection,
+    get_db_cursor,
+    get_db_read_connection,
+    query_instrumentation,
+)
+from app.db.inventory import INVENTORY_LIMIT, inventory_repository
+from app.db.json_patch import JsonPatch, json_extract_path, json_path_equals, load_json_column
+from app.db.boot import boot_database
+from app.db.migrations import migration_engine
+from app.db.queries import (
+    CHARACTER_FIRST_FOR_USER,
+    CHARACTER_IDS_FOR_USER,
+    CHARACTER_REVISION_FOR_OWNER,
+    CHARACTER_SET_GOLD,
+    PVP_MATCH_PROFILE,
+    PVP_OPPONENT_INDEX_ROWS,
+    PVP_OPPONENT_OWNER,
+    PVP_SET_ENABLED,
+    USER_BY_ID,
+    USER_CREDENTIALS_BY_USERNAME,
+    USER_ID_BY_USERNAME,
+    USER_INSERT,
+    USER_SET_PASSWORD_HASH,
+)
+from app.db.statements import statements
+from app.services.character_cache import character_cache
+from app.services.inventory_ops import (
+    MAX_BULK_ACTIONS,
+    BulkConflictError,
+    inventory_bulk_service,
+)
+from app.services.leaderboard import leaderboard
+from app.services.matchmaker import batch_matchmaker
+from app.services.opponents import opponent_index
+from app.services.ownership import ownership_cache
 from app.services.player_tracking import player_tracking_service
+from app.services.presence import presence_tracker
+from app.services.pve_progress import pve_catalog, pve_progress_service
+from app.services.queue_telemetry import queue_telemetry
 from app.services.state_service import (
     delete_auto_fight_session,
     delete_combat_state,
+    delete_pvp_match_result,
     delete_pvp_queue_entry,
     get_all_auto_fight_sessions,
-    get_all_pvp_queue,
     get_auto_fight_session,
     get_combat_state,
-    get_pvp_queue_entry,
+    get_pvp_match_result,
+    get_pvp_queue_member,
+    get_pvp_queue_size,
+    get_pvp_queue_stats,
+    pop_pvp_pair,
     set_auto_fight_session,
     set_combat_state,
     set_pvp_queue_entry,
@@ -69,7 +114,8 @@ from game_logic import (
     calculate_damage, check_hit, calculate_exp_gain, process_level_up,
     get_equipment_stats, get_weapon_type, get_weapon_attack_speed,
     get_weapon_damage_type, get_abilities_for_weapon, get_ability_by_id,
-    PRIMARY_STATS, EQUIPMENT_SLOTS, WEAPON_TYPES, RARITIES
+    calculate_sell_price, calculate_upgrade_cost, rescale_equipment_stats,
+    PRIMARY_STATS, EQUIPMENT_SLOTS, RARITIES, COMBINE_REQUIREMENTS
 )
 
 app = FastAPI(title="IdleDuelist", version="2.0.0")
@@ -122,664 +168,31 @@ def get_redis_client():
     return redis_cache.get_client()
 
 def init_database():
-    """Initialize database with all tables - compatible with both SQLite and PostgreSQL"""
+    """Bring schema and seed data up to date - works with SQLite and PostgreSQL.
+
+    Skips migrations and seeding entirely when the stored fingerprints match.
+    """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
     except Exception as e:
-        logger.critical(r"Cannot initialize database: {e}")
+        logger.critical(f"Cannot initialize database: {e}")
         if USE_POSTGRES:
             print("⚠ PostgreSQL connection failed. Check Railway PostgreSQL service.")
         raise
     
-    # Users table - PostgreSQL uses VARCHAR, SQLite uses TEXT
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id VARCHAR(255) PRIMARY KEY,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                email VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id TEXT PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                email TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-    
-    # Characters table - PostgreSQL uses different boolean defaults
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS characters (
-                id VARCHAR(255) PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                name VARCHAR(255) UNIQUE NOT NULL,
-                level INTEGER DEFAULT 1,
-                exp INTEGER DEFAULT 0,
-                skill_points INTEGER DEFAULT 3,
-                stats_json TEXT NOT NULL,
-                equipment_json TEXT NOT NULL,
-                inventory_json TEXT NOT NULL,
-                auto_combat BOOLEAN DEFAULT FALSE,
-                gold INTEGER DEFAULT 0,
-                pvp_enabled BOOLEAN DEFAULT FALSE,
-                combat_stance VARCHAR(50) DEFAULT 'balanced',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS characters (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                name TEXT UNIQUE NOT NULL,
-                level INTEGER DEFAULT 1,
-                exp INTEGER DEFAULT 0,
-                skill_points INTEGER DEFAULT 3,
-                stats_json TEXT NOT NULL,
-                equipment_json TEXT NOT NULL,
-                inventory_json TEXT NOT NULL,
-                auto_combat BOOLEAN DEFAULT 0,
-                gold INTEGER DEFAULT 0,
-                pvp_enabled BOOLEAN DEFAULT 0,
-                combat_stance TEXT DEFAULT 'balanced',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-    
-    # Commit initial table creation so subsequent ALTER statements see the tables
-    if USE_POSTGRES:
-        conn.commit()
-    
-    # Add gold and pvp_enabled columns if they don't exist (for existing databases)
-    # For PostgreSQL, we need to handle transaction rollbacks on errors
-    def table_exists(table_name: str) -> bool:
-        """Check if a table exists in the current database"""
-        try:
-            if USE_POSTGRES:
-                cursor.execute("SELECT to_regclass(%s)", (f'public.{table_name}',))
-                result = cursor.fetchone()
-                return result is not None and result[0] is not None
-            else:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-                return cursor.fetchone() is not None
-        except Exception:
-            if USE_POSTGRES:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            return False
-    
-    def column_exists(table_name: str, column_name: str) -> bool:
-        """Check if a column exists in the table"""
-        try:
-            if USE_POSTGRES:
-                cursor.execute(
-                    """
-                    SELECT 1
-                    FROM information_schema.columns
-                    WHERE table_name = %s AND column_name = %s
-                    """,
-                    (table_name, column_name),
-                )
-                return cursor.fetchone() is not None
-            else:
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-                return any(col[1] == column_name for col in columns)
-        except Exception:
-            if USE_POSTGRES:
-                try:
-                    conn.rollback()
-                except:
-                    pass
-            return False
-    
-    def safe_alter_table(alter_sql):
-        """Safely execute ALTER TABLE, handling duplicate column errors"""
-        try:
-            cursor.execute(alter_sql)
-            if USE_POSTGRES:
-                conn.commit()  # Commit after each successful ALTER
-        except Exception as e:
-            # For PostgreSQL, rollback on any error to clear failed transaction state
-            if USE_POSTGRES:
-                try:
-                    conn.rollback()
-                except:
-                    pass  # Ignore rollback errors
-            # Column already exists or other error - ignore
-            pass
-    
-    if table_exists('characters'):
-        safe_alter_table('ALTER TABLE characters ADD COLUMN gold INTEGER DEFAULT 0')
-        
-        if USE_POSTGRES:
-            safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_enabled BOOLEAN DEFAULT FALSE')
-        else:
-            safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_enabled BOOLEAN DEFAULT 0')
-        
-        if USE_POSTGRES:
-            safe_alter_table("ALTER TABLE characters ADD COLUMN combat_stance VARCHAR(50) DEFAULT 'balanced'")
-        else:
-            safe_alter_table('ALTER TABLE characters ADD COLUMN combat_stance TEXT DEFAULT "balanced"')
-        
-        # Add PvP stats columns if they don't exist
-        safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_wins INTEGER DEFAULT 0')
-        safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_losses INTEGER DEFAULT 0')
-        safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_mmr INTEGER DEFAULT 1000')
-        safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_last_week_rank INTEGER')
-        
-        if USE_POSTGRES:
-            safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_weekly_rewards_claimed BOOLEAN DEFAULT FALSE')
-        else:
-            safe_alter_table('ALTER TABLE characters ADD COLUMN pvp_weekly_rewards_claimed BOOLEAN DEFAULT 0')
-    
-    # Combat logs table
-    if USE_POSTGRES:
-        # Check if table exists first to avoid sequence conflicts
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'combat_logs'
-            )
-        """)
-        result = cursor.fetchone()
-        if USE_POSTGRES:
-            # PostgreSQL RealDictCursor returns a dict with column name as key
-            table_exists = result['exists'] if result and isinstance(result, dict) else (result[0] if result else False)
-        else:
-            # SQLite returns a tuple
-            table_exists = result[0] if result else False
-        
-        if not table_exists:
-            try:
-                cursor.execute('''
-                    CREATE TABLE combat_logs (
-                        id SERIAL PRIMARY KEY,
-                        character1_id VARCHAR(255) NOT NULL,
-                        character2_id VARCHAR(255) NOT NULL,
-                        winner_id VARCHAR(255),
-                        log_json TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (character1_id) REFERENCES characters (id),
-                        FOREIGN KEY (character2_id) REFERENCES characters (id)
-                    )
-                ''')
-                conn.commit()
-            except Exception as e:
-                # If sequence conflict, table might be partially created - check again
-                if "already exists" in str(e) or "duplicate key" in str(e):
-                    cursor.execute("""
-                        SELECT EXISTS (
-                            SELECT FROM information_schema.tables 
-                            WHERE table_name = 'combat_logs'
-                        )
-                    """)
-                    result = cursor.fetchone()
-                    if USE_POSTGRES:
-                        table_exists = result['exists'] if result and isinstance(result, dict) else (result[0] if result else False)
-                    else:
-                        table_exists = result[0] if result else False
-                    if not table_exists:
-                        # Table doesn't exist, but sequence does - drop sequence and retry
-                        try:
-                            cursor.execute("DROP SEQUENCE IF EXISTS combat_logs_id_seq CASCADE")
-                            cursor.execute('''
-                                CREATE TABLE combat_logs (
-                                    id SERIAL PRIMARY KEY,
-                                    character1_id VARCHAR(255) NOT NULL,
-                                    character2_id VARCHAR(255) NOT NULL,
-                                    winner_id VARCHAR(255),
-                                    log_json TEXT,
-                                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                                    FOREIGN KEY (character1_id) REFERENCES characters (id),
-                                    FOREIGN KEY (character2_id) REFERENCES characters (id)
-                                )
-                            ''')
-                            conn.commit()
-                        except Exception as e2:
-                            logger.warning(r"Could not create combat_logs table: {e2}")
-                            conn.rollback()
-                else:
-                    raise
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS combat_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                character1_id TEXT NOT NULL,
-                character2_id TEXT NOT NULL,
-                winner_id TEXT,
-                log_json TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (character1_id) REFERENCES characters (id),
-                FOREIGN KEY (character2_id) REFERENCES characters (id)
-            )
-        ''')
-    
-    # Chat messages table
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_messages (
-                id SERIAL PRIMARY KEY,
-                character_id VARCHAR(255) NOT NULL,
-                character_name VARCHAR(255) NOT NULL,
-                message TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (character_id) REFERENCES characters (id)
-            )
-        ''')
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                character_id TEXT NOT NULL,
-                character_name TEXT NOT NULL,
-                message TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (character_id) REFERENCES characters (id)
-            )
-        ''')
-    
-    # Abilities table - PostgreSQL uses VARCHAR for consistency
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS abilities (
-                id VARCHAR(255) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                cooldown_seconds INTEGER NOT NULL,
-                damage_multiplier REAL NOT NULL,
-                damage_type VARCHAR(50) NOT NULL,
-                mana_cost INTEGER NOT NULL,
-                weapon_type VARCHAR(50) NOT NULL,
-                is_ultimate BOOLEAN DEFAULT FALSE
-            )
-        ''')
-        # Commit after table creation to ensure it's visible
-        conn.commit()
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS abilities (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                description TEXT,
-                cooldown_seconds INTEGER NOT NULL,
-                damage_multiplier REAL NOT NULL,
-                damage_type TEXT NOT NULL,
-                mana_cost INTEGER NOT NULL,
-                weapon_type TEXT NOT NULL,
-                is_ultimate BOOLEAN DEFAULT 0
-            )
-        ''')
-    
-    # Character abilities (loadout/hotkey assignments)
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS character_abilities (
-                id SERIAL PRIMARY KEY,
-                character_id VARCHAR(255) NOT NULL,
-                ability_id VARCHAR(255) NOT NULL,
-                slot_position INTEGER NOT NULL,
-                FOREIGN KEY (character_id) REFERENCES characters (id),
-                FOREIGN KEY (ability_id) REFERENCES abilities (id),
-                UNIQUE(character_id, slot_position)
-            )
-        ''')
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS character_abilities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                character_id TEXT NOT NULL,
-                ability_id TEXT NOT NULL,
-                slot_position INTEGER NOT NULL,
-                FOREIGN KEY (character_id) REFERENCES characters (id),
-                FOREIGN KEY (ability_id) REFERENCES abilities (id),
-                UNIQUE(character_id, slot_position)
-            )
-        ''')
-    
-    # PvE enemies table
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pve_enemies (
-                id VARCHAR(255) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                level INTEGER NOT NULL,
-                stats_json TEXT NOT NULL,
-                description TEXT,
-                story_order INTEGER NOT NULL,
-                unlocked_at_level INTEGER DEFAULT 1,
-                gold_min INTEGER DEFAULT 1,
-                gold_max INTEGER DEFAULT 1,
-                drop_chance REAL DEFAULT 0.0,
-                exp_reward INTEGER DEFAULT 50
-            )
-        ''')
-        conn.commit()
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pve_enemies (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                level INTEGER NOT NULL,
-                stats_json TEXT NOT NULL,
-                description TEXT,
-                story_order INTEGER NOT NULL,
-                unlocked_at_level INTEGER DEFAULT 1,
-                gold_min INTEGER DEFAULT 1,
-                gold_max INTEGER DEFAULT 1,
-                drop_chance REAL DEFAULT 0.0,
-                exp_reward INTEGER DEFAULT 50
-            )
-        ''')
-    
-    if table_exists('pve_enemies'):
-        if not column_exists('pve_enemies', 'description'):
-            safe_alter_table('ALTER TABLE pve_enemies ADD COLUMN description TEXT')
-        if not column_exists('pve_enemies', 'gold_min'):
-            safe_alter_table('ALTER TABLE pve_enemies ADD COLUMN gold_min INTEGER DEFAULT 1')
-        if not column_exists('pve_enemies', 'gold_max'):
-            safe_alter_table('ALTER TABLE pve_enemies ADD COLUMN gold_max INTEGER DEFAULT 1')
-        if not column_exists('pve_enemies', 'drop_chance'):
-            safe_alter_table('ALTER TABLE pve_enemies ADD COLUMN drop_chance REAL DEFAULT 0.0')
-        if not column_exists('pve_enemies', 'exp_reward'):
-            safe_alter_table('ALTER TABLE pve_enemies ADD COLUMN exp_reward INTEGER DEFAULT 50')
-    
-    # Character PvE progress
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS character_pve_progress (
-                id SERIAL PRIMARY KEY,
-                character_id VARCHAR(255) NOT NULL,
-                highest_enemy_defeated VARCHAR(255),
-                enemies_unlocked_json TEXT NOT NULL,
-                FOREIGN KEY (character_id) REFERENCES characters (id),
-                UNIQUE(character_id)
-            )
-        ''')
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS character_pve_progress (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                character_id TEXT NOT NULL,
-                highest_enemy_defeated TEXT,
-                enemies_unlocked_json TEXT NOT NULL,
-                FOREIGN KEY (character_id) REFERENCES characters (id),
-                UNIQUE(character_id)
-            )
-        ''')
-    
-    # Store items table
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS store_items (
-                id VARCHAR(255) PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                slot VARCHAR(50) NOT NULL,
-                weapon_type VARCHAR(50),
-                base_price INTEGER NOT NULL,
-                level_requirement INTEGER DEFAULT 1
-            )
-        ''')
-        conn.commit()
-    else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS store_items (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                slot TEXT NOT NULL,
-                weapon_type TEXT,
-                base_price INTEGER NOT NULL,
-                level_requirement INTEGER DEFAULT 1
-            )
-        ''')
-    
-    # Feedback table
-    if USE_POSTGRES:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback (
-                id VARCHAR(255) PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                character_name VARCHAR(255),
-                content TEXT NOT NULL,
-                upvotes INTEGER DEFAULT 0,
-                downvotes INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback_votes (
-                id VARCHAR(255) PRIMARY KEY,
-                feedback_id VARCHAR(255) NOT NULL,
-                user_id VARCHAR(255) NOT NULL,
-                vote_type VARCHAR(10) NOT NULL CHECK (vote_type IN ('upvote', 'downvote')),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (feedback_id) REFERENCES feedback (id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                UNIQUE(feedback_id, user_id)
-            )
-        ''')
-        conn.commit()
+    try:
+        report = boot_database(conn, use_postgres=USE_POSTGRES)
+    finally:
+        conn.close()
+    app.state.boot_report = report
+    if report.migrations_applied:
+        logger.info(f"Applied schema migrations: {', '.join(str(v) for v in report.migrations_applied)}")
+    if report.skipped:
+        logger.info(f"Database up to date (schema version {migration_engine.latest_version}), "
+                    f"boot checks took {report.timings_ms['total_ms']:.1f} ms")
     else:
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                character_name TEXT,
-                content TEXT NOT NULL,
-                upvotes INTEGER DEFAULT 0,
-                downvotes INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback_votes (
-                id TEXT PRIMARY KEY,
-                feedback_id TEXT NOT NULL,
-                user_id TEXT NOT NULL,
-                vote_type TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (feedback_id) REFERENCES feedback (id) ON DELETE CASCADE,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                UNIQUE(feedback_id, user_id)
-            )
-        ''')
-    
-    ensure_player_tracking_tables(conn, cursor, USE_POSTGRES)
-    conn.commit()
-    conn.close()
-    logger.info("Database initialized successfully")
-    
-    # Initialize default data
-    initialize_default_data()
-
-
-def initialize_default_data():
-    """Initialize default abilities, PvE enemies, and store items"""
-    from game_logic import ABILITIES
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Initialize abilities
-    for weapon_type, abilities in ABILITIES.items():
-        for ability in abilities:
-            if USE_POSTGRES:
-                cursor.execute('''
-                    INSERT INTO abilities 
-                    (id, name, description, cooldown_seconds, damage_multiplier, damage_type, mana_cost, weapon_type, is_ultimate)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (id) DO NOTHING
-                ''', (
-                    ability['id'], ability['name'], ability['description'],
-                    ability['cooldown_seconds'], ability['damage_multiplier'],
-                    ability['damage_type'], ability['mana_cost'], weapon_type,
-                    ability['is_ultimate']
-                ))
-            else:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO abilities 
-                    (id, name, description, cooldown_seconds, damage_multiplier, damage_type, mana_cost, weapon_type, is_ultimate)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    ability['id'], ability['name'], ability['description'],
-                    ability['cooldown_seconds'], ability['damage_multiplier'],
-                    ability['damage_type'], ability['mana_cost'], weapon_type,
-                    1 if ability['is_ultimate'] else 0
-                ))
-    
-    # Initialize PvE enemies (30 specific enemies with exact stats and rewards)
-    # Only clear if we need to update - check if enemies exist first
-    cursor.execute("SELECT COUNT(*) as count FROM pve_enemies")
-    enemy_count = cursor.fetchone()['count'] if USE_POSTGRES else cursor.fetchone()[0]
-    # Only delete if we have enemies (means we're updating, not initializing)
-    if enemy_count > 0:
-        cursor.execute("DELETE FROM pve_enemies")
-    
-    # Balanced PvE enemies - roughly 2.5-3x level in total stats for appropriate challenge
-    # Enemies should be beatable by similarly-leveled players with decent equipment
-    # EXP reward formula: 50 + (level * 5) - fixed per enemy type
-    pve_enemies_data = [
-        {'id': 'chicken', 'name': 'Chicken', 'level': 1, 'stats': {'might': 1, 'agility': 2, 'vitality': 1, 'intellect': 0, 'wisdom': 0, 'charisma': 0}, 'description': 'Harmless barn birds that peck at ankles. More annoying than dangerous.', 'gold_min': 1, 'gold_max': 1, 'drop_chance': 0.0, 'exp_reward': 50},
-        {'id': 'forest_rat', 'name': 'Forest Rat', 'level': 3, 'stats': {'might': 2, 'agility': 6, 'vitality': 3, 'intellect': 1, 'wisdom': 0, 'charisma': 0}, 'description': 'Oversized rodents twisted by wild magic. Quick and skittish.', 'gold_min': 1, 'gold_max': 2, 'drop_chance': 0.0, 'exp_reward': 65},
-        {'id': 'goblin_scout', 'name': 'Goblin Scout', 'level': 5, 'stats': {'might': 4, 'agility': 9, 'vitality': 4, 'intellect': 1, 'wisdom': 1, 'charisma': 0}, 'description': 'Sneaky ambushers who dart from shadow to shadow.', 'gold_min': 1, 'gold_max': 3, 'drop_chance': 0.1, 'exp_reward': 75},
-        {'id': 'cave_slime', 'name': 'Cave Slime', 'level': 8, 'stats': {'might': 3, 'agility': 2, 'vitality': 16, 'intellect': 2, 'wisdom': 3, 'charisma': 0}, 'description': 'Gelatinous blobs that digest anything organic.', 'gold_min': 2, 'gold_max': 4, 'drop_chance': 0.2, 'exp_reward': 90},
-        {'id': 'ork_grunt', 'name': 'Ork Grunt', 'level': 10, 'stats': {'might': 18, 'agility': 4, 'vitality': 12, 'intellect': 1, 'wisdom': 0, 'charisma': 0}, 'description': 'Brutish frontline fighters serving stronger warlords.', 'gold_min': 2, 'gold_max': 5, 'drop_chance': 0.5, 'exp_reward': 100},
-        {'id': 'bandit_cutpurse', 'name': 'Bandit Cutpurse', 'level': 12, 'stats': {'might': 8, 'agility': 22, 'vitality': 6, 'intellect': 2, 'wisdom': 2, 'charisma': 0}, 'description': 'High-speed thieves who rely on mobility to survive.', 'gold_min': 4, 'gold_max': 7, 'drop_chance': 0.5, 'exp_reward': 110},
-        {'id': 'skeleton_warrior', 'name': 'Skeleton Warrior', 'level': 15, 'stats': {'might': 18, 'agility': 3, 'vitality': 25, 'intellect': 0, 'wisdom': 4, 'charisma': 0}, 'description': 'Reanimated bones that act on forgotten commands.', 'gold_min': 6, 'gold_max': 10, 'drop_chance': 0.7, 'exp_reward': 125},
-        {'id': 'gnoll_raider', 'name': 'Gnoll Raider', 'level': 18, 'stats': {'might': 26, 'agility': 16, 'vitality': 16, 'intellect': 0, 'wisdom': 2, 'charisma': 0}, 'description': 'Savage hyena-folk who overwhelm caravans in packs.', 'gold_min': 8, 'gold_max': 12, 'drop_chance': 0.8, 'exp_reward': 140},
-        {'id': 'cave_spider', 'name': 'Cave Spider', 'level': 20, 'stats': {'might': 7, 'agility': 30, 'vitality': 14, 'intellect': 13, 'wisdom': 4, 'charisma': 0}, 'description': 'Venomous hunters whose webs block entire tunnels.', 'gold_min': 10, 'gold_max': 15, 'drop_chance': 1.0, 'exp_reward': 150},
-        {'id': 'bog_zombie', 'name': 'Bog Zombie', 'level': 23, 'stats': {'might': 16, 'agility': 1, 'vitality': 50, 'intellect': 4, 'wisdom': 5, 'charisma': 0}, 'description': 'Rotting corpses preserved by swamp sorcery.', 'gold_min': 12, 'gold_max': 18, 'drop_chance': 1.0, 'exp_reward': 165},
-        {'id': 'lizardfolk_scout', 'name': 'Lizardfolk Scout', 'level': 26, 'stats': {'might': 22, 'agility': 33, 'vitality': 22, 'intellect': 5, 'wisdom': 4, 'charisma': 0}, 'description': 'Cold-blooded hunters defending marsh territory.', 'gold_min': 14, 'gold_max': 22, 'drop_chance': 1.2, 'exp_reward': 180},
-        {'id': 'dire_wolf', 'name': 'Dire Wolf', 'level': 30, 'stats': {'might': 33, 'agility': 43, 'vitality': 20, 'intellect': 0, 'wisdom': 0, 'charisma': 0}, 'description': 'Moon-touched predators leading lesser wolf packs.', 'gold_min': 18, 'gold_max': 28, 'drop_chance': 1.5, 'exp_reward': 200},
-        {'id': 'ogre_brute', 'name': 'Ogre Brute', 'level': 33, 'stats': {'might': 62, 'agility': 6, 'vitality': 37, 'intellect': 0, 'wisdom': 0, 'charisma': 0}, 'description': 'Massive simple monsters who smash everything.', 'gold_min': 22, 'gold_max': 32, 'drop_chance': 1.7, 'exp_reward': 215},
-        {'id': 'wraithling', 'name': 'Wraithling', 'level': 36, 'stats': {'might': 6, 'agility': 24, 'vitality': 6, 'intellect': 35, 'wisdom': 46, 'charisma': 0}, 'description': 'Flickering spirits wandering ruins in search of warmth.', 'gold_min': 24, 'gold_max': 35, 'drop_chance': 1.8, 'exp_reward': 230},
-        {'id': 'lizardfolk_shaman', 'name': 'Lizardfolk Shaman', 'level': 40, 'stats': {'might': 7, 'agility': 7, 'vitality': 20, 'intellect': 39, 'wisdom': 56, 'charisma': 0}, 'description': 'Mystics who summon storms and serpents.', 'gold_min': 28, 'gold_max': 40, 'drop_chance': 2.0, 'exp_reward': 250},
-        {'id': 'stone_golem', 'name': 'Stone Golem', 'level': 44, 'stats': {'might': 28, 'agility': 1, 'vitality': 95, 'intellect': 0, 'wisdom': 16, 'charisma': 0}, 'description': 'Ancient guardians carved from enchanted rock.', 'gold_min': 40, 'gold_max': 60, 'drop_chance': 2.5, 'exp_reward': 270},
-        {'id': 'frost_troll', 'name': 'Frost Troll', 'level': 48, 'stats': {'might': 45, 'agility': 8, 'vitality': 82, 'intellect': 0, 'wisdom': 15, 'charisma': 0}, 'description': 'Regenerating monsters of the frozen wastes.', 'gold_min': 45, 'gold_max': 70, 'drop_chance': 2.7, 'exp_reward': 290},
-        {'id': 'vampire_thrall', 'name': 'Vampire Thrall', 'level': 52, 'stats': {'might': 33, 'agility': 65, 'vitality': 18, 'intellect': 41, 'wisdom': 0, 'charisma': 9}, 'description': 'Graceful undead servants with life-draining strikes.', 'gold_min': 50, 'gold_max': 80, 'drop_chance': 3.0, 'exp_reward': 310},
-        {'id': 'flame_elemental', 'name': 'Flame Elemental', 'level': 56, 'stats': {'might': 1, 'agility': 27, 'vitality': 19, 'intellect': 79, 'wisdom': 52, 'charisma': 0}, 'description': 'Living firestorms born from volcanic vents.', 'gold_min': 55, 'gold_max': 90, 'drop_chance': 3.2, 'exp_reward': 330},
-        {'id': 'arcane_sentinel', 'name': 'Arcane Sentinel', 'level': 60, 'stats': {'might': 10, 'agility': 1, 'vitality': 20, 'intellect': 93, 'wisdom': 65, 'charisma': 0}, 'description': 'Hovering constructs guarding forgotten libraries.', 'gold_min': 60, 'gold_max': 100, 'drop_chance': 3.5, 'exp_reward': 350},
-        {'id': 'corrupted_druid', 'name': 'Corrupted Druid', 'level': 65, 'stats': {'might': 11, 'agility': 11, 'vitality': 31, 'intellect': 51, 'wisdom': 100, 'charisma': 0}, 'description': 'Once-kind wardens now twisted by blight magic.', 'gold_min': 70, 'gold_max': 120, 'drop_chance': 4.0, 'exp_reward': 375},
-        {'id': 'blighted_treant', 'name': 'Blighted Treant', 'level': 70, 'stats': {'might': 23, 'agility': 1, 'vitality': 162, 'intellect': 1, 'wisdom': 33, 'charisma': 0}, 'description': 'Infected forest guardians dripping toxic sap.', 'gold_min': 80, 'gold_max': 130, 'drop_chance': 4.5, 'exp_reward': 400},
-        {'id': 'aether_warden', 'name': 'Aether Warden', 'level': 74, 'stats': {'might': 1, 'agility': 24, 'vitality': 24, 'intellect': 81, 'wisdom': 103, 'charisma': 0}, 'description': 'Riftwalkers who bend space around them.', 'gold_min': 90, 'gold_max': 150, 'drop_chance': 5.0, 'exp_reward': 420},
-        {'id': 'lich_adept', 'name': 'Lich Adept', 'level': 78, 'stats': {'might': 1, 'agility': 1, 'vitality': 25, 'intellect': 132, 'wisdom': 85, 'charisma': 0}, 'description': 'Apprentice necromancers wielding soul-draining magic.', 'gold_min': 100, 'gold_max': 160, 'drop_chance': 5.5, 'exp_reward': 440},
-        {'id': 'wyvern_stalker', 'name': 'Wyvern Stalker', 'level': 82, 'stats': {'might': 77, 'agility': 114, 'vitality': 51, 'intellect': 13, 'wisdom': 1, 'charisma': 0}, 'description': 'Silent aerial hunters with venomous tails.', 'gold_min': 120, 'gold_max': 180, 'drop_chance': 6.0, 'exp_reward': 460},
-        {'id': 'void_wraith', 'name': 'Void Wraith', 'level': 86, 'stats': {'might': 1, 'agility': 41, 'vitality': 15, 'intellect': 80, 'wisdom': 132, 'charisma': 0}, 'description': 'Entities from a lightless dimension whispering madness.', 'gold_min': 130, 'gold_max': 200, 'drop_chance': 7.0, 'exp_reward': 480},
-        {'id': 'titan_construct', 'name': 'Titan Construct', 'level': 90, 'stats': {'might': 84, 'agility': 1, 'vitality': 167, 'intellect': 28, 'wisdom': 1, 'charisma': 0}, 'description': 'Colossal machines built by civilizations long gone.', 'gold_min': 150, 'gold_max': 230, 'drop_chance': 8.0, 'exp_reward': 500},
-        {'id': 'demon_knight', 'name': 'Demon Knight', 'level': 94, 'stats': {'might': 145, 'agility': 30, 'vitality': 88, 'intellect': 1, 'wisdom': 30, 'charisma': 0}, 'description': 'Elite hellwarriors clad in cursed armor.', 'gold_min': 170, 'gold_max': 260, 'drop_chance': 9.0, 'exp_reward': 520},
-        {'id': 'ancient_dragon', 'name': 'Ancient Dragon', 'level': 98, 'stats': {'might': 91, 'agility': 46, 'vitality': 91, 'intellect': 46, 'wisdom': 32, 'charisma': 0}, 'description': 'World-shaping titans whose breath shifts landscapes.', 'gold_min': 200, 'gold_max': 300, 'drop_chance': 10.0, 'exp_reward': 540},
-        {'id': 'demon_lord_regent', 'name': 'Demon Lord Regent', 'level': 100, 'stats': {'might': 63, 'agility': 32, 'vitality': 47, 'intellect': 93, 'wisdom': 78, 'charisma': 0}, 'description': 'Infernal rulers capable of warping reality itself.', 'gold_min': 250, 'gold_max': 350, 'drop_chance': 12.0, 'exp_reward': 550}
-    ]
-    
-    for i, enemy in enumerate(pve_enemies_data):
-        if USE_POSTGRES:
-            # PostgreSQL uses ON CONFLICT
-            cursor.execute('''
-                INSERT INTO pve_enemies 
-                (id, name, level, stats_json, description, story_order, unlocked_at_level, gold_min, gold_max, drop_chance, exp_reward)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    level = EXCLUDED.level,
-                    stats_json = EXCLUDED.stats_json,
-                    description = EXCLUDED.description,
-                    story_order = EXCLUDED.story_order,
-                    unlocked_at_level = EXCLUDED.unlocked_at_level,
-                    gold_min = EXCLUDED.gold_min,
-                    gold_max = EXCLUDED.gold_max,
-                    drop_chance = EXCLUDED.drop_chance,
-                    exp_reward = EXCLUDED.exp_reward
-            ''', (
-                enemy['id'], enemy['name'], enemy['level'],
-                json.dumps(enemy['stats']), enemy['description'],
-                i + 1, enemy['level'],  # story_order and unlocked_at_level
-                enemy['gold_min'], enemy['gold_max'], enemy['drop_chance'], enemy.get('exp_reward', 50)
-            ))
-        else:
-            # SQLite uses INSERT OR REPLACE
-            cursor.execute('''
-                INSERT OR REPLACE INTO pve_enemies 
-                (id, name, level, stats_json, description, story_order, unlocked_at_level, gold_min, gold_max, drop_chance, exp_reward)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                enemy['id'], enemy['name'], enemy['level'],
-                json.dumps(enemy['stats']), enemy['description'],
-                i + 1, enemy['level'],  # story_order and unlocked_at_level
-                enemy['gold_min'], enemy['gold_max'], enemy['drop_chance'], enemy.get('exp_reward', 50)
-            ))
-    
-    # Initialize store items (Common rarity only, all weapon types)
-    store_items = []
-    for weapon_type in WEAPON_TYPES:
-        weapon_names = {
-            'sword': 'Sword', 'staff': 'Staff', 'bow': 'Bow',
-            'dagger': 'Dagger', 'mace': 'Mace'
-        }
-        store_items.append({
-            'id': f"store_{weapon_type}",
-            'name': f"Common {weapon_names[weapon_type]}",
-            'slot': 'main_hand',
-            'weapon_type': weapon_type,
-            'base_price': 100,
-            'level_requirement': 1
-        })
-    
-    # Add armor pieces
-    armor_slots = ['helmet', 'chest', 'legs', 'boots', 'gloves']
-    for slot in armor_slots:
-        slot_names = {
-            'helmet': 'Helmet', 'chest': 'Chestplate', 'legs': 'Leggings',
-            'boots': 'Boots', 'gloves': 'Gloves'
-        }
-        store_items.append({
-            'id': f"store_{slot}",
-            'name': f"Common {slot_names[slot]}",
-            'slot': slot,
-            'weapon_type': None,
-            'base_price': 50,
-            'level_requirement': 1
-        })
-    
-    for item in store_items:
-        if USE_POSTGRES:
-            cursor.execute('''
-                INSERT INTO store_items 
-                (id, name, slot, weapon_type, base_price, level_requirement)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO NOTHING
-            ''', (
-                item['id'], item['name'], item['slot'],
-                item['weapon_type'], item['base_price'], item['level_requirement']
-            ))
-        else:
-            cursor.execute('''
-                INSERT OR IGNORE INTO store_items 
-                (id, name, slot, weapon_type, base_price, level_requirement)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                item['id'], item['name'], item['slot'],
-                item['weapon_type'], item['base_price'], item['level_requirement']
-            ))
-    
-    conn.commit()
-    conn.close()
-    logger.info("Default data initialized")
+        logger.info(f"Database initialized (schema version {migration_engine.latest_version}, "
+                    f"seed data {'updated' if report.seed_changed else 'unchanged'}) in {report.timings_ms['total_ms']:.1f} ms")
 
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production-min-32-chars")
@@ -797,15 +210,6 @@ if IS_PRODUCTION:
 # Security scheme for FastAPI
 security = HTTPBearer(auto_error=False)
 
-# Password hashing
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
-
 # JWT Token functions
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -820,7 +224,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     # Track active session for online player count
     user_id = data.get("sub") or data.get("user_id")
     if user_id:
-        game_state.touch_session(user_id)
+        presence_tracker.heartbeat(user_id)
     
     return encoded_jwt
 
@@ -842,8 +246,27 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
     except JWTError:
         return None
 
+def _load_principal(user_id: str) -> Optional[dict]:
+    """Look a user up for authentication and cache the principal."""
+    epoch = auth_cache.load_epoch()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        user = statements.fetchone(cursor, USER_BY_ID, (user_id,))
+    finally:
+        conn.close()
+    if user is None:
+        return None
+    principal = {"user_id": user['id'], "username": user['username']}
+    auth_cache.put_principal(user_id, principal, epoch)
+    return principal
+
 async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> dict:
-    """Dependency to get current authenticated user from JWT token"""
+    """Dependency to get current authenticated user from JWT token.
+
+    Verified tokens and user principals are cached (``app.core.auth_cache``),
+    so repeat requests do no decoding and no database work.
+    """
     if credentials is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
@@ -851,29 +274,29 @@ async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] =
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    payload = verify_token(token, "access")
-    
+    payload = auth_cache.get_payload(token)
     if payload is None:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+        payload = verify_token(token, "access")
+        if payload is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        auth_cache.put_payload(token, payload)
     
     # Update active session timestamp for online player count
     user_id = payload.get("sub")
     if user_id:
-        game_state.touch_session(user_id)
+        presence_tracker.heartbeat(user_id)
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
     # Verify user still exists
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username FROM users WHERE id = ?", (user_id,))
-    user = cursor.fetchone()
-    conn.close()
+    principal = auth_cache.get_principal(user_id)
+    if principal is None:
+        principal = await async_db.run(_load_principal, user_id)
     
-    if user is None:
+    if principal is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return {"user_id": user['id'], "username": user['username']}
+    return principal
 
 # Import Pydantic models from models.py if available, otherwise use simple definitions
 try:
@@ -962,11 +385,62 @@ async def game():
         return HTMLResponse(content="<h1>Game page not found</h1>")
 
 # Authentication endpoints
+# Blocking account queries, run through async_db so DB work stays off the event loop
+def _username_taken(username: str) -> bool:
+    with db_manager.connection() as conn:
+        return statements.fetchone(conn.cursor(), USER_ID_BY_USERNAME, (username,)) is not None
+
+def _insert_user(user_id: str, username: str, password_hash: str, email: Optional[str]) -> None:
+    with db_manager.connection() as conn:
+        statements.execute(conn.cursor(), USER_INSERT, (user_id, username, password_hash, email))
+        conn.commit()
+    player_tracking_service.ensure_profile(user_id, username, email)
+
+def _load_credentials(username: str) -> Optional[dict]:
+    with db_manager.connection() as conn:
+        user = statements.fetchone(conn.cursor(), USER_CREDENTIALS_BY_USERNAME, (username,))
+        return dict(user) if user else None
+
+def _owned_character_ids(cursor, user_id: str) -> List[str]:
+    return [row['id'] for row in statements.fetchall(cursor, CHARACTER_IDS_FOR_USER, (user_id,))]
+
+def _load_owned_character_ids(user_id: str) -> List[str]:
+    with db_manager.connection() as conn:
+        return _owned_character_ids(conn.cursor(), user_id)
+
+def ensure_owned(user_id: str, character_id: Optional[str], status_code: int = 403) -> None:
+    """Raise unless ``user_id`` owns ``character_id`` (answered from the ownership cache)."""
+    if not ownership_cache.owns(user_id, character_id, _load_owned_character_ids):
+        raise HTTPException(status_code=status_code, detail="Character not found or access denied")
+
+def owned_character(character_id: str, current_user: dict = Depends(get_current_user)) -> str:
+    """Dependency for routes with a ``{character_id}`` path parameter."""
+    ensure_owned(current_user["user_id"], character_id, status_code=404)
+    return character_id
+
+def _finish_login(user: dict, ip_address: Optional[str], new_password_hash: Optional[str]) -> Optional[dict]:
+    """Store an upgraded password hash, load the user's character and record the login."""
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
+        if new_password_hash:
+            statements.execute(cursor, USER_SET_PASSWORD_HASH, (new_password_hash, user['id']))
+            conn.commit()
+            password_hasher.record_rehash()
+        epoch = ownership_cache.load_epoch()
+        character = statements.fetchone(cursor, CHARACTER_FIRST_FOR_USER, (user['id'],))
+        character = dict(character) if character else None
+        ownership_cache.prime(user['id'], _owned_character_ids(cursor, user['id']), epoch)
+
+    try:
+        player_tracking_service.record_login(user['id'], user['username'], ip_address)
+    except Exception as tracking_error:
+        logger.warning(f"Failed to record login analytics: {tracking_error}")
+    return character
+
 @app.post("/api/register")
 @limiter.limit("5/minute")
 async def register(register_data: RegisterRequest, request: Request):
     """Register a new user"""
-    conn = None
     try:
         # Validate input
         if not register_data.username or not register_data.password:
@@ -978,43 +452,25 @@ async def register(register_data: RegisterRequest, request: Request):
         if len(register_data.password) < 6:
             raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Check if username exists
-        if USE_POSTGRES:
-            cursor.execute("SELECT id FROM users WHERE username = %s", (register_data.username,))
-        else:
-            cursor.execute("SELECT id FROM users WHERE username = ?", (register_data.username,))
-        if cursor.fetchone():
+        if await async_db.run(_username_taken, register_data.username):
             raise HTTPException(status_code=400, detail="Username already exists")
         
-        # Create user
+        # Create user (bcrypt runs in the password worker pool)
         try:
             user_id = generate_id()
-            password_hash = hash_password(register_data.password)
+            password_hash = await password_hasher.hash(register_data.password)
         except Exception as e:
             logger.error(f"Error generating user ID or hashing password: {e}")
             raise HTTPException(status_code=500, detail="Failed to create user account")
         
         # Insert user into database
         try:
-            if USE_POSTGRES:
-                cursor.execute(
-                    "INSERT INTO users (id, username, password_hash, email) VALUES (%s, %s, %s, %s)",
-                    (user_id, register_data.username, password_hash, register_data.email)
-                )
-            else:
-                cursor.execute(
-                    "INSERT INTO users (id, username, password_hash, email) VALUES (?, ?, ?, ?)",
-                    (user_id, register_data.username, password_hash, register_data.email)
-                )
-            conn.commit()
-            player_tracking_service.ensure_profile(user_id, register_data.username, register_data.email)
+            await async_db.run(
+                _insert_user, user_id, register_data.username, password_hash, register_data.email
+            )
         except Exception as e:
             logger.error(f"Database error during registration: {e}")
-            if USE_POSTGRES:
-                conn.rollback()
             raise HTTPException(status_code=500, detail="Failed to create user account. Please try again.")
         
         return {"success": True, "user_id": user_id, "message": "Account created successfully"}
@@ -1025,63 +481,42 @@ async def register(register_data: RegisterRequest, request: Request):
     except Exception as e:
         logger.error(f"Registration error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An error occurred during registration. Please try again.")
-    finally:
-        # Ensure database connection is closed
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.post("/api/login")
 @limiter.limit("10/minute")
 async def login(login_data: LoginRequest, request: Request):
     """Login and return JWT tokens and user data"""
-    conn = None
     try:
         # Validate input
         if not login_data.username or not login_data.password:
             raise HTTPException(status_code=400, detail="Username and password are required")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Query user
-        if USE_POSTGRES:
-            cursor.execute(
-                "SELECT id, username, password_hash FROM users WHERE username = %s",
-                (login_data.username,)
-            )
-        else:
-            cursor.execute(
-                "SELECT id, username, password_hash FROM users WHERE username = ?",
-                (login_data.username,)
-            )
-        user = cursor.fetchone()
+        user = await async_db.run(_load_credentials, login_data.username)
         
         if not user:
             raise HTTPException(status_code=401, detail="Invalid username or password")
         
-        # Verify password
+        # Verify password (bcrypt runs in the password worker pool)
         try:
-            if not verify_password(login_data.password, user['password_hash']):
+            if not await password_hasher.verify(login_data.password, user['password_hash']):
                 raise HTTPException(status_code=401, detail="Invalid username or password")
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Password verification error: {e}")
             raise HTTPException(status_code=401, detail="Invalid username or password")
         
-        # Get user's character
-        if USE_POSTGRES:
-            cursor.execute(
-                "SELECT * FROM characters WHERE user_id = %s LIMIT 1",
-                (user['id'],)
-            )
-        else:
-            cursor.execute(
-                "SELECT * FROM characters WHERE user_id = ? LIMIT 1",
-                (user['id'],)
-            )
-        character = cursor.fetchone()
+        # Upgrade hashes made with a lower cost than PASSWORD_BCRYPT_ROUNDS
+        new_password_hash = None
+        if password_hasher.needs_rehash(user['password_hash']):
+            try:
+                new_password_hash = await password_hasher.hash(login_data.password)
+            except Exception as e:
+                logger.warning(f"Password rehash failed for user {user['id']}: {e}")
+        
+        ip_address = request.client.host if request and request.client else None
+        character = await async_db.run(_finish_login, user, ip_address, new_password_hash)
         
         # Create JWT tokens
         try:
@@ -1104,12 +539,6 @@ async def login(login_data: LoginRequest, request: Request):
         if character:
             result["character_id"] = character['id']
             result["character_name"] = character['name']
-
-        try:
-            ip_address = request.client.host if request and request.client else None
-            player_tracking_service.record_login(user['id'], user['username'], ip_address)
-        except Exception as tracking_error:
-            logger.warning(f"Failed to record login analytics: {tracking_error}")
         
         return result
         
@@ -1119,13 +548,6 @@ async def login(login_data: LoginRequest, request: Request):
     except Exception as e:
         logger.error(f"Login error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An error occurred during login. Please try again.")
-    finally:
-        # Ensure database connection is closed
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
 
 @app.post("/api/auth/refresh")
 async def refresh_token(refresh_token: str = Body(..., embed=True)):
@@ -1141,7 +563,7 @@ async def refresh_token(refresh_token: str = Body(..., embed=True)):
     # Verify user still exists
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT id, username FROM users WHERE id = ?", (user_id,))
+    statements.execute(cursor, USER_BY_ID, (user_id,))
     user = cursor.fetchone()
     conn.close()
     
@@ -1198,6 +620,13 @@ async def create_character(request: CreateCharacterRequest, current_user: dict =
     
     conn.commit()
     conn.close()
+    ownership_cache.invalidate(user_id)
+    leaderboard.upsert({
+        "id": character_id,
+        "name": request.name,
+        "username": current_user.get("username"),
+        "level": 1,
+    })
     
     return {
         "success": True,
@@ -1206,10 +635,11 @@ async def create_character(request: CreateCharacterRequest, current_user: dict =
     }
 
 @app.get("/api/character/list")
-async def list_characters(current_user: dict = Depends(get_current_user)):
+@async_db.offload
+def list_characters(current_user: dict = Depends(get_current_user)):
     """List characters for the authenticated user"""
     user_id = current_user["user_id"]
-    conn = get_db_connection()
+    conn = get_db_read_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT id, name, level FROM characters WHERE user_id = ?", (user_id,))
@@ -1254,24 +684,12 @@ def normalize_equipment_item(item: Dict, slot: str) -> Dict:
     
     return item
 
-@app.get("/api/character/{character_id}")
-async def get_character(character_id: str, current_user: dict = Depends(get_current_user)):
-    """Get character data"""
-    user_id = current_user["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT * FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    character = cursor.fetchone()
-    
-    if not character:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Character not found")
-    
+def build_character_payload(cursor, character) -> Dict:
+    """Render the full character payload (parsed JSON, normalized items, combat stats)"""
     # Parse JSON fields
-    stats = json.loads(character['stats_json'])
-    equipment = json.loads(character['equipment_json'])
-    inventory = json.loads(character['inventory_json'])
+    stats = load_json_column(character['stats_json'])
+    equipment = load_json_column(character['equipment_json'])
+    inventory = inventory_repository.list_items(cursor, character['id'])
     
     # Normalize equipment items to ensure they have weapon_type if missing
     for slot, item in equipment.items():
@@ -1291,8 +709,6 @@ async def get_character(character_id: str, current_user: dict = Depends(get_curr
     equipment_stats = get_equipment_stats(equipment)
     combat_stats = calculate_combat_stats(stats, equipment_stats, equipment)
     
-    conn.close()
-    
     # Get gold and pvp_enabled (handle missing columns gracefully for existing databases)
     try:
         gold = character['gold'] if 'gold' in character.keys() else 0
@@ -1330,28 +746,67 @@ async def get_character(character_id: str, current_user: dict = Depends(get_curr
     pvp_win_rate = (pvp_wins / total_games * 100) if total_games > 0 else 0.0
     
     return {
-        "success": True,
-        "character": {
-            "id": character['id'],
-            "name": character['name'],
-            "level": character['level'],
-            "exp": character['exp'],
-            "skill_points": character['skill_points'],
-            "stats": stats,
-            "equipment": equipment,
-            "inventory": inventory,
-            "combat_stats": combat_stats,
-            "auto_combat": bool(character['auto_combat']),
-            "gold": gold,
-            "pvp_enabled": pvp_enabled,
-            "combat_stance": combat_stance,
-            "pvp_wins": pvp_wins,
-            "pvp_losses": pvp_losses,
-            "pvp_mmr": pvp_mmr,
-            "pvp_win_rate": round(pvp_win_rate, 2)
-        }
+        "id": character['id'],
+        "name": character['name'],
+        "level": character['level'],
+        "exp": character['exp'],
+        "skill_points": character['skill_points'],
+        "stats": stats,
+        "equipment": equipment,
+        "inventory": inventory,
+        "combat_stats": combat_stats,
+        "auto_combat": bool(character['auto_combat']),
+        "gold": gold,
+        "pvp_enabled": pvp_enabled,
+        "combat_stance": combat_stance,
+        "pvp_wins": pvp_wins,
+        "pvp_losses": pvp_losses,
+        "pvp_mmr": pvp_mmr,
+        "pvp_win_rate": round(pvp_win_rate, 2)
     }
 
+@app.get("/api/character/{character_id}")
+@async_db.offload
+def get_character(
+    character_id: str,
+    inventory_limit: Optional[int] = None,
+    inventory_offset: int = 0,
+    current_user: dict = Depends(get_current_user),
+):
+    """Get character data; the inventory can be paged with inventory_limit/inventory_offset"""
+    user_id = current_user["user_id"]
+    conn = get_db_read_connection()
+    cursor = conn.cursor()
+    
+    # Cheap revision probe first; the rendered payload is served from cache when current
+    statements.execute(cursor, CHARACTER_REVISION_FOR_OWNER, (character_id, user_id))
+    row = cursor.fetchone()
+    
+    if not row:
+        conn.close()
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    payload = character_cache.get(character_id, row['revision'] or 0)
+    if payload is None:
+        cursor.execute("SELECT * FROM characters WHERE id = ?", (character_id,))
+        character = cursor.fetchone()
+        if not character:
+            conn.close()
+            raise HTTPException(status_code=404, detail="Character not found")
+        payload = build_character_payload(cursor, character)
+        character_cache.set(character_id, character['revision'] or 0, payload)
+    
+    conn.close()
+    
+    inventory = payload["inventory"]
+    character_data = dict(payload, inventory_total=len(inventory))
+    if inventory_limit is not None:
+        inventory_limit = max(0, min(inventory_limit, INVENTORY_LIMIT))
+        offset = max(inventory_offset, 0)
+        character_data["inventory"] = inventory[offset:offset + inventory_limit]
+    
+    return {"success": True, "character": character_data}
+
 
 @app.put("/api/character/{character_id}/stance")
 async def update_combat_stance(character_id: str, request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
@@ -1361,18 +816,13 @@ async def update_combat_stance(character_id: str, request: Dict = Body(...), cur
     if stance not in ['offensive', 'defensive', 'balanced']:
         raise HTTPException(status_code=400, detail="Invalid stance. Must be 'offensive', 'defensive', or 'balanced'")
     
+    ensure_owned(user_id, character_id, status_code=404)
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    character = cursor.fetchone()
-    
-    if not character:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Character not found")
-    
     cursor.execute(
-        "UPDATE characters SET combat_stance = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        "UPDATE characters SET combat_stance = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
         (stance, character_id)
     )
     
@@ -1389,14 +839,14 @@ async def allocate_skills(character_id: str, request: AllocateSkillsRequest, cur
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
+        cursor.execute("SELECT stats_json, skill_points FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
         character = cursor.fetchone()
         
         if not character:
             conn.close()
             raise HTTPException(status_code=404, detail="Character not found")
         
-        current_stats = json.loads(character['stats_json'])
+        current_stats = load_json_column(character['stats_json'])
         # SQLite Row objects use dictionary-style access
         available_points = character['skill_points'] if character['skill_points'] is not None else 0
         
@@ -1427,13 +877,24 @@ async def allocate_skills(character_id: str, request: AllocateSkillsRequest, cur
                 conn.close()
                 raise HTTPException(status_code=400, detail=f"Stat {stat} must be between 1 and 100")
         
-        # Update stats
-        new_skill_points = available_points - (new_points_used - points_used)
+        # Apply per-stat deltas in place; the skill_points guard keeps concurrent allocations from overspending
+        points_spent = new_points_used - points_used
+        stats_patch = JsonPatch('stats_json')
+        for stat, value in request.stats.items():
+            delta = value - current_stats.get(stat, 10)
+            if delta:
+                stats_patch.increment(stat, delta, default=10)
+        stats_expr, stats_params = stats_patch.build()
         
         cursor.execute(
-            "UPDATE characters SET stats_json = ?, skill_points = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (json.dumps(request.stats), new_skill_points, character_id)
+            f"UPDATE characters SET stats_json = {stats_expr}, skill_points = COALESCE(skill_points, 0) - ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 "
+            "WHERE id = ? AND COALESCE(skill_points, 0) >= ?",
+            (*stats_params, points_spent, character_id, points_spent)
         )
+        if cursor.rowcount == 0:
+            conn.rollback()
+            conn.close()
+            raise HTTPException(status_code=400, detail="Not enough skill points")
         
         conn.commit()
         conn.close()
@@ -1486,21 +947,17 @@ async def reset_skill_points(request: Dict = Body(...), current_user: dict = Dep
     # Level 1: 3 points, Level 2: 6 points, Level 3: 9 points, etc.
     refunded_skill_points = 3 + (char_level - 1) * 3
     
-    # Deduct gold
-    new_gold = current_gold - cost
-    
-    # Update character
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET stats_json = %s, skill_points = %s, gold = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-            (json.dumps(base_stats), refunded_skill_points, new_gold, character_id)
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET stats_json = ?, skill_points = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (json.dumps(base_stats), refunded_skill_points, new_gold, character_id)
-        )
+    # Reset stats and deduct gold in one guarded statement
+    cursor.execute(
+        "UPDATE characters SET stats_json = ?, skill_points = ?, gold = gold - ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ? AND gold >= ?",
+        (json.dumps(base_stats), refunded_skill_points, cost, character_id, cost)
+    )
+    if cursor.rowcount == 0:
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=400, detail=f"Not enough gold. Required: {cost}")
     
+    new_gold = get_gold(cursor, character_id)
     conn.commit()
     conn.close()
     
@@ -1512,6 +969,54 @@ async def reset_skill_points(request: Dict = Body(...), current_user: dict = Dep
         "gold_remaining": new_gold
     }
 
+def adjust_gold(cursor, character_id: str, delta: int, expected_revision: Optional[int] = None) -> bool:
+    """Atomically add (or spend, when negative) gold; returns False if funds are insufficient
+
+    With ``expected_revision`` the update also requires the character to be
+    unchanged since it was read, so two concurrent purchases based on the same
+    read cannot both apply.
+    """
+    revision_guard = " AND revision = ?" if expected_revision is not None else ""
+    cursor.execute(
+        "UPDATE characters SET gold = COALESCE(gold, 0) + ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 "
+        f"WHERE id = ? AND COALESCE(gold, 0) + ? >= 0{revision_guard}",
+        (delta, character_id, delta, *(() if expected_revision is None else (expected_revision,)))
+    )
+    return cursor.rowcount > 0
+
+def spend_gold_or_raise(conn, cursor, character_id: str, cost: int, expected_revision: int) -> None:
+    """Spend ``cost`` gold against the revision read earlier, or roll back and raise (400 funds / 409 conflict)"""
+    if adjust_gold(cursor, character_id, -cost, expected_revision=expected_revision):
+        return
+    current_gold = get_gold(cursor, character_id)
+    conn.rollback()
+    conn.close()
+    if current_gold < cost:
+        raise HTTPException(status_code=400, detail=f"Not enough gold. Required: {cost}")
+    raise HTTPException(status_code=409, detail="Item changed, please retry")
+
+def get_gold(cursor, character_id: str) -> int:
+    cursor.execute("SELECT gold FROM characters WHERE id = ?", (character_id,))
+    row = cursor.fetchone()
+    return (row['gold'] or 0) if row else 0
+
+def set_equipment_slot(cursor, character_id: str, slot: str, item: Optional[Dict], expected_item: Optional[Dict] = None) -> bool:
+    """Patch a single equipment slot in place.
+
+    The update only applies while the slot still holds ``expected_item``, so a
+    concurrent equip/unequip cannot be silently overwritten.
+    """
+    patch_expr, patch_params = JsonPatch('equipment_json').set(slot, item).build()
+    guard_sql, guard_params = json_path_equals(
+        'equipment_json', [slot, 'id'], expected_item.get('id') if expected_item else None
+    )
+    cursor.execute(
+        f"UPDATE characters SET equipment_json = {patch_expr}, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 "
+        f"WHERE id = ? AND {guard_sql}",
+        (*patch_params, character_id, *guard_params)
+    )
+    return cursor.rowcount > 0
+
 # Equipment endpoints
 @app.post("/api/equipment/drop")
 async def drop_equipment(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
@@ -1540,14 +1045,10 @@ async def drop_equipment(request: Dict = Body(...), current_user: dict = Depends
     equipment = generate_equipment(slot, rarity, level)
     
     # Add to inventory
-    cursor.execute("SELECT inventory_json FROM characters WHERE id = ?", (character_id,))
-    char = cursor.fetchone()
-    inventory = json.loads(char['inventory_json'])
-    inventory.append(equipment)
-    
+    inventory_repository.add_item(cursor, character_id, equipment)
     cursor.execute(
-        "UPDATE characters SET inventory_json = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(inventory), character_id)
+        "UPDATE characters SET updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
+        (character_id,)
     )
     
     conn.commit()
@@ -1562,40 +1063,31 @@ async def equip_item(request: Dict = Body(...), current_user: dict = Depends(get
     character_id = request.get('character_id')
     
     # Verify character belongs to user
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=403, detail="Character not found or access denied")
-    conn.close()
+    ensure_owned(user_id, character_id)
     item_id = request.get('item_id')
     slot = request.get('slot')
     
     if not character_id or not item_id or not slot:
         raise HTTPException(status_code=400, detail="character_id, item_id, and slot required")
+    if slot not in EQUIPMENT_SLOTS:
+        raise HTTPException(status_code=400, detail="Invalid equipment slot")
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT equipment_json, inventory_json FROM characters WHERE id = ?", (character_id,))
+    # Only the target slot is read; the update below patches that key in place
+    slot_expr, slot_params = json_extract_path('equipment_json', slot)
+    cursor.execute(f"SELECT {slot_expr} AS current_item FROM characters WHERE id = ?", (*slot_params, character_id))
     character = cursor.fetchone()
     
     if not character:
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    equipment = json.loads(character['equipment_json'])
-    inventory = json.loads(character['inventory_json'])
+    current_item = load_json_column(character['current_item'])
     
     # Find item in inventory
-    item = None
-    item_index = None
-    for i, inv_item in enumerate(inventory):
-        if inv_item.get('id') == item_id:
-            item = inv_item
-            item_index = i
-            break
+    item = inventory_repository.get_item(cursor, character_id, item_id)
     
     if not item:
         conn.close()
@@ -1605,19 +1097,21 @@ async def equip_item(request: Dict = Body(...), current_user: dict = Depends(get
         conn.close()
         raise HTTPException(status_code=400, detail="Item slot mismatch")
     
-    # Unequip current item if any
-    current_item = equipment.get(slot)
-    if current_item:
-        inventory.append(current_item)
+    # Equip new item, moving the current one (if any) back to the inventory. The
+    # slot and the inventory rows are separate tables, so this is one transaction
+    # rather than one statement; the guarded slot update is what serializes it.
+    if not inventory_repository.remove_item(cursor, character_id, item_id):
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=404, detail="Item not found in inventory")
     
-    # Equip new item
-    equipment[slot] = item
-    inventory.pop(item_index)
+    if not set_equipment_slot(cursor, character_id, slot, item, expected_item=current_item):
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=409, detail="Equipment changed, please retry")
     
-    cursor.execute(
-        "UPDATE characters SET equipment_json = ?, inventory_json = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(equipment), json.dumps(inventory), character_id)
-    )
+    if current_item:
+        inventory_repository.add_item(cursor, character_id, current_item)
     
     conn.commit()
     conn.close()
@@ -1631,42 +1125,36 @@ async def unequip_item(request: Dict = Body(...), current_user: dict = Depends(g
     character_id = request.get('character_id')
     
     # Verify character belongs to user
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=403, detail="Character not found or access denied")
-    conn.close()
+    ensure_owned(user_id, character_id)
     slot = request.get('slot')
     
     if not character_id or not slot:
         raise HTTPException(status_code=400, detail="character_id and slot required")
+    if slot not in EQUIPMENT_SLOTS:
+        raise HTTPException(status_code=400, detail="Invalid equipment slot")
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT equipment_json, inventory_json FROM characters WHERE id = ?", (character_id,))
+    slot_expr, slot_params = json_extract_path('equipment_json', slot)
+    cursor.execute(f"SELECT {slot_expr} AS current_item FROM characters WHERE id = ?", (*slot_params, character_id))
     character = cursor.fetchone()
     
     if not character:
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    equipment = json.loads(character['equipment_json'])
-    inventory = json.loads(character['inventory_json'])
+    current_item = load_json_column(character['current_item'])
     
-    if slot not in equipment or not equipment[slot]:
+    if not current_item:
         conn.close()
         raise HTTPException(status_code=400, detail="No item equipped in that slot")
     
-    # Move to inventory
-    inventory.append(equipment[slot])
-    equipment[slot] = None
-    
-    cursor.execute(
-        "UPDATE characters SET equipment_json = ?, inventory_json = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(equipment), json.dumps(inventory), character_id)
-    )
+    # Clear the slot (guarded on the item we read) and move it to inventory
+    if not set_equipment_slot(cursor, character_id, slot, None, expected_item=current_item):
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=409, detail="Equipment changed, please retry")
+    inventory_repository.add_item(cursor, character_id, current_item)
     
     conn.commit()
     conn.close()
@@ -1687,7 +1175,7 @@ async def upgrade_equipment(request: Dict = Body(...), current_user: dict = Depe
     cursor = conn.cursor()
     
     # Verify character belongs to user
-    cursor.execute("SELECT level, gold, equipment_json, inventory_json FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
+    cursor.execute("SELECT level, gold, revision, equipment_json FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
     char = cursor.fetchone()
     
     if not char:
@@ -1696,29 +1184,26 @@ async def upgrade_equipment(request: Dict = Body(...), current_user: dict = Depe
     
     char_level = char['level']
     current_gold = char['gold'] if char['gold'] is not None else 0
-    equipment = json.loads(char['equipment_json'])
-    inventory = json.loads(char['inventory_json'])
+    equipment = load_json_column(char['equipment_json'])
     
     # Find item in equipment or inventory
     item = None
     item_location = None
-    item_index = None
     
     # Check equipped items
+    item_slot = None
     for slot, eq_item in equipment.items():
         if eq_item and eq_item.get('id') == item_id:
             item = eq_item
             item_location = 'equipment'
+            item_slot = slot
             break
     
     # Check inventory
     if not item:
-        for i, inv_item in enumerate(inventory):
-            if inv_item.get('id') == item_id:
-                item = inv_item
-                item_location = 'inventory'
-                item_index = i
-                break
+        item = inventory_repository.get_item(cursor, character_id, item_id)
+        if item:
+            item_location = 'inventory'
     
     if not item:
         conn.close()
@@ -1731,88 +1216,35 @@ async def upgrade_equipment(request: Dict = Body(...), current_user: dict = Depe
         raise HTTPException(status_code=400, detail=f"Item is already at maximum level ({char_level})")
     
     # Calculate cost: 500 * (item_level + 1)
-    cost = 500 * (item_level + 1)
+    cost = calculate_upgrade_cost(item_level)
     
     if current_gold < cost:
         conn.close()
         raise HTTPException(status_code=400, detail=f"Not enough gold. Required: {cost}, Have: {current_gold}")
     
-    # Upgrade item level
+    # Upgrade item level, recalculating stats while preserving existing stat types
     new_level = item_level + 1
-    
-    # Recalculate stats based on new level
-    rarity = item.get('rarity', 'common')
-    slot = item.get('slot')
-    
-    # Use the same logic as generate_equipment but preserve existing stat types
-    from game_logic import RARITY_STAT_RANGES, PRIMARY_STATS
-    ranges = RARITY_STAT_RANGES.get(rarity, RARITY_STAT_RANGES['common'])
-    
-    # Level scaling factor (1.0 at level 1, 2.0 at level 100)
-    level_scale = 1.0 + ((new_level - 1) / 99.0)
-    
-    # Get existing stat keys to preserve stat types
-    existing_stats = item.get('stats', {})
-    existing_stat_keys = list(existing_stats.keys())
-    
-    # Recalculate stats with new level, preserving which stats the item has
-    new_stats = {}
-    stat_index = 0
-    
-    # Primary stat
-    if ranges['primary'][1] > 0 and stat_index < len(existing_stat_keys):
-        stat_name = existing_stat_keys[stat_index] if stat_index < len(existing_stat_keys) else random.choice(PRIMARY_STATS)
-        base_value = random.randint(ranges['primary'][0], ranges['primary'][1])
-        new_stats[stat_name] = int(base_value * level_scale)
-        stat_index += 1
-    
-    # Secondary stat
-    if ranges['secondary'][1] > 0 and stat_index < len(existing_stat_keys):
-        stat_name = existing_stat_keys[stat_index] if stat_index < len(existing_stat_keys) else random.choice([s for s in PRIMARY_STATS if s not in new_stats])
-        base_value = random.randint(ranges['secondary'][0], ranges['secondary'][1])
-        new_stats[stat_name] = int(base_value * level_scale)
-        stat_index += 1
-    
-    # Tertiary stat
-    if ranges['tertiary'][1] > 0 and stat_index < len(existing_stat_keys):
-        stat_name = existing_stat_keys[stat_index] if stat_index < len(existing_stat_keys) else random.choice([s for s in PRIMARY_STATS if s not in new_stats])
-        base_value = random.randint(ranges['tertiary'][0], ranges['tertiary'][1])
-        new_stats[stat_name] = int(base_value * level_scale)
-        stat_index += 1
-    
-    # Quaternary stat (mythic only)
-    if ranges['quaternary'][1] > 0 and stat_index < len(existing_stat_keys):
-        stat_name = existing_stat_keys[stat_index] if stat_index < len(existing_stat_keys) else random.choice([s for s in PRIMARY_STATS if s not in new_stats])
-        base_value = random.randint(ranges['quaternary'][0], ranges['quaternary'][1])
-        new_stats[stat_name] = int(base_value * level_scale)
+    new_stats = rescale_equipment_stats(item, new_level)
     
     # Update item
     item['level'] = new_level
     item['stats'] = new_stats
     
-    # Update in appropriate location
+    # Deduct gold guarded on the revision read above (a concurrent upgrade or
+    # re-roll of the same read gets a 409), then patch only the item's own location
+    spend_gold_or_raise(conn, cursor, character_id, cost, char['revision'])
+    
     if item_location == 'equipment':
-        for slot_key, eq_item in equipment.items():
-            if eq_item and eq_item.get('id') == item_id:
-                equipment[slot_key] = item
-                break
+        updated = set_equipment_slot(cursor, character_id, item_slot, item, expected_item=item)
     else:
-        inventory[item_index] = item
+        updated = inventory_repository.update_item(cursor, character_id, item)
     
-    # Deduct gold and save
-    new_gold = current_gold - cost
-    
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET equipment_json = %s, inventory_json = %s, gold = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-            (json.dumps(equipment), json.dumps(inventory), new_gold, character_id)
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET equipment_json = ?, inventory_json = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (json.dumps(equipment), json.dumps(inventory), new_gold, character_id)
-        )
+    if not updated:
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=409, detail="Item changed, please retry")
     
+    new_gold = get_gold(cursor, character_id)
     conn.commit()
     conn.close()
     
@@ -1838,7 +1270,7 @@ async def reroll_equipment_stats(request: Dict = Body(...), current_user: dict =
     cursor = conn.cursor()
     
     # Verify character belongs to user
-    cursor.execute("SELECT gold, equipment_json, inventory_json FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
+    cursor.execute("SELECT gold, revision, equipment_json FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
     char = cursor.fetchone()
     
     if not char:
@@ -1846,29 +1278,26 @@ async def reroll_equipment_stats(request: Dict = Body(...), current_user: dict =
         raise HTTPException(status_code=404, detail="Character not found")
     
     current_gold = char['gold'] if char['gold'] is not None else 0
-    equipment = json.loads(char['equipment_json'])
-    inventory = json.loads(char['inventory_json'])
+    equipment = load_json_column(char['equipment_json'])
     
     # Find item in equipment or inventory
     item = None
     item_location = None
-    item_index = None
     
     # Check equipped items
+    item_slot = None
     for slot, eq_item in equipment.items():
         if eq_item and eq_item.get('id') == item_id:
             item = eq_item
             item_location = 'equipment'
+            item_slot = slot
             break
     
     # Check inventory
     if not item:
-        for i, inv_item in enumerate(inventory):
-            if inv_item.get('id') == item_id:
-                item = inv_item
-                item_location = 'inventory'
-                item_index = i
-                break
+        item = inventory_repository.get_item(cursor, character_id, item_id)
+        if item:
+            item_location = 'inventory'
     
     if not item:
         conn.close()
@@ -1928,29 +1357,21 @@ async def reroll_equipment_stats(request: Dict = Body(...), current_user: dict =
     # Update item stats
     item['stats'] = new_stats
     
-    # Update in appropriate location
+    # Deduct gold guarded on the revision read above (a concurrent upgrade or
+    # re-roll of the same read gets a 409), then patch only the item's own location
+    spend_gold_or_raise(conn, cursor, character_id, cost, char['revision'])
+    
     if item_location == 'equipment':
-        for slot_key, eq_item in equipment.items():
-            if eq_item and eq_item.get('id') == item_id:
-                equipment[slot_key] = item
-                break
+        updated = set_equipment_slot(cursor, character_id, item_slot, item, expected_item=item)
     else:
-        inventory[item_index] = item
-    
-    # Deduct gold and save
-    new_gold = current_gold - cost
+        updated = inventory_repository.update_item(cursor, character_id, item)
     
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET equipment_json = %s, inventory_json = %s, gold = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-            (json.dumps(equipment), json.dumps(inventory), new_gold, character_id)
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET equipment_json = ?, inventory_json = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (json.dumps(equipment), json.dumps(inventory), new_gold, character_id)
-        )
+    if not updated:
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=409, detail="Item changed, please retry")
     
+    new_gold = get_gold(cursor, character_id)
     conn.commit()
     conn.close()
     
@@ -1969,6 +1390,12 @@ def generate_combat_id() -> str:
 
 def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: bool = False) -> str:
     """Initialize a new combat state and return combat_id"""
+    combat_state = build_combat_state(character1_id, character2_data, is_pvp)
+    set_combat_state(combat_state['combat_id'], combat_state)
+    return combat_state['combat_id']
+
+def build_combat_state(character1_id: str, character2_data: Dict, is_pvp: bool = False) -> Dict:
+    """Build a new combat state (not stored) for character1 against character2"""
     combat_id = generate_combat_id()
     
     conn = get_db_connection()
@@ -1982,8 +1409,8 @@ def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: b
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    char1_stats = json.loads(char1['stats_json'])
-    char1_equipment = json.loads(char1['equipment_json'])
+    char1_stats = load_json_column(char1['stats_json'])
+    char1_equipment = load_json_column(char1['equipment_json'])
     char1_equipment_stats = get_equipment_stats(char1_equipment)
     char1_combat = calculate_combat_stats(char1_stats, char1_equipment_stats, char1_equipment)
     char1_weapon_type = get_weapon_type(char1_equipment)
@@ -2003,6 +1430,7 @@ def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: b
     
     # Get opponent data
     char2_ability_loadout = {}  # Initialize for both cases
+    char2_combat_stance = 'balanced'
     if isinstance(character2_data, dict) and 'id' in character2_data:
         # AI or offline player
         char2_combat = character2_data.get('combat_stats', {})
@@ -2019,14 +1447,16 @@ def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: b
             conn.close()
             raise HTTPException(status_code=404, detail="Opponent not found")
         
-        char2_stats = json.loads(char2['stats_json'])
-        char2_equipment = json.loads(char2['equipment_json'])
+        char2_stats = load_json_column(char2['stats_json'])
+        char2_equipment = load_json_column(char2['equipment_json'])
         char2_equipment_stats = get_equipment_stats(char2_equipment)
         char2_combat = calculate_combat_stats(char2_stats, char2_equipment_stats, char2_equipment)
         char2_name = char2['name']
         char2_id = char2['id']
         char2_level = char2['level']
         char2_weapon_type = get_weapon_type(char2_equipment)
+        if 'combat_stance' in char2.keys() and char2['combat_stance']:
+            char2_combat_stance = char2['combat_stance']
         
         # For PvP, load opponent's ability loadout
         if is_pvp:
@@ -2061,6 +1491,8 @@ def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: b
             'last_mana_regen_time': datetime.now().timestamp(),
             'auto_attack_enabled': True,
             'auto_ability_enabled': False,
+            'ability_loadout': ability_loadout,
+            'combat_stance': combat_stance,
             'ability_cooldowns': {},
             'buffs': {},
             'debuffs': {}
@@ -2082,6 +1514,7 @@ def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: b
             'auto_attack_enabled': True,
             'auto_ability_enabled': is_pvp,  # Enable abilities for PvP opponents (not ultimates)
             'ability_loadout': char2_ability_loadout if is_pvp else {},  # Load opponent's ability loadout in PvP
+            'combat_stance': char2_combat_stance,
             'ability_cooldowns': {},
             'buffs': {},
             'debuffs': {}
@@ -2092,33 +1525,27 @@ def initialize_combat_state(character1_id: str, character2_data: Dict, is_pvp: b
         'is_active': True
     }
     
-    set_combat_state(combat_id, combat_state)
-    return combat_id
+    return combat_state
 
 # Combat endpoints
 @app.post("/api/combat/start")
 @limiter.limit("30/minute")
-async def start_combat(request: Dict = Body(...), current_user: dict = Depends(get_current_user), req: Request = None):
+@async_db.offload
+def start_combat(request: Request, payload: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Start a new combat encounter"""
     try:
         user_id = current_user["user_id"]
-        character_id = request.get('character_id')
+        character_id = payload.get('character_id')
         
         if not character_id:
             raise HTTPException(status_code=400, detail="character_id required")
         
         # Verify character belongs to user
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-        if not cursor.fetchone():
-            conn.close()
-            raise HTTPException(status_code=403, detail="Character not found or access denied")
-        conn.close()
+        ensure_owned(user_id, character_id)
         
-        opponent_id = request.get('opponent_id')
-        enemy_id = request.get('enemy_id')  # For PvE
-        is_pvp = request.get('is_pvp', False)
+        opponent_id = payload.get('opponent_id')
+        enemy_id = payload.get('enemy_id')  # For PvE
+        is_pvp = payload.get('is_pvp', False)
         
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -2135,8 +1562,8 @@ async def start_combat(request: Dict = Body(...), current_user: dict = Depends(g
                 conn.close()
                 raise HTTPException(status_code=404, detail="Opponent not found")
             
-            opponent_stats = json.loads(opponent['stats_json'])
-            opponent_equipment = json.loads(opponent['equipment_json'])
+            opponent_stats = load_json_column(opponent['stats_json'])
+            opponent_equipment = load_json_column(opponent['equipment_json'])
             opponent_equipment_stats = get_equipment_stats(opponent_equipment)
             opponent_combat = calculate_combat_stats(opponent_stats, opponent_equipment_stats, opponent_equipment)
             
@@ -2160,7 +1587,7 @@ async def start_combat(request: Dict = Body(...), current_user: dict = Depends(g
                 conn.close()
                 raise HTTPException(status_code=404, detail="Enemy not found")
             
-            enemy_stats = json.loads(enemy['stats_json'])
+            enemy_stats = load_json_column(enemy['stats_json'])
             enemy_equipment = {slot: None for slot in EQUIPMENT_SLOTS}
             enemy_equipment_stats = get_equipment_stats(enemy_equipment)
             enemy_combat = calculate_combat_stats(enemy_stats, enemy_equipment_stats, enemy_equipment)
@@ -2202,7 +1629,8 @@ async def start_combat(request: Dict = Body(...), current_user: dict = Depends(g
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/api/combat/state/{combat_id}")
-async def get_combat_state_endpoint(combat_id: str):
+@async_db.offload(serialize_on="combat_id")
+def get_combat_state_endpoint(combat_id: str):
     """Get current combat state (polling endpoint)"""
     try:
         state = get_combat_state(combat_id)
@@ -2241,6 +1669,11 @@ async def get_combat_state_endpoint(combat_id: str):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def combat_time(state: Dict) -> float:
+    """Current time for a combat: the wall clock, or the simulated clock of a ghost battle"""
+    virtual_time = state.get('virtual_time')
+    return virtual_time if virtual_time is not None else datetime.now().timestamp()
+
 def process_combat_turns(combat_id: str):
     """Process combat turns based on attack speeds"""
     state = get_combat_state(combat_id)
@@ -2249,7 +1682,19 @@ def process_combat_turns(combat_id: str):
     if not state['is_active']:
         return
     
-    current_time = datetime.now().timestamp()
+    finished = advance_combat(state, combat_time(state))
+    set_combat_state(combat_id, state)
+    
+    # Check for combat end
+    if finished:
+        end_combat(combat_id)
+        # State is saved inside end_combat, but ensure it's persisted
+        final_state = get_combat_state(combat_id)
+        if final_state:
+            set_combat_state(combat_id, final_state)
+
+def advance_combat(state: Dict, current_time: float) -> bool:
+    """Run one combat step at ``current_time``; returns True once either side is down"""
     player1 = state['player1']
     player2 = state['player2']
     
@@ -2291,13 +1736,7 @@ def process_combat_turns(combat_id: str):
     # Update ability cooldowns
     update_ability_cooldowns(state, current_time)
     
-    # Check for combat end
-    if player1['current_hp'] <= 0 or player2['current_hp'] <= 0:
-        end_combat(combat_id)
-        # State is saved inside end_combat, but ensure it's persisted
-        final_state = get_combat_state(combat_id)
-        if final_state:
-            set_combat_state(combat_id, final_state)
+    return player1['current_hp'] <= 0 or player2['current_hp'] <= 0
 
 def perform_auto_attack(state: Dict, attacker_key: str, defender_key: str):
     """Perform an auto-attack"""
@@ -2317,7 +1756,7 @@ def perform_auto_attack(state: Dict, attacker_key: str, defender_key: str):
         'type': 'attack',
         'attacker': attacker_key,
         'defender': defender_key,
-        'timestamp': datetime.now().timestamp()
+        'timestamp': combat_time(state)
     })
     
     if hit:
@@ -2341,7 +1780,7 @@ def perform_auto_attack(state: Dict, attacker_key: str, defender_key: str):
             'target': defender_key,
             'damage': damage,
             'is_crit': crit,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         
         crit_text = " (CRIT!)" if crit else ""
@@ -2353,7 +1792,7 @@ def perform_auto_attack(state: Dict, attacker_key: str, defender_key: str):
         state['visual_events'].append({
             'type': 'dodge',
             'target': defender_key,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         state['combat_log'].append(f"{defender['name']} dodges {attacker['name']}'s attack!")
     elif parried:
@@ -2361,7 +1800,7 @@ def perform_auto_attack(state: Dict, attacker_key: str, defender_key: str):
         state['visual_events'].append({
             'type': 'parry',
             'target': defender_key,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         state['combat_log'].append(f"{defender['name']} parries {attacker['name']}'s attack!")
     else:
@@ -2369,14 +1808,14 @@ def perform_auto_attack(state: Dict, attacker_key: str, defender_key: str):
         state['visual_events'].append({
             'type': 'miss',
             'target': defender_key,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         state['combat_log'].append(f"{attacker['name']} misses {defender['name']}!")
 
 def process_auto_abilities(state: Dict, attacker_key: str, defender_key: str):
     """Process auto-triggered abilities with loadout cycling and stance-based prioritization"""
     attacker = state[attacker_key]
-    current_time = datetime.now().timestamp()
+    current_time = combat_time(state)
     
     # Check if stunned
     for debuff_data in attacker['debuffs'].values():
@@ -2542,7 +1981,7 @@ def apply_status_effect(state: Dict, target_key: str, effect_type: str, power: f
                        charisma: int = 0, max_stacks: int = 5, aoe: bool = False):
     """Apply a status effect (buff or debuff) to a player with stacking support"""
     target = state[target_key]
-    current_time = datetime.now().timestamp()
+    current_time = combat_time(state)
     
     # Charisma affects effect power and duration
     power_multiplier = 1.0 + (charisma * 0.01)  # +1% per Charisma point
@@ -2611,7 +2050,7 @@ def trigger_ability(state: Dict, attacker_key: str, defender_key: str, ability_i
         return
     
     # Check cooldown
-    current_time = datetime.now().timestamp()
+    current_time = combat_time(state)
     cooldown_key = f"{ability_id}_cooldown"
     if cooldown_key in attacker['ability_cooldowns']:
         if current_time < attacker['ability_cooldowns'][cooldown_key]:
@@ -2630,7 +2069,7 @@ def trigger_ability(state: Dict, attacker_key: str, defender_key: str, ability_i
         'defender': defender_key,
         'ability_id': ability_id,
         'ability_name': ability['name'],
-        'timestamp': datetime.now().timestamp()
+        'timestamp': combat_time(state)
     })
     
     # Calculate damage
@@ -2660,7 +2099,7 @@ def trigger_ability(state: Dict, attacker_key: str, defender_key: str, ability_i
             'is_crit': is_crit,
             'is_ability': True,
             'ability_name': ability['name'],
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         
         # Apply status effects from ability
@@ -2703,7 +2142,7 @@ def trigger_ability(state: Dict, attacker_key: str, defender_key: str, ability_i
         state['visual_events'].append({
             'type': 'dodge',
             'target': defender_key,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         state['combat_log'].append(f"{defender['name']} dodges {attacker['name']}'s {ability['name']}!")
     elif parried:
@@ -2711,7 +2150,7 @@ def trigger_ability(state: Dict, attacker_key: str, defender_key: str, ability_i
         state['visual_events'].append({
             'type': 'parry',
             'target': defender_key,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         state['combat_log'].append(f"{defender['name']} parries {attacker['name']}'s {ability['name']}!")
     else:
@@ -2719,25 +2158,20 @@ def trigger_ability(state: Dict, attacker_key: str, defender_key: str, ability_i
         state['visual_events'].append({
             'type': 'miss',
             'target': defender_key,
-            'timestamp': datetime.now().timestamp()
+            'timestamp': combat_time(state)
         })
         state['combat_log'].append(f"{attacker['name']}'s {ability['name']} misses {defender['name']}!")
 
 @app.post("/api/combat/ability/{combat_id}")
-async def use_ability(combat_id: str, request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+@async_db.offload(serialize_on="combat_id")
+def use_ability(combat_id: str, request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Manually trigger an ability"""
     user_id = current_user["user_id"]
     ability_id = request.get('ability_id')
     character_id = request.get('character_id')
     
     # Verify character belongs to user
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=403, detail="Character not found or access denied")
-    conn.close()
+    ensure_owned(user_id, character_id)
     
     state = get_combat_state(combat_id)
     if state is None:
@@ -2762,19 +2196,14 @@ async def use_ability(combat_id: str, request: Dict = Body(...), current_user: d
     return {"success": True, "combat": state}
 
 @app.post("/api/combat/auto-toggle/{combat_id}")
-async def toggle_auto_combat(combat_id: str, request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+@async_db.offload(serialize_on="combat_id")
+def toggle_auto_combat(combat_id: str, request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Toggle auto-attack or auto-ability"""
     user_id = current_user["user_id"]
     character_id = request.get('character_id')
     
     # Verify character belongs to user
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=403, detail="Character not found or access denied")
-    conn.close()
+    ensure_owned(user_id, character_id)
     toggle_type = request.get('toggle_type')  # 'attack' or 'ability'
     enabled = request.get('enabled', True)
     
@@ -2799,9 +2228,15 @@ async def toggle_auto_combat(combat_id: str, request: Dict = Body(...), current_
     
     return {"success": True, "combat": state}
 
-def end_combat(combat_id: str):
-    """End combat and award rewards"""
-    state = get_combat_state(combat_id)
+def end_combat(combat_id: str, state: Optional[Dict] = None):
+    """End combat and award rewards
+    
+    Pass ``state`` to settle a combat that is not stored (ghost battles); it is
+    updated in place and not saved.
+    """
+    stored = state is None
+    if stored:
+        state = get_combat_state(combat_id)
     if state is None:
         return
     
@@ -2907,7 +2342,8 @@ def end_combat(combat_id: str):
                 if conn:
                     conn.close()
                 # Don't return early - save state with error flag
-                set_combat_state(combat_id, state)
+                if stored:
+                    set_combat_state(combat_id, state)
                 return
             
             # Handle None values (SQLite returns None for missing/null values)
@@ -2931,25 +2367,15 @@ def end_combat(combat_id: str):
             char_dict = process_level_up(char_dict)
             
             cursor.execute(
-                "UPDATE characters SET exp = ?, level = ?, skill_points = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                "UPDATE characters SET exp = ?, level = ?, skill_points = ?, gold = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
                 (char_dict['exp'], char_dict['level'], char_dict.get('skill_points', 0), new_gold, winner_id)
             )
-
-            try:
-                player_tracking_service.record_progress(
-                    character_id=winner_id,
-                    user_id=owner_user_id,
-                    level=char_dict['level'],
-                    exp_gain=exp_gain,
-                    gold_gain=gold_gain,
-                    metadata={
-                        "combat_id": combat_id,
-                        "is_pvp": state.get('is_pvp', False),
-                        "opponent_id": state.get('opponent_id'),
-                    },
-                )
-            except Exception as tracking_error:
-                logger.warning(f"Failed to record progress for {winner_id}: {tracking_error}")
+            # Shared rankings are refreshed once the transaction has committed
+            ranking_updates = [(winner_id, {'level': char_dict['level']})]
+            
+            # Analytics use their own connections, so they are written after this
+            # transaction commits (SQLite would otherwise block them on its write lock)
+            pvp_record = None
             
             # Drop equipment based on drop chance
             equipment_dropped = False
@@ -2958,66 +2384,15 @@ def end_combat(combat_id: str):
                 slot = random.choice(EQUIPMENT_SLOTS)
                 equipment = generate_equipment(slot, rarity, char_dict['level'])
                 
-                cursor.execute("SELECT inventory_json FROM characters WHERE id = ?", (winner_id,))
-                inv_data = cursor.fetchone()
-                inventory = json.loads(inv_data['inventory_json'])
-                
                 # Check inventory limit (100 items)
-                if len(inventory) < 100:
-                    inventory.append(equipment)
+                if inventory_repository.add_items(cursor, winner_id, [equipment]):
                     equipment_dropped = True
-                    cursor.execute(
-                        "UPDATE characters SET inventory_json = ? WHERE id = ?",
-                        (json.dumps(inventory), winner_id)
-                    )
             
             rewards['equipment_dropped'] = equipment_dropped
             
             # Update PvP stats if this is a PvP match
             if state['is_pvp'] and not is_auto_fight:
                 try:
-                    # Check if PvP columns exist first
-                    existing_columns = set()
-                    if USE_POSTGRES:
-                        cursor.execute("""
-                            SELECT column_name 
-                            FROM information_schema.columns 
-                            WHERE table_name = 'characters' AND column_name IN ('pvp_wins', 'pvp_losses', 'pvp_mmr')
-                        """)
-                        existing_columns = {row['column_name'] for row in cursor.fetchall()}
-                        has_pvp_columns = len(existing_columns) == 3
-                    else:
-                        cursor.execute("PRAGMA table_info(characters)")
-                        columns = [col[1] for col in cursor.fetchall()]
-                        existing_columns = set(columns)
-                        has_pvp_columns = all(col in columns for col in ['pvp_wins', 'pvp_losses', 'pvp_mmr'])
-                    
-                    if not has_pvp_columns:
-                        print("[WARNING] PvP columns missing, attempting to add them...")
-                        # Try to add missing columns
-                        if USE_POSTGRES:
-                            if 'pvp_wins' not in existing_columns:
-                                cursor.execute('ALTER TABLE characters ADD COLUMN pvp_wins INTEGER DEFAULT 0')
-                                conn.commit()
-                            if 'pvp_losses' not in existing_columns:
-                                cursor.execute('ALTER TABLE characters ADD COLUMN pvp_losses INTEGER DEFAULT 0')
-                                conn.commit()
-                            if 'pvp_mmr' not in existing_columns:
-                                cursor.execute('ALTER TABLE characters ADD COLUMN pvp_mmr INTEGER DEFAULT 1000')
-                                conn.commit()
-                        else:
-                            # For SQLite, try to add columns with error handling
-                            for col_sql in [
-                                'ALTER TABLE characters ADD COLUMN pvp_wins INTEGER DEFAULT 0',
-                                'ALTER TABLE characters ADD COLUMN pvp_losses INTEGER DEFAULT 0',
-                                'ALTER TABLE characters ADD COLUMN pvp_mmr INTEGER DEFAULT 1000'
-                            ]:
-                                try:
-                                    cursor.execute(col_sql)
-                                    conn.commit()
-                                except Exception:
-                                    pass  # Column already exists
-                    
                     # Get current PvP stats for both players
                     cursor.execute("SELECT user_id, pvp_wins, pvp_losses, pvp_mmr FROM characters WHERE id = ?", (winner_id,))
                     winner_stats = cursor.fetchone()
@@ -3045,32 +2420,35 @@ def end_combat(combat_id: str):
                     # SQLite Row objects use dictionary-style access, not .get()
                     winner_wins = (winner_stats['pvp_wins'] if winner_stats and winner_stats['pvp_wins'] is not None else 0) + 1
                     cursor.execute(
-                        "UPDATE characters SET pvp_wins = ?, pvp_mmr = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                        "UPDATE characters SET pvp_wins = ?, pvp_mmr = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
                         (winner_wins, new_winner_mmr, winner_id)
                     )
                     
                     # Update loser stats
                     loser_losses = (loser_stats['pvp_losses'] if loser_stats and loser_stats['pvp_losses'] is not None else 0) + 1
                     cursor.execute(
-                        "UPDATE characters SET pvp_losses = ?, pvp_mmr = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                        "UPDATE characters SET pvp_losses = ?, pvp_mmr = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
                         (loser_losses, new_loser_mmr, loser_id)
                     )
+                    ranking_updates.append((winner_id, {'mmr': new_winner_mmr, 'wins': winner_wins}))
+                    ranking_updates.append((loser_id, {'mmr': new_loser_mmr, 'losses': loser_losses}))
+                    state['mmr_changes'] = {
+                        winner_id: {'before': winner_mmr, 'after': new_winner_mmr},
+                        loser_id: {'before': loser_mmr, 'after': new_loser_mmr},
+                    }
 
                     if winner_stats and loser_stats:
-                        try:
-                            player_tracking_service.record_pvp_result(
-                                winner_character_id=winner_id,
-                                loser_character_id=loser_id,
-                                winner_user_id=winner_stats['user_id'],
-                                loser_user_id=loser_stats['user_id'],
-                                winner_mmr_before=winner_mmr,
-                                winner_mmr_after=new_winner_mmr,
-                                loser_mmr_before=loser_mmr,
-                                loser_mmr_after=new_loser_mmr,
-                                metadata={"combat_id": combat_id},
-                            )
-                        except Exception as tracking_error:
-                            logger.warning(f"Failed to persist PvP match analytics: {tracking_error}")
+                        pvp_record = dict(
+                            winner_character_id=winner_id,
+                            loser_character_id=loser_id,
+                            winner_user_id=winner_stats['user_id'],
+                            loser_user_id=loser_stats['user_id'],
+                            winner_mmr_before=winner_mmr,
+                            winner_mmr_after=new_winner_mmr,
+                            loser_mmr_before=loser_mmr,
+                            loser_mmr_after=new_loser_mmr,
+                            metadata={"combat_id": combat_id},
+                        )
                 except Exception as pvp_error:
                     import traceback
                     error_msg = f"Failed to update PvP stats: {pvp_error}"
@@ -3083,6 +2461,28 @@ def end_combat(combat_id: str):
                         rewards['pvp_stats_error'] = str(pvp_error)
             
             conn.commit()
+            publish_ranking_updates(ranking_updates)
+            
+            try:
+                player_tracking_service.record_progress(
+                    character_id=winner_id,
+                    user_id=owner_user_id,
+                    level=char_dict['level'],
+                    exp_gain=exp_gain,
+                    gold_gain=gold_gain,
+                    metadata={
+                        "combat_id": combat_id,
+                        "is_pvp": state.get('is_pvp', False),
+                        "opponent_id": state.get('opponent_id'),
+                    },
+                )
+            except Exception as tracking_error:
+                logger.warning(f"Failed to record progress for {winner_id}: {tracking_error}")
+            if pvp_record:
+                try:
+                    player_tracking_service.record_pvp_result(**pvp_record)
+                except Exception as tracking_error:
+                    logger.warning(f"Failed to persist PvP match analytics: {tracking_error}")
             
             # Verify the update was actually saved by reading it back
             cursor.execute("SELECT exp, level, gold FROM characters WHERE id = ?", (winner_id,))
@@ -3126,6 +2526,8 @@ def end_combat(combat_id: str):
                     pass
     
     # Always save the state after updating (even if rewards failed to apply)
+    if not stored:
+        return
     try:
         set_combat_state(combat_id, state)
     except Exception as e:
@@ -3134,7 +2536,8 @@ def end_combat(combat_id: str):
         print(traceback.format_exc())
 
 @app.post("/api/combat/end/{combat_id}")
-async def end_combat_endpoint(combat_id: str):
+@async_db.offload(serialize_on="combat_id")
+def end_combat_endpoint(combat_id: str):
     """Manually end combat (cleanup)"""
     state = get_combat_state(combat_id)
     if state is not None:
@@ -3144,6 +2547,67 @@ async def end_combat_endpoint(combat_id: str):
         return {"success": True, "combat": final_state if final_state else state}
     raise HTTPException(status_code=404, detail="Combat not found")
 
+def _replay_event(event: Dict, started_at: float) -> List:
+    """Compact replay row for a visual event: [ms since start, type, side, value, crit]"""
+    actor = event.get('attacker') if event['type'] in ('attack', 'ability') else event.get('target')
+    value = event.get('damage', event.get('amount', event.get('ability_id')))
+    return [
+        int(round((event['timestamp'] - started_at) * 1000)),
+        event['type'],
+        2 if actor == 'player2' else 1,
+        value,
+        1 if event.get('is_crit') else 0,
+    ]
+
+def simulate_combat(state: Dict, tick_seconds: float, max_seconds: float) -> Dict:
+    """Run a combat to the end on a virtual clock and return its compact replay
+    
+    Steps the same rules as live combat every ``tick_seconds`` of simulated time,
+    without waiting. If nobody is down after ``max_seconds``, the side with the
+    smaller share of its health left loses (ties go to player2).
+    """
+    started_at = combat_time(state)
+    state['virtual_time'] = started_at
+    events = []
+    finished = False
+    while not finished and state['virtual_time'] - started_at < max_seconds:
+        state['virtual_time'] += tick_seconds
+        finished = advance_combat(state, state['virtual_time'])
+        events.extend(_replay_event(event, started_at) for event in state['visual_events'])
+        state['visual_events'] = []
+    
+    if not finished:
+        loser_key = min(
+            ('player1', 'player2'),
+            key=lambda key: (state[key]['current_hp'] / max(1, state[key]['max_hp']), key == 'player2'),
+        )
+        state[loser_key]['current_hp'] = 0
+        state['combat_log'].append(f"Time expired: {state[loser_key]['name']} loses")
+        events.append([
+            int(round((state['virtual_time'] - started_at) * 1000)),
+            'timeout',
+            2 if loser_key == 'player2' else 1,
+            None,
+            0,
+        ])
+    
+    return {
+        'tick_ms': int(round(tick_seconds * 1000)),
+        'duration_ms': int(round((state['virtual_time'] - started_at) * 1000)),
+        'players': {
+            str(side): {
+                'id': state[key]['id'],
+                'name': state[key]['name'],
+                'level': state[key]['level'],
+                'max_hp': state[key]['max_hp'],
+                'max_mana': state[key]['max_mana'],
+                'weapon_type': state[key]['weapon_type'],
+            }
+            for side, key in ((1, 'player1'), (2, 'player2'))
+        },
+        'events': events,
+    }
+
 # Legacy combat endpoint (kept for backwards compatibility, but should use new system)
 async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool = True):
     """Resolve a combat encounter"""
@@ -3158,8 +2622,8 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    char1_stats = json.loads(char1['stats_json'])
-    char1_equipment = json.loads(char1['equipment_json'])
+    char1_stats = load_json_column(char1['stats_json'])
+    char1_equipment = load_json_column(char1['equipment_json'])
     char1_equipment_stats = get_equipment_stats(char1_equipment)
     char1_combat = calculate_combat_stats(char1_stats, char1_equipment_stats, char1_equipment)
     
@@ -3178,8 +2642,8 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
             conn.close()
             raise HTTPException(status_code=404, detail="Opponent not found")
         
-        char2_stats = json.loads(char2['stats_json'])
-        char2_equipment = json.loads(char2['equipment_json'])
+        char2_stats = load_json_column(char2['stats_json'])
+        char2_equipment = load_json_column(char2['equipment_json'])
         char2_equipment_stats = get_equipment_stats(char2_equipment)
         char2_combat = calculate_combat_stats(char2_stats, char2_equipment_stats, char2_equipment)
         char2_name = char2['name']
@@ -3253,6 +2717,7 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
         exp_gain = max(1, exp_gain)  # Ensure never negative
     
     # Update winner's EXP and level
+    ranking_updates = []
     if winner_id == character1_id:
         cursor.execute("SELECT exp, level FROM characters WHERE id = ?", (character1_id,))
         char_data = cursor.fetchone()
@@ -3268,9 +2733,10 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
         char_dict = process_level_up(char_dict)
         
         cursor.execute(
-            "UPDATE characters SET exp = ?, level = ?, skill_points = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            "UPDATE characters SET exp = ?, level = ?, skill_points = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
             (char_dict['exp'], char_dict['level'], char_dict['skill_points'], character1_id)
         )
+        ranking_updates.append((character1_id, {'level': char_dict['level']}))
         
         # Drop equipment
         if random.random() < 0.7:  # 70% drop chance
@@ -3278,15 +2744,7 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
             slot = random.choice(EQUIPMENT_SLOTS)
             equipment = generate_equipment(slot, rarity, char_dict['level'])
             
-            cursor.execute("SELECT inventory_json FROM characters WHERE id = ?", (character1_id,))
-            inv_data = cursor.fetchone()
-            inventory = json.loads(inv_data['inventory_json'])
-            inventory.append(equipment)
-            
-            cursor.execute(
-                "UPDATE characters SET inventory_json = ? WHERE id = ?",
-                (json.dumps(inventory), character1_id)
-            )
+            inventory_repository.add_item(cursor, character1_id, equipment)
     
     # Save combat log
     cursor.execute(
@@ -3297,6 +2755,7 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
     
     conn.commit()
     conn.close()
+    publish_ranking_updates(ranking_updates)
     
     return {
         "success": True,
@@ -3307,149 +2766,72 @@ async def resolve_combat(character1_id: str, character2_id_or_data, is_pvp: bool
     }
 
 @app.post("/api/combat/auto-toggle")
-async def toggle_auto_combat(request: Dict = Body(...)):
+@async_db.offload
+def toggle_auto_combat(request: Dict = Body(...)):
     """Toggle auto combat mode"""
     character_id = request.get('character_id')
     auto_combat = request.get('auto_combat', False)
     
-    if not character_id:
-        raise HTTPException(status_code=400, detail="character_id required")
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "UPDATE characters SET auto_combat = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (1 if auto_combat else 0, character_id)
-    )
-    
-    conn.commit()
-    conn.close()
-    
-    return {"success": True, "auto_combat": auto_combat}
-
-# PvE endpoints
-@app.get("/api/pve/list")
-async def list_pve_enemies(character_id: str):
-    """Get available PvE enemies for character"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get character level and progress
-    cursor.execute("SELECT level FROM characters WHERE id = ?", (character_id,))
-    char = cursor.fetchone()
-    if not char:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Character not found")
-    
-    char_level = char['level']
-    
-    # Get PvE progress
-    cursor.execute("SELECT enemies_unlocked_json FROM character_pve_progress WHERE character_id = ?", (character_id,))
-    progress = cursor.fetchone()
-    
-    if progress:
-        unlocked_enemies = json.loads(progress['enemies_unlocked_json'])
-    else:
-        unlocked_enemies = ['chicken']  # Start with first enemy (Chicken)
-        # Initialize progress
-        if USE_POSTGRES:
-            cursor.execute(
-                "INSERT INTO character_pve_progress (character_id, enemies_unlocked_json) VALUES (%s, %s) ON CONFLICT (character_id) DO NOTHING",
-                (character_id, json.dumps(unlocked_enemies))
-            )
-        else:
-            cursor.execute(
-                "INSERT OR IGNORE INTO character_pve_progress (character_id, enemies_unlocked_json) VALUES (?, ?)",
-                (character_id, json.dumps(unlocked_enemies))
-            )
-        conn.commit()
-    
-    # Get all enemies
-    cursor.execute("SELECT * FROM pve_enemies ORDER BY story_order")
-    all_enemies = cursor.fetchall()
+    if not character_id:
+        raise HTTPException(status_code=400, detail="character_id required")
     
-    if not all_enemies:
-        conn.close()
-        return {"success": True, "enemies": []}
+    conn = get_db_connection()
+    cursor = conn.cursor()
     
-    # Ensure unlocked list only contains valid enemy IDs
-    valid_enemy_ids = {enemy['id'] for enemy in all_enemies}
-    filtered_unlocked = [enemy_id for enemy_id in unlocked_enemies if enemy_id in valid_enemy_ids]
-    if filtered_unlocked != unlocked_enemies:
-        unlocked_enemies = filtered_unlocked
-        cursor.execute(
-            "UPDATE character_pve_progress SET enemies_unlocked_json = ? WHERE character_id = ?",
-            (json.dumps(unlocked_enemies), character_id)
-        )
-        conn.commit()
+    cursor.execute(
+        "UPDATE characters SET auto_combat = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
+        (1 if auto_combat else 0, character_id)
+    )
     
-    # Always unlock the first enemy (Chicken) by default
-    first_enemy_id = all_enemies[0]['id']
-    if first_enemy_id not in unlocked_enemies:
-        unlocked_enemies.insert(0, first_enemy_id)
-        cursor.execute(
-            "UPDATE character_pve_progress SET enemies_unlocked_json = ? WHERE character_id = ?",
-            (json.dumps(unlocked_enemies), character_id)
-        )
-        conn.commit()
+    conn.commit()
+    conn.close()
     
+    return {"success": True, "auto_combat": auto_combat}
+
+# PvE endpoints
+@app.get("/api/pve/list")
+@async_db.offload
+def list_pve_enemies(character_id: str):
+    """Get available PvE enemies for character"""
+    conn = get_db_read_connection()
+    cursor = conn.cursor()
+    
+    # Character existence and story progress in one read
+    cursor.execute(
+        """SELECT c.level, p.highest_unlocked_order
+           FROM characters c
+           LEFT JOIN character_pve_progress p ON p.character_id = c.id
+           WHERE c.id = ?""",
+        (character_id,)
+    )
+    char = cursor.fetchone()
     conn.close()
     
+    if not char:
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    # The first enemy is always unlocked, so a missing progress row means story order 1
+    highest_unlocked = pve_catalog.clamp_order(char['highest_unlocked_order'])
+    
     enemies_list = []
-    for enemy in all_enemies:
-        is_unlocked = enemy['id'] in unlocked_enemies
-        keys = enemy.keys()
-        description = enemy['description'] if 'description' in keys and enemy['description'] else ''
-        gold_min = enemy['gold_min'] if 'gold_min' in keys and enemy['gold_min'] is not None else 1
-        gold_max = enemy['gold_max'] if 'gold_max' in keys and enemy['gold_max'] is not None else gold_min
-        drop_chance = enemy['drop_chance'] if 'drop_chance' in keys and enemy['drop_chance'] is not None else 0.0
+    for enemy in pve_catalog.enemies:
         enemies_list.append({
             'id': enemy['id'],
             'name': enemy['name'],
             'level': enemy['level'],
-            'description': description,
+            'description': enemy.get('description') or '',
             'story_order': enemy['story_order'],
-            'unlocked': is_unlocked,
-            'gold_min': gold_min,
-            'gold_max': gold_max,
-            'drop_chance': drop_chance
+            'unlocked': enemy['story_order'] <= highest_unlocked,
+            'gold_min': enemy['gold_min'],
+            'gold_max': enemy['gold_max'],
+            'drop_chance': enemy['drop_chance']
         })
     
     return {"success": True, "enemies": enemies_list}
 
 def unlock_next_enemy(character_id: str, enemy_id: str) -> bool:
     """Unlock the next PvE enemy after defeating current one"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get current progress
-    cursor.execute("SELECT enemies_unlocked_json FROM character_pve_progress WHERE character_id = ?", (character_id,))
-    progress = cursor.fetchone()
-    
-    if progress:
-        unlocked_enemies = json.loads(progress['enemies_unlocked_json'])
-    else:
-        unlocked_enemies = ['enemy_1']
-    
-    # Get next enemy
-    cursor.execute("SELECT story_order FROM pve_enemies WHERE id = ?", (enemy_id,))
-    current_enemy = cursor.fetchone()
-    
-    if current_enemy:
-        next_order = current_enemy['story_order'] + 1
-        cursor.execute("SELECT id FROM pve_enemies WHERE story_order = ?", (next_order,))
-        next_enemy = cursor.fetchone()
-        
-        if next_enemy and next_enemy['id'] not in unlocked_enemies:
-            unlocked_enemies.append(next_enemy['id'])
-            cursor.execute(
-                "UPDATE character_pve_progress SET enemies_unlocked_json = ? WHERE character_id = ?",
-                (json.dumps(unlocked_enemies), character_id)
-            )
-            conn.commit()
-    
-    conn.close()
+    pve_progress_service.unlock_next(character_id, enemy_id)
     return True
 
 @app.post("/api/pve/unlock")
@@ -3459,7 +2841,8 @@ async def unlock_pve_enemy(character_id: str, enemy_id: str):
     return {"success": True}
 
 @app.post("/api/pve/auto-fight")
-async def start_auto_fight(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+@async_db.offload
+def start_auto_fight(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Start an hour-long auto-fight session against a PvE enemy"""
     try:
         user_id = current_user["user_id"]
@@ -3525,13 +2908,8 @@ async def start_auto_fight(request: Dict = Body(...), current_user: dict = Depen
             raise HTTPException(status_code=404, detail="Enemy not found")
         
         # Check if enemy is unlocked
-        cursor.execute("SELECT enemies_unlocked_json FROM character_pve_progress WHERE character_id = ?", (character_id,))
-        progress = cursor.fetchone()
-        unlocked_enemies = ['chicken']  # Default
-        if progress:
-            unlocked_enemies = json.loads(progress['enemies_unlocked_json'])
-        
-        if enemy_id not in unlocked_enemies:
+        highest_unlocked = pve_progress_service.get_highest_unlocked(cursor, character_id)
+        if not pve_progress_service.is_unlocked(highest_unlocked, enemy_id):
             conn.close()
             raise HTTPException(status_code=400, detail="Enemy not unlocked")
         
@@ -3546,12 +2924,12 @@ async def start_auto_fight(request: Dict = Body(...), current_user: dict = Depen
         # Use simpler format without prefix to avoid FastAPI route matching issues
         session_id = f"{random.randint(100000, 999999)}{int(datetime.now().timestamp())}"
         
-        char_stats = json.loads(char['stats_json'])
-        char_equipment = json.loads(char['equipment_json'])
+        char_stats = load_json_column(char['stats_json'])
+        char_equipment = load_json_column(char['equipment_json'])
         char_equipment_stats = get_equipment_stats(char_equipment)
         char_combat = calculate_combat_stats(char_stats, char_equipment_stats, char_equipment)
         
-        enemy_stats = json.loads(enemy['stats_json'])
+        enemy_stats = load_json_column(enemy['stats_json'])
         enemy_equipment = {slot: None for slot in EQUIPMENT_SLOTS}
         enemy_equipment_stats = get_equipment_stats(enemy_equipment)
         enemy_combat = calculate_combat_stats(enemy_stats, enemy_equipment_stats, enemy_equipment)
@@ -3608,7 +2986,8 @@ async def start_auto_fight(request: Dict = Body(...), current_user: dict = Depen
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @app.get("/api/pve/auto-fight/{session_id}")
-async def get_auto_fight_status(session_id: str):
+@async_db.offload(serialize_on="session_id")
+def get_auto_fight_status(session_id: str):
     """Get status of auto-fight session"""
     logger.info(f"[AUTO-FIGHT] GET request for session_id: {session_id}")
     session = get_auto_fight_session(session_id)
@@ -3650,7 +3029,8 @@ async def get_auto_fight_status(session_id: str):
     }
 
 @app.post("/api/pve/auto-fight/extend")
-async def extend_auto_fight(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+@async_db.offload(serialize_on=lambda kwargs: kwargs["request"].get("session_id"))
+def extend_auto_fight(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Extend an active auto-fight session by adding hours"""
     user_id = current_user["user_id"]
     session_id = request.get('session_id')
@@ -3704,16 +3084,7 @@ async def extend_auto_fight(request: Dict = Body(...), current_user: dict = Depe
     # Deduct gold
     new_gold = current_gold - cost
     
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET gold = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-            (new_gold, session['character_id'])
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (new_gold, session['character_id'])
-        )
+    statements.execute(cursor, CHARACTER_SET_GOLD, (new_gold, session['character_id']))
     
     conn.commit()
     conn.close()
@@ -3831,7 +3202,7 @@ def process_auto_fight(session_id: str):
             conn.close()
             return
         
-        enemy_stats = json.loads(enemy['stats_json'])
+        enemy_stats = load_json_column(enemy['stats_json'])
         enemy_equipment = {slot: None for slot in EQUIPMENT_SLOTS}
         enemy_equipment_stats = get_equipment_stats(enemy_equipment)
         enemy_combat = calculate_combat_stats(enemy_stats, enemy_equipment_stats, enemy_equipment)
@@ -3879,7 +3250,7 @@ def end_auto_fight_session(session_id: str):
     cursor = conn.cursor()
     
     # Get current character data
-    cursor.execute("SELECT user_id, exp, level, gold, skill_points, inventory_json FROM characters WHERE id = ?", (session['character_id'],))
+    cursor.execute("SELECT user_id, exp, level, gold, skill_points FROM characters WHERE id = ?", (session['character_id'],))
     char = cursor.fetchone()
     
     if char:
@@ -3897,16 +3268,13 @@ def end_auto_fight_session(session_id: str):
         }
         char_dict = process_level_up(char_dict)
         
-        # Add items to inventory
-        inventory = json.loads(char['inventory_json'])
-        for item in session['items_dropped']:
-            if len(inventory) < 100:  # Respect inventory limit
-                inventory.append(item)
+        # Add items to inventory (respecting the inventory limit)
+        inventory_repository.add_items(cursor, session['character_id'], session['items_dropped'])
         
         # Update character
         cursor.execute(
-            "UPDATE characters SET exp = ?, level = ?, skill_points = ?, gold = ?, inventory_json = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (char_dict['exp'], char_dict['level'], char_dict.get('skill_points', 0), new_gold, json.dumps(inventory), session['character_id'])
+            "UPDATE characters SET exp = ?, level = ?, skill_points = ?, gold = ?, updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
+            (char_dict['exp'], char_dict['level'], char_dict.get('skill_points', 0), new_gold, session['character_id'])
         )
         
         try:
@@ -3926,6 +3294,7 @@ def end_auto_fight_session(session_id: str):
             logger.warning(f"Failed to record auto-fight progress: {tracking_error}")
         
         conn.commit()
+        publish_ranking_updates([(session['character_id'], {'level': char_dict['level']})])
     
     conn.close()
     
@@ -3937,7 +3306,8 @@ def end_auto_fight_session(session_id: str):
             pass  # Ignore unlock errors
 
 @app.post("/api/pve/auto-fight/{session_id}/stop")
-async def stop_auto_fight(session_id: str):
+@async_db.offload(serialize_on="session_id")
+def stop_auto_fight(session_id: str):
     """Manually stop an auto-fight session early"""
     logger.info(f"[AUTO-FIGHT] STOP request for session_id: {session_id}")
     session = get_auto_fight_session(session_id)
@@ -3951,42 +3321,59 @@ async def stop_auto_fight(session_id: str):
     return {"success": True, "message": "Auto-fight session stopped"}
 
 # PvP endpoints
+def publish_ranking_updates(updates: List[Tuple[str, Dict]]) -> None:
+    """Apply committed level/MMR/record changes to the opponent index and leaderboard.
+
+    Call only after the transaction that wrote them has committed, so a
+    rolled-back fight never shows up in matchmaking or the rankings.
+    """
+    for character_id, fields in updates:
+        if 'level' in fields or 'mmr' in fields:
+            opponent_index.update(character_id, level=fields.get('level'), mmr=fields.get('mmr'))
+        leaderboard.update(character_id, **fields)
+
+def _load_match_profile(character_id: str) -> Optional[dict]:
+    """Name, level and MMR used to place a character in the matchmaking and opponent indexes."""
+    with db_manager.connection() as conn:
+        row = statements.fetchone(conn.cursor(), PVP_MATCH_PROFILE, (character_id,))
+    return dict(row) if row else None
+
+def _load_opponent_rows() -> List[dict]:
+    with db_manager.connection() as conn:
+        return [dict(row) for row in statements.fetchall(conn.cursor(), PVP_OPPONENT_INDEX_ROWS)]
+
 @app.post("/api/pvp/queue")
-async def pvp_queue(request: Dict = Body(...)):
+@async_db.offload
+def pvp_queue(request: Dict = Body(...)):
     """Join or leave PvP queue"""
     character_id = request.get('character_id')
     action = request.get('action', 'join')  # 'join' or 'leave'
     
     if action == 'join':
-        set_pvp_queue_entry(character_id, datetime.now().isoformat())
+        profile = _load_match_profile(character_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Character not found")
+        delete_pvp_match_result(character_id)
+        set_pvp_queue_entry(character_id, profile['pvp_mmr'])
         return {"success": True, "message": "Joined PvP queue"}
     elif action == 'leave':
-        if get_pvp_queue_entry(character_id):
-            delete_pvp_queue_entry(character_id)
+        delete_pvp_queue_entry(character_id)
         return {"success": True, "message": "Left PvP queue"}
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
 
 @app.get("/api/pvp/available")
-async def get_pvp_available():
+@async_db.offload
+def get_pvp_available():
     """Get list of offline players with PvP enabled"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if USE_POSTGRES:
-        cursor.execute("SELECT id, name, level FROM characters WHERE pvp_enabled = TRUE ORDER BY level DESC LIMIT 20")
-    else:
-        cursor.execute("SELECT id, name, level FROM characters WHERE pvp_enabled = 1 ORDER BY level DESC LIMIT 20")
-    players = cursor.fetchall()
-    
-    conn.close()
-    
-    players_list = [{'id': p['id'], 'name': p['name'], 'level': p['level']} for p in players]
+    opponent_index.ensure_loaded(_load_opponent_rows)
+    players_list = [{'id': p.id, 'name': p.name, 'level': p.level} for p in opponent_index.highest(20)]
     
     return {"success": True, "players": players_list}
 
 @app.post("/api/pvp/toggle")
-async def toggle_pvp(request: Dict = Body(...)):
+@async_db.offload
+def toggle_pvp(request: Dict = Body(...)):
     """Enable/disable PvP availability"""
     character_id = request.get('character_id')
     enabled = request.get('enabled', True)
@@ -3994,24 +3381,22 @@ async def toggle_pvp(request: Dict = Body(...)):
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET pvp_enabled = %s WHERE id = %s",
-            (enabled, character_id)
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET pvp_enabled = ? WHERE id = ?",
-            (1 if enabled else 0, character_id)
-        )
+    statements.execute(cursor, PVP_SET_ENABLED, (bool(enabled), character_id))
+    profile = statements.fetchone(cursor, PVP_MATCH_PROFILE, (character_id,)) if enabled else None
     
     conn.commit()
     conn.close()
     
+    if profile:
+        opponent_index.upsert(dict(profile))
+    else:
+        opponent_index.remove(character_id)
+    
     return {"success": True, "pvp_enabled": enabled}
 
 @app.post("/api/pvp/match")
-async def pvp_match(request: Dict = Body(...)):
+@async_db.offload
+def pvp_match(request: Dict = Body(...)):
     """Match with queue or offline opponent"""
     character_id = request.get('character_id')
     opponent_id = request.get('opponent_id')  # Optional, if provided use that
@@ -4020,41 +3405,105 @@ async def pvp_match(request: Dict = Body(...)):
         # Use specific opponent
         return {"success": True, "opponent_id": opponent_id}
     
-    # Try to match with queue first
-    queue_list = [cid for cid in get_all_pvp_queue().keys() if cid != character_id]
-    if queue_list:
-        opponent_id = queue_list[0]
-        delete_pvp_queue_entry(opponent_id)
-        if get_pvp_queue_entry(character_id):
-            delete_pvp_queue_entry(character_id)
+    # A match already made by the batch matchmaker wins
+    result = get_pvp_match_result(character_id)
+    if result:
+        delete_pvp_match_result(character_id)
+        return {"success": True, "opponent_id": result['opponent_id'], "matched_from": "matchmaker"}
+    
+    # Try to match with the closest-MMR queued player first
+    opponent_index.ensure_loaded(_load_opponent_rows)
+    me = opponent_index.get(character_id)
+    profile = None
+    if me is None:
+        profile = _load_match_profile(character_id)
+    mmr = me.mmr if me else (profile['pvp_mmr'] if profile else None)
+    opponent_id = pop_pvp_pair(character_id, mmr)
+    if opponent_id:
         return {"success": True, "opponent_id": opponent_id, "matched_from": "queue"}
     
-    # Fallback to offline players with PvP enabled
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    if USE_POSTGRES:
-        cursor.execute(
-            "SELECT id FROM characters WHERE pvp_enabled = TRUE AND id != %s ORDER BY RANDOM() LIMIT 1",
-            (character_id,)
-        )
+    # Fallback to a random offline player with PvP enabled, from the caller's level band if possible
+    level = me.level if me else (profile['level'] if profile else None)
+    opponent_id = opponent_index.sample(exclude=character_id, level=level)
+    if opponent_id:
+        return {"success": True, "opponent_id": opponent_id, "matched_from": "offline"}
+    
+    raise HTTPException(status_code=404, detail="No opponents available")
+
+GHOST_SAMPLE_ATTEMPTS = 5
+
+def _ghost_opponent_problem(opponent_id: str) -> Optional[Tuple[int, str]]:
+    """Why ``opponent_id`` cannot be fought as a ghost (status, detail), or None.
+
+    Ghosts are characters with PvP enabled (so in the opponent index) whose
+    owner is offline; online players are fought through the live queue.
+    """
+    with db_manager.connection() as conn:
+        row = statements.fetchone(conn.cursor(), PVP_OPPONENT_OWNER, (opponent_id,))
+    if not row:
+        return 404, "Opponent not found"
+    if not row['pvp_enabled'] or opponent_index.get(opponent_id) is None:
+        return 400, "Opponent does not have PvP enabled"
+    if presence_tracker.is_online(row['user_id']):
+        return 400, "Opponent is online"
+    return None
+
+@app.post("/api/pvp/ghost-battle")
+@limiter.limit("30/minute")
+@async_db.offload
+def ghost_battle(request: Request, payload: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+    """Fight an offline player's ghost: the whole PvP combat is simulated server-side
+    
+    Both sides fight on auto with their loadouts under the live combat rules.
+    Rewards and MMR are applied as for a live PvP win or loss, and the replay
+    lets the client animate the fight without polling.
+    """
+    character_id = payload.get('character_id')
+    if not character_id:
+        raise HTTPException(status_code=400, detail="character_id required")
+    ensure_owned(current_user["user_id"], character_id)
+    
+    opponent_index.ensure_loaded(_load_opponent_rows)
+    opponent_id = payload.get('opponent_id')
+    if opponent_id:
+        if opponent_id == character_id:
+            raise HTTPException(status_code=400, detail="Cannot fight yourself")
+        problem = _ghost_opponent_problem(opponent_id)
+        if problem:
+            raise HTTPException(status_code=problem[0], detail=problem[1])
     else:
-        cursor.execute(
-            "SELECT id FROM characters WHERE pvp_enabled = 1 AND id != ? ORDER BY RANDOM() LIMIT 1",
-            (character_id,)
-        )
-    opponent = cursor.fetchone()
-    conn.close()
+        # Random offline player with PvP enabled, from the caller's level band if possible
+        me = opponent_index.get(character_id)
+        for _ in range(GHOST_SAMPLE_ATTEMPTS):
+            candidate = opponent_index.sample(exclude=character_id, level=me.level if me else None)
+            if candidate and not _ghost_opponent_problem(candidate):
+                opponent_id = candidate
+                break
+        if not opponent_id:
+            raise HTTPException(status_code=404, detail="No opponents available")
     
-    if opponent:
-        return {"success": True, "opponent_id": opponent['id'], "matched_from": "offline"}
+    state = build_combat_state(character_id, opponent_id, is_pvp=True)
+    state['is_ghost'] = True
+    state['player1']['auto_ability_enabled'] = True
+    replay = simulate_combat(state, settings.ghost_battle_tick_seconds, settings.ghost_battle_max_seconds)
+    end_combat(state['combat_id'], state)
     
-    raise HTTPException(status_code=404, detail="No opponents available")
+    return {
+        "success": True,
+        "combat_id": state['combat_id'],
+        "opponent_id": opponent_id,
+        "winner_id": state['winner_id'],
+        "won": state['winner_id'] == character_id,
+        "rewards": state.get('rewards'),
+        "mmr": state.get('mmr_changes', {}).get(character_id),
+        "replay": replay
+    }
 
 # Ability endpoints
 @app.get("/api/abilities/list")
 async def list_abilities(character_id: str):
     """Get abilities for character's equipped weapon"""
-    conn = get_db_connection()
+    conn = get_db_read_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT equipment_json FROM characters WHERE id = ?", (character_id,))
@@ -4064,7 +3513,7 @@ async def list_abilities(character_id: str):
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    equipment = json.loads(char['equipment_json'])
+    equipment = load_json_column(char['equipment_json'])
     weapon_type = get_weapon_type(equipment)
     
     abilities = get_abilities_for_weapon(weapon_type)
@@ -4111,9 +3560,10 @@ async def set_ability_loadout(request: Dict = Body(...)):
 
 # Store endpoints
 @app.get("/api/store/list")
-async def list_store_items(character_id: str):
+@async_db.offload
+def list_store_items(character_id: str):
     """Get available store items for character level"""
-    conn = get_db_connection()
+    conn = get_db_read_connection()
     cursor = conn.cursor()
     
     cursor.execute("SELECT level FROM characters WHERE id = ?", (character_id,))
@@ -4149,7 +3599,8 @@ async def list_store_items(character_id: str):
     return {"success": True, "items": items_list}
 
 @app.post("/api/store/buy")
-async def buy_store_item(request: Dict = Body(...)):
+@async_db.offload
+def buy_store_item(request: Dict = Body(...)):
     """Purchase item from store"""
     character_id = request.get('character_id')
     item_id = request.get('item_id')
@@ -4158,7 +3609,7 @@ async def buy_store_item(request: Dict = Body(...)):
     cursor = conn.cursor()
     
     # Get character
-    cursor.execute("SELECT level, gold, inventory_json FROM characters WHERE id = ?", (character_id,))
+    cursor.execute("SELECT level, gold FROM characters WHERE id = ?", (character_id,))
     char = cursor.fetchone()
     
     if not char:
@@ -4187,8 +3638,7 @@ async def buy_store_item(request: Dict = Body(...)):
         raise HTTPException(status_code=400, detail="Not enough gold")
     
     # Check inventory limit (100 items)
-    inventory = json.loads(char['inventory_json'])
-    if len(inventory) >= 100:
+    if inventory_repository.count(cursor, character_id) >= INVENTORY_LIMIT:
         conn.close()
         raise HTTPException(status_code=400, detail="Inventory full (100 item limit)")
     
@@ -4215,14 +3665,17 @@ async def buy_store_item(request: Dict = Body(...)):
     if store_item['slot'] in armor_slots:
         equipment['armor_type'] = random.choice(['cloth', 'leather', 'metal'])
     
-    # Add to inventory and deduct gold
-    inventory.append(equipment)
-    new_gold = char['gold'] - price
-    
-    cursor.execute(
-        "UPDATE characters SET inventory_json = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(inventory), new_gold, character_id)
-    )
+    # Deduct gold and add to inventory
+    if not adjust_gold(cursor, character_id, -price):
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=400, detail="Not enough gold")
+    # The gold update holds the character row, so the guarded insert can't race another add
+    if inventory_repository.add_item(cursor, character_id, equipment, limit=INVENTORY_LIMIT) is None:
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=400, detail="Inventory full (100 item limit)")
+    new_gold = get_gold(cursor, character_id)
     
     conn.commit()
     conn.close()
@@ -4230,7 +3683,8 @@ async def buy_store_item(request: Dict = Body(...)):
     return {"success": True, "equipment": equipment, "gold_remaining": new_gold}
 
 @app.post("/api/store/sell")
-async def sell_item(request: Dict = Body(...)):
+@async_db.offload
+def sell_item(request: Dict = Body(...)):
     """Sell item from inventory"""
     character_id = request.get('character_id')
     item_id = request.get('item_id')
@@ -4239,44 +3693,30 @@ async def sell_item(request: Dict = Body(...)):
     cursor = conn.cursor()
     
     # Get character
-    cursor.execute("SELECT gold, inventory_json FROM characters WHERE id = ?", (character_id,))
+    cursor.execute("SELECT gold FROM characters WHERE id = ?", (character_id,))
     char = cursor.fetchone()
     
     if not char:
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    inventory = json.loads(char['inventory_json'])
-    
     # Find item in inventory
-    item = None
-    item_index = None
-    for i, inv_item in enumerate(inventory):
-        if inv_item.get('id') == item_id:
-            item = inv_item
-            item_index = i
-            break
+    item = inventory_repository.get_item(cursor, character_id, item_id)
     
     if not item:
         conn.close()
         raise HTTPException(status_code=404, detail="Item not found in inventory")
     
     # Calculate sell price
-    rarity_multipliers = {
-        'common': 1, 'uncommon': 2, 'rare': 3,
-        'epic': 5, 'legendary': 10, 'mythic': 20
-    }
-    rarity_mult = rarity_multipliers.get(item.get('rarity', 'common'), 1)
-    sell_price = (item.get('level', 1) * 5) + (rarity_mult * 10)
+    sell_price = calculate_sell_price(item)
     
-    # Remove item and add gold
-    inventory.pop(item_index)
-    new_gold = char['gold'] + sell_price
-    
-    cursor.execute(
-        "UPDATE characters SET inventory_json = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(inventory), new_gold, character_id)
-    )
+    # Remove item and add gold; a concurrent sell of the same item credits nothing
+    if not inventory_repository.remove_item(cursor, character_id, item_id):
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=404, detail="Item not found in inventory")
+    adjust_gold(cursor, character_id, sell_price)
+    new_gold = get_gold(cursor, character_id)
     
     conn.commit()
     conn.close()
@@ -4284,7 +3724,8 @@ async def sell_item(request: Dict = Body(...)):
     return {"success": True, "gold_gained": sell_price, "gold_remaining": new_gold}
 
 @app.post("/api/store/forge")
-async def forge_item(request: Dict = Body(...)):
+@async_db.offload
+def forge_item(request: Dict = Body(...)):
     """Forge random item (gold sink)"""
     character_id = request.get('character_id')
     rarity = request.get('rarity', 'common')
@@ -4303,7 +3744,7 @@ async def forge_item(request: Dict = Body(...)):
     cursor = conn.cursor()
     
     # Get character
-    cursor.execute("SELECT level, gold, inventory_json FROM characters WHERE id = ?", (character_id,))
+    cursor.execute("SELECT level, gold FROM characters WHERE id = ?", (character_id,))
     char = cursor.fetchone()
     
     if not char:
@@ -4316,8 +3757,7 @@ async def forge_item(request: Dict = Body(...)):
         raise HTTPException(status_code=400, detail="Not enough gold")
     
     # Check inventory limit
-    inventory = json.loads(char['inventory_json'])
-    if len(inventory) >= 100:
+    if inventory_repository.count(cursor, character_id) >= INVENTORY_LIMIT:
         conn.close()
         raise HTTPException(status_code=400, detail="Inventory full (100 item limit)")
     
@@ -4325,14 +3765,17 @@ async def forge_item(request: Dict = Body(...)):
     slot = random.choice(EQUIPMENT_SLOTS)
     equipment = generate_equipment(slot, rarity, char['level'])
     
-    # Add to inventory and deduct gold
-    inventory.append(equipment)
-    new_gold = char['gold'] - cost
-    
-    cursor.execute(
-        "UPDATE characters SET inventory_json = ?, gold = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(inventory), new_gold, character_id)
-    )
+    # Deduct gold and add to inventory
+    if not adjust_gold(cursor, character_id, -cost):
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=400, detail="Not enough gold")
+    # The gold update holds the character row, so the guarded insert can't race another add
+    if inventory_repository.add_item(cursor, character_id, equipment, limit=INVENTORY_LIMIT) is None:
+        conn.rollback()
+        conn.close()
+        raise HTTPException(status_code=400, detail="Inventory full (100 item limit)")
+    new_gold = get_gold(cursor, character_id)
     
     conn.commit()
     conn.close()
@@ -4340,7 +3783,8 @@ async def forge_item(request: Dict = Body(...)):
     return {"success": True, "equipment": equipment, "gold_remaining": new_gold, "cost": cost}
 
 @app.post("/api/store/combine")
-async def combine_items(request: Dict = Body(...)):
+@async_db.offload
+def combine_items(request: Dict = Body(...)):
     """Combine items of same rarity to create higher rarity item"""
     character_id = request.get('character_id')
     item_ids = request.get('item_ids', [])  # List of item IDs to combine
@@ -4349,76 +3793,62 @@ async def combine_items(request: Dict = Body(...)):
         raise HTTPException(status_code=400, detail="Need at least 2 items to combine")
     
     # Requirements: 2 Common → 1 Uncommon, 3 Uncommon → 1 Rare, 4 Rare → 1 Epic, 5 Epic → 1 Legendary, 6 Legendary → 1 Mythic
-    combine_requirements = {
-        'common': (2, 'uncommon'),
-        'uncommon': (3, 'rare'),
-        'rare': (4, 'epic'),
-        'epic': (5, 'legendary'),
-        'legendary': (6, 'mythic')
-    }
+    combine_requirements = COMBINE_REQUIREMENTS
     
     conn = get_db_connection()
     cursor = conn.cursor()
     
     # Get character
-    cursor.execute("SELECT level, inventory_json FROM characters WHERE id = ?", (character_id,))
+    cursor.execute("SELECT level FROM characters WHERE id = ?", (character_id,))
     char = cursor.fetchone()
     
     if not char:
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
-    inventory = json.loads(char['inventory_json'])
-    
-    # Find items and verify they're all the same rarity
+    # Fetch all requested items in one query and verify they're all the same rarity
+    found_items = inventory_repository.get_items(cursor, character_id, item_ids)
     items_to_combine = []
     target_rarity = None
     
-    for item_id in item_ids:
-        found = False
-        for i, inv_item in enumerate(inventory):
-            if inv_item.get('id') == item_id:
-                item_rarity = inv_item.get('rarity', 'common')
-                if target_rarity is None:
-                    target_rarity = item_rarity
-                elif item_rarity != target_rarity:
-                    conn.close()
-                    raise HTTPException(status_code=400, detail="All items must be the same rarity")
-                items_to_combine.append((i, inv_item))
-                found = True
-                break
-        if not found:
+    for item_id in dict.fromkeys(item_ids):
+        inv_item = found_items.get(item_id)
+        if inv_item is None:
             conn.close()
             raise HTTPException(status_code=404, detail=f"Item {item_id} not found in inventory")
+        item_rarity = inv_item.get('rarity', 'common')
+        if target_rarity is None:
+            target_rarity = item_rarity
+        elif item_rarity != target_rarity:
+            conn.close()
+            raise HTTPException(status_code=400, detail="All items must be the same rarity")
+        items_to_combine.append(inv_item)
     
     # Check requirements
     if target_rarity not in combine_requirements:
         conn.close()
         raise HTTPException(status_code=400, detail="Cannot combine items of this rarity")
     
-        required_count, result_rarity = combine_requirements[target_rarity]
-        if len(items_to_combine) < required_count:
-            conn.close()
-            raise HTTPException(status_code=400, detail=f"Need {required_count} {target_rarity} items to create {result_rarity}")
+    required_count, result_rarity = combine_requirements[target_rarity]
+    if len(items_to_combine) < required_count:
+        conn.close()
+        raise HTTPException(status_code=400, detail=f"Need {required_count} {target_rarity} items to create {result_rarity}")
     
     # Check inventory limit (if combining would exceed limit)
-    if len(inventory) - len(items_to_combine) + 1 >= 100:
+    inventory_count = inventory_repository.count(cursor, character_id)
+    if inventory_count - len(items_to_combine) + 1 >= INVENTORY_LIMIT:
         conn.close()
         raise HTTPException(status_code=400, detail="Inventory would be full after combining")
     
-    # Remove items (in reverse order to maintain indices)
-    items_to_combine.sort(reverse=True, key=lambda x: x[0])
-    for index, _ in items_to_combine:
-        inventory.pop(index)
-    
-    # Create combined item
+    # Remove consumed items and create combined item
+    inventory_repository.remove_items(cursor, character_id, [item['id'] for item in items_to_combine])
     slot = random.choice(EQUIPMENT_SLOTS)
     equipment = generate_equipment(slot, result_rarity, char['level'])
-    inventory.append(equipment)
+    inventory_repository.add_item(cursor, character_id, equipment)
     
     cursor.execute(
-        "UPDATE characters SET inventory_json = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (json.dumps(inventory), character_id)
+        "UPDATE characters SET updated_at = CURRENT_TIMESTAMP, revision = revision + 1 WHERE id = ?",
+        (character_id,)
     )
     
     conn.commit()
@@ -4426,146 +3856,33 @@ async def combine_items(request: Dict = Body(...)):
     
     return {"success": True, "equipment": equipment, "rarity_created": result_rarity}
 
-# Feedback endpoints
-def ensure_feedback_tables_exist():
-    """Ensure feedback tables exist, create them if they don't"""
+@app.post("/api/inventory/bulk")
+@async_db.offload
+def bulk_inventory_actions(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+    """Apply an ordered list of sell/equip/unequip/combine/upgrade actions in one transaction"""
+    user_id = current_user["user_id"]
+    character_id = request.get('character_id')
+    actions = request.get('actions')
+    
+    if not character_id or not isinstance(actions, list) or not actions:
+        raise HTTPException(status_code=400, detail="character_id and a non-empty actions list required")
+    if len(actions) > MAX_BULK_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ACTIONS} actions per request")
+    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if feedback table exists
-        table_exists = False
-        if USE_POSTGRES:
-            cursor.execute("""
-                SELECT 1 FROM information_schema.tables 
-                WHERE table_name = 'feedback'
-            """)
-            table_exists = cursor.fetchone() is not None
-        else:
-            cursor.execute("""
-                SELECT name FROM sqlite_master 
-                WHERE type='table' AND name='feedback'
-            """)
-            table_exists = cursor.fetchone() is not None
-        
-        if not table_exists:
-            print("[INFO] Feedback table missing, creating it...")
-            if USE_POSTGRES:
-                # Check if users table exists first
-                cursor.execute("""
-                    SELECT 1 FROM information_schema.tables 
-                    WHERE table_name = 'users'
-                """)
-                users_exists = cursor.fetchone() is not None
-                
-                if users_exists:
-                    cursor.execute('''
-                        CREATE TABLE feedback (
-                            id VARCHAR(255) PRIMARY KEY,
-                            user_id VARCHAR(255) NOT NULL,
-                            character_name VARCHAR(255),
-                            content TEXT NOT NULL,
-                            upvotes INTEGER DEFAULT 0,
-                            downvotes INTEGER DEFAULT 0,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            FOREIGN KEY (user_id) REFERENCES users (id)
-                        )
-                    ''')
-                else:
-                    # Create without foreign key if users table doesn't exist
-                    print("[WARNING] Users table not found, creating feedback table without foreign key")
-                    cursor.execute('''
-                        CREATE TABLE feedback (
-                            id VARCHAR(255) PRIMARY KEY,
-                            user_id VARCHAR(255) NOT NULL,
-                            character_name VARCHAR(255),
-                            content TEXT NOT NULL,
-                            upvotes INTEGER DEFAULT 0,
-                            downvotes INTEGER DEFAULT 0,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    ''')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS feedback_votes (
-                        id VARCHAR(255) PRIMARY KEY,
-                        feedback_id VARCHAR(255) NOT NULL,
-                        user_id VARCHAR(255) NOT NULL,
-                        vote_type VARCHAR(10) NOT NULL CHECK (vote_type IN ('upvote', 'downvote')),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (feedback_id) REFERENCES feedback (id) ON DELETE CASCADE,
-                        FOREIGN KEY (user_id) REFERENCES users (id),
-                        UNIQUE(feedback_id, user_id)
-                    )
-                ''')
-            else:
-                # Check if users table exists for SQLite
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-                users_exists = cursor.fetchone() is not None
-                
-                if users_exists:
-                    cursor.execute('''
-                        CREATE TABLE feedback (
-                            id TEXT PRIMARY KEY,
-                            user_id TEXT NOT NULL,
-                            character_name TEXT,
-                            content TEXT NOT NULL,
-                            upvotes INTEGER DEFAULT 0,
-                            downvotes INTEGER DEFAULT 0,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            FOREIGN KEY (user_id) REFERENCES users (id)
-                        )
-                    ''')
-                else:
-                    # Create without foreign key if users table doesn't exist
-                    print("[WARNING] Users table not found, creating feedback table without foreign key")
-                    cursor.execute('''
-                        CREATE TABLE feedback (
-                            id TEXT PRIMARY KEY,
-                            user_id TEXT NOT NULL,
-                            character_name TEXT,
-                            content TEXT NOT NULL,
-                            upvotes INTEGER DEFAULT 0,
-                            downvotes INTEGER DEFAULT 0,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    ''')
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS feedback_votes (
-                        id TEXT PRIMARY KEY,
-                        feedback_id TEXT NOT NULL,
-                        user_id TEXT NOT NULL,
-                        vote_type TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (feedback_id) REFERENCES feedback (id) ON DELETE CASCADE,
-                        FOREIGN KEY (user_id) REFERENCES users (id),
-                        UNIQUE(feedback_id, user_id)
-                    )
-                ''')
-            conn.commit()
-            print("[INFO] Feedback tables created successfully")
-        if conn:
-            conn.close()
-    except Exception as e:
-        import traceback
-        logger.error(f"Failed to ensure feedback tables exist: {e}")
-        print(traceback.format_exc())
-        if conn:
-            try:
-                conn.rollback()
-            except:
-                pass
-            try:
-                conn.close()
-            except:
-                pass
+        return inventory_bulk_service.apply(
+            character_id, user_id, actions, atomic=bool(request.get('atomic', False))
+        )
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Character not found")
+    except BulkConflictError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
 
+# Feedback endpoints
 @app.post("/api/feedback/create")
 async def create_feedback(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Create a new feedback/suggestion post"""
     try:
-        # Ensure tables exist before trying to use them
-        ensure_feedback_tables_exist()
-        
         user_id = current_user["user_id"]
         content = request.get('content', '').strip()
         character_id = request.get('character_id')
@@ -4605,23 +3922,8 @@ async def create_feedback(request: Dict = Body(...), current_user: dict = Depend
             error_msg = str(e)
             logger.error(f"Failed to create feedback: {error_msg}")
             print(traceback.format_exc())
-            
-            # If table doesn't exist error, try to create it and retry once
-            if 'does not exist' in error_msg or 'no such table' in error_msg.lower():
-                print("[INFO] Retrying after ensuring table exists...")
-                conn.close()
-                ensure_feedback_tables_exist()
-                # Retry once
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO feedback (id, user_id, character_name, content) VALUES (?, ?, ?, ?)",
-                    (feedback_id, user_id, character_name, content)
-                )
-                conn.commit()
-            else:
-                conn.close()
-                raise HTTPException(status_code=500, detail=f"Failed to create feedback: {error_msg}")
+            conn.close()
+            raise HTTPException(status_code=500, detail=f"Failed to create feedback: {error_msg}")
         finally:
             if conn:
                 conn.close()
@@ -4639,7 +3941,7 @@ async def create_feedback(request: Dict = Body(...), current_user: dict = Depend
 async def list_feedback(limit: int = 50, offset: int = 0):
     """Get list of feedback posts with vote counts"""
     try:
-        conn = get_db_connection()
+        conn = get_db_read_connection()
         cursor = conn.cursor()
         
         cursor.execute(
@@ -4760,7 +4062,7 @@ async def get_my_votes(current_user: dict = Depends(get_current_user)):
     """Get all feedback IDs that the current user has voted on"""
     user_id = current_user["user_id"]
     
-    conn = get_db_connection()
+    conn = get_db_read_connection()
     cursor = conn.cursor()
     
     cursor.execute(
@@ -4815,7 +4117,7 @@ async def send_chat_message(request: Dict = Body(...)):
 @app.get("/api/chat/get")
 async def get_chat_messages(limit: int = 50):
     """Get recent chat messages"""
-    conn = get_db_connection()
+    conn = get_db_read_connection()
     cursor = conn.cursor()
     
     cursor.execute(
@@ -4840,19 +4142,14 @@ async def get_chat_messages(limit: int = 50):
 
 # PVP Matchmaking endpoints
 @app.post("/api/pvp/join-queue")
-async def join_pvp_queue(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+@async_db.offload
+def join_pvp_queue(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Join the PVP matchmaking queue"""
     user_id = current_user["user_id"]
     character_id = request.get('character_id')
     
     # Verify character belongs to user
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=403, detail="Character not found or access denied")
-    conn.close()
+    ensure_owned(user_id, character_id)
     
     if not character_id:
         raise HTTPException(status_code=400, detail="character_id required")
@@ -4861,47 +4158,34 @@ async def join_pvp_queue(request: Dict = Body(...), current_user: dict = Depends
     cursor = conn.cursor()
     
     # Verify character exists and enable PVP
-    cursor.execute("SELECT id, level FROM characters WHERE id = ?", (character_id,))
-    character = cursor.fetchone()
+    character = statements.fetchone(cursor, PVP_MATCH_PROFILE, (character_id,))
     
     if not character:
         conn.close()
         raise HTTPException(status_code=404, detail="Character not found")
     
     # Enable PVP for character
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET pvp_enabled = TRUE WHERE id = %s",
-            (character_id,)
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET pvp_enabled = 1 WHERE id = ?",
-            (character_id,)
-        )
-    
-    # Add to queue
-    set_pvp_queue_entry(character_id, str(datetime.now().timestamp()))
+    statements.execute(cursor, PVP_SET_ENABLED, (True, character_id))
     
     conn.commit()
     conn.close()
     
+    # Queue only once PvP is enabled in the database
+    delete_pvp_match_result(character_id)
+    set_pvp_queue_entry(character_id, character['pvp_mmr'])
+    opponent_index.upsert(dict(character))
+    
     return {"success": True, "message": "Joined PVP queue"}
 
 @app.post("/api/pvp/leave-queue")
-async def leave_pvp_queue(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
+@async_db.offload
+def leave_pvp_queue(request: Dict = Body(...), current_user: dict = Depends(get_current_user)):
     """Leave the PVP matchmaking queue"""
     user_id = current_user["user_id"]
     character_id = request.get('character_id')
     
     # Verify character belongs to user
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    if not cursor.fetchone():
-        conn.close()
-        raise HTTPException(status_code=403, detail="Character not found or access denied")
-    conn.close()
+    ensure_owned(user_id, character_id)
     
     if not character_id:
         raise HTTPException(status_code=400, detail="character_id required")
@@ -4910,148 +4194,138 @@ async def leave_pvp_queue(request: Dict = Body(...), current_user: dict = Depend
     
     conn = get_db_connection()
     cursor = conn.cursor()
-    if USE_POSTGRES:
-        cursor.execute(
-            "UPDATE characters SET pvp_enabled = FALSE WHERE id = %s",
-            (character_id,)
-        )
-    else:
-        cursor.execute(
-            "UPDATE characters SET pvp_enabled = 0 WHERE id = ?",
-            (character_id,)
-        )
+    statements.execute(cursor, PVP_SET_ENABLED, (False, character_id))
     conn.commit()
     conn.close()
+    opponent_index.remove(character_id)
     
     return {"success": True, "message": "Left PVP queue"}
 
 @app.get("/api/pvp/opponents")
-async def get_pvp_opponents(character_id: str, max_level_diff: int = 5, current_user: dict = Depends(get_current_user)):
+@async_db.offload
+def get_pvp_opponents(character_id: str, max_level_diff: int = 5, current_user: dict = Depends(get_current_user)):
     """Get list of available PVP opponents within level range"""
     user_id = current_user["user_id"]
+    ensure_owned(user_id, character_id, status_code=404)
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get character level and verify ownership
-    cursor.execute("SELECT level FROM characters WHERE id = ? AND user_id = ?", (character_id, user_id))
-    char = cursor.fetchone()
-    
-    if not char:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Character not found")
-    
-    char_level = char['level']
-    
-    # Find opponents within level range who have PVP enabled
-    min_level = max(1, char_level - max_level_diff)
-    max_level = min(100, char_level + max_level_diff)
-    
-    if USE_POSTGRES:
-        cursor.execute("""
-            SELECT id, name, level, exp, pvp_enabled
-            FROM characters
-            WHERE id != %s 
-            AND level BETWEEN %s AND %s
-            AND pvp_enabled = TRUE
-            ORDER BY ABS(level - %s) ASC, name ASC
-            LIMIT 20
-        """, (character_id, min_level, max_level, char_level))
+    opponent_index.ensure_loaded(_load_opponent_rows)
+    me = opponent_index.get(character_id)
+    if me is not None:
+        char_level = me.level
     else:
-        cursor.execute("""
-            SELECT id, name, level, exp, pvp_enabled
-            FROM characters
-            WHERE id != ? 
-            AND level BETWEEN ? AND ?
-            AND pvp_enabled = 1
-            ORDER BY ABS(level - ?) ASC, name ASC
-            LIMIT 20
-        """, (character_id, min_level, max_level, char_level))
-    
-    opponents = []
-    for row in cursor.fetchall():
-        opponents.append({
-            'id': row['id'],
-            'name': row['name'],
-            'level': row['level'],
-            'level_diff': abs(row['level'] - char_level)
-        })
-    
-    conn.close()
+        profile = _load_match_profile(character_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Character not found")
+        char_level = profile['level']
+    
+    # Walk outward from the caller's level (nearest first, then by name)
+    opponents = [
+        {
+            'id': opponent.id,
+            'name': opponent.name,
+            'level': opponent.level,
+            'level_diff': abs(opponent.level - char_level)
+        }
+        for opponent in opponent_index.nearest(
+            char_level, limit=20, max_level_diff=max(0, max_level_diff), exclude=character_id
+        )
+    ]
     
     return {"success": True, "opponents": opponents}
 
 @app.get("/api/pvp/leaderboard")
-async def get_pvp_leaderboard(limit: int = 50, offset: int = 0):
-    """Get PVP leaderboard (ranked by MMR) using persistent tracking data."""
+@async_db.offload
+def get_pvp_leaderboard(limit: int = 50, offset: int = 0):
+    """Get PVP leaderboard (ranked by MMR) from the materialized leaderboard."""
+    if not leaderboard.loaded:
+        raise HTTPException(status_code=503, detail="Leaderboard is loading")
     try:
-        rows = player_tracking_service.get_leaderboard(limit=limit, offset=offset)
+        rows = leaderboard.page(offset=offset, limit=limit)
     except Exception as exc:
         logger.error(f"Failed to load leaderboard: {exc}")
         raise HTTPException(status_code=500, detail="Unable to load leaderboard")
 
-    leaderboard = []
-    rank = offset + 1
-    for row in rows:
-        wins = row.get("wins", 0) or 0
-        losses = row.get("losses", 0) or 0
-        total_games = wins + losses
-        win_rate = (wins / total_games * 100) if total_games else 0.0
-        leaderboard.append(
-            {
-                "rank": rank,
-                "id": row.get("id"),
-                "name": row.get("name"),
-                "username": row.get("username"),
-                "level": row.get("level"),
-                "mmr": row.get("mmr", 1000),
-                "wins": wins,
-                "losses": losses,
-                "win_rate": round(win_rate, 2),
-                "best_mmr": row.get("best_mmr", row.get("mmr", 1000)),
-            }
-        )
-        rank += 1
+    return {"success": True, "leaderboard": [_leaderboard_entry(row) for row in rows]}
 
-    return {"success": True, "leaderboard": leaderboard}
+
+@app.get("/api/pvp/leaderboard/rank")
+@async_db.offload
+def get_pvp_leaderboard_rank(character_id: str, neighbors: int = 5):
+    """Get a character's leaderboard rank and the players just above and below it."""
+    neighbors = max(0, min(neighbors, 50))
+    if not leaderboard.loaded:
+        raise HTTPException(status_code=503, detail="Leaderboard is loading")
+    try:
+        result = leaderboard.around(character_id, neighbors)
+    except Exception as exc:
+        logger.error(f"Failed to load leaderboard rank: {exc}")
+        raise HTTPException(status_code=500, detail="Unable to load leaderboard")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Character not ranked")
+
+    return {
+        "success": True,
+        "rank": result["rank"],
+        "total": len(leaderboard),
+        "leaderboard": [_leaderboard_entry(row) for row in result["entries"]],
+    }
+
+
+def _leaderboard_entry(row: Dict) -> Dict:
+    wins = row.get("wins", 0) or 0
+    losses = row.get("losses", 0) or 0
+    total_games = wins + losses
+    win_rate = (wins / total_games * 100) if total_games else 0.0
+    return {
+        "rank": row["rank"],
+        "id": row.get("id"),
+        "name": row.get("name"),
+        "username": row.get("username"),
+        "level": row.get("level"),
+        "mmr": row.get("mmr", 1000),
+        "wins": wins,
+        "losses": losses,
+        "win_rate": round(win_rate, 2),
+        "best_mmr": row.get("best_mmr", row.get("mmr", 1000)),
+    }
 
 
 @app.get("/api/pvp/queue-status")
-async def get_pvp_queue_status(character_id: str):
+@async_db.offload
+def get_pvp_queue_status(character_id: str):
     """Get PVP queue status and estimated wait time"""
     if not character_id:
         raise HTTPException(status_code=400, detail="character_id required")
     
-    in_queue = get_pvp_queue_entry(character_id) is not None
+    entry = get_pvp_queue_member(character_id)
+    in_queue = entry is not None
     
-    queue = get_all_pvp_queue()
-    queue_size = len(queue)
+    # Cached between matchmaking ticks instead of counting the queue per poll
+    queue_size = queue_telemetry.queue_size(get_pvp_queue_size)
     
-    # Estimate wait time (rough calculation)
-    estimated_wait_seconds = queue_size * 30  # Rough estimate: 30 seconds per player ahead
+    estimated_wait_seconds = 0
+    if entry is not None:
+        # Recent waits of matched players in the same MMR bracket; 30 s per queued player until any are known
+        estimated_wait_seconds = queue_telemetry.estimate_wait(entry.mmr, time.time() - entry.joined_at)
+        if estimated_wait_seconds is None:
+            estimated_wait_seconds = queue_size * 30
+    
+    # Set once the batch matchmaker has paired this character; /api/pvp/match consumes it
+    match = get_pvp_match_result(character_id)
     
     return {
         "success": True,
         "in_queue": in_queue,
         "queue_size": queue_size,
-        "estimated_wait_seconds": estimated_wait_seconds if in_queue else 0
+        "estimated_wait_seconds": estimated_wait_seconds,
+        "matched": match is not None,
+        "match": match
     }
 
 @app.get("/api/players/online-count")
 async def get_online_player_count():
-    """Get count of currently online players (active in last 5 minutes)"""
-    current_time = datetime.utcnow().timestamp()
-    five_minutes_ago = current_time - (5 * 60)  # 5 minutes in seconds
-    
-    # Prune stale sessions and count recent ones
-    game_state.prune_sessions(settings.active_session_ttl)
-    online_count = sum(
-        1
-        for session in game_state.active_sessions.values()
-        if session.get("last_seen", 0) >= five_minutes_ago
-    )
-    
-    return {"success": True, "online_count": online_count}
+    """Get count of currently online players (active in the presence window, 5 minutes by default)"""
+    return {"success": True, "online_count": presence_tracker.online_count()}
 
 @app.get("/api/player/profile")
 async def get_player_profile(current_user: dict = Depends(get_current_user)):
@@ -5060,16 +4334,8 @@ async def get_player_profile(current_user: dict = Depends(get_current_user)):
     return {"success": True, **data}
 
 @app.get("/api/player/progress/{character_id}")
-async def get_character_progress(character_id: str, current_user: dict = Depends(get_current_user), limit: int = 25):
+async def get_character_progress(character_id: str = Depends(owned_character), limit: int = 25):
     """Return recent progress logs for a specific character."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM characters WHERE id = ? AND user_id = ?", (character_id, current_user["user_id"]))
-    owned = cursor.fetchone()
-    conn.close()
-    if not owned:
-        raise HTTPException(status_code=404, detail="Character not found or access denied")
-    
     entries = player_tracking_service.get_recent_progress(character_id, limit=limit)
     return {"success": True, "entries": entries}
 
@@ -5180,6 +4446,8 @@ async def metrics_middleware(request: Request, call_next):
     global request_count, error_count
     import time
     start_time = time.time()
+    query_scope = query_instrumentation.begin_request(request.method, request.scope)
+    routing_scope = db_manager.replica_router.begin_request(request.headers.get("authorization"))
     
     try:
         response = await call_next(request)
@@ -5191,6 +4459,8 @@ async def metrics_middleware(request: Request, call_next):
         error_count += 1
         raise
     finally:
+        db_manager.replica_router.end_request(routing_scope)
+        query_instrumentation.end_request(query_scope)
         duration = time.time() - start_time
         request_times.append(duration)
         # Keep only last 1000 request times
@@ -5237,12 +4507,32 @@ async def metrics():
             "p95_ms": round(p95_response_time * 1000, 2) if p95_response_time > 0 else 0
         },
         "database": {
-            "active_connections": db_connection_count
+            "active_connections": db_connection_count,
+            "pool": db_manager.pool_stats(),
+            "executor": async_db.stats(),
+            "sqlite": db_manager.sqlite_stats(),
+            "statements": statements.stats(top=20),
+            "queries": db_manager.query_stats(top=20),
+            "replica": db_manager.replica_stats()
         },
         "redis": {
             "connected": redis_info.get("connected_clients", 0) > 0 if redis_info else False,
             "used_memory_mb": round(redis_info.get("used_memory", 0) / 1024 / 1024, 2) if redis_info else 0
         },
+        "character_cache": character_cache.stats(),
+        "ownership_cache": ownership_cache.stats(),
+        "presence": presence_tracker.stats(),
+        "matchmaking": get_pvp_queue_stats(),
+        "matchmaker": batch_matchmaker.stats(),
+        "opponent_index": opponent_index.stats(),
+        "queue_telemetry": queue_telemetry.stats(),
+        "leaderboard": leaderboard.stats(),
+        "auth_cache": auth_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "startup": {
+            "total_ms": getattr(app.state, "startup_ms", None),
+            "database": app.state.boot_report.to_dict() if hasattr(app.state, "boot_report") else None
+        },
         "uptime_seconds": (datetime.utcnow() - app.state.start_time).total_seconds() if hasattr(app.state, 'start_time') else 0
     }
 
@@ -5251,6 +4541,7 @@ async def metrics():
 async def startup_event():
     # Set startup time for metrics
     app.state.start_time = datetime.utcnow()
+    startup_started = time.perf_counter()
     
     # Validate environment variables
     try:
@@ -5318,6 +4609,46 @@ async def startup_event():
         import traceback
         traceback.print_exc()
 
+    # Keep the SQLite WAL from growing while readers hold it open
+    if db_manager.uses_sqlite_wal and settings.sqlite_checkpoint_interval > 0:
+        app.state.wal_checkpoint_task = asyncio.create_task(
+            db_manager.wal_checkpointer.run_forever(async_db.run)
+        )
+        logger.info(f"  SQLite profile: {db_manager.sqlite_profile.name} (WAL checkpoint every {settings.sqlite_checkpoint_interval:g}s)")
+
+    # Pair the PvP queue in batches instead of per poll
+    if settings.matchmaking_tick_seconds > 0:
+        app.state.matchmaking_task = asyncio.create_task(batch_matchmaker.run_forever(asyncio.to_thread))
+
+    # Build the PvP leaderboard and reconcile it off the request path
+    app.state.leaderboard_task = asyncio.create_task(
+        leaderboard.run_forever(player_tracking_service.get_leaderboard_rows, async_db.run)
+    )
+
+    # Start bcrypt workers in the background so the first logins don't pay for process spawn
+    app.state.password_warmup_task = asyncio.create_task(asyncio.to_thread(password_hasher.warm_up))
+
+    app.state.startup_ms = round((time.perf_counter() - startup_started) * 1000, 2)
+    logger.info(f"Startup complete in {app.state.startup_ms:.1f} ms")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for name in ("wal_checkpoint_task", "matchmaking_task", "leaderboard_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    if db_manager.uses_sqlite_wal:
+        try:
+            await async_db.run(db_manager.wal_checkpointer.checkpoint, "TRUNCATE")
+        except Exception as e:
+            logger.warning(f"Final WAL checkpoint failed: {e}")
+    async_db.shutdown(wait=False)
+    password_hasher.shutdown(wait=False)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
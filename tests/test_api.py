@@ -9,6 +9,8 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+import asyncio
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from server import app
 
@@ -71,6 +73,120 @@ class TestPlayerEndpoints:
         response = client.get("/api/player/matches")
         assert response.status_code == 401
 
+
+class TestEquipmentGuards:
+    def test_unequip_rejects_unknown_slot(self, monkeypatch):
+        import server
+        monkeypatch.setattr(server, "ensure_owned", lambda *args, **kwargs: None)
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(server.unequip_item({"character_id": "c1", "slot": 'a"b'}, {"user_id": "u1"}))
+        assert exc.value.status_code == 400
+
+    def test_spend_with_stale_revision_conflicts(self):
+        import sqlite3
+        import server
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.execute("CREATE TABLE characters (id TEXT PRIMARY KEY, gold INTEGER, revision INTEGER, updated_at TEXT)")
+        conn.execute("INSERT INTO characters VALUES ('c1', 1000, 7, NULL)")
+        cursor = conn.cursor()
+        assert server.adjust_gold(cursor, "c1", -300, expected_revision=7)
+        # a second upgrade computed from the same read (revision 7) must not apply
+        assert not server.adjust_gold(cursor, "c1", -300, expected_revision=7)
+        with pytest.raises(HTTPException) as exc:
+            server.spend_gold_or_raise(conn, conn.cursor(), "c1", 300, 7)
+        assert exc.value.status_code == 409
+
+    def test_forge_into_inventory_filled_after_the_count(self, monkeypatch):
+        import sqlite3
+        import server
+        from app.db.migrations import migration_engine
+
+        conn = sqlite3.connect(":memory:", check_same_thread=False)  # the handler runs on a worker thread
+        conn.row_factory = sqlite3.Row
+        migration_engine.migrate(conn, use_postgres=False)
+        conn.execute(
+            "INSERT INTO characters (id, user_id, name, level, stats_json, equipment_json, inventory_json, gold) "
+            "VALUES ('c1', 'u1', 'Hero', 5, '{}', '{}', '[]', 5000)"
+        )
+        cursor = conn.cursor()
+        for index in range(server.INVENTORY_LIMIT):
+            server.inventory_repository.add_item(cursor, "c1", {"id": f"eq_{index}", "slot": "helmet"})
+        conn.commit()
+
+        class SharedConnection:
+            def __getattr__(self, name):
+                return getattr(conn, name)
+
+            def close(self):
+                pass
+
+        # The pre-check saw a free slot; a concurrent add took it before the insert
+        real_count = server.inventory_repository.count
+        stale = iter([0])
+        monkeypatch.setattr(
+            server.inventory_repository, "count", lambda cur, cid: next(stale, real_count(cur, cid))
+        )
+        monkeypatch.setattr(server, "get_db_connection", SharedConnection)
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(server.forge_item({"character_id": "c1", "rarity": "uncommon"}))
+        assert exc.value.status_code == 400
+        assert conn.execute("SELECT gold FROM characters WHERE id = 'c1'").fetchone()["gold"] == 5000
+        assert real_count(conn.cursor(), "c1") == server.INVENTORY_LIMIT
+        conn.close()
+
+
+class TestRankingUpdatesAfterCommit:
+    def test_updates_route_to_index_and_leaderboard(self, monkeypatch):
+        import server
+        calls = []
+        monkeypatch.setattr(server.opponent_index, "update", lambda cid, **kw: calls.append(("index", cid, kw)))
+        monkeypatch.setattr(server.leaderboard, "update", lambda cid, **kw: calls.append(("board", cid, kw)))
+        server.publish_ranking_updates([("w", {"mmr": 1016, "wins": 3}), ("l", {"losses": 2})])
+        assert calls == [
+            ("index", "w", {"level": None, "mmr": 1016}),
+            ("board", "w", {"mmr": 1016, "wins": 3}),
+            ("board", "l", {"losses": 2}),
+        ]
+
+    def test_failed_commit_does_not_queue(self, monkeypatch):
+        import sqlite3
+        import server
+
+        class LockedConnection:
+            def __init__(self):
+                self.conn = sqlite3.connect(":memory:")
+                self.conn.row_factory = sqlite3.Row
+                self.conn.execute(
+                    "CREATE TABLE characters (id TEXT PRIMARY KEY, name TEXT, level INTEGER, "
+                    "pvp_mmr INTEGER, pvp_enabled INTEGER, revision INTEGER)"
+                )
+                self.conn.execute("INSERT INTO characters VALUES ('c1', 'Hero', 5, 1000, 0, 0)")
+
+            def cursor(self):
+                return self.conn.cursor()
+
+            def commit(self):
+                raise sqlite3.OperationalError("database is locked")
+
+            def close(self):
+                pass
+
+        queued = []
+        monkeypatch.setattr(server, "ensure_owned", lambda *args, **kwargs: None)
+        monkeypatch.setattr(server, "get_db_connection", LockedConnection)
+        monkeypatch.setattr(server, "set_pvp_queue_entry", lambda *args: queued.append(args))
+        monkeypatch.setattr(server.opponent_index, "upsert", lambda row: queued.append(row))
+        with pytest.raises(sqlite3.OperationalError):
+            asyncio.run(server.join_pvp_queue({"character_id": "c1"}, {"user_id": "u1"}))
+        assert queued == []
+
+
+class TestPvpEndpoints:
+    def test_ghost_battle_requires_auth(self):
+        response = client.post("/api/pvp/ghost-battle", json={"character_id": "test-character"})
+        assert response.status_code == 401
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the async database executor
+"""
+import pytest
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.async_db import AsyncDatabase
+
+request_tag = contextvars.ContextVar("request_tag", default=None)
+
+
+class TestAsyncDatabase:
+    def test_runs_off_loop_with_caller_context(self):
+        db = AsyncDatabase(max_workers=2)
+
+        def work(value):
+            return threading.get_ident(), request_tag.get(), value * 2
+
+        async def main():
+            request_tag.set("req-1")
+            return threading.get_ident(), await db.run(work, 21)
+
+        loop_thread, (worker_thread, tag, result) = asyncio.run(main())
+        assert worker_thread != loop_thread
+        assert tag == "req-1"
+        assert result == 42
+        db.shutdown()
+
+    def test_offload_keeps_signature_and_counts_failures(self):
+        db = AsyncDatabase(max_workers=2)
+
+        @db.offload
+        def handler(character_id: str, limit: int = 5):
+            if limit < 0:
+                raise ValueError("bad limit")
+            return character_id, limit
+
+        assert inspect.iscoroutinefunction(handler)
+        assert list(inspect.signature(handler).parameters) == ['character_id', 'limit']
+        assert asyncio.run(handler(character_id="c1")) == ("c1", 5)
+        with pytest.raises(ValueError):
+            asyncio.run(handler(character_id="c1", limit=-1))
+
+        stats = db.stats()
+        assert stats['submitted'] == 2
+        assert stats['completed'] == 1
+        assert stats['failed'] == 1
+        assert stats['in_flight'] == 0
+        db.shutdown()
+
+    def test_serialize_on_runs_same_key_one_at_a_time(self):
+        db = AsyncDatabase(max_workers=4)
+        active = {}
+        overlaps = []
+        lock = threading.Lock()
+
+        @db.offload(serialize_on="combat_id")
+        def tick(combat_id: str):
+            with lock:
+                active[combat_id] = active.get(combat_id, 0) + 1
+                overlaps.append(active[combat_id])
+            time.sleep(0.02)
+            with lock:
+                active[combat_id] -= 1
+
+        async def main():
+            await asyncio.gather(*(tick(combat_id=cid) for cid in ["a", "a", "a", "b", "b"]))
+
+        asyncio.run(main())
+        assert max(overlaps) == 1
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
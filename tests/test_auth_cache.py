@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the authenticated-principal cache
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.auth_cache import AuthCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return AuthCache(principal_ttl=60, max_entries=3, clock=clock)
+
+
+class TestTokenPayloads:
+    def test_memoized_until_exp(self, cache, clock):
+        payload = {"sub": "u1", "type": "access", "exp": clock.now + 10}
+        cache.put_payload("tok", payload)
+        assert cache.get_payload("tok") == payload
+        clock.now += 10
+        assert cache.get_payload("tok") is None
+        assert cache.stats()["tokens"] == 0
+
+    def test_payload_without_exp_is_not_cached(self, cache):
+        cache.put_payload("tok", {"sub": "u1"})
+        assert cache.get_payload("tok") is None
+
+    def test_bounded_lru(self, cache, clock):
+        for i in range(4):
+            cache.put_payload(f"tok{i}", {"sub": "u", "exp": clock.now + 60})
+        assert cache.get_payload("tok0") is None
+        assert cache.get_payload("tok3") is not None
+
+
+class TestPrincipals:
+    def test_ttl_and_copy_on_read(self, cache, clock):
+        cache.put_principal("u1", {"user_id": "u1", "username": "alice"})
+        principal = cache.get_principal("u1")
+        principal["username"] = "mallory"
+        assert cache.get_principal("u1")["username"] == "alice"
+        clock.now += 60
+        assert cache.get_principal("u1") is None
+
+    def test_invalidate_drops_principal_and_tokens(self, cache, clock):
+        cache.put_payload("tok-a", {"sub": "u1", "exp": clock.now + 60})
+        cache.put_payload("tok-b", {"sub": "u2", "exp": clock.now + 60})
+        cache.put_principal("u1", {"user_id": "u1", "username": "alice"})
+        cache.invalidate_user("u1")
+        assert cache.get_principal("u1") is None
+        assert cache.get_payload("tok-a") is None
+        assert cache.get_payload("tok-b") is not None
+
+    def test_load_racing_invalidation_is_discarded(self, cache):
+        epoch = cache.load_epoch()
+        cache.invalidate_user("u1")  # account deleted while the lookup ran
+        cache.put_principal("u1", {"user_id": "u1", "username": "alice"}, epoch)
+        assert cache.get_principal("u1") is None
+
+    def test_disabled_cache_stores_nothing(self, clock):
+        cache = AuthCache(principal_ttl=60, max_entries=0, clock=clock)
+        cache.put_payload("tok", {"sub": "u1", "exp": clock.now + 60})
+        cache.put_principal("u1", {"user_id": "u1"})
+        assert cache.get_payload("tok") is None and cache.get_principal("u1") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for fingerprinted fast boot (schema + seed data)
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.boot import SEED_KEY, SeedTable, boot_database, build_seed_tables
+from game_logic import ABILITIES, PVE_ENEMIES
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "boot.db"))
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+def _count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class TestFastBoot:
+    def test_cold_then_warm_boot(self, conn):
+        cold = boot_database(conn, use_postgres=False)
+        assert cold.schema_changed and cold.seed_changed and cold.migrations_applied
+        assert _count(conn, "abilities") == sum(len(a) for a in ABILITIES.values())
+        assert _count(conn, "pve_enemies") == len(PVE_ENEMIES)
+        assert _count(conn, "store_items") == 10
+        first = conn.execute("SELECT id FROM pve_enemies WHERE story_order = 1").fetchone()[0]
+        assert first == PVE_ENEMIES[0]["id"]
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        warm = boot_database(conn, use_postgres=False)
+        conn.set_trace_callback(None)
+        assert warm.skipped and warm.migrations_applied == []
+        assert statements == ["SELECT key, value FROM boot_meta"]
+
+    def test_changed_seed_is_upserted_and_pruned(self, conn):
+        boot_database(conn, use_postgres=False)
+        tables = build_seed_tables()
+        enemies = next(t for t in tables if t.table == "pve_enemies")
+        kept = list(enemies.rows[:2])
+        kept[0] = (kept[0][0], "Renamed") + kept[0][2:]
+        tables = [t if t.table != "pve_enemies" else t._replace(rows=kept) for t in tables]
+
+        report = boot_database(conn, use_postgres=False, seed_tables=tables)
+        assert report.seed_changed and not report.schema_changed
+        assert _count(conn, "pve_enemies") == 2
+        assert conn.execute("SELECT name FROM pve_enemies WHERE id = ?", (kept[0][0],)).fetchone()[0] == "Renamed"
+        # Unpruned tables keep rows that left the seed
+        assert _count(conn, "abilities") == sum(len(a) for a in ABILITIES.values())
+
+    def test_failed_seed_leaves_fingerprint_unset(self, conn):
+        broken = [SeedTable("store_items", ("id", "missing_column"), [("x", 1)])]
+        with pytest.raises(sqlite3.OperationalError):
+            boot_database(conn, use_postgres=False, seed_tables=broken)
+        assert conn.execute("SELECT value FROM boot_meta WHERE key = ?", (SEED_KEY,)).fetchone() is None
+        assert boot_database(conn, use_postgres=False).seed_changed
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
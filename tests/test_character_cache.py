@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the character snapshot cache
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.character_cache import CharacterSnapshotCache
+
+
+class TestCharacterSnapshotCache:
+    def test_hit_requires_matching_revision(self):
+        cache = CharacterSnapshotCache(max_entries=10, ttl_seconds=60)
+        assert cache.get('c1', 0) is None
+        cache.set('c1', 0, {'id': 'c1', 'gold': 5})
+        assert cache.get('c1', 0) == {'id': 'c1', 'gold': 5}
+
+        # A newer revision in the database makes the entry stale
+        assert cache.get('c1', 1) is None
+        assert cache.get('c1', 0) is None
+
+        stats = cache.stats()
+        assert stats['local_hits'] == 1
+        assert stats['misses'] == 3
+        assert stats['stale'] == 1
+        assert stats['hit_rate'] == 25.0
+
+    def test_lru_eviction(self):
+        cache = CharacterSnapshotCache(max_entries=2, ttl_seconds=60)
+        cache.set('a', 0, {})
+        cache.set('b', 0, {})
+        cache.get('a', 0)
+        cache.set('c', 0, {})
+        assert cache.get('b', 0) is None
+        assert cache.get('a', 0) == {}
+        assert cache.stats()['entries'] == 2
+
+    def test_invalidate_and_disabled(self):
+        cache = CharacterSnapshotCache(max_entries=10, ttl_seconds=60)
+        cache.set('a', 3, {'x': 1})
+        cache.invalidate('a')
+        assert cache.get('a', 3) is None
+
+        disabled = CharacterSnapshotCache(max_entries=0, ttl_seconds=60)
+        disabled.set('a', 0, {})
+        assert disabled.get('a', 0) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pooled database connections
+"""
+import pytest
+import sqlite3
+import threading
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.manager import PoolTimeout, QueuePool, ThreadLocalPool
+
+
+def _sqlite_factory():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _pool(cls, **overrides):
+    options = dict(min_size=0, max_size=2, timeout=0.2, health_check_interval=30)
+    options.update(overrides)
+    return cls(_sqlite_factory, **options)
+
+
+class TestQueuePool:
+    def test_reuses_returned_connections(self):
+        pool = _pool(QueuePool)
+        conn = pool.acquire()
+        raw = conn.raw
+        conn.close()
+        conn.close()  # idempotent
+
+        again = pool.acquire()
+        assert again.raw is raw
+        again.close()
+
+        stats = pool.stats()
+        assert stats['created'] == 1
+        assert stats['checkouts'] == 2
+        assert stats['in_use'] == 0
+        assert stats['idle'] == 1
+
+    def test_times_out_when_exhausted_and_wakes_waiters(self):
+        pool = _pool(QueuePool, max_size=1)
+        held = pool.acquire()
+        held_raw = held.raw
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert pool.stats()['timeouts'] == 1
+
+        result = {}
+
+        def waiter():
+            conn = pool.acquire()
+            result['raw'] = conn.raw
+            conn.close()
+
+        thread = threading.Thread(target=waiter)
+        pool.timeout = 2
+        thread.start()
+        held.close()
+        thread.join(2)
+        assert result['raw'] is held_raw
+
+    def test_rolls_back_on_return_and_replaces_broken(self):
+        pool = _pool(QueuePool, health_check_interval=0)
+        conn = pool.acquire()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        raw = conn.raw
+        conn.close()
+        assert raw.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+        raw.close()  # simulate a dropped server connection
+        fresh = pool.acquire()
+        assert fresh.raw is not raw
+        assert fresh.execute("SELECT 1").fetchone()[0] == 1
+        fresh.close()
+        assert pool.stats()['health_check_failures'] == 1
+
+
+class TestThreadLocalPool:
+    def test_connections_stay_on_their_thread(self):
+        pool = _pool(ThreadLocalPool)
+        main = pool.acquire()
+        main_raw = main.raw
+        main.close()
+
+        seen = {}
+
+        def worker():
+            conn = pool.acquire()
+            seen['raw'] = conn.raw
+            conn.close()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+        assert seen['raw'] is not main_raw
+        again = pool.acquire()
+        assert again.raw is main_raw
+        again.close()
+        assert pool.stats()['created'] == 2
+
+    def test_never_blocks_and_caps_idle(self):
+        pool = _pool(ThreadLocalPool, max_size=1)
+        first, second = pool.acquire(), pool.acquire()
+        assert pool.stats()['in_use'] == 2
+        first.close()
+        second.close()
+        stats = pool.stats()
+        assert stats['idle'] == 1
+        assert stats['closed'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Unit tests for server-side ghost battles (simulated PvP against offline players)
+"""
+import pytest
+import json
+import random
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import server
+from app.db.manager import db_manager
+from app.services.opponents import OpponentIndex
+from app.services.presence import presence_tracker
+
+
+@pytest.fixture
+def game_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, "sqlite_path", str(tmp_path / "game.db"))
+    # fresh pools: worker threads keep their idle connections to the previous file
+    monkeypatch.setattr(db_manager, "_sqlite_pool", None)
+    monkeypatch.setattr(db_manager, "_sqlite_read_pool", None)
+    server.init_database()
+    monkeypatch.setattr(server, "opponent_index", OpponentIndex(refresh_seconds=0, rng=random.Random(3)))
+    presence_tracker.reset()
+    random.seed(7)
+    yield
+    presence_tracker.reset()
+    db_manager.close_pools()
+
+
+def seed(character_id, user_id, level=10, mmr=1000, gold=0, pvp_enabled=True):
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR IGNORE INTO users (id, username, password_hash) VALUES (?, ?, ?)",
+            (user_id, user_id, "x"),
+        )
+        # registration creates the profile the match analytics update
+        cursor.execute("INSERT OR IGNORE INTO player_profiles (user_id, username) VALUES (?, ?)", (user_id, user_id))
+        cursor.execute(
+            """INSERT INTO characters
+               (id, user_id, name, level, exp, skill_points, stats_json, equipment_json, inventory_json,
+                gold, pvp_mmr, pvp_enabled)
+               VALUES (?, ?, ?, ?, 0, 0, ?, ?, '[]', ?, ?, ?)""",
+            (
+                character_id, user_id, character_id.title(), level,
+                json.dumps(server.get_default_stats()),
+                json.dumps({slot: None for slot in server.EQUIPMENT_SLOTS}),
+                gold, mmr, pvp_enabled,
+            ),
+        )
+        conn.commit()
+
+
+def character(character_id):
+    with db_manager.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT gold, pvp_mmr, pvp_wins, pvp_losses FROM characters WHERE id = ?", (character_id,))
+        return dict(cursor.fetchone())
+
+
+@pytest.fixture
+def duel(game_db):
+    seed("hero", "alice", gold=50)
+    seed("ghost", "bob", gold=70, mmr=1100)
+    return server.build_combat_state("hero", "ghost", is_pvp=True)
+
+
+class TestSimulation:
+    def test_runs_on_the_virtual_clock(self, duel, monkeypatch):
+        class NoWallClock:
+            @staticmethod
+            def now():
+                raise AssertionError("simulated combat read the wall clock")
+
+        monkeypatch.setattr(server, "datetime", NoWallClock)
+        started = time.perf_counter()
+        duel['virtual_time'] = 1_000.0
+        replay = server.simulate_combat(duel, tick_seconds=0.1, max_seconds=300)
+
+        assert min(duel['player1']['current_hp'], duel['player2']['current_hp']) <= 0
+        assert server.combat_time(duel) == duel['virtual_time']
+        assert replay['duration_ms'] == round((duel['virtual_time'] - 1_000.0) * 1000)
+        assert replay['duration_ms'] > 1000 * (time.perf_counter() - started)
+
+    def test_replay_format(self, duel):
+        replay = server.simulate_combat(duel, tick_seconds=0.1, max_seconds=300)
+
+        assert replay['tick_ms'] == 100
+        assert replay['players']['1']['id'] == "hero" and replay['players']['2']['id'] == "ghost"
+        assert replay['events']
+        times = [event[0] for event in replay['events']]
+        assert times == sorted(times) and times[-1] <= replay['duration_ms']
+        for at, kind, side, value, crit in replay['events']:
+            assert isinstance(at, int) and isinstance(kind, str)
+            assert side in (1, 2) and crit in (0, 1)
+        assert "attack" in {event[1] for event in replay['events']}
+
+    def test_timeout_loser_has_less_health_left(self, duel):
+        duel['player1']['current_hp'] = duel['player1']['max_hp'] // 2
+        replay = server.simulate_combat(duel, tick_seconds=0.1, max_seconds=0)
+        assert replay['events'] == [[0, 'timeout', 1, None, 0]]
+        assert duel['player1']['current_hp'] == 0 and duel['player2']['current_hp'] > 0
+
+    def test_timeout_tie_goes_to_player2(self, duel):
+        replay = server.simulate_combat(duel, tick_seconds=0.1, max_seconds=0)
+        assert replay['events'] == [[0, 'timeout', 1, None, 0]]
+        assert duel['player1']['current_hp'] == 0 and duel['player2']['current_hp'] > 0
+
+    def test_end_combat_settles_both_characters(self, duel):
+        duel['player2']['current_hp'] = 1
+        server.simulate_combat(duel, tick_seconds=0.1, max_seconds=0)  # ghost loses on time
+        server.end_combat(duel['combat_id'], duel)
+
+        assert duel['winner_id'] == "hero" and duel['rewards']['applied']
+        hero, ghost = character("hero"), character("ghost")
+        assert hero['gold'] == 50 + 100 + 10 * 10  # PvP gold: 100 + loser level * 10
+        assert ghost['gold'] == 70
+        assert (hero['pvp_wins'], hero['pvp_losses'], ghost['pvp_wins'], ghost['pvp_losses']) == (1, 0, 0, 1)
+        expected = 1 / (1 + 10 ** ((1100 - 1000) / 400))
+        assert hero['pvp_mmr'] == 1000 + int(32 * (1 - expected))
+        assert ghost['pvp_mmr'] == 1100 + int(32 * (0 - (1 - expected)))
+        assert duel['mmr_changes'] == {
+            "hero": {'before': 1000, 'after': hero['pvp_mmr']},
+            "ghost": {'before': 1100, 'after': ghost['pvp_mmr']},
+        }
+
+
+@pytest.fixture
+def client(game_db):
+    server.app.dependency_overrides[server.get_current_user] = lambda: {"user_id": "alice"}
+    yield TestClient(server.app)
+    server.app.dependency_overrides.pop(server.get_current_user, None)
+
+
+def fight(client, opponent_id=None):
+    payload = {"character_id": "hero"}
+    if opponent_id:
+        payload["opponent_id"] = opponent_id
+    return client.post("/api/pvp/ghost-battle", json=payload)
+
+
+class TestOpponentChecks:
+    def test_offline_opponent_is_fought(self, client):
+        seed("hero", "alice")
+        seed("ghost", "bob")
+        response = fight(client, "ghost")
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert body["opponent_id"] == "ghost" and body["won"] == (body["winner_id"] == "hero")
+        assert body["replay"]["events"]
+
+    def test_unknown_opponent(self, client):
+        seed("hero", "alice")
+        assert fight(client, "nobody").status_code == 404
+
+    def test_opponent_without_pvp(self, client):
+        seed("hero", "alice")
+        seed("ghost", "bob", pvp_enabled=False)
+        response = fight(client, "ghost")
+        assert response.status_code == 400 and "PvP" in response.json()["detail"]
+
+    def test_online_opponent(self, client):
+        seed("hero", "alice")
+        seed("ghost", "bob")
+        presence_tracker.heartbeat("bob")
+        response = fight(client, "ghost")
+        assert response.status_code == 400 and "online" in response.json()["detail"]
+
+    def test_sampling_skips_online_players(self, client):
+        seed("hero", "alice")
+        seed("ghost", "bob")
+        seed("alt", "alice")  # the caller's own character: its owner is online
+        presence_tracker.heartbeat("alice")
+        presence_tracker.heartbeat("bob")
+        assert fight(client).status_code == 404
+        presence_tracker.reset()
+        presence_tracker.heartbeat("alice")
+        for _ in range(4):
+            response = fight(client)
+            assert response.status_code == 200 and response.json()["opponent_id"] == "ghost"
+        # 5 draws for the 404, then at least one redraw after picking the online alt
+        assert server.opponent_index.stats()["samples"] > 5 + 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
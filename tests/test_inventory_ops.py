@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Unit tests for bulk inventory actions
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.inventory_ops import InventoryBulkService, InventorySnapshot, InventoryActionError
+
+
+def _item(item_id, slot='helmet', rarity='common', level=1):
+    return {'id': item_id, 'name': item_id, 'slot': slot, 'rarity': rarity, 'level': level, 'stats': {'might': 2}}
+
+
+def _snapshot(items, equipment=None, gold=1000, level=10, inventory_limit=100):
+    row = {'level': level, 'gold': gold, 'revision': 3, 'equipment_json': equipment or {'helmet': None, 'boots': None}}
+    return InventorySnapshot(row, items, inventory_limit=inventory_limit)
+
+
+class TestInventoryBulkActions:
+    def setup_method(self):
+        self.service = InventoryBulkService()
+
+    def test_sell_tracks_gold_and_removal(self):
+        snap = _snapshot([_item('a'), _item('b')])
+        result = self.service._sell(snap, {'item_id': 'a'})
+        assert result['gold_gained'] == 15
+        assert snap.gold_delta == 15
+        assert set(snap.inventory) == {'b'}
+        with pytest.raises(InventoryActionError):
+            self.service._sell(snap, {'item_id': 'a'})
+
+    def test_equip_swaps_current_item_back(self):
+        snap = _snapshot([_item('a')], equipment={'helmet': _item('old'), 'boots': None})
+        self.service._equip(snap, {'item_id': 'a', 'slot': 'helmet'})
+        assert snap.equipment['helmet']['id'] == 'a'
+        assert set(snap.inventory) == {'old'}
+        assert snap.dirty_slots == {'helmet'}
+        with pytest.raises(InventoryActionError):
+            self.service._equip(snap, {'item_id': 'old', 'slot': 'boots'})
+
+    def test_items_moved_back_need_a_free_unique_id(self):
+        snap = _snapshot([_item('old', slot='boots')], equipment={'helmet': _item('old'), 'boots': None})
+        with pytest.raises(InventoryActionError, match="already in inventory"):
+            self.service._unequip(snap, {'slot': 'helmet'})
+        snap = _snapshot([_item('a'), _item('old', slot='boots')], equipment={'helmet': _item('old'), 'boots': None})
+        with pytest.raises(InventoryActionError, match="already in inventory"):
+            self.service._equip(snap, {'item_id': 'a', 'slot': 'helmet'})
+        assert snap.equipment['helmet']['id'] == 'old' and not snap.changed
+
+        snap = _snapshot([_item('a')], equipment={'helmet': _item('old'), 'boots': None}, inventory_limit=1)
+        with pytest.raises(InventoryActionError, match="full"):
+            self.service._unequip(snap, {'slot': 'helmet'})
+        # A swap frees the slot it refills
+        self.service._equip(snap, {'item_id': 'a', 'slot': 'helmet'})
+        assert set(snap.inventory) == {'old'}
+
+    def test_combine_requires_matching_rarity_and_count(self):
+        snap = _snapshot([_item('a'), _item('b', rarity='rare'), _item('c')])
+        with pytest.raises(InventoryActionError):
+            self.service._combine(snap, {'item_ids': ['a', 'b']})
+        result = self.service._combine(snap, {'item_ids': ['a', 'c']})
+        assert result['rarity_created'] == 'uncommon'
+        assert set(snap.inventory) == {'b', result['equipment']['id']}
+        with pytest.raises(InventoryActionError, match="must be a list"):
+            self.service._combine(snap, {'item_ids': 'bb'})
+
+    def test_upgrade_spends_available_gold(self):
+        snap = _snapshot([_item('a', level=1)], gold=1500)
+        result = self.service._upgrade(snap, {'item_id': 'a'})
+        assert result['gold_spent'] == 1000
+        assert snap.inventory['a']['level'] == 2
+        assert snap.dirty_items == {'a'}
+        # 500 left is not enough for the next level (1500)
+        with pytest.raises(InventoryActionError):
+            self.service._upgrade(snap, {'item_id': 'a'})
+
+    def test_unchanged_snapshot(self):
+        snap = _snapshot([_item('a')])
+        assert not snap.changed
+        with pytest.raises(InventoryActionError):
+            self.service._unequip(snap, {'slot': 'helmet'})
+        assert not snap.changed
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the normalized inventory repository
+"""
+import pytest
+import json
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.inventory import InventoryRepository
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE characters (id TEXT PRIMARY KEY, inventory_json TEXT NOT NULL)")
+    conn.execute('''
+        CREATE TABLE inventory_items (
+            character_id TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            slot TEXT,
+            rarity TEXT,
+            level INTEGER,
+            position INTEGER NOT NULL DEFAULT 0,
+            item_json TEXT NOT NULL,
+            PRIMARY KEY (character_id, item_id)
+        )
+    ''')
+    yield conn.cursor()
+    conn.close()
+
+
+def _item(item_id, slot='helmet', rarity='common', level=1):
+    return {'id': item_id, 'name': item_id, 'slot': slot, 'rarity': rarity, 'level': level, 'stats': {}}
+
+
+class TestInventoryRepository:
+    def test_add_preserves_order_and_pages(self, cursor):
+        repo = InventoryRepository()
+        for i in range(5):
+            repo.add_item(cursor, 'c1', _item(f'eq_{i}'))
+        repo.add_item(cursor, 'c2', _item('eq_other'))
+
+        assert repo.count(cursor, 'c1') == 5
+        assert [i['id'] for i in repo.list_items(cursor, 'c1')] == [f'eq_{i}' for i in range(5)]
+        assert [i['id'] for i in repo.list_items(cursor, 'c1', limit=2, offset=2)] == ['eq_2', 'eq_3']
+
+    def test_colliding_id_is_rekeyed(self, cursor):
+        repo = InventoryRepository()
+        repo.add_item(cursor, 'c1', _item('eq_1'))
+        second = repo.add_item(cursor, 'c1', _item('eq_1'))
+        assert second['id'] != 'eq_1'
+        assert repo.get_item(cursor, 'c1', second['id'])['id'] == second['id']
+        assert repo.count(cursor, 'c1') == 2
+
+    def test_filters_update_and_remove(self, cursor):
+        repo = InventoryRepository()
+        repo.add_item(cursor, 'c1', _item('eq_a', slot='boots', rarity='rare'))
+        repo.add_item(cursor, 'c1', _item('eq_b', slot='helmet'))
+        assert [i['id'] for i in repo.list_items(cursor, 'c1', slot='boots')] == ['eq_a']
+        assert [i['id'] for i in repo.list_items(cursor, 'c1', rarity='common')] == ['eq_b']
+
+        item = repo.get_item(cursor, 'c1', 'eq_b')
+        item['level'] = 7
+        assert repo.update_item(cursor, 'c1', item)
+        assert repo.get_item(cursor, 'c1', 'eq_b')['level'] == 7
+
+        assert set(repo.get_items(cursor, 'c1', ['eq_a', 'eq_b', 'missing'])) == {'eq_a', 'eq_b'}
+        assert repo.remove_items(cursor, 'c1', ['eq_a', 'eq_b']) == 2
+        assert not repo.remove_item(cursor, 'c1', 'eq_a')
+        assert repo.count(cursor, 'c1') == 0
+
+    def test_add_items_respects_limit(self, cursor):
+        repo = InventoryRepository(limit=3)
+        repo.add_item(cursor, 'c1', _item('eq_0'))
+        added = repo.add_items(cursor, 'c1', [_item(f'eq_{i}') for i in range(1, 5)])
+        assert [i['id'] for i in added] == ['eq_1', 'eq_2']
+        assert repo.count(cursor, 'c1') == 3
+
+    def test_limit_is_checked_by_the_insert(self, cursor):
+        repo = InventoryRepository(limit=2)
+        assert repo.add_item(cursor, 'c1', _item('eq_1'), limit=2)
+        assert repo.add_item(cursor, 'c1', _item('eq_1'), limit=2)['id'] != 'eq_1'  # re-keyed, still fits
+        assert repo.add_item(cursor, 'c1', _item('eq_3'), limit=2) is None
+        assert repo.count(cursor, 'c1') == 2
+
+
+class TestLegacyInventoryMigration:
+    def test_migrates_and_empties_blob(self, cursor):
+        legacy = [_item('eq_1'), _item('eq_2', slot='boots'), _item('eq_1'), {'name': 'no id', 'slot': 'legs'}]
+        cursor.execute("INSERT INTO characters (id, inventory_json) VALUES (?, ?)", ('c1', json.dumps(legacy)))
+        cursor.execute("INSERT INTO characters (id, inventory_json) VALUES (?, ?)", ('c2', '[]'))
+
+        repo = InventoryRepository()
+        assert repo.migrate_legacy_inventory(cursor) == 1
+
+        items = repo.list_items(cursor, 'c1')
+        assert len(items) == 4
+        assert [i['id'] for i in items[:2]] == ['eq_1', 'eq_2']
+        assert len({i['id'] for i in items}) == 4
+        cursor.execute("SELECT inventory_json FROM characters WHERE id = 'c1'")
+        assert cursor.fetchone()['inventory_json'] == '[]'
+
+        # Idempotent
+        assert repo.migrate_legacy_inventory(cursor) == 0
+        assert repo.count(cursor, 'c1') == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
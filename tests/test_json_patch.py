@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for in-database JSON patch helpers
+"""
+import pytest
+import json
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.json_patch import JsonPatch, json_extract_path, json_path_equals, load_json_column
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE docs (id INTEGER PRIMARY KEY, doc TEXT NOT NULL)")
+    conn.execute(
+        "INSERT INTO docs (id, doc) VALUES (1, ?)",
+        (json.dumps({'strength': 10, 'helmet': {'id': 'eq_1'}, 'boots': None}),)
+    )
+    yield conn
+    conn.close()
+
+
+def _apply(conn, patch, where="", where_params=()):
+    expr, params = patch.build()
+    cursor = conn.execute(f"UPDATE docs SET doc = {expr} WHERE id = 1 {where}", (*params, *where_params))
+    return cursor.rowcount
+
+
+def _doc(conn):
+    return load_json_column(conn.execute("SELECT doc FROM docs WHERE id = 1").fetchone()['doc'])
+
+
+class TestSqliteJsonPatch:
+    def test_set_increment_remove_insert(self, conn):
+        patch = (
+            JsonPatch('doc', use_postgres=False)
+            .set('boots', {'id': 'eq_2'})
+            .increment('strength', 3)
+            .increment('agility', 2, default=10)
+            .remove('helmet')
+            .insert('strength', 99)
+            .insert('luck', 1)
+        )
+        assert _apply(conn, patch) == 1
+        assert _doc(conn) == {'strength': 13, 'agility': 12, 'boots': {'id': 'eq_2'}, 'luck': 1}
+
+    def test_chained_increments_see_earlier_operations(self, conn):
+        patch = (
+            JsonPatch('doc', use_postgres=False)
+            .increment('strength', 3)
+            .increment('strength', 4)
+            .set('agility', 5)
+            .increment('agility', 1)
+        )
+        assert _apply(conn, patch) == 1
+        assert _doc(conn)['strength'] == 17 and _doc(conn)['agility'] == 6
+
+    def test_set_null_and_guard(self, conn):
+        guard, guard_params = json_path_equals('doc', ['helmet', 'id'], 'eq_other', use_postgres=False)
+        patch = JsonPatch('doc', use_postgres=False).set('helmet', None)
+        assert _apply(conn, patch, f"AND {guard}", guard_params) == 0
+
+        guard, guard_params = json_path_equals('doc', ['helmet', 'id'], 'eq_1', use_postgres=False)
+        patch = JsonPatch('doc', use_postgres=False).set('helmet', None)
+        assert _apply(conn, patch, f"AND {guard}", guard_params) == 1
+        assert _doc(conn)['helmet'] is None
+
+        # Empty slot matches an expected value of None
+        guard, guard_params = json_path_equals('doc', ['helmet', 'id'], None, use_postgres=False)
+        assert _apply(conn, JsonPatch('doc', use_postgres=False).set('helmet', {'id': 'eq_3'}), f"AND {guard}", guard_params) == 1
+
+    def test_extract_path(self, conn):
+        expr, params = json_extract_path('doc', 'helmet', use_postgres=False)
+        row = conn.execute(f"SELECT {expr} AS value FROM docs WHERE id = 1", params).fetchone()
+        assert load_json_column(row['value']) == {'id': 'eq_1'}
+
+        expr, params = json_extract_path('doc', 'boots', use_postgres=False)
+        row = conn.execute(f"SELECT {expr} AS value FROM docs WHERE id = 1", params).fetchone()
+        assert load_json_column(row['value']) is None
+
+
+class TestPostgresJsonPatch:
+    def test_builds_nested_jsonb_set(self):
+        expr, params = JsonPatch('stats_json', use_postgres=True).set('a', 1).increment('b', 2).build()
+        assert expr.startswith("jsonb_set(jsonb_set(stats_json, ?::text[], ?::jsonb, true)")
+        assert params == [['a'], '1', ['b'], ['b'], 0, 2]
+
+        # A second increment of the same path reads the already-patched document
+        expr, params = JsonPatch('stats_json', use_postgres=True).increment('b', 1).increment('b', 2).build()
+        inner = [['b'], ['b'], 0, 1]
+        assert params == [*inner, ['b'], *inner, ['b'], 0, 2]
+        assert expr.count("?") == len(params)
+
+    def test_load_json_column_accepts_parsed_values(self):
+        assert load_json_column({'a': 1}) == {'a': 1}
+        assert load_json_column('{"a": 1}') == {'a': 1}
+        assert load_json_column(None, default={}) == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
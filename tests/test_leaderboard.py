@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the materialized PvP leaderboard
+"""
+import asyncio
+import pytest
+import random
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import leaderboard as leaderboard_module
+from app.services.leaderboard import Leaderboard, _RankedSkipList
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def row(cid, mmr, wins=0, level=1, losses=0):
+    return {"id": cid, "name": cid.title(), "mmr": mmr, "wins": wins, "losses": losses, "level": level}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def board(clock):
+    board = Leaderboard(reconcile_seconds=300, clock=clock, rng=random.Random(3))
+    board.reconcile(lambda: [
+        row("ann", 1200, wins=5),
+        row("bob", 1100, wins=9),
+        row("cat", 1100, wins=9, level=4),
+        row("dan", 900),
+        row("eve", 1000, wins=2),
+    ])
+    return board
+
+
+def ids(rows):
+    return [entry["id"] for entry in rows]
+
+
+class TestSkipList:
+    def test_matches_sorted_list(self):
+        rng = random.Random(11)
+        skiplist, reference = _RankedSkipList(rng), []
+        for step in range(2000):
+            key = (rng.randrange(300), f"c{rng.randrange(50)}")
+            if key in reference:
+                assert skiplist.remove(key)
+                reference.remove(key)
+            else:
+                skiplist.insert(key)
+                reference.append(key)
+            if step % 100 == 0:
+                reference.sort()
+                assert len(skiplist) == len(reference)
+                for position, expected in enumerate(reference, start=1):
+                    assert skiplist.rank(expected) == position
+                    assert skiplist.select(position).key == expected
+                assert skiplist.descending(0, len(reference)) == reference[::-1]
+        assert not skiplist.remove((-1, "missing"))
+
+
+class TestLeaderboard:
+    def test_orders_by_mmr_wins_level(self, board):
+        assert ids(board.page(0, 10)) == ["ann", "cat", "bob", "eve", "dan"]
+        assert [entry["rank"] for entry in board.page(1, 2)] == [2, 3]
+        assert ids(board.page(4, 10)) == ["dan"]
+        assert board.page(10, 10) == []
+
+    def test_updates_move_ranks(self, board):
+        board.update("dan", mmr=1300, wins=1)
+        board.update("ann", losses=3)
+        board.update("ghost", mmr=5000)  # not ranked: ignored
+        assert board.rank("dan") == 1
+        assert board.rank("ann") == 2
+        assert board.page(0, 1)[0]["best_mmr"] == 1300
+        assert board.rank("ghost") is None
+        board.remove("dan")
+        assert board.rank("ann") == 1
+        assert len(board) == 4
+
+    def test_rank_with_neighbors(self, board):
+        around = board.around("bob", neighbors=1)
+        assert around["rank"] == 3
+        assert ids(around["entries"]) == ["cat", "bob", "eve"]
+        assert ids(board.around("ann", neighbors=2)["entries"]) == ["ann", "cat", "bob"]
+        assert board.around("ghost", neighbors=2) is None
+
+    def test_reconcile_replays_updates_made_during_rebuild(self, board, clock):
+        clock.now += 300
+
+        def loader():
+            board.update("eve", mmr=2000)  # lands while the rebuild is running
+            return [row("eve", 1000), row("fay", 1050)]
+
+        board.reconcile(loader)
+        assert ids(board.page(0, 10)) == ["eve", "fay"]
+        assert board.stats()["reconciles"] == 2
+
+    def test_background_task_builds_then_reconciles(self, clock, monkeypatch):
+        board = Leaderboard(reconcile_seconds=300, clock=clock, rng=random.Random(3))
+        sleeps, loads = [], []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                raise asyncio.CancelledError
+
+        async def run_blocking(fn, *args):
+            return fn(*args)
+
+        def loader():
+            loads.append(1)
+            if len(loads) == 1:
+                raise RuntimeError("database unavailable")
+            return [row("ann", 1200)]
+
+        monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+        assert not board.loaded
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(board.run_forever(loader, run_blocking))
+        assert board.loaded and ids(board.page(0, 10)) == ["ann"]
+        assert sleeps == [leaderboard_module.RETRY_SECONDS, 300, 300]
+        assert board.stats()["reconcile_errors"] == 1 and board.stats()["reconciles"] == 2
+
+
+class TestRedisLeaderboard:
+    def test_scripted_updates_match_memory_board(self, board, clock, monkeypatch):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # fakeredis runs Lua scripts through lupa
+        client = fakeredis.FakeStrictRedis(decode_responses=True)
+        shared = Leaderboard(reconcile_seconds=300, clock=clock, rng=random.Random(3))
+        monkeypatch.setattr(shared, "_client", lambda: client)
+        shared.reconcile(lambda: [dict(entry) for entry in board.page(0, 10)])
+
+        rng = random.Random(5)
+        for _ in range(200):
+            cid = rng.choice(["ann", "bob", "cat", "dan", "eve", "ghost"])
+            changes = {
+                "mmr": rng.choice([None, rng.randrange(800, 1400)]),
+                "wins": rng.choice([None, rng.randrange(20)]),
+                "level": rng.choice([None, rng.randrange(1, 60)]),
+            }
+            board.update(cid, **changes)
+            shared.update(cid, **changes)
+        assert shared.page(0, 10) == board.page(0, 10)
+        assert [shared.rank(cid) for cid in ("ann", "dan")] == [board.rank(cid) for cid in ("ann", "dan")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the MMR-bucketed matchmaking engine
+"""
+import pytest
+import sys
+import os
+import random
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.cache import redis_cache
+from app.core.state import game_state
+from app.services.matchmaker import BatchMatchmaker
+from app.services.matchmaking import MatchmakingEngine, QueueEntry, RedisMatchQueue
+from app.services.state_service import state_service
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def engine(clock):
+    return MatchmakingEngine(
+        bracket_width=100, base_window=100, widen_per_second=10,
+        max_window=500, entry_ttl=300, clock=clock,
+    )
+
+
+class TestPairing:
+    def test_pairs_closest_mmr_across_brackets(self, engine):
+        engine.join("far", 1150)
+        engine.join("near", 1098)
+        engine.join("me", 1120)
+        assert engine.pair("me").character_id == "near"
+        assert len(engine) == 1
+        assert engine.get("far") is not None
+
+    def test_out_of_window_players_are_not_paired(self, engine):
+        engine.join("low", 800)
+        engine.join("me", 1200)
+        assert engine.pair("me") is None
+        assert len(engine) == 2
+
+    def test_window_widens_with_wait(self, engine, clock):
+        engine.join("veteran", 1250)
+        engine.join("me", 1000)
+        assert engine.pair("me") is None
+        clock.now += 15  # veteran's window is now 250
+        assert engine.pair("me").character_id == "veteran"
+        assert len(engine) == 0
+
+    def test_unqueued_caller_searches_by_mmr(self, engine):
+        engine.join("queued", 1500)
+        assert engine.pair("visitor", mmr=1450).character_id == "queued"
+        assert engine.pair("visitor", mmr=1450) is None
+
+    def test_rejoin_moves_bracket(self, engine):
+        engine.join("a", 1000)
+        engine.join("a", 1600)
+        assert engine.depth_by_bracket() == {"1600-1699": 1}
+        assert engine.leave("a") and not engine.leave("a")
+
+
+@pytest.fixture
+def redis_queue(monkeypatch, clock):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs Lua scripts through lupa
+    client = fakeredis.FakeStrictRedis(decode_responses=True)
+    monkeypatch.setattr(redis_cache, "get_client", lambda: client)
+    return RedisMatchQueue(
+        bracket_width=100, base_window=100, widen_per_second=10,
+        max_window=500, entry_ttl=300, clock=clock,
+    )
+
+
+class TestRedisPairing:
+    def test_walks_past_neighbours_outside_their_window(self, redis_queue, clock):
+        redis_queue.join("veteran", 700)
+        clock.now += 30  # veteran's window is now 400
+        for i in range(40):  # fresh, 150-189 above: out of everyone's window
+            redis_queue.join(f"fresh{i}", 1150 + i)
+        assert redis_queue.pair("me", mmr=1000).character_id == "veteran"
+        assert redis_queue.pair("me", mmr=1000) is None
+        assert len(redis_queue) == 40
+
+    def test_matches_in_memory_engine(self, redis_queue, engine, clock):
+        rng = random.Random(7)
+        for mmr in rng.sample(range(500, 2500), 120):
+            for queue in (redis_queue, engine):
+                queue.join(f"p{mmr}", mmr)
+            clock.now += rng.random()
+        clock.now += 5
+        for mmr in rng.sample(range(500, 2500), 60):
+            expected = engine.pair("seeker", mmr=mmr)
+            found = redis_queue.pair("seeker", mmr=mmr)
+            assert (found and found.character_id) == (expected and expected.character_id)
+        for character_id in sorted(engine.entries())[::3]:  # queued seekers use their own window
+            if engine.get(character_id) is not None:
+                expected = engine.pair(character_id)
+                found = redis_queue.pair(character_id)
+                assert (found and found.character_id) == (expected and expected.character_id)
+        assert set(redis_queue.entries()) == set(engine.entries())
+
+
+class TestQueueState:
+    def test_entries_expire_after_ttl(self, engine, clock):
+        engine.join("a", 1000)
+        clock.now += 200
+        engine.join("b", 1000)
+        clock.now += 100
+        assert engine.get("a") is None
+        assert engine.get("b") is not None
+        assert engine.stats()["expired"] == 1
+
+    def test_depth_by_bracket(self, engine):
+        for cid, mmr in (("a", 990), ("b", 1000), ("c", 1099), ("d", 1300)):
+            engine.join(cid, mmr)
+        assert engine.depth_by_bracket() == {"900-999": 1, "1000-1099": 2, "1300-1399": 1}
+
+
+class TestStateServiceQueue:
+    def test_in_memory_backend_round_trip(self, monkeypatch, engine):
+        monkeypatch.setattr(state_service, "pvp_queue", lambda: engine)
+        state_service.set_pvp_queue_entry("a", 1000)
+        state_service.set_pvp_queue_entry("b", 1040)
+        assert state_service.get_pvp_queue_entry("a") is not None
+        assert state_service.get_pvp_queue_size() == 2
+        assert set(state_service.get_all_pvp_queue()) == {"a", "b"}
+        assert state_service.pop_pvp_pair("a") == "b"
+        assert state_service.get_pvp_queue_entry("a") is None
+        assert state_service.pop_pvp_pair("c", 1000) is None
+
+
+class TestBatchPlanning:
+    def test_pairs_neighbours_for_smallest_total_gap(self, engine, clock):
+        entries = [QueueEntry(cid, mmr, clock.now) for cid, mmr in
+                   (("a", 1000), ("b", 1010), ("c", 1060), ("d", 1075))]
+        pairs = [(x.character_id, y.character_id) for x, y in engine.plan_pairs(entries)]
+        assert pairs == [("a", "b"), ("c", "d")]
+
+    def test_prefers_more_matches_over_smaller_gap(self, engine, clock):
+        # pairing b-c (gap 10) would strand a and d; a-b and c-d match everyone
+        entries = [QueueEntry(cid, mmr, clock.now) for cid, mmr in
+                   (("a", 1000), ("b", 1090), ("c", 1100), ("d", 1190))]
+        pairs = [(x.character_id, y.character_id) for x, y in engine.plan_pairs(entries)]
+        assert pairs == [("a", "b"), ("c", "d")]
+
+    def test_respects_windows(self, engine, clock):
+        entries = [QueueEntry("a", 1000, clock.now), QueueEntry("b", 1300, clock.now)]
+        assert engine.plan_pairs(entries) == []
+        clock.now += 20  # both windows now 300
+        assert len(engine.plan_pairs(entries)) == 1
+
+
+class TestBatchMatchmaker:
+    def test_tick_claims_and_publishes(self, monkeypatch, engine, clock):
+        monkeypatch.setattr(state_service, "pvp_queue", lambda: engine)
+        clock.now = time.time()  # published results expire on the wall clock
+        for cid, mmr in (("a", 1000), ("b", 1020), ("c", 1900)):
+            engine.join(cid, mmr)
+        matchmaker = BatchMatchmaker(interval_seconds=0.5, clock=clock)
+        assert matchmaker.tick() == 1
+        assert state_service.get_pvp_match_result("a")["opponent_id"] == "b"
+        assert state_service.get_pvp_match_result("b")["opponent_id"] == "a"
+        assert state_service.get_pvp_match_result("c") is None
+        assert engine.get("c") is not None and len(engine) == 1
+        for cid in ("a", "b"):
+            state_service.delete_pvp_match_result(cid)
+
+    def test_results_are_published_under_the_state_lock(self):
+        stale = time.time() - 10 * 3600
+        state_service.set_pvp_match_results({"old": {"opponent_id": "x", "matched_at": stale}})
+        published = threading.Event()
+
+        def publish():
+            state_service.set_pvp_match_results({"a": {"opponent_id": "b", "matched_at": time.time()}})
+            published.set()
+
+        with game_state.lock:  # what a consumer popping a result holds
+            thread = threading.Thread(target=publish)
+            thread.start()
+            assert not published.wait(0.1)
+            assert "old" in game_state.pvp_matches
+        thread.join()
+        assert published.is_set() and "old" not in game_state.pvp_matches
+        state_service.delete_pvp_match_result("a")
+
+    def test_claim_skips_players_already_taken(self, engine):
+        for cid in ("a", "b", "c"):
+            engine.join(cid, 1000)
+        assert engine.claim_pairs([("a", "b"), ("b", "c")]) == [True, False]
+        assert engine.get("c") is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
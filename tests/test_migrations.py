@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Unit tests for versioned schema migrations and hot-query index usage
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.migrations import MigrationEngine, migration_engine
+from app.db.queries import PVP_LEADERBOARD_ROWS, PVP_OPPONENT_INDEX_ROWS
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "migrations.db"))
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+def _plan(conn, sql, params=()):
+    return " | ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+class TestMigrationEngine:
+    def test_applies_all_versions_once(self, conn):
+        applied = migration_engine.migrate(conn, use_postgres=False)
+        assert applied == [m.version for m in migration_engine.migrations]
+        assert migration_engine.migrate(conn, use_postgres=False) == []
+
+        rows = conn.execute("SELECT version, name FROM schema_migrations ORDER BY version").fetchall()
+        assert rows[0]["name"] == "baseline_schema"
+        assert rows[-1]["version"] == migration_engine.latest_version
+
+    def test_upgrades_database_created_before_versioning(self, conn):
+        conn.execute(
+            "CREATE TABLE users (id TEXT PRIMARY KEY, username TEXT UNIQUE NOT NULL, "
+            "password_hash TEXT NOT NULL, email TEXT, created_at TIMESTAMP)"
+        )
+        conn.execute(
+            "CREATE TABLE characters (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, name TEXT UNIQUE NOT NULL, "
+            "level INTEGER DEFAULT 1, exp INTEGER DEFAULT 0, skill_points INTEGER DEFAULT 3, "
+            "stats_json TEXT NOT NULL, equipment_json TEXT NOT NULL, inventory_json TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO characters (id, user_id, name, stats_json, equipment_json, inventory_json) "
+            "VALUES ('c1', 'u1', 'Old', '{}', '{}', '[{\"id\": \"eq_1\", \"slot\": \"helmet\"}]')"
+        )
+        conn.commit()
+
+        migration_engine.migrate(conn, use_postgres=False)
+
+        row = conn.execute("SELECT gold, pvp_mmr, revision, inventory_json FROM characters WHERE id = 'c1'").fetchone()
+        assert (row["gold"], row["pvp_mmr"], row["revision"]) == (0, 1000, 0)
+        assert row["inventory_json"] == "[]"
+        assert conn.execute("SELECT item_id FROM inventory_items WHERE character_id = 'c1'").fetchone()[0] == "eq_1"
+
+    def test_failed_migration_is_not_recorded(self, conn):
+        engine = MigrationEngine()
+
+        @engine.register(1, "create_t")
+        def _create(ctx):
+            ctx.execute("CREATE TABLE t (x INTEGER)")
+
+        @engine.register(2, "broken")
+        def _broken(ctx):
+            ctx.execute("INSERT INTO missing_table VALUES (1)")
+
+        with pytest.raises(sqlite3.OperationalError):
+            engine.migrate(conn, use_postgres=False)
+        assert engine.applied_versions(conn.cursor()) == [1]
+        with pytest.raises(ValueError):
+            engine.register(1, "duplicate")(lambda ctx: None)
+
+    def test_version_is_rechecked_under_the_write_lock(self, conn, tmp_path, monkeypatch):
+        engine = MigrationEngine()
+
+        @engine.register(1, "create_t")
+        def _create(ctx):
+            ctx.execute("CREATE TABLE t (x INTEGER)")
+
+        other = sqlite3.connect(str(tmp_path / "migrations.db"))
+        other.row_factory = sqlite3.Row
+        try:
+            assert engine.migrate(other, use_postgres=False) == [1]
+        finally:
+            other.close()
+
+        # A worker that listed pending versions before the other one finished
+        monkeypatch.setattr(engine, "pending", lambda cursor: list(engine.migrations))
+        assert engine.migrate(conn, use_postgres=False) == []
+        assert engine.applied_versions(conn.cursor()) == [1]
+
+    def test_each_migration_commits_once_with_its_version_row(self, conn):
+        class CountingConnection:
+            def __init__(self, inner):
+                self.inner = inner
+                self.versions_at_commit = []
+
+            def __getattr__(self, name):
+                return getattr(self.inner, name)
+
+            def commit(self):
+                self.inner.commit()
+                self.versions_at_commit.append(
+                    self.inner.execute("SELECT COUNT(*) FROM schema_migrations").fetchone()[0]
+                )
+
+        counting = CountingConnection(conn)
+        migration_engine.migrate(counting, use_postgres=False)
+        # One commit for the version table, then exactly one per migration
+        assert counting.versions_at_commit == list(range(len(migration_engine.migrations) + 1))
+
+
+class TestHotQueryIndexes:
+    @pytest.fixture(autouse=True)
+    def migrated(self, conn):
+        migration_engine.migrate(conn, use_postgres=False)
+
+    def test_character_lookups(self, conn):
+        assert "idx_characters_user_id" in _plan(conn, "SELECT id, name FROM characters WHERE user_id = ?", ("u1",))
+        plan = _plan(conn, PVP_OPPONENT_INDEX_ROWS.sqlite_sql, ())
+        assert "idx_characters_pvp_level" in plan
+
+    def test_leaderboard_rows_join_profiles_by_index(self, conn):
+        plan = _plan(conn, PVP_LEADERBOARD_ROWS.sqlite_sql, (1000, 1000))
+        assert "sqlite_autoindex_player_profiles" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_chat_votes_and_abilities(self, conn):
+        plan = _plan(conn, "SELECT message FROM chat_messages ORDER BY created_at DESC LIMIT ?", (50,))
+        assert "idx_chat_messages_created_at" in plan and "TEMP B-TREE" not in plan
+
+        plan = _plan(conn, "SELECT id FROM feedback_votes WHERE feedback_id = ? AND user_id = ?", ("f1", "u1"))
+        assert "sqlite_autoindex_feedback_votes" in plan
+        assert "idx_feedback_votes_user" in _plan(
+            conn, "SELECT feedback_id FROM feedback_votes WHERE user_id = ?", ("u1",)
+        )
+
+        plan = _plan(
+            conn,
+            "SELECT ability_id FROM character_abilities WHERE character_id = ? ORDER BY slot_position",
+            ("c1",),
+        )
+        assert "sqlite_autoindex_character_abilities" in plan and "TEMP B-TREE" not in plan
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
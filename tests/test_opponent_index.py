@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the level-bucketed PvP opponent index
+"""
+import pytest
+import random
+import sys
+import os
+from collections import Counter
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.opponents import OpponentIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def row(cid, name, level, mmr=1000):
+    return {"id": cid, "name": name, "level": level, "pvp_mmr": mmr}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def index(clock):
+    index = OpponentIndex(refresh_seconds=60, clock=clock)
+    index.ensure_loaded(lambda: [
+        row("me", "Me", 10),
+        row("b", "Bravo", 11),
+        row("a", "Alpha", 9),
+        row("c", "Charlie", 10),
+        row("far", "Faraway", 30),
+    ])
+    return index
+
+
+def ids(opponents):
+    return [opponent.id for opponent in opponents]
+
+
+class TestNearest:
+    def test_orders_by_level_distance_then_name(self, index):
+        assert ids(index.nearest(10, limit=10, max_level_diff=5, exclude="me")) == ["c", "a", "b"]
+
+    def test_limit_and_level_range(self, index):
+        assert ids(index.nearest(10, limit=2, max_level_diff=5, exclude="me")) == ["c", "a"]
+        assert ids(index.nearest(10, limit=10, max_level_diff=0)) == ["c", "me"]
+        assert ids(index.nearest(30, limit=10, max_level_diff=1)) == ["far"]
+
+
+class TestMaintenance:
+    def test_upsert_update_remove(self, index):
+        index.upsert(row("d", "Delta", 10))
+        index.update("a", level=10, mmr=1200)
+        index.remove("c")
+        assert ids(index.nearest(10, limit=10, max_level_diff=0, exclude="me")) == ["a", "d"]
+        assert index.get("a").mmr == 1200
+        index.update("ghost", level=5)  # not indexed: ignored
+        assert index.get("ghost") is None
+
+    def test_refresh_replays_updates_made_during_rebuild(self, index, clock):
+        clock.now += 60
+
+        def loader():
+            index.remove("b")  # lands while the rebuild is running
+            return [row("b", "Bravo", 11), row("e", "Echo", 12)]
+
+        index.ensure_loaded(loader)
+        assert index.get("b") is None
+        assert index.get("e") is not None
+        assert index.stats()["loads"] == 2
+
+    def test_not_reloaded_before_interval(self, index):
+        index.ensure_loaded(lambda: [])
+        assert len(index) == 5
+
+
+class TestSampling:
+    def test_uniform_and_never_the_caller(self, clock):
+        index = OpponentIndex(refresh_seconds=60, clock=clock, rng=random.Random(7))
+        index.ensure_loaded(lambda: [row(f"c{i}", f"N{i}", 10) for i in range(4)])
+        counts = Counter(index.sample(exclude="c1") for _ in range(3000))
+        assert set(counts) == {"c0", "c2", "c3"}
+        assert min(counts.values()) > 900
+
+    def test_prefers_level_band_then_falls_back(self, index):
+        assert index.sample(exclude="me", level=35) == "far"
+        assert index.sample(exclude="me", level=10) in {"b", "c"}
+        assert index.sample(exclude="me", level=55) in {"a", "b", "c", "far"}
+        assert index.stats()["band_fallbacks"] == 1
+
+    def test_swap_remove_keeps_sampler_consistent(self, index):
+        for cid in ("me", "a", "b", "c"):
+            index.remove(cid)
+        assert index.sample() == "far"
+        assert index.sample(exclude="far") is None
+
+    def test_highest_levels_first(self, index):
+        assert ids(index.highest(3)) == ["far", "b", "c"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the character-ownership cache
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.ownership import OwnershipCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLoader:
+    def __init__(self, owned):
+        self.owned = owned
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        return self.owned.get(user_id, [])
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return OwnershipCache(max_entries=2, ttl_seconds=60, clock=clock)
+
+
+class TestOwnershipCache:
+    def test_loads_once_then_answers_from_cache(self, cache):
+        loader = CountingLoader({"u1": ["c1", "c2"]})
+        assert cache.owns("u1", "c1", loader)
+        assert cache.owns("u1", "c2", loader)
+        assert loader.calls == 1
+        assert cache.stats()["local_hits"] == 1
+
+    def test_primed_set_needs_no_load(self, cache):
+        loader = CountingLoader({})
+        cache.prime("u1", ["c1"])
+        assert cache.owns("u1", "c1", loader)
+        assert loader.calls == 0
+
+    def test_negative_answer_is_rechecked(self, cache):
+        loader = CountingLoader({"u1": ["c1"]})
+        cache.prime("u1", [])  # stale copy from before the character existed
+        assert cache.owns("u1", "c1", loader)
+        assert loader.calls == 1
+        assert not cache.owns("u1", "other", loader)
+        assert cache.stats()["rechecks"] == 2
+
+    def test_missing_character_id_is_refused(self, cache):
+        loader = CountingLoader({"u1": ["c1"]})
+        assert not cache.owns("u1", None, loader)
+        assert loader.calls == 0
+
+    def test_ttl_and_lru_bound(self, cache, clock):
+        cache.prime("u1", ["c1"])
+        clock.now += 60
+        assert cache.get("u1") is None
+        for user in ("u1", "u2", "u3"):
+            cache.prime(user, [f"{user}-c"])
+        assert cache.get("u1") is None
+        assert cache.get("u3") == frozenset({"u3-c"})
+
+    def test_invalidate_discards_racing_load(self, cache):
+        epoch = cache.load_epoch()
+        cache.invalidate("u1")  # character deleted while the load ran
+        cache.prime("u1", ["c1"], epoch)
+        assert cache.get("u1") is None
+
+    def test_disabled_cache_always_loads(self, clock):
+        cache = OwnershipCache(max_entries=0, ttl_seconds=60, clock=clock)
+        loader = CountingLoader({"u1": ["c1"]})
+        assert cache.owns("u1", "c1", loader) and cache.owns("u1", "c1", loader)
+        assert loader.calls == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pooled bcrypt hashing and the rehash policy
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.passwords import PasswordHasher, hash_password_sync, hash_rounds
+
+
+class TestPolicy:
+    def test_rounds_are_validated(self):
+        with pytest.raises(ValueError):
+            PasswordHasher(rounds=3, workers=0, max_concurrency=1)
+
+    def test_needs_rehash_only_below_policy(self):
+        weak = hash_password_sync("secret1", 4)
+        assert hash_rounds(weak) == 4
+        assert PasswordHasher(rounds=5, workers=0, max_concurrency=1).needs_rehash(weak)
+        assert not PasswordHasher(rounds=4, workers=0, max_concurrency=1).needs_rehash(weak)
+        assert not PasswordHasher(rounds=5, workers=0, max_concurrency=1).needs_rehash("not-a-hash")
+
+
+class TestPasswordHasher:
+    async def test_process_pool_roundtrip(self):
+        hasher = PasswordHasher(rounds=4, workers=1, max_concurrency=2)
+        try:
+            hashed = await hasher.hash("secret1")
+            assert hash_rounds(hashed) == 4
+            assert await hasher.verify("secret1", hashed)
+            assert not await hasher.verify("wrong", hashed)
+            stats = hasher.stats()
+            assert (stats["hashes"], stats["verifies"], stats["backend"]) == (1, 2, "process")
+        finally:
+            hasher.shutdown()
+
+    async def test_concurrency_cap_queues_callers(self):
+        hasher = PasswordHasher(rounds=4, workers=0, max_concurrency=1)
+        hashed = hash_password_sync("secret1", 4)
+        results = await asyncio.gather(*(hasher.verify("secret1", hashed) for _ in range(4)))
+        assert all(results)
+        stats = hasher.stats()
+        assert stats["verifies"] == 4 and stats["in_flight"] == 0 and stats["waiting"] == 0
+        assert stats["queue_wait_ms_max"] > 0
+
+    async def test_invalid_hash_counts_as_failure(self):
+        hasher = PasswordHasher(rounds=4, workers=0, max_concurrency=1)
+        with pytest.raises(ValueError):
+            await hasher.verify("secret1", "not-a-hash")
+        assert hasher.stats()["failed"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the bucketed online-presence tracker
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.presence import PresenceTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 6_000_000.0  # aligned to a bucket boundary
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def tracker(clock):
+    return PresenceTracker(window_seconds=300, bucket_seconds=60, clock=clock)
+
+
+class TestPresenceTracker:
+    def test_counts_distinct_users(self, tracker):
+        for user in ("u1", "u2", "u1", "u3"):
+            tracker.heartbeat(user)
+        assert tracker.online_count() == 3
+
+    def test_heartbeats_coalesced_per_bucket(self, tracker, clock):
+        for _ in range(10):
+            tracker.heartbeat("u1")
+            clock.now += 5
+        assert tracker.stats()["writes"] == 1
+        clock.now += 10  # next bucket
+        tracker.heartbeat("u1")
+        assert tracker.stats()["writes"] == 2
+        assert tracker.online_count() == 1
+
+    def test_user_moves_to_latest_bucket(self, tracker, clock):
+        tracker.heartbeat("u1")
+        clock.now += 120
+        tracker.heartbeat("u1")
+        stats = tracker.stats()
+        assert stats["tracked_users"] == 1
+        clock.now += 300
+        assert tracker.online_count() == 1  # still inside the window of the second heartbeat
+
+    def test_users_expire_after_window(self, tracker, clock):
+        tracker.heartbeat("u1")
+        clock.now += 300
+        assert tracker.online_count() == 1
+        clock.now += 60
+        assert tracker.online_count() == 0
+        assert tracker.stats()["buckets"] == 0
+
+    def test_is_online_follows_the_window(self, tracker, clock):
+        tracker.heartbeat("u1")
+        clock.now += 300
+        assert tracker.is_online("u1") and not tracker.is_online("u2")
+        clock.now += 60
+        assert not tracker.is_online("u1")
+
+    def test_window_must_hold_a_bucket(self, clock):
+        with pytest.raises(ValueError):
+            PresenceTracker(window_seconds=30, bucket_seconds=60, clock=clock)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Unit tests for PvE story progression
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.pve_progress import PveCatalog, PveProgressService, pve_catalog
+
+
+def _legacy_db():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute('''
+        CREATE TABLE character_pve_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            character_id TEXT NOT NULL,
+            highest_enemy_defeated TEXT,
+            enemies_unlocked_json TEXT NOT NULL,
+            highest_unlocked_order INTEGER,
+            UNIQUE(character_id)
+        )
+    ''')
+    return conn
+
+
+class TestPveCatalog:
+    def test_story_order_follows_roster(self):
+        assert pve_catalog.story_order('chicken') == 1
+        assert pve_catalog.story_order('forest_rat') == 2
+        assert pve_catalog.story_order('unknown') is None
+
+    def test_clamp_order(self):
+        catalog = PveCatalog([{'id': 'a'}, {'id': 'b'}])
+        assert catalog.clamp_order(None) == 1
+        assert catalog.clamp_order(0) == 1
+        assert catalog.clamp_order(5) == 2
+
+    def test_highest_order_ignores_unknown_ids(self):
+        assert pve_catalog.highest_order_from_ids(['chicken', 'goblin_scout', 'removed_enemy']) == 3
+        assert pve_catalog.highest_order_from_ids([]) == 1
+
+
+class TestLegacyMigration:
+    def test_migrates_json_lists(self):
+        conn = _legacy_db()
+        conn.execute(
+            "INSERT INTO character_pve_progress (character_id, enemies_unlocked_json) VALUES (?, ?)",
+            ('c1', '["chicken", "forest_rat", "goblin_scout"]')
+        )
+        conn.execute(
+            "INSERT INTO character_pve_progress (character_id, enemies_unlocked_json) VALUES (?, ?)",
+            ('c2', 'not json')
+        )
+        service = PveProgressService(pve_catalog)
+        assert service.migrate_legacy_progress(conn.cursor()) == 2
+
+        cursor = conn.cursor()
+        assert service.get_highest_unlocked(cursor, 'c1') == 3
+        assert service.get_highest_unlocked(cursor, 'c2') == 1
+        assert service.get_highest_unlocked(cursor, 'missing') == 1
+        # Second run is a no-op
+        assert service.migrate_legacy_progress(conn.cursor()) == 0
+
+    def test_is_unlocked(self):
+        service = PveProgressService(pve_catalog)
+        assert service.is_unlocked(2, 'forest_rat')
+        assert not service.is_unlocked(2, 'goblin_scout')
+        assert not service.is_unlocked(30, 'unknown')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for query instrumentation (latency, rows, per-request counts, N+1)
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.async_db import AsyncDatabase
+from app.db.instrumentation import InstrumentedSqliteConnection, QueryInstrumentation, normalize_sql, query_instrumentation
+
+
+class FakeRoute:
+    path = "/api/things/{thing_id}"
+
+
+@pytest.fixture
+def instrumentation():
+    saved = (query_instrumentation.slow_query_ms, query_instrumentation.n_plus_one_threshold)
+    query_instrumentation.reset()
+    yield query_instrumentation
+    query_instrumentation.slow_query_ms, query_instrumentation.n_plus_one_threshold = saved
+    query_instrumentation.reset()
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", factory=InstrumentedSqliteConnection, check_same_thread=False)
+    conn.execute("CREATE TABLE things (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany("INSERT INTO things (name) VALUES (?)", [("a",), ("b",), ("c",)])
+    yield conn
+    conn.close()
+
+
+def _statement(stats, sql):
+    return next(row for row in stats["statements"] if row["sql"] == normalize_sql(sql))
+
+
+class TestStatementStats:
+    def test_latency_rows_and_errors(self, instrumentation, conn):
+        instrumentation.reset()
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM things\n   WHERE id > ?", (0,))
+        assert len(cursor.fetchall()) == 3
+        conn.execute("UPDATE things SET name = ? WHERE id <= ?", ("z", 2))
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("SELECT missing FROM things")
+
+        stats = instrumentation.stats()
+        select = _statement(stats, "SELECT id FROM things WHERE id > ?")
+        assert (select["calls"], select["rows"]) == (1, 3)
+        assert _statement(stats, "UPDATE things SET name = ? WHERE id <= ?")["rows"] == 2
+        assert _statement(stats, "SELECT missing FROM things")["errors"] == 1
+        assert stats["totals"]["outside_request"] == stats["totals"]["queries"] == 3
+
+    def test_statement_table_is_bounded(self, conn):
+        instrumentation = QueryInstrumentation(max_statements=2)
+        for sql in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3"):
+            instrumentation.record(sql, 1.0)
+        stats = instrumentation.stats()
+        assert sorted(row["sql"] for row in stats["statements"]) == ["SELECT 1", "SELECT 3"]
+        assert stats["totals"]["evicted_statements"] == 1
+
+    def test_paused_block_is_not_recorded(self, instrumentation, conn):
+        instrumentation.reset()
+        with instrumentation.paused():
+            conn.execute("PRAGMA cache_size = -2000")
+        assert instrumentation.stats()["totals"]["queries"] == 0
+
+
+class TestRequestScope:
+    def test_counts_per_route_and_flags_n_plus_one(self, instrumentation, conn, caplog):
+        instrumentation.n_plus_one_threshold = 3
+        instrumentation.slow_query_ms = 0.0
+        scope = {"path": "/api/things/7"}
+        token = instrumentation.begin_request("GET", scope)
+        scope["route"] = FakeRoute()  # set by the router after the middleware runs
+        for thing_id in range(1, 5):
+            conn.execute("SELECT name FROM things WHERE id = ?", (thing_id,)).fetchone()
+        request = instrumentation.end_request(token)
+
+        assert request.count == 4
+        assert request.flagged == [normalize_sql("SELECT name FROM things WHERE id = ?")]
+        assert instrumentation.current_request() is None
+
+        stats = instrumentation.stats()
+        assert stats["routes"][0]["route"] == "GET /api/things/{thing_id}"
+        assert stats["routes"][0]["max_queries"] == 4
+        assert stats["n_plus_one"][0]["requests"] == 1
+        assert stats["recent_slow"][0]["route"] == "GET /api/things/{thing_id}"
+        assert "Possible N+1" in caplog.text and "Slow query" in caplog.text
+
+    async def test_scope_follows_offloaded_handlers(self, instrumentation, conn):
+        executor = AsyncDatabase(max_workers=2)
+        token = instrumentation.begin_request("POST", path="/api/things")
+        try:
+            await executor.run(lambda: conn.execute("SELECT COUNT(*) FROM things").fetchone())
+            await executor.run(lambda: conn.execute("SELECT COUNT(*) FROM things").fetchone())
+        finally:
+            request = instrumentation.end_request(token)
+            executor.shutdown()
+        assert request.count == 2
+        assert instrumentation.stats()["routes"][0]["route"] == "POST /api/things"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the PvP queue wait-time telemetry
+"""
+import pytest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.queue_telemetry import QueueTelemetry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def telemetry(clock):
+    return QueueTelemetry(bracket_width=100, half_life_seconds=60, clock=clock)
+
+
+class TestEstimate:
+    def test_no_data_means_no_estimate(self, telemetry):
+        assert telemetry.estimate_wait(1000) is None
+
+    def test_uses_own_bracket_then_overall(self, telemetry):
+        telemetry.record_match(1010, 10)
+        telemetry.record_match(1090, 30)
+        telemetry.record_match(1500, 100)
+        # waits are spread evenly over their buckets: 5-10s and 20-30s
+        assert telemetry.estimate_wait(1050) == round((7.5 + 25) / 2)
+        assert telemetry.estimate_wait(1050, waited_seconds=15) == 25 - 15
+        assert telemetry.estimate_wait(2000) == round((7.5 + 25 + 90) / 3)
+
+    def test_long_waits_are_estimated_from_the_tail(self, telemetry):
+        for _ in range(9):
+            telemetry.record_match(1000, 8)
+        telemetry.record_match(1000, 250)
+        assert telemetry.estimate_wait(1000) < 30
+        # only the 120-300s wait is longer than 60s: its midpoint is 210s
+        assert telemetry.estimate_wait(1000, waited_seconds=60) == 210 - 60
+        assert telemetry.estimate_wait(1000, waited_seconds=200) == 50
+        # past every recorded wait, fall back to the mean instead of 1s
+        assert telemetry.estimate_wait(1000, waited_seconds=5000) == round((9 * 8 + 250) / 10)
+
+    def test_old_matches_fade(self, telemetry, clock):
+        telemetry.record_match(1000, 100)
+        clock.now += 600  # ten half-lives
+        telemetry.record_match(1000, 10)
+        assert telemetry.estimate_wait(1000) == 8  # 5-10s bucket
+
+
+class TestStats:
+    def test_percentiles_and_rate(self, telemetry, clock):
+        for waited in (3, 4, 8, 25, 250):
+            telemetry.record_match(1000, waited)
+        overall = telemetry.stats()["overall"]
+        assert overall["p50_wait_seconds"] == 10
+        assert overall["p90_wait_seconds"] == 300
+        assert overall["matches_per_minute"] > 0
+        clock.now += 60
+        assert telemetry.stats()["overall"]["matches_per_minute"] == pytest.approx(overall["matches_per_minute"] / 2, rel=0.01)
+        assert list(telemetry.stats()["brackets"]) == ["1000-1099"]
+
+    def test_queue_size_is_cached(self, telemetry, clock):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return 7
+
+        assert telemetry.queue_size(loader) == 7
+        assert telemetry.queue_size(loader) == 7
+        assert len(calls) == 1
+        telemetry.observe_queue_size(3)
+        assert telemetry.queue_size(loader) == 3
+        clock.now += 2
+        assert telemetry.queue_size(loader) == 7
+        assert len(calls) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Unit tests for read-replica routing (staleness budget, read-your-writes)
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.manager import DatabaseManager
+from app.db.replica import PRIMARY_LAG, PRIMARY_STICKY, REPLICA, ReplicaRouter
+from app.db.sqlite_profile import build_sqlite_profile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplicaRouter:
+    def test_read_your_writes_is_sticky_per_session(self):
+        clock = FakeClock()
+        router = ReplicaRouter(max_lag_seconds=5, sticky_seconds=3, clock=clock)
+        probe = lambda: 0.0
+
+        token = router.begin_request("Bearer alice")
+        assert router.choose(probe) == REPLICA
+        router.note_write()
+        assert router.choose(probe) == PRIMARY_STICKY  # rest of the same request
+        router.end_request(token)
+
+        token = router.begin_request("Bearer alice")
+        assert router.choose(probe) == PRIMARY_STICKY
+        router.end_request(token)
+        token = router.begin_request("Bearer bob")
+        assert router.choose(probe) == REPLICA
+        router.end_request(token)
+
+        clock.now += 3
+        token = router.begin_request("Bearer alice")
+        assert router.choose(probe) == REPLICA
+        router.end_request(token)
+        assert router.stats()["sticky_sessions"] == 0
+
+    def test_staleness_budget_and_probe_caching(self):
+        clock = FakeClock()
+        router = ReplicaRouter(max_lag_seconds=2, lag_check_interval=1, clock=clock)
+        lags = [0.5, 10.0]
+        calls = []
+
+        def probe():
+            calls.append(clock.now)
+            return lags[len(calls) - 1]
+
+        assert router.choose(probe) == REPLICA
+        assert router.choose(probe) == REPLICA  # cached
+        clock.now += 1
+        assert router.choose(probe) == PRIMARY_LAG
+        assert len(calls) == 2
+
+        clock.now += 1
+        assert router.choose(lambda: 1 / 0) == PRIMARY_LAG  # unmeasurable lag is treated as stale
+        stats = router.stats()
+        assert (stats["replica_reads"], stats["primary_reads_lag"], stats["lag_probe_failures"]) == (2, 2, 1)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager()
+    manager.use_postgres = False
+    manager.sqlite_path = str(tmp_path / "primary.db")
+    manager.sqlite_profile = build_sqlite_profile("tuned")
+    yield manager
+    manager.close_pools()
+
+
+def _create(path, value):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (source TEXT)")
+    conn.execute("INSERT INTO t VALUES (?)", (value,))
+    conn.commit()
+    conn.close()
+
+
+def _read_source(manager):
+    conn = manager.get_read_connection()
+    try:
+        return conn.execute("SELECT source FROM t").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestManagerRouting:
+    def test_reads_use_replica_until_session_writes(self, manager, tmp_path):
+        _create(manager.sqlite_path, "primary")
+        replica_path = str(tmp_path / "replica.db")
+        _create(replica_path, "replica")
+        manager.replica_url = f"sqlite:///{replica_path}"
+
+        token = manager.replica_router.begin_request("Bearer alice")
+        assert _read_source(manager) == "replica"
+        conn = manager.get_connection()
+        conn.execute("INSERT INTO t VALUES ('write')")
+        conn.commit()
+        conn.close()
+        assert _read_source(manager) == "primary"
+        manager.replica_router.end_request(token)
+
+        replica = manager.get_read_connection()
+        with pytest.raises(sqlite3.OperationalError):
+            replica.execute("INSERT INTO t VALUES ('nope')")
+        replica.close()
+        stats = manager.replica_stats()
+        assert stats["configured"] and stats["pool"]["checkouts"] == 2
+        assert stats["primary_reads_sticky"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
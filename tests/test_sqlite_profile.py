@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for SQLite connection profiles and WAL checkpoints
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.manager import DatabaseManager
+from app.db.sqlite_profile import WalCheckpointer, build_sqlite_profile
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = DatabaseManager()
+    manager.use_postgres = False
+    manager.sqlite_path = str(tmp_path / "profile.db")
+    manager.sqlite_profile = build_sqlite_profile("tuned")
+    yield manager
+    manager.close_pools()
+
+
+def _pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+class TestSqliteProfile:
+    def test_overrides_and_validation(self):
+        profile = build_sqlite_profile("TUNED", synchronous="FULL", busy_timeout_ms=None)
+        assert profile.synchronous == "full"
+        assert profile.busy_timeout_ms == 5000
+        with pytest.raises(ValueError):
+            build_sqlite_profile("turbo")
+        with pytest.raises(ValueError):
+            build_sqlite_profile("tuned", journal_mode="wal2")
+
+    def test_connections_get_profile_pragmas(self, manager):
+        conn = manager.get_connection()
+        assert _pragma(conn, "journal_mode") == "wal"
+        assert _pragma(conn, "synchronous") == 1  # NORMAL
+        assert _pragma(conn, "busy_timeout") == 5000
+        assert _pragma(conn, "temp_store") == 2  # MEMORY
+        assert _pragma(conn, "cache_size") == -64000
+        conn.close()
+
+    def test_read_connection_is_query_only(self, manager):
+        conn = manager.get_connection()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+        conn.close()
+
+        reader = manager.get_read_connection()
+        assert reader.execute("SELECT x FROM t").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            reader.execute("INSERT INTO t VALUES (2)")
+        reader.close()
+        assert manager.sqlite_stats()['read_pool']['checkouts'] == 1
+
+
+class TestWalCheckpointer:
+    def test_truncates_large_wal(self, manager):
+        conn = manager.get_connection()
+        conn.execute("CREATE TABLE t (x TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("x" * 500,) for _ in range(200)])
+        conn.commit()
+        conn.close()
+
+        checkpointer = WalCheckpointer(manager.get_connection, interval_seconds=60, truncate_pages=1)
+        result = checkpointer.checkpoint()
+        assert result['busy'] == 0
+        assert result['log_pages'] == 0  # TRUNCATE resets the WAL
+        stats = checkpointer.stats()
+        assert stats['runs'] == 1
+        assert stats['truncations'] == 1
+        assert os.path.getsize(manager.sqlite_path + "-wal") == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
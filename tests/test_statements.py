@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the named statement registry
+"""
+import pytest
+import sqlite3
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db.statements import Statement, StatementRegistry, to_postgres_placeholders
+
+
+class RecordingPgCursor:
+    """Stands in for a psycopg2 cursor; records the SQL it is given."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+
+
+class RecordingPgConnection:
+    def __init__(self):
+        self.prepared_statements = set()
+
+
+class TestTranslation:
+    def test_placeholders_outside_quotes_only(self):
+        sql = "SELECT '?' AS q, \"a?b\" FROM t WHERE x = ? AND y = ?"
+        assert to_postgres_placeholders(sql) == "SELECT '?' AS q, \"a?b\" FROM t WHERE x = %s AND y = %s"
+        assert to_postgres_placeholders("SELECT 1") == "SELECT 1"
+
+    def test_statement_renders_both_dialects(self):
+        statement = Statement("pvp.match", "SELECT id FROM c WHERE pvp_enabled = {true} AND id != ?")
+        assert statement.sqlite_sql == "SELECT id FROM c WHERE pvp_enabled = 1 AND id != ?"
+        assert statement.postgres_sql == "SELECT id FROM c WHERE pvp_enabled = TRUE AND id != %s"
+        assert statement.prepare_sql == "PREPARE st_pvp_match AS SELECT id FROM c WHERE pvp_enabled = TRUE AND id != $1"
+        assert statement.execute_sql == "EXECUTE st_pvp_match (%s)"
+        assert statement.param_count == 1
+
+
+class TestStatementRegistry:
+    def test_executes_on_sqlite_and_records_timings(self):
+        registry = StatementRegistry()
+        select = registry.register("t.by_flag", "SELECT x FROM t WHERE flag = {false} AND x > ?")
+        with pytest.raises(ValueError):
+            registry.register("t.by_flag", "SELECT 1")
+
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE t (x INTEGER, flag INTEGER)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, 0), (2, 0), (3, 1)])
+        cursor = conn.cursor()
+        assert [row[0] for row in registry.fetchall(cursor, select, (1,))] == [2]
+        assert registry.fetchone(cursor, "t.by_flag", (0,)) == (1,)
+
+        with pytest.raises(sqlite3.OperationalError):
+            registry.execute(cursor, registry.register("t.broken", "SELECT nope FROM t"))
+
+        stats = {row['name']: row for row in registry.stats()}
+        assert stats['t.by_flag']['calls'] == 2
+        assert stats['t.broken']['errors'] == 1
+
+    def test_prepares_once_per_postgres_connection(self):
+        registry = StatementRegistry(prepare_on_postgres=True)
+        statement = registry.register("users.by_id", "SELECT id FROM users WHERE id = ?")
+        unprepared = registry.register("users.all", "SELECT * FROM users", prepare=False)
+
+        connection = RecordingPgConnection()
+        cursor = RecordingPgCursor(connection)
+        registry.execute(cursor, statement, ("u1",))
+        registry.execute(cursor, statement, ("u2",))
+        registry.execute(cursor, unprepared)
+
+        assert cursor.executed.count(statement.prepare_sql) == 1
+        assert cursor.executed.count("EXECUTE st_users_by_id (%s)") == 2
+        assert cursor.executed[-1] == "SELECT * FROM users"
+        assert connection.prepared_statements == {"st_users_by_id"}
+
+        # A fresh connection prepares again
+        other = RecordingPgCursor(RecordingPgConnection())
+        registry.execute(other, statement, ("u3",))
+        assert statement.prepare_sql in other.executed
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])